@@ -0,0 +1,58 @@
+"""add_bankroll_analytics
+
+Revision ID: d5a1e7c3b9f2
+Revises: c3f8a2d6e1b4
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a1e7c3b9f2'
+down_revision: Union[str, None] = 'c3f8a2d6e1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Incremental analytics state; populate existing rows with scripts/backfill_bankroll_analytics.py
+    op.add_column('bankrolls', sa.Column('equity', sa.Float(), nullable=True))
+    op.add_column('bankrolls', sa.Column('peak_equity', sa.Float(), nullable=True))
+    op.add_column('bankrolls', sa.Column('current_drawdown', sa.Float(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('returns_count', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('returns_mean', sa.Float(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('returns_m2', sa.Float(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('current_streak', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('longest_win_streak', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('bankrolls', sa.Column('longest_loss_streak', sa.Integer(), nullable=True, server_default='0'))
+
+    op.create_table(
+        'bankroll_equity_points',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('bet_id', sa.String(), nullable=True),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False),
+        sa.Column('equity', sa.Float(), nullable=False),
+        sa.Column('drawdown', sa.Float(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_equity_points_user_time', 'bankroll_equity_points', ['user_id', 'recorded_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_equity_points_user_time', table_name='bankroll_equity_points')
+    op.drop_table('bankroll_equity_points')
+    with op.batch_alter_table('bankrolls') as batch_op:
+        batch_op.drop_column('longest_loss_streak')
+        batch_op.drop_column('longest_win_streak')
+        batch_op.drop_column('current_streak')
+        batch_op.drop_column('returns_m2')
+        batch_op.drop_column('returns_mean')
+        batch_op.drop_column('returns_count')
+        batch_op.drop_column('current_drawdown')
+        batch_op.drop_column('peak_equity')
+        batch_op.drop_column('equity')
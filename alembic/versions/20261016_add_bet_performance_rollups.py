@@ -0,0 +1,91 @@
+"""add_bet_performance_rollups
+
+Revision ID: c3f8a2d6e1b4
+Revises: b7e4c2a9d1f3
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d6e1b4'
+down_revision: Union[str, None] = 'b7e4c2a9d1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-day ROI totals so BetTracker.calculate_roi sums rollups instead of scanning bets
+    op.create_table(
+        'bet_performance_rollups',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('sport', sa.String(), nullable=False),
+        sa.Column('bet_type', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('bets_placed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bets_settled', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bets_won', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bets_lost', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bets_pushed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amount_wagered', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('amount_won', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('amount_lost', sa.Float(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id', 'sport', 'bet_type', 'day')
+    )
+    op.create_index('idx_bet_rollups_user_day', 'bet_performance_rollups', ['user_id', 'day'], unique=False)
+
+    # Backfill from existing bets in one grouped INSERT ... SELECT.
+    # Enum columns may hold names or values, so compare case-insensitively.
+    # Cancelled bets were placed but never settled, matching BetTracker at runtime.
+    bets = sa.table(
+        'bets',
+        sa.column('user_id', sa.String()),
+        sa.column('sport', sa.String()),
+        sa.column('bet_type', sa.String()),
+        sa.column('status', sa.String()),
+        sa.column('amount', sa.Float()),
+        sa.column('payout', sa.Float()),
+        sa.column('placed_at', sa.DateTime()),
+    )
+    rollups = sa.table(
+        'bet_performance_rollups',
+        *(sa.column(name) for name in (
+            'user_id', 'sport', 'bet_type', 'day', 'bets_placed', 'bets_settled', 'bets_won', 'bets_lost',
+            'bets_pushed', 'amount_wagered', 'amount_won', 'amount_lost'
+        ))
+    )
+    status = sa.func.lower(bets.c.status)
+    bet_type = sa.func.lower(bets.c.bet_type)
+    day = sa.cast(bets.c.placed_at, sa.Date()) if op.get_bind().dialect.name != 'sqlite' else sa.func.date(bets.c.placed_at)
+
+    def count_if(condition):
+        return sa.func.sum(sa.case((condition, 1), else_=0))
+
+    def sum_if(condition, value):
+        return sa.func.sum(sa.case((condition, sa.func.coalesce(value, 0)), else_=0))
+
+    select = sa.select(
+        bets.c.user_id,
+        bets.c.sport,
+        bet_type,
+        day,
+        sa.func.count(),
+        count_if(status.notin_(('pending', 'cancelled'))),
+        count_if(status == 'won'),
+        count_if(status == 'lost'),
+        count_if(status == 'pushed'),
+        sa.func.sum(bets.c.amount),
+        sum_if(status == 'won', bets.c.payout),
+        sum_if(status == 'lost', bets.c.amount),
+    ).where(bets.c.placed_at.isnot(None)).group_by(bets.c.user_id, bets.c.sport, bet_type, day)
+
+    op.execute(rollups.insert().from_select([c.name for c in rollups.columns], select))
+
+
+def downgrade() -> None:
+    op.drop_index('idx_bet_rollups_user_day', table_name='bet_performance_rollups')
+    op.drop_table('bet_performance_rollups')
@@ -0,0 +1,141 @@
+"""add_prediction_betting_columns
+
+Revision ID: b7e4c2a9d1f3
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a9d1f3'
+down_revision: Union[str, None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _parse_game_date(value):
+    if not value:
+        return None
+    from dateutil import parser
+    try:
+        game_date = parser.parse(str(value))
+    except (ValueError, OverflowError, TypeError):
+        return None
+    if game_date.tzinfo is not None:
+        game_date = game_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return game_date
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def upgrade() -> None:
+    # Promote betting fields out of metadata_json so the betting engine can filter in SQL
+    op.add_column('predictions', sa.Column('game_id', sa.String(), nullable=True))
+    op.add_column('predictions', sa.Column('game_date', sa.DateTime(), nullable=True))
+    op.add_column('predictions', sa.Column('home_team', sa.String(), nullable=True))
+    op.add_column('predictions', sa.Column('away_team', sa.String(), nullable=True))
+    op.add_column('predictions', sa.Column('team', sa.String(), nullable=True))
+    op.add_column('predictions', sa.Column('bet_type', sa.String(), nullable=True))
+    op.add_column('predictions', sa.Column('line', sa.Float(), nullable=True))
+    op.add_column('predictions', sa.Column('odds', sa.Float(), nullable=True))
+    op.add_column('predictions', sa.Column('probability', sa.Float(), nullable=True))
+    op.add_column('predictions', sa.Column('edge', sa.Float(), nullable=True))
+
+    # Backfill from existing JSON (batched to keep memory flat on large tables)
+    bind = op.get_bind()
+    predictions = sa.table(
+        'predictions',
+        sa.column('id', sa.String()),
+        sa.column('metadata_json', sa.JSON()),
+        sa.column('game_id', sa.String()),
+        sa.column('game_date', sa.DateTime()),
+        sa.column('home_team', sa.String()),
+        sa.column('away_team', sa.String()),
+        sa.column('team', sa.String()),
+        sa.column('bet_type', sa.String()),
+        sa.column('line', sa.Float()),
+        sa.column('odds', sa.Float()),
+        sa.column('probability', sa.Float()),
+        sa.column('edge', sa.Float()),
+    )
+
+    last_id = None
+    while True:
+        query = sa.select(predictions.c.id, predictions.c.metadata_json).order_by(predictions.c.id)
+        if last_id is not None:
+            query = query.where(predictions.c.id > last_id)
+        rows = bind.execute(query.limit(BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, metadata in rows:
+            metadata = metadata or {}
+            if not isinstance(metadata, dict):
+                continue
+            game_id = metadata.get('game_id')
+            updates.append({
+                'row_id': row_id,
+                'game_id': str(game_id) if game_id is not None else None,
+                'game_date': _parse_game_date(metadata.get('game_date') or metadata.get('date')),
+                'home_team': metadata.get('home_team'),
+                'away_team': metadata.get('away_team'),
+                'team': metadata.get('team'),
+                'bet_type': metadata.get('bet_type'),
+                'line': _to_float(metadata.get('line')),
+                'odds': _to_float(metadata.get('odds')),
+                'probability': _to_float(metadata.get('probability')),
+                'edge': _to_float(metadata.get('edge')),
+            })
+
+        if updates:
+            bind.execute(
+                predictions.update()
+                .where(predictions.c.id == sa.bindparam('row_id'))
+                .values(
+                    game_id=sa.bindparam('game_id'),
+                    game_date=sa.bindparam('game_date'),
+                    home_team=sa.bindparam('home_team'),
+                    away_team=sa.bindparam('away_team'),
+                    team=sa.bindparam('team'),
+                    bet_type=sa.bindparam('bet_type'),
+                    line=sa.bindparam('line'),
+                    odds=sa.bindparam('odds'),
+                    probability=sa.bindparam('probability'),
+                    edge=sa.bindparam('edge'),
+                ),
+                updates
+            )
+        last_id = rows[-1][0]
+
+    op.create_index('ix_predictions_game_id', 'predictions', ['game_id'], unique=False)
+    op.create_index('idx_predictions_game_date_timestamp', 'predictions', ['game_date', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_predictions_game_date_timestamp', table_name='predictions')
+    op.drop_index('ix_predictions_game_id', table_name='predictions')
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.drop_column('edge')
+        batch_op.drop_column('probability')
+        batch_op.drop_column('odds')
+        batch_op.drop_column('line')
+        batch_op.drop_column('bet_type')
+        batch_op.drop_column('team')
+        batch_op.drop_column('away_team')
+        batch_op.drop_column('home_team')
+        batch_op.drop_column('game_date')
+        batch_op.drop_column('game_id')
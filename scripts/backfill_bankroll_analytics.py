@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Backfill Bankroll Analytics
+===========================
+Rebuild equity curves, drawdown, Sharpe and streaks from settled bets.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from src.services.bankroll_analytics import bankroll_analytics
+
+
+async def main():
+    """Rebuild bankroll analytics."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild bankroll analytics from bet history")
+    parser.add_argument("--user", action="append", dest="users", help="User ID to rebuild (repeatable; default: all)")
+
+    args = parser.parse_args()
+
+    print("📊 Rebuilding bankroll analytics...")
+    rebuilt = await bankroll_analytics.backfill(args.users)
+    print(f"✅ Rebuilt {rebuilt} bankrolls")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -62,10 +62,13 @@ async def generate_predictions_with_betting_metadata():
     if check_tomorrow:
         print(f"   Also checking tomorrow: {tomorrow_date} (early morning or late evening)")
     
+    # Fetch every sport's scoreboard concurrently over the shared client
+    print(f"   Fetching {', '.join(sports_to_fetch)} games...")
+    games_by_sport = await real_sports_service.get_live_games_many(sports_to_fetch)
+    
     for sport_key in sports_to_fetch:
         try:
-            print(f"   Fetching {sport_key} games...")
-            games = await real_sports_service.get_live_games(sport_key)
+            games = games_by_sport.get((sport_key, None), [])
             if games:
                 print(f"   ✅ Found {len(games)} total {sport_key} games from API")
                 
@@ -131,84 +134,123 @@ async def generate_predictions_with_betting_metadata():
     print()
     
     predictions_created = 0
+    prepared_games = []
+    
+    for game in selected_games:
+        try:
+            # Extract game info - home_team and away_team are strings in the response
+            home_team = game.get("home_team", "Home Team")
+            away_team = game.get("away_team", "Away Team")
+            game_id = game.get("id", f"game_{uuid.uuid4()}")
+            
+            # Determine sport name - preserve specific sport types
+            sport_key = game.get("sport_key", "basketball")
+            sport_map = {
+                "ncaaf": "football",
+                "nfl": "football",
+                "nhl": "hockey",
+                "ncaab": "basketball",
+                "ncaaw": "women_basketball",  # Keep women's basketball separate
+                "nba": "basketball",
+                "wnba": "women_basketball",
+                "mlb": "baseball"
+            }
+            sport = sport_map.get(sport_key, "basketball")
+            
+            # Extract odds from real_odds if available
+            real_odds = game.get("real_odds", {})
+            markets = real_odds.get("markets", [])
+            
+            # Try to get moneyline odds, fallback to spread, then default
+            odds = -110  # Default odds
+            bet_type = "moneyline"
+            line = None
+            team = home_team  # Default to home team
+            
+            # Look for moneyline (h2h) first
+            for market in markets:
+                if market.get("key") == "h2h":
+                    outcomes = market.get("outcomes", [])
+                    if outcomes:
+                        # Use home team odds
+                        home_outcome = next((o for o in outcomes if o.get("name") == home_team), None)
+                        if home_outcome:
+                            odds = home_outcome.get("price", -110)
+                            bet_type = "moneyline"
+                            team = home_team
+                            break
+                
+                elif market.get("key") == "spreads" and bet_type == "moneyline":
+                    # Fallback to spread if no moneyline
+                    outcomes = market.get("outcomes", [])
+                    if outcomes:
+                        home_outcome = next((o for o in outcomes if o.get("name") == home_team), None)
+                        if home_outcome:
+                            odds = home_outcome.get("price", -110)
+                            line = home_outcome.get("point", 0)
+                            bet_type = "spread"
+                            team = home_team
+                            break
+            
+            # Generate prediction text
+            if bet_type == "moneyline":
+                prediction_text = f"{home_team} to win (Moneyline)"
+            else:
+                prediction_text = f"{home_team} {line:+.1f} (Spread)"
+            
+            # Model input (scored per sport in one batch below)
+            game_data = {
+                "game_id": game_id,
+                "home_team": home_team,
+                "away_team": away_team,
+                "date": game.get("date", datetime.utcnow().isoformat()),
+                "sport": sport
+            }
+            
+            prepared_games.append({
+                "game": game,
+                "game_data": game_data,
+                "game_id": game_id,
+                "home_team": home_team,
+                "away_team": away_team,
+                "sport_key": sport_key,
+                "sport": sport,
+                "odds": odds,
+                "prediction_text": prediction_text
+            })
+        except Exception as e:
+            print(f"   ⚠️ Error processing game: {e}")
+            continue
+    
+    # Score each sport's slate with one batched model call
+    for sport_key in {entry["sport_key"] for entry in prepared_games}:
+        entries = [entry for entry in prepared_games if entry["sport_key"] == sport_key]
+        try:
+            results = await model_prediction_service.get_model_predictions_batch(
+                sport=sport_key,
+                games=[entry["game_data"] for entry in entries],
+                odds=[entry["odds"] for entry in entries]
+            )
+        except Exception as e:
+            print(f"   ⚠️ Error scoring {sport_key} games: {e}")
+            continue
+        for entry, result in zip(entries, results):
+            entry["model_result"] = result
     
     async with AsyncSessionLocal() as session:
-        for game in selected_games:
+        for entry in prepared_games:
+            if "model_result" not in entry:
+                continue
             try:
-                # Extract game info - home_team and away_team are strings in the response
-                home_team = game.get("home_team", "Home Team")
-                away_team = game.get("away_team", "Away Team")
-                game_id = game.get("id", f"game_{uuid.uuid4()}")
-                
-                # Determine sport name - preserve specific sport types
-                sport_key = game.get("sport_key", "basketball")
-                sport_map = {
-                    "ncaaf": "football",
-                    "nfl": "football",
-                    "nhl": "hockey",
-                    "ncaab": "basketball",
-                    "ncaaw": "women_basketball",  # Keep women's basketball separate
-                    "nba": "basketball",
-                    "wnba": "women_basketball",
-                    "mlb": "baseball"
-                }
-                sport = sport_map.get(sport_key, "basketball")
-                
-                # Extract odds from real_odds if available
-                real_odds = game.get("real_odds", {})
-                markets = real_odds.get("markets", [])
-                
-                # Try to get moneyline odds, fallback to spread, then default
-                odds = -110  # Default odds
-                bet_type = "moneyline"
-                line = None
-                team = home_team  # Default to home team
-                
-                # Look for moneyline (h2h) first
-                for market in markets:
-                    if market.get("key") == "h2h":
-                        outcomes = market.get("outcomes", [])
-                        if outcomes:
-                            # Use home team odds
-                            home_outcome = next((o for o in outcomes if o.get("name") == home_team), None)
-                            if home_outcome:
-                                odds = home_outcome.get("price", -110)
-                                bet_type = "moneyline"
-                                team = home_team
-                                break
-                    
-                    elif market.get("key") == "spreads" and bet_type == "moneyline":
-                        # Fallback to spread if no moneyline
-                        outcomes = market.get("outcomes", [])
-                        if outcomes:
-                            home_outcome = next((o for o in outcomes if o.get("name") == home_team), None)
-                            if home_outcome:
-                                odds = home_outcome.get("price", -110)
-                                line = home_outcome.get("point", 0)
-                                bet_type = "spread"
-                                team = home_team
-                                break
-                
-                # Generate prediction text
-                if bet_type == "moneyline":
-                    prediction_text = f"{home_team} to win (Moneyline)"
-                else:
-                    prediction_text = f"{home_team} {line:+.1f} (Spread)"
-                
-                # Get model prediction (uses trained models if available, fallback otherwise)
-                game_data = {
-                    "game_id": game_id,
-                    "home_team": home_team,
-                    "away_team": away_team,
-                    "date": game.get("date", datetime.utcnow().isoformat()),
-                    "sport": sport
-                }
-                
-                model_result = await model_prediction_service.get_model_prediction(
-                    sport=sport_key,
-                    game_data=game_data,
-                    odds=odds
-                )
+                game = entry["game"]
+                game_id = entry["game_id"]
+                home_team = entry["home_team"]
+                away_team = entry["away_team"]
+                sport_key = entry["sport_key"]
+                sport = entry["sport"]
+                odds = entry["odds"]
+                prediction_text = entry["prediction_text"]
+                model_result = entry["model_result"]
                 
                 model_probability = model_result['model_probability']
                 model_confidence = model_result['confidence']
@@ -8,7 +8,8 @@ and handles global learning across all sports.
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Protocol, Any
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Protocol, Any
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
@@ -19,7 +20,7 @@ from src.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.database import AsyncSessionLocal
 from sqlalchemy import select, func
-from src.db.models.prediction import Prediction as PredictionModel
+from src.db.models.prediction import Prediction as PredictionModel, betting_columns_from_metadata
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -77,11 +78,18 @@ class HeadAgent:
     
     Sub-agent registration is persisted to Redis to support horizontal scaling.
     Local instance keeps references to agent objects for actual communication.
+    
+    Sub-agents are queried concurrently under a per-agent deadline, with a
+    hedged second attempt for slow ones. Their health is probed by the
+    heartbeat loop and read back from the registry snapshot.
     """
     
     # Redis key for sub-agent registry
     REDIS_AGENT_KEY = "head_agent:sub_agents"
     
+    # How long a direct health probe is reused when the registry is unavailable
+    HEALTH_CACHE_SECONDS = 30
+    
     def __init__(self, redis_client=None):
         # Local agent instances (for fast access within this process)
         # These are actual agent object references
@@ -94,16 +102,22 @@ class HeadAgent:
         
         # Initialize services for state management
         from src.services.auth_service import AuthService
-        from src.services.user_preferences import UserPreferencesService
+        from src.services.user_preferences import user_preferences_service
         from src.services.feature_flags import feature_flags
         from src.services.agent_registry import agent_registry
-        from src.config import settings
         
         self.auth_service = AuthService()
-        self.preferences_service = UserPreferencesService()
+        self.preferences_service = user_preferences_service
         self.feature_flags = feature_flags
         self.agent_registry = agent_registry
         
+        # Fan-out deadlines (seconds)
+        self.agent_timeout = settings.agent_call_timeout_seconds
+        self.hedge_delay = settings.agent_hedge_delay_seconds
+        
+        # sport -> (monotonic probe time, healthy); fallback when the registry is unavailable
+        self._health_cache: Dict[SportType, tuple] = {}
+        
         # Generate unique instance ID
         import socket
         self.instance_id = f"{socket.gethostname()}:{id(self)}"
@@ -163,6 +177,9 @@ class HeadAgent:
             self._local_agent_ids[sport] = agent_id
             logger.info(f"✅ Registered sub-agent for {sport.value} (agent_id={agent_id})")
             
+            # Publish real health right away rather than at the next heartbeat
+            await self._report_health(sport, agent_id)
+            
             # Start heartbeat loop if not already running
             if not self._heartbeat_running:
                 await self._start_heartbeat_loop()
@@ -174,6 +191,7 @@ class HeadAgent:
         # Remove local reference
         if sport in self._local_agent_refs:
             del self._local_agent_refs[sport]
+        self._health_cache.pop(sport, None)
         
         # Unregister from distributed registry
         if sport in self._local_agent_ids:
@@ -224,7 +242,13 @@ class HeadAgent:
         return list(local_sports)
     
     async def aggregate_predictions(self, user_query: UserQuery) -> Dict[str, Any]:
-        """Aggregate predictions from relevant sub-agents."""
+        """Aggregate predictions from relevant sub-agents.
+        
+        Sub-agents are queried concurrently, so the aggregation takes about as
+        long as the slowest agent, capped by AGENT_CALL_TIMEOUT_SECONDS. Agents
+        that miss the deadline are listed in "sports_timed_out" and the rest
+        are still combined.
+        """
         logger.info(f"Aggregating predictions for user {user_query.user_id}")
         
         predictions = {}
@@ -243,72 +267,19 @@ class HeadAgent:
                 "available_sports": await self.get_available_sports()
             }
         
-        # Collect predictions from relevant sub-agents
-        for sport in relevant_sports:
-            try:
-                # First try local agent (fast path)
-                if sport in self._local_agent_refs:
-                    agent = self._local_agent_refs[sport]
-                    
-                    # Check agent health
-                    health = await agent.get_health_status()
-                    if not health.get("healthy", False):
-                        logger.warning(f"Sub-agent for {sport.value} is unhealthy: {health}")
-                        continue
-                    
-                    # Get prediction from local agent
-                    query_params = {
-                        "user_id": user_query.user_id,
-                        "query_text": user_query.query_text,
-                        "preferences": user_query.preferences,
-                        "timestamp": user_query.timestamp.isoformat()
-                    }
-                    
-                    prediction = await agent.get_prediction(query_params)
-                    predictions[sport.value] = prediction
-                else:
-                    # Try to get agent from registry (remote instance)
-                    agent_info = await self.agent_registry.get_agent(sport.value)
-                    if not agent_info:
-                        logger.warning(f"No agent available for {sport.value}")
-                        continue
-                    
-                    # Invoke remote agent via HTTP
-                    prediction = await self._invoke_remote_agent(
-                        agent_info,
-                        user_query
-                    )
-                    
-                    if prediction:
-                        predictions[sport.value] = prediction
-                    else:
-                        logger.warning(f"Remote agent invocation failed for {sport.value}")
-                        continue
-                
-                # Store in database
-                async with AsyncSessionLocal() as db:
-                    try:
-                        db_prediction = PredictionModel(
-                            id=f"pred_{sport.value}_{uuid.uuid4()}", # Unique ID
-                            user_id=user_query.user_id,
-                            sport=sport.value,
-                            prediction_text=prediction.prediction,
-                            confidence=prediction.confidence.value,
-                            reasoning=prediction.reasoning,
-                            timestamp=datetime.utcnow(),
-                            metadata_json=prediction.metadata
-                        )
-                        db.add(db_prediction)
-                        await db.commit()
-                    except Exception as db_err:
-                        logger.error(f"Failed to save prediction to DB: {db_err}")
-                        await db.rollback()
-                
-            except Exception as e:
-                logger.error(f"Error getting prediction from {sport.value} agent: {e}")
-                predictions[sport.value] = {
-                    "error": f"Failed to get prediction: {str(e)}"
-                }
+        # Query every relevant sub-agent at once; each is bounded by its own deadline
+        results = await asyncio.gather(
+            *(self._collect_prediction(sport, user_query) for sport in relevant_sports)
+        )
+        timed_out = []
+        for sport, (prediction, sport_timed_out) in zip(relevant_sports, results):
+            if prediction is not None:
+                predictions[sport.value] = prediction
+            if sport_timed_out:
+                timed_out.append(sport.value)
+        
+        # Store in database
+        await self._save_predictions(user_query, predictions)
         
         # Combine predictions using weighting algorithm
         combined_prediction = await self._combine_predictions(predictions, user_query)
@@ -319,9 +290,167 @@ class HeadAgent:
             "predictions": predictions,
             "combined_prediction": combined_prediction,
             "timestamp": datetime.now().isoformat(),
-            "sports_analyzed": [s.value for s in relevant_sports]
+            "sports_analyzed": [s.value for s in relevant_sports],
+            "sports_timed_out": timed_out
         }
     
+    async def _collect_prediction(self, sport: SportType, user_query: UserQuery) -> tuple:
+        """Get one sport's prediction for aggregate_predictions.
+        
+        Returns (prediction, timed_out). The prediction is None when the sport
+        is skipped and an error dict when the agent fails or misses its deadline.
+        """
+        try:
+            # First try local agent (fast path)
+            if sport in self._local_agent_refs:
+                agent = self._local_agent_refs[sport]
+                
+                # Check agent health (cached; refreshed by the heartbeat loop)
+                if not await self._is_agent_healthy(sport, agent):
+                    logger.warning(f"Sub-agent for {sport.value} is unhealthy")
+                    return None, False
+                
+                # Get prediction from local agent
+                query_params = {
+                    "user_id": user_query.user_id,
+                    "query_text": user_query.query_text,
+                    "preferences": user_query.preferences,
+                    "timestamp": user_query.timestamp.isoformat()
+                }
+                
+                return await self._call_with_hedge(lambda: agent.get_prediction(query_params)), False
+            
+            async def invoke_remote():
+                # Try to get agent from registry (remote instance); a hedge may pick another one
+                agent_info = await self.agent_registry.get_agent(sport.value)
+                if not agent_info:
+                    logger.warning(f"No agent available for {sport.value}")
+                    return None
+                
+                # Invoke remote agent via HTTP; tracking feeds least-loaded selection
+                async with self.agent_registry.track(agent_info.agent_id):
+                    return await self._invoke_remote_agent(agent_info, user_query)
+            
+            prediction = await self._call_with_hedge(invoke_remote)
+            if not prediction:
+                logger.warning(f"Remote agent invocation failed for {sport.value}")
+                return None, False
+            return prediction, False
+        
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ {sport.value} agent missed its {self.agent_timeout}s deadline")
+            return {"error": f"Timed out after {self.agent_timeout}s"}, True
+        except Exception as e:
+            logger.error(f"Error getting prediction from {sport.value} agent: {e}")
+            return {"error": f"Failed to get prediction: {str(e)}"}, False
+    
+    async def _call_with_hedge(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call() under the agent deadline, hedging with a second attempt.
+        
+        The second attempt starts once the first has run for hedge_delay, or
+        straight away if the first fails. The first attempt to succeed wins and
+        the other is cancelled. Raises asyncio.TimeoutError at the deadline, or
+        straight away if the deadline leaves no time to start an attempt.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.agent_timeout
+        hedge_at = start + self.hedge_delay
+        max_attempts = 2 if self.hedge_delay > 0 else 1
+        
+        pending = set()
+        attempts = 0
+        error = None
+        try:
+            while True:
+                now = loop.time()
+                if attempts < max_attempts and now < deadline and (not pending or now >= hedge_at):
+                    pending.add(asyncio.ensure_future(call()))
+                    attempts += 1
+                if not pending:
+                    raise error if error is not None else asyncio.TimeoutError()
+                if now >= deadline:
+                    raise asyncio.TimeoutError()
+                
+                wake_at = deadline if attempts >= max_attempts else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, wake_at - now), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _is_agent_healthy(self, sport: SportType, agent: SubAgentInterface) -> bool:
+        """Health of a local sub-agent without probing it on every call.
+        
+        Read from the registry snapshot, where the heartbeat loop reports it.
+        Agents missing from the registry (Redis down) reuse a direct probe for
+        HEALTH_CACHE_SECONDS.
+        """
+        agent_id = self._local_agent_ids.get(sport)
+        if agent_id:
+            for agent_info in await self.agent_registry.get_all_agents(sport.value):
+                if agent_info.agent_id == agent_id:
+                    return agent_info.status == "healthy"
+        
+        checked_at, healthy = self._health_cache.get(sport, (None, False))
+        if checked_at is None or time.monotonic() - checked_at > self.HEALTH_CACHE_SECONDS:
+            healthy = await self._probe_health(sport, agent)
+        return healthy
+    
+    async def _probe_health(self, sport: SportType, agent: SubAgentInterface) -> bool:
+        """Ask a sub-agent for its health and remember the answer."""
+        try:
+            health = await asyncio.wait_for(agent.get_health_status(), timeout=self.agent_timeout)
+            healthy = bool(health.get("healthy", False))
+            if not healthy:
+                logger.warning(f"Sub-agent for {sport.value} is unhealthy: {health}")
+        except Exception as e:
+            logger.warning(f"Health check failed for {sport.value}: {e}")
+            healthy = False
+        self._health_cache[sport] = (time.monotonic(), healthy)
+        return healthy
+    
+    async def _report_health(self, sport: SportType, agent_id: str) -> bool:
+        """Probe a local sub-agent and heartbeat its health into the registry."""
+        agent = self._local_agent_refs.get(sport)
+        healthy = await self._probe_health(sport, agent) if agent is not None else False
+        return await self.agent_registry.heartbeat(agent_id, "healthy" if healthy else "unhealthy")
+    
+    async def _save_predictions(self, user_query: UserQuery, predictions: Dict[str, Any]) -> None:
+        """Store an aggregation's predictions with a single bulk insert."""
+        now = datetime.utcnow()
+        rows = [
+            PredictionModel(
+                id=f"pred_{sport}_{uuid.uuid4()}", # Unique ID
+                user_id=user_query.user_id,
+                sport=sport,
+                prediction_text=prediction.prediction,
+                confidence=prediction.confidence.value,
+                reasoning=prediction.reasoning,
+                timestamp=now,
+                metadata_json=prediction.metadata,
+                # Every row sets the same columns, so the flush batches them into one INSERT
+                **betting_columns_from_metadata(prediction.metadata)
+            )
+            for sport, prediction in predictions.items()
+            if isinstance(prediction, Prediction)
+        ]
+        if not rows:
+            return
+        
+        async with AsyncSessionLocal() as db:
+            try:
+                db.add_all(rows)
+                await db.commit()
+            except Exception as db_err:
+                logger.error(f"Failed to save predictions to DB: {db_err}")
+                await db.rollback()
+    
     async def _combine_predictions(self, predictions: Dict[str, Any], user_query: UserQuery) -> Dict[str, Any]:
         """Combine predictions using intelligent weighting."""
         if not predictions:
@@ -454,22 +583,24 @@ class HeadAgent:
         """Background task to send heartbeats for all registered agents."""
         while self._heartbeat_running:
             try:
-                # Send heartbeat for each registered agent
-                for sport, agent_id in list(self._local_agent_ids.items()):
-                    try:
-                        success = await self.agent_registry.heartbeat(agent_id)
-                        if not success:
-                            logger.warning(f"⚠️ Failed to send heartbeat for {sport.value}")
-                    except Exception as e:
-                        logger.error(f"❌ Heartbeat error for {sport.value}: {e}")
-                
-                # Sleep for heartbeat interval (30 seconds)
+                # Sleep for heartbeat interval (30 seconds); registration already sent the first beat
                 await asyncio.sleep(30)
+                
+                # Probe and heartbeat every registered agent concurrently
+                agents = list(self._local_agent_ids.items())
+                results = await asyncio.gather(
+                    *(self._report_health(sport, agent_id) for sport, agent_id in agents),
+                    return_exceptions=True
+                )
+                for (sport, _), result in zip(agents, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"❌ Heartbeat error for {sport.value}: {result}")
+                    elif not result:
+                        logger.warning(f"⚠️ Failed to send heartbeat for {sport.value}")
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"❌ Heartbeat loop error: {e}")
-                await asyncio.sleep(30)  # Continue despite errors
+                logger.error(f"❌ Heartbeat loop error: {e}")  # Continue despite errors
 
     async def scan_market(self) -> None:
         """Scan active sub-agents for betting opportunities."""
@@ -510,7 +641,7 @@ class HeadAgent:
     async def update_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> None:
         """Update user preferences."""
         # This simplifies to updating betting preferences for now, but could be more granular
-        self.preferences_service.update_betting_preferences(user_id, preferences)
+        await self.preferences_service.update_betting_preferences(user_id, preferences)
         logger.info(f"Updated preferences for user {user_id}")
     
     async def get_system_status(self) -> Dict[str, Any]:
@@ -31,6 +31,17 @@ security = HTTPBearer()
 # Initialize auth service
 auth_service = AuthService()
 
+# Seconds clients are asked to wait when password hashing is at capacity
+BUSY_RETRY_AFTER_SECONDS = 1
+
+
+def _server_busy(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=message,
+        headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)}
+    )
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
@@ -66,6 +77,8 @@ async def register_user(registration: UserRegistration, request: Request, db: As
                 "username": result["username"],
                 "email": result["email"]
             }
+        elif result["status"] == AuthStatus.SERVER_BUSY:
+            raise _server_busy(result["message"])
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -111,6 +124,8 @@ async def login_user(login: UserLogin, request: Request, db: AsyncSession = Depe
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail=result["message"]
             )
+        elif result["status"] == AuthStatus.SERVER_BUSY:
+            raise _server_busy(result["message"])
         else:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -127,17 +142,16 @@ async def login_user(login: UserLogin, request: Request, db: AsyncSession = Depe
         )
 
 @router.post("/logout", response_model=Dict[str, Any])
-async def logout_user(request: Request, current_user: Dict[str, Any] = Depends(get_current_user)):
+async def logout_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
     """Logout the current user."""
     try:
-        # Get session ID from request headers or token
+        # Revoke the presented token and its session (from the header, else the token's sid claim)
         session_id = request.headers.get("x-session-id")
-        
-        if session_id:
-            result = auth_service.logout_user(session_id)
-        else:
-            # If no session ID, just return success (token will expire)
-            result = {"status": AuthStatus.SUCCESS, "message": "Logout successful"}
+        result = await auth_service.logout_user(session_id, token=credentials.credentials)
         
         if result["status"] == AuthStatus.SUCCESS:
             logger.info(f"✅ User logged out: {current_user['username']}")
@@ -198,6 +212,8 @@ async def change_password(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=result["message"]
             )
+        elif result["status"] == AuthStatus.SERVER_BUSY:
+            raise _server_busy(result["message"])
         else:
              raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -262,7 +278,7 @@ async def revoke_session(
 ):
     """Revoke a specific session."""
     try:
-        result = auth_service.logout_user(session_id)
+        result = await auth_service.logout_user(session_id)
         
         if result["status"] == AuthStatus.SUCCESS:
             logger.info(f"✅ Session revoked for user: {current_user['username']}")
@@ -30,6 +30,12 @@ class SetUserFlagRequest(BaseModel):
     enabled: bool
 
 
+class SetRolloutRequest(BaseModel):
+    """Request to roll a flag out to a percentage of users."""
+    flag: str
+    percentage: Optional[float] = None  # None removes the rollout
+
+
 class DeleteUserFlagRequest(BaseModel):
     """Request to delete a user-specific flag."""
     user_id: str
@@ -114,6 +120,37 @@ async def set_flag(request: SetFlagRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Failed to set flag: {str(e)}")
 
 
+@router.post("/rollout", dependencies=[Depends(require_admin)])
+async def set_rollout(request: SetRolloutRequest) -> Dict[str, Any]:
+    """
+    Enable a flag for a stable percentage of users.
+    
+    Requires admin authentication.
+    
+    Args:
+        request: Flag name and percentage (0-100, or null to remove)
+    
+    Returns:
+        Success message
+    """
+    try:
+        success = await feature_flags.set_rollout(request.flag, request.percentage)
+        if not success:
+            raise HTTPException(status_code=500, detail="Failed to set rollout (Redis unavailable?)")
+        
+        return {
+            "message": f"Rollout for '{request.flag}' set to {request.percentage}%",
+            "flag": request.flag,
+            "percentage": request.percentage
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to set rollout: {str(e)}")
+
+
 @router.post("/set-user", dependencies=[Depends(require_admin)])
 async def set_user_flag(request: SetUserFlagRequest) -> Dict[str, Any]:
     """
@@ -185,7 +222,6 @@ async def get_user_flags(user_id: str) -> Dict[str, bool]:
         Dictionary of flag names to enabled status
     """
     try:
-        flags = await feature_flags.get_all_flags(user_id=user_id)
-        return flags
+        return await feature_flags.evaluate_all(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user flags: {str(e)}")
@@ -4,10 +4,11 @@ Health & Readiness Endpoints
 Production-grade health monitoring for load balancers and orchestrators.
 """
 
-from fastapi import APIRouter, status
-from typing import Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from typing import Any, Dict, Optional
 from datetime import datetime
 import asyncio
+import time
 
 router = APIRouter(tags=["Health"])
 
@@ -74,32 +75,31 @@ async def readiness_check() -> Dict[str, Any]:
 
 
 @router.get("/metrics")
-async def metrics() -> Dict[str, Any]:
+async def metrics() -> Response:
     """
-    Prometheus-compatible metrics endpoint.
+    Prometheus metrics endpoint.
     
-    Returns key application metrics in a format Prometheus can scrape.
+    Returns request, storage, upstream API, model, settlement and WebSocket
+    metrics in the Prometheus text exposition format.
     """
-    from src.api.routes import head_agent
+    from src.services.metrics import CONTENT_TYPE_LATEST, render_latest
     
-    metrics = {
-        "timestamp": datetime.utcnow().isoformat(),
-        
-        # Application metrics
-        "agents_registered": len(head_agent._local_agent_refs) if head_agent else 0,
-        "heartbeat_running": head_agent._heartbeat_running if head_agent else False,
-        
-        # Will be populated by actual metrics collection
-        "predictions_total": 0,  # TODO: Implement counter
-        "predictions_per_minute": 0,  # TODO: Implement gauge
-        "active_users": 0,  # TODO: Implement from sessions
-        "websocket_connections": 0,  # TODO: Implement
-        
-        # System metrics
-        "uptime_seconds": 0,  # TODO: Track startup time
-    }
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/metrics/slow-requests")
+async def slow_requests(x_profile_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Slowest profiled requests since startup, with span totals and the
+    collapsed-stack files written for each.
+    
+    Requires the same X-Profile-Token used to trigger profiles.
+    """
+    from src.services.profiling import profiler
     
-    return metrics
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token required")
+    return {"requests": profiler.slow_requests(), "timestamp": datetime.utcnow().isoformat()}
 
 
 async def check_database() -> Dict[str, Any]:
@@ -108,6 +108,7 @@ async def check_database() -> Dict[str, Any]:
         from src.db.database import AsyncSessionLocal
         from sqlalchemy import text
         
+        start = time.perf_counter()
         async with AsyncSessionLocal() as session:
             # Simple query to verify DB is up
             result = await session.execute(text("SELECT 1"))
@@ -116,7 +117,7 @@ async def check_database() -> Dict[str, Any]:
         return {
             "healthy": True,
             "message": "Database connection successful",
-            "latency_ms": 0  # TODO: Measure actual latency
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2)
         }
     except Exception as e:
         return {
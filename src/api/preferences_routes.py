@@ -11,7 +11,7 @@ import logging
 from datetime import datetime
 
 from src.services.user_preferences import (
-    UserPreferencesService, SportType, RiskLevel, BettingType,
+    user_preferences_service, SportType, RiskLevel, BettingType,
     NotificationType
 )
 from src.api.auth_routes import get_current_user
@@ -23,14 +23,14 @@ logger = logging.getLogger(__name__)
 # Initialize router
 router = APIRouter(tags=["User Preferences"])
 
-# Initialize preferences service
-preferences_service = UserPreferencesService()
+# Shared preferences service (pooled Redis connection and local cache)
+preferences_service = user_preferences_service
 
 @router.get("/", response_model=Dict[str, Any])
 async def get_user_preferences(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get current user's preferences."""
     try:
-        preferences = preferences_service.get_user_preferences(current_user["id"])
+        preferences = await preferences_service.get_user_preferences(current_user["id"])
         
         if not preferences:
             raise HTTPException(
@@ -159,7 +159,7 @@ async def update_betting_preferences(
                 validated_prefs[field] = betting_prefs[field]
         
         # Update preferences
-        success = preferences_service.update_betting_preferences(current_user["id"], validated_prefs)
+        success = await preferences_service.update_betting_preferences(current_user["id"], validated_prefs)
         
         if success:
             logger.info(f"✅ Betting preferences updated for user: {current_user['username']}")
@@ -228,7 +228,7 @@ async def update_notification_preferences(
                     )
         
         # Update preferences
-        success = preferences_service.update_notification_preferences(current_user["id"], validated_prefs)
+        success = await preferences_service.update_notification_preferences(current_user["id"], validated_prefs)
         
         if success:
             logger.info(f"✅ Notification preferences updated for user: {current_user['username']}")
@@ -340,7 +340,7 @@ async def update_display_preferences(
                 )
         
         # Update preferences
-        success = preferences_service.update_display_preferences(current_user["id"], validated_prefs)
+        success = await preferences_service.update_display_preferences(current_user["id"], validated_prefs)
         
         if success:
             logger.info(f"✅ Display preferences updated for user: {current_user['username']}")
@@ -367,7 +367,7 @@ async def update_display_preferences(
 async def get_user_sport_preferences(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's preferred sports."""
     try:
-        sports = preferences_service.get_user_sport_preferences(current_user["id"])
+        sports = await preferences_service.get_user_sport_preferences(current_user["id"])
         
         return {
             "success": True,
@@ -386,7 +386,7 @@ async def get_user_sport_preferences(current_user: Dict[str, Any] = Depends(get_
 async def get_user_risk_level(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's risk level."""
     try:
-        risk_level = preferences_service.get_user_risk_level(current_user["id"])
+        risk_level = await preferences_service.get_user_risk_level(current_user["id"])
         
         return {
             "success": True,
@@ -405,7 +405,7 @@ async def get_user_risk_level(current_user: Dict[str, Any] = Depends(get_current
 async def get_user_confidence_threshold(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's minimum confidence threshold."""
     try:
-        threshold = preferences_service.get_user_confidence_threshold(current_user["id"])
+        threshold = await preferences_service.get_user_confidence_threshold(current_user["id"])
         
         return {
             "success": True,
@@ -423,7 +423,7 @@ async def get_user_confidence_threshold(current_user: Dict[str, Any] = Depends(g
 async def get_user_max_bet_amount(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's maximum bet amount."""
     try:
-        max_amount = preferences_service.get_user_max_bet_amount(current_user["id"])
+        max_amount = await preferences_service.get_user_max_bet_amount(current_user["id"])
         
         return {
             "success": True,
@@ -441,7 +441,7 @@ async def get_user_max_bet_amount(current_user: Dict[str, Any] = Depends(get_cur
 async def get_user_timezone(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's timezone."""
     try:
-        timezone = preferences_service.get_user_timezone(current_user["id"])
+        timezone = await preferences_service.get_user_timezone(current_user["id"])
         
         return {
             "success": True,
@@ -459,7 +459,7 @@ async def get_user_timezone(current_user: Dict[str, Any] = Depends(get_current_u
 async def get_user_currency(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get user's preferred currency."""
     try:
-        currency = preferences_service.get_user_currency(current_user["id"])
+        currency = await preferences_service.get_user_currency(current_user["id"])
         
         return {
             "success": True,
@@ -477,7 +477,7 @@ async def get_user_currency(current_user: Dict[str, Any] = Depends(get_current_u
 async def reset_user_preferences(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Reset user preferences to defaults."""
     try:
-        success = preferences_service.reset_user_preferences(current_user["id"])
+        success = await preferences_service.reset_user_preferences(current_user["id"])
         
         if success:
             logger.info(f"✅ Preferences reset for user: {current_user['username']}")
@@ -511,7 +511,7 @@ async def get_preferences_stats(current_user: Dict[str, Any] = Depends(get_curre
                 detail="Admin access required"
             )
         
-        stats = preferences_service.get_preferences_stats()
+        stats = await preferences_service.get_preferences_stats()
         
         return {
             "success": True,
@@ -532,7 +532,7 @@ async def preferences_health_check():
     """Health check for preferences service."""
     try:
         # Try to get stats to check service health
-        stats = preferences_service.get_preferences_stats()
+        stats = await preferences_service.get_preferences_stats()
         
         if "error" in stats:
             return {
@@ -7,7 +7,7 @@ Live updates and real-time prediction streaming with authentication and Redis in
 import json
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from fastapi import WebSocket, WebSocketDisconnect, Depends, HTTPException
 from fastapi.routing import APIRouter
 from fastapi.security import HTTPBearer
@@ -80,11 +80,17 @@ async def websocket_authenticated(websocket: WebSocket):
                     channel = message.get("channel")
                     if channel:
                         await websocket_manager.subscribe_to_channel(connection_info, channel)
+                    sport = message.get("sport")
+                    if sport:
+                        await websocket_manager.subscribe_to_sport(connection_info, sport)
                 
                 elif message.get("type") == "unsubscribe":
                     channel = message.get("channel")
                     if channel:
                         await websocket_manager.unsubscribe_from_channel(connection_info, channel)
+                    sport = message.get("sport")
+                    if sport:
+                        await websocket_manager.unsubscribe_from_sport(connection_info, sport)
                 
                 elif message.get("type") == "request_prediction":
                     if connection_info.status.value == "authenticated":
@@ -231,10 +237,7 @@ async def websocket_predictions(websocket: WebSocket):
                         timestamp=datetime.now()
                     )
                     
-                    await websocket_manager.broadcast_message(
-                        broadcast_message,
-                        filter_func=lambda conn: "predictions" in conn.subscriptions
-                    )
+                    await websocket_manager.broadcast_to_channel("predictions", broadcast_message)
                     
             except json.JSONDecodeError:
                 error_message = WebSocketMessage(
@@ -495,11 +498,20 @@ async def get_user_notifications(
     user_id: str, 
     limit: int = 50, 
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: str = Depends(get_current_user_from_token)
 ):
-    """Get notifications for a user."""
+    """Get notifications for a user; pass `cursor` from a previous page to keep paging."""
     if websocket_manager.notification_service:
-        notifications = await websocket_manager.notification_service.get_user_notifications(user_id, limit, offset)
+        service = websocket_manager.notification_service
+        next_cursor = None
+        if cursor or not offset:
+            try:
+                notifications, next_cursor = await service.get_user_notifications_page(user_id, limit, cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        else:
+            notifications = await service.get_user_notifications(user_id, limit, offset)
         
         return {
             "success": True,
@@ -507,6 +519,7 @@ async def get_user_notifications(
                 "notifications": [n.to_dict() for n in notifications],
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": next_cursor,
                 "total": len(notifications)
             },
             "timestamp": datetime.now().isoformat()
@@ -772,10 +785,7 @@ async def generate_yolo_prediction(request: Dict[str, Any]):
         timestamp=datetime.now()
     )
     
-    await websocket_manager.broadcast_message(
-        broadcast_message,
-        filter_func=lambda conn: "yolo_predictions" in conn.subscriptions
-    )
+    await websocket_manager.broadcast_to_channel("yolo_predictions", broadcast_message)
     
     return {
         "success": True,
@@ -44,6 +44,26 @@ class Settings:
         self.max_login_attempts: int = int(os.getenv("MAX_LOGIN_ATTEMPTS", "5"))
         self.lockout_duration_minutes: int = int(os.getenv("LOCKOUT_DURATION_MINUTES", "15"))
         self.rate_limit_requests_per_hour: int = int(os.getenv("RATE_LIMIT_REQUESTS_PER_HOUR", "100"))
+        self.rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+        
+        # Verified-token cache (per process; revocations shared through Redis)
+        self.auth_token_cache_ttl_seconds: float = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "60"))
+        self.auth_token_cache_size: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+        self.auth_revocation_sync_seconds: float = float(os.getenv("AUTH_REVOCATION_SYNC_SECONDS", "1"))
+        
+        # Password hashing (bcrypt on a bounded worker pool; 0 workers = one per core, at most 4)
+        self.bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.bcrypt_pool_size: int = int(os.getenv("BCRYPT_POOL_SIZE", "0"))
+        self.bcrypt_queue_size: int = int(os.getenv("BCRYPT_QUEUE_SIZE", "64"))
+        
+        # Agent registry (round_robin, least_in_flight or latency_weighted selection)
+        self.agent_selection_strategy: str = os.getenv("AGENT_SELECTION_STRATEGY", "least_in_flight")
+        self.agent_registry_snapshot_ttl: float = float(os.getenv("AGENT_REGISTRY_SNAPSHOT_TTL", "5"))
+        self.agent_latency_ewma_alpha: float = float(os.getenv("AGENT_LATENCY_EWMA_ALPHA", "0.2"))
+        
+        # Sub-agent fan-out (per-agent deadline; a hedged second attempt after the delay, 0 disables hedging)
+        self.agent_call_timeout_seconds: float = float(os.getenv("AGENT_CALL_TIMEOUT_SECONDS", "10"))
+        self.agent_hedge_delay_seconds: float = float(os.getenv("AGENT_HEDGE_DELAY_SECONDS", "2"))
         
         # API Keys (use environment variables only)
         self.anthropic_api_key: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
@@ -54,6 +74,34 @@ class Settings:
         self.espn_api_key: Optional[str] = os.getenv("ESPN_API_KEY")
         self.sports_data_api_key: Optional[str] = os.getenv("SPORTS_DATA_API_KEY")
         self.the_odds_api_key: Optional[str] = os.getenv("THE_ODDS_API_KEY")
+        self.sports_api_max_concurrency: int = int(os.getenv("SPORTS_API_MAX_CONCURRENCY", "10"))
+        self.sports_api_host_rate_limit: float = float(os.getenv("SPORTS_API_HOST_RATE_LIMIT", "20"))
+        
+        # WebSocket fan-out (per-connection send queues and slow-consumer handling)
+        self.websocket_send_queue_size: int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "256"))
+        self.websocket_backpressure_policy: str = os.getenv("WEBSOCKET_BACKPRESSURE_POLICY", "drop_oldest")
+        self.websocket_send_timeout: float = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "5"))
+        self.websocket_broadcast_shard_size: int = int(os.getenv("WEBSOCKET_BROADCAST_SHARD_SIZE", "1000"))
+        self.websocket_topic_ttl: int = int(os.getenv("WEBSOCKET_TOPIC_TTL", "90"))
+        
+        # User preferences (per-process cache in front of Redis)
+        self.preferences_cache_size: int = int(os.getenv("PREFERENCES_CACHE_SIZE", "10000"))
+        self.preferences_cache_ttl: float = float(os.getenv("PREFERENCES_CACHE_TTL", "300"))
+        self.preferences_redis_max_connections: int = int(os.getenv("PREFERENCES_REDIS_MAX_CONNECTIONS", "50"))
+        
+        # Feature flags (per-process snapshot; pub/sub invalidation, periodic refresh as a safety net)
+        self.feature_flags_refresh_seconds: float = float(os.getenv("FEATURE_FLAGS_REFRESH_SECONDS", "60"))
+        self.feature_flags_user_cache_size: int = int(os.getenv("FEATURE_FLAGS_USER_CACHE_SIZE", "10000"))
+        
+        # Request profiling (header-triggered profiles need PROFILING_TOKEN outside debug mode)
+        self.profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "True").lower() == "true"
+        self.profiling_sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        self.profiling_sample_stacks: bool = os.getenv("PROFILING_SAMPLE_STACKS", "False").lower() == "true"
+        self.profiling_token: Optional[str] = os.getenv("PROFILING_TOKEN")
+        self.profiling_stack_interval_ms: float = float(os.getenv("PROFILING_STACK_INTERVAL_MS", "5"))
+        self.profiling_output_dir: str = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+        self.profiling_min_duration_ms: float = float(os.getenv("PROFILING_MIN_DURATION_MS", "0"))
+        self.profiling_slow_log_size: int = int(os.getenv("PROFILING_SLOW_LOG_SIZE", "20"))
 
 # Global settings instance
 settings = Settings() 
\ No newline at end of file
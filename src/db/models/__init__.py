@@ -2,7 +2,7 @@
 from src.db.models.user import User
 from src.db.models.prediction import Prediction
 from src.db.models.mobile import MobileDevice, Notification, OfflineAction
-from src.db.models.bet import Bet, Bankroll, DailyPerformance
+from src.db.models.bet import Bet, Bankroll, DailyPerformance, BetPerformanceRollup, BankrollEquityPoint
 from src.db.models.parlay import ParlayLeg, ParlayCard
 from src.db.models.subscription import Subscription, UsageLog
 from src.db.models.application import LicenseApplication
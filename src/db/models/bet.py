@@ -4,7 +4,7 @@ Bet Database Models
 Track all bets placed, outcomes, and performance.
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Boolean, Integer, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Date, DateTime, Boolean, Integer, JSON, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from src.db.database import Base
 import enum
@@ -103,6 +103,17 @@ class Bankroll(Base):
     sharpe_ratio = Column(Float, nullable=True)  # Risk-adjusted returns
     max_drawdown = Column(Float, default=0.0)  # Worst drawdown %
     
+    # Incremental analytics state (maintained by BankrollAnalytics)
+    equity = Column(Float, nullable=True)  # initial_deposit + realized profit
+    peak_equity = Column(Float, nullable=True)
+    current_drawdown = Column(Float, default=0.0)  # % below peak_equity
+    returns_count = Column(Integer, default=0)  # Welford n over per-bet returns
+    returns_mean = Column(Float, default=0.0)  # Welford mean
+    returns_m2 = Column(Float, default=0.0)  # Welford sum of squared deviations
+    current_streak = Column(Integer, default=0)  # +N wins / -N losses in a row
+    longest_win_streak = Column(Integer, default=0)
+    longest_loss_streak = Column(Integer, default=0)
+    
     # Current state
     active_bets_count = Column(Integer, default=0)
     active_bets_amount = Column(Float, default=0.0)
@@ -119,6 +130,23 @@ class Bankroll(Base):
     last_bet_at = Column(DateTime, nullable=True)
 
 
+class BankrollEquityPoint(Base):
+    """One point on a user's equity curve, recorded as each bet settles."""
+    
+    __tablename__ = "bankroll_equity_points"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False)
+    bet_id = Column(String, nullable=True)
+    recorded_at = Column(DateTime, nullable=False)
+    equity = Column(Float, nullable=False)
+    drawdown = Column(Float, nullable=False, default=0.0)  # % below the running peak
+    
+    __table_args__ = (
+        Index("idx_equity_points_user_time", "user_id", "recorded_at"),
+    )
+
+
 class DailyPerformance(Base):
     """Track daily performance metrics."""
     
@@ -142,3 +170,36 @@ class DailyPerformance(Base):
     
     # Metadata
     metadata_json = Column(JSON, nullable=True)
+
+
+class BetPerformanceRollup(Base):
+    """
+    Per-day betting totals for one user, sport and bet type.
+    
+    Kept in step with Bet in the same transaction as each placement and
+    settlement, so ROI for any window is a SUM over a handful of rows.
+    Bets are bucketed by the UTC day they were placed.
+    """
+    
+    __tablename__ = "bet_performance_rollups"
+    
+    user_id = Column(String, primary_key=True)
+    sport = Column(String, primary_key=True)
+    bet_type = Column(String, primary_key=True)  # BetType value
+    day = Column(Date, primary_key=True)
+    
+    # Counts
+    bets_placed = Column(Integer, nullable=False, default=0)
+    bets_settled = Column(Integer, nullable=False, default=0)
+    bets_won = Column(Integer, nullable=False, default=0)
+    bets_lost = Column(Integer, nullable=False, default=0)
+    bets_pushed = Column(Integer, nullable=False, default=0)
+    
+    # Amounts
+    amount_wagered = Column(Float, nullable=False, default=0.0)
+    amount_won = Column(Float, nullable=False, default=0.0)  # Payouts of winning bets
+    amount_lost = Column(Float, nullable=False, default=0.0)  # Stakes of losing bets
+    
+    __table_args__ = (
+        Index("idx_bet_rollups_user_day", "user_id", "day"),
+    )
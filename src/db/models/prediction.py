@@ -3,27 +3,123 @@ Prediction Database Model
 ========================
 SQLAlchemy model representing a betting prediction.
 """
-from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, JSON, Boolean
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import Column, String, Float, DateTime, JSON, Boolean, Index, event, inspect
 from src.db.database import Base
 import uuid
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+
+# Betting fields promoted out of metadata_json into typed columns.
+# Kept in sync by the before_insert/before_update listeners below.
+BETTING_COLUMNS = (
+    "game_id", "game_date", "home_team", "away_team",
+    "team", "bet_type", "line", "odds", "probability", "edge",
+)
+
+
+def parse_game_date(value: Any) -> Optional[datetime]:
+    """Parse a metadata game date into a naive UTC datetime (None if unparseable)."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, datetime):
+            game_date = value
+        else:
+            from dateutil import parser
+            game_date = parser.parse(str(value))
+    except (ValueError, OverflowError, TypeError):
+        return None
+    if game_date.tzinfo is not None:
+        game_date = game_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return game_date
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def betting_columns_from_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Extract typed betting column values from a prediction's metadata dict."""
+    metadata = metadata or {}
+    game_id = metadata.get("game_id")
+    return {
+        "game_id": str(game_id) if game_id is not None else None,
+        "game_date": parse_game_date(metadata.get("game_date") or metadata.get("date")),
+        "home_team": metadata.get("home_team"),
+        "away_team": metadata.get("away_team"),
+        "team": metadata.get("team"),
+        "bet_type": metadata.get("bet_type"),
+        "line": _to_float(metadata.get("line")),
+        "odds": _to_float(metadata.get("odds")),
+        "probability": _to_float(metadata.get("probability")),
+        "edge": _to_float(metadata.get("edge")),
+    }
+
+
 class Prediction(Base):
     __tablename__ = "predictions"
+    __table_args__ = (
+        Index("idx_predictions_game_date_timestamp", "game_date", "timestamp"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, index=True, nullable=True) # Optional link to user who requested it
-    
+
     sport = Column(String, index=True, nullable=False)
     prediction_text = Column(String, nullable=False)
     confidence = Column(String, nullable=False) # Stored as string enum (low/medium/high) or float
     reasoning = Column(String, nullable=True)
-    
+
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     metadata_json = Column(JSON, default=dict) # avoiding 'metadata' reserved keyword conflict
-    
+
+    # Betting fields (denormalized from metadata_json so they can be filtered in SQL)
+    game_id = Column(String, index=True, nullable=True)
+    game_date = Column(DateTime, nullable=True)  # Naive UTC game start time
+    home_team = Column(String, nullable=True)
+    away_team = Column(String, nullable=True)
+    team = Column(String, nullable=True)  # Side being predicted
+    bet_type = Column(String, nullable=True)  # moneyline, spread, over_under
+    line = Column(Float, nullable=True)
+    odds = Column(Float, nullable=True)  # American odds
+    probability = Column(Float, nullable=True)
+    edge = Column(Float, nullable=True)
+
     outcome = Column(Boolean, nullable=True) # True=Win, False=Loss, None=Pending
     outcome_reported_at = Column(DateTime, nullable=True)
+
+
+@event.listens_for(Prediction, "before_insert")
+def _fill_betting_columns(mapper, connection, target: Prediction) -> None:
+    """Derive betting columns from metadata_json so existing writers keep working."""
+    if target.metadata_json:
+        _apply_betting_columns(target, keep_explicit=True)
+
+
+@event.listens_for(Prediction, "before_update")
+def _refresh_betting_columns(mapper, connection, target: Prediction) -> None:
+    """Recompute betting columns when metadata_json is reassigned, so they never go stale."""
+    if inspect(target).attrs.metadata_json.history.has_changes():
+        _apply_betting_columns(target)
+
+
+def _apply_betting_columns(target: Prediction, keep_explicit: bool = False) -> None:
+    """
+    Copy betting values from metadata_json onto the columns.
+    
+    With keep_explicit, a column the caller already set is only replaced
+    when metadata_json carries a value for it.
+    """
+    metadata = target.metadata_json or {}
+    for column, value in betting_columns_from_metadata(metadata).items():
+        keys = ("game_date", "date") if column == "game_date" else (column,)
+        if keep_explicit and getattr(target, column) is not None and not any(k in metadata for k in keys):
+            continue
+        setattr(target, column, value)
@@ -15,6 +15,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # Import middleware
 from src.middleware.error_handler import ErrorHandlerMiddleware, add_error_handlers
+from src.middleware.metrics import MetricsMiddleware
+from src.middleware.profiling import ProfilingMiddleware
 from src.middleware.rate_limiter import RateLimitMiddleware, rate_limiter
 from src.middleware.security_headers import SecurityHeadersMiddleware
 
@@ -41,6 +43,11 @@ async def lifelong(app: FastAPI):
         from src.services.notification_service import initialize_notification_service
         
         logger.info("🚀 Initializing services...")
+        try:
+            from src.services.feature_flags import feature_flags
+            await feature_flags.load()
+        except Exception as e:
+            logger.warning(f"⚠️ Feature flag snapshot load failed (using defaults): {e}")
         try:
             await websocket_manager.initialize()
             redis_client = await websocket_manager.redis_manager.get_redis()
@@ -97,6 +104,41 @@ async def lifelong(app: FastAPI):
         await scheduled_tasks_service.stop()
     except Exception as e:
         logger.error(f"Error stopping scheduled tasks: {e}")
+    try:
+        from src.services.real_sports_service import real_sports_service
+        await real_sports_service.aclose()
+    except Exception as e:
+        logger.error(f"Error closing sports API client: {e}")
+    try:
+        from src.services.websocket_service import websocket_manager
+        await websocket_manager.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping WebSocket writers: {e}")
+    try:
+        from src.services.user_preferences import user_preferences_service
+        await user_preferences_service.close()
+    except Exception as e:
+        logger.error(f"Error closing preferences service: {e}")
+    try:
+        from src.services.feature_flags import feature_flags
+        await feature_flags.close()
+    except Exception as e:
+        logger.error(f"Error closing feature flag service: {e}")
+    try:
+        from src.services.token_cache import token_cache
+        await token_cache.close()
+    except Exception as e:
+        logger.error(f"Error closing token cache: {e}")
+    try:
+        from src.services.password_hasher import password_hasher
+        password_hasher.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping password hasher: {e}")
+    try:
+        from src.services.agent_registry import agent_registry
+        await agent_registry.close()
+    except Exception as e:
+        logger.error(f"Error closing agent registry: {e}")
 
 def create_fastapi_app():
     """Create a FastAPI application with all features."""
@@ -121,12 +163,23 @@ def create_fastapi_app():
     add_error_handlers(app)
     app.add_middleware(ErrorHandlerMiddleware)
     
+    # Add request profiling (header-triggered or sampled; idle otherwise)
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
+    
     # Add security headers
     app.add_middleware(SecurityHeadersMiddleware)
     
-    # Add rate limiting middleware
-    # app.add_middleware(RateLimitMiddleware, rate_limiter=rate_limiter)
-    # Note: Commented out for now, uncomment when Redis is configured
+    # Add rate limiting middleware (falls back to in-memory limits without Redis)
+    if settings.rate_limit_enabled:
+        app.add_middleware(RateLimitMiddleware, rate_limiter=rate_limiter)
+    
+    # Prometheus instrumentation (outermost, so latency includes every middleware)
+    from src.db.database import engine
+    from src.services.metrics import instrument_redis, instrument_sqlalchemy
+    app.add_middleware(MetricsMiddleware)
+    instrument_sqlalchemy(engine)
+    instrument_redis()
 
     # Initialize services
     # We maintain singletons or initialize here if needed for dependency injection
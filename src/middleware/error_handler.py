@@ -94,7 +94,8 @@ class ErrorHandlerMiddleware:
                     "message": exc.detail,
                     "error_id": error_id,
                     "timestamp": datetime.utcnow().isoformat()
-                }
+                },
+                headers=getattr(exc, "headers", None)
             )
         
         else:
@@ -173,7 +174,8 @@ def add_error_handlers(app):
                 "message": exc.detail,
                 "error_id": error_id,
                 "timestamp": datetime.utcnow().isoformat()
-            }
+            },
+            headers=getattr(exc, "headers", None)
         )
     
     @app.exception_handler(Exception)
@@ -0,0 +1,57 @@
+"""
+Profiling Middleware
+====================
+Opt-in request profiling, triggered per request by header or by sampling.
+"""
+
+from typing import Optional
+
+from src.services.profiling import Profiler, profiler as default_profiler
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected requests.
+
+    Send `X-Profile: spans` (or `stacks` to add stack samples) together with
+    `X-Profile-Token` to profile one request; a configured fraction of all
+    requests is also sampled. Profiled responses carry an X-Profile-Id header
+    naming the collapsed-stack files written for them.
+    """
+
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or default_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        mode = headers.get(b"x-profile")
+        token = headers.get(b"x-profile-token")
+        mode = mode.decode("latin-1") if mode is not None else None
+        stacks = self.profiler.choose(mode, token.decode("latin-1") if token is not None else None)
+        if stacks is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.begin(scope["method"], scope["path"], stacks)
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        context_token = self.profiler.activate(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.deactivate(context_token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            await self.profiler.finish(profile, route, status_code, forced=mode is not None)
@@ -2,37 +2,149 @@
 Rate Limiting Middleware
 ========================
 Prevents abuse and DDoS attacks with configurable rate limits.
+
+Limits are enforced with the Generic Cell Rate Algorithm (GCRA): each key
+stores a single "theoretical arrival time", so a check is one atomic Lua
+call in Redis and there is no burst at window boundaries.
 """
 
+import json
+import math
 import time
 import logging
+from dataclasses import dataclass
 from fastapi import Request, HTTPException, status
-from typing import Dict, Optional, Callable
-from collections import defaultdict
-from datetime import datetime, timedelta
-import asyncio
+from typing import Any, Dict, List, Optional, Callable, Tuple
+
+import jwt
 
 logger = logging.getLogger(__name__)
 
 
+# GCRA in one round trip. Times are milliseconds from the Redis server clock,
+# so every instance agrees on "now".
+# KEYS[1] = limiter key
+# ARGV[1] = emission interval (window / requests), ARGV[2] = window
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local emission = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if now < allow_at then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / emission), 0, new_tat - now}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a single rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed
+    reset_after: float  # seconds until the key is back to a full burst
+
+
+class TimeWheelStore:
+    """
+    Bounded in-memory key store with time-wheel expiry.
+
+    Features:
+    - O(1) get/set; expired keys are swept one wheel slot per tick
+    - Hard cap on keys, evicting the oldest insertions when full
+    - Keys expiring beyond one wheel revolution are re-slotted on sweep
+    """
+
+    def __init__(self, max_keys: int = 100000, slots: int = 512, tick: float = 1.0):
+        self.max_keys = max_keys
+        self.slots = slots
+        self.tick = tick
+        self._values: Dict[str, Tuple[Any, float]] = {}
+        self._wheel: List[set] = [set() for _ in range(slots)]
+        self._cursor = int(time.monotonic() / tick)
+
+    def _slot(self, expires_at: float) -> int:
+        return int(expires_at / self.tick) % self.slots
+
+    def _advance(self, now: float):
+        current = int(now / self.tick)
+        # Never walk more than one revolution, however long we were idle
+        for tick in range(max(self._cursor + 1, current - self.slots + 1), current + 1):
+            bucket = self._wheel[tick % self.slots]
+            if not bucket:
+                continue
+            self._wheel[tick % self.slots] = set()
+            for key in bucket:
+                entry = self._values.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._values[key]
+                else:
+                    self._wheel[self._slot(entry[1])].add(key)
+        self._cursor = max(self._cursor, current)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Any]:
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+        entry = self._values.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        if key not in self._values:
+            while len(self._values) >= self.max_keys:
+                # Dicts keep insertion order: drop the oldest key (it fails open)
+                del self._values[next(iter(self._values))]
+        else:
+            # Re-inserting moves the key to the back of the eviction order
+            del self._values[key]
+        self._values[key] = (value, expires_at)
+        self._wheel[self._slot(expires_at)].add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
 class RateLimiter:
     """
-    Token bucket rate limiter with Redis backend for distributed rate limiting.
-    
+    GCRA rate limiter with Redis backend for distributed rate limiting.
+
     Features:
     - Per-IP rate limiting
-    - Per-user rate limiting
+    - Per-user rate limiting (user ID taken from the JWT)
     - Per-endpoint rate limiting
     - Premium user bypass
-    - Distributed across instances via Redis
+    - Distributed across instances via a single Lua call per check
+    - Bounded in-memory fallback when Redis is unavailable
     """
-    
-    def __init__(self, redis_client=None):
+
+    REDIS_RETRY_INTERVAL = 30  # seconds before retrying a failed connection
+
+    def __init__(self, redis_client=None, redis_url: Optional[str] = None, max_memory_keys: int = 100000):
         self.redis_client = redis_client
-        
+        self.redis_url = redis_url
+        self._redis_retry_at = 0.0
+        self._script = None  # GCRA script registered on the current client; reloads itself on NOSCRIPT
+
         # In-memory fallback if Redis unavailable
-        self._memory_store: Dict[str, Dict] = defaultdict(dict)
-        
+        self._memory_store = TimeWheelStore(max_keys=max_memory_keys)
+
         # Rate limit configurations
         self.limits = {
             "global": {"requests": 100, "window": 60},  # 100 req/min
@@ -41,7 +153,21 @@ class RateLimiter:
             "predictions": {"requests": 30, "window": 60},  # 30/min
             "websocket": {"requests": 50, "window": 60},  # 50/min
         }
-    
+
+    async def _get_redis(self):
+        """Lazy-initialize Redis from redis_url, backing off after a failure."""
+        if self.redis_client is None and self.redis_url and time.monotonic() >= self._redis_retry_at:
+            try:
+                import redis.asyncio as redis
+                client = redis.from_url(self.redis_url, decode_responses=True)
+                await client.ping()
+                self.redis_client = client
+                logger.info("✅ Rate limiter: Redis connected")
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limiter: Redis unavailable, using memory: {e}")
+                self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+        return self.redis_client
+
     async def check_rate_limit(
         self,
         key: str,
@@ -50,167 +176,185 @@ class RateLimiter:
     ) -> bool:
         """
         Check if request is within rate limits.
-        
+
         Args:
             key: Unique identifier (IP address, user ID, etc.)
             limit_type: Type of rate limit to apply
             user_id: User ID for premium bypass check
-        
+
         Returns:
             True if allowed, False if rate limited
         """
-        # Check if user has premium (bypass rate limits)
-        if user_id and await self._is_premium_user(user_id):
-            return True
-        
+        result = await self.evaluate(key, limit_type, user_id)
+        return result.allowed
+
+    async def evaluate(
+        self,
+        key: str,
+        limit_type: str = "global",
+        user_id: Optional[str] = None
+    ) -> RateLimitResult:
+        """Check a request and return the full result for response headers."""
         limit_config = self.limits.get(limit_type, self.limits["global"])
         max_requests = limit_config["requests"]
         window_seconds = limit_config["window"]
-        
+
+        # Check if user has premium (bypass rate limits)
+        if user_id and await self._is_premium_user(user_id):
+            return RateLimitResult(True, max_requests, max_requests, 0.0, 0.0)
+
         # Try Redis first
-        if self.redis_client:
+        redis_client = await self._get_redis()
+        if redis_client:
             try:
-                return await self._check_redis_rate_limit(
+                result = await self._check_redis_rate_limit(
                     key, max_requests, window_seconds, limit_type
                 )
+                if not result.allowed:
+                    logger.warning(
+                        f"Rate limit exceeded | Key: {key} | Type: {limit_type} | Limit: {max_requests}"
+                    )
+                return result
             except Exception as e:
                 logger.warning(f"Redis rate limit check failed, using memory: {e}")
-        
+                if self.redis_url:
+                    # Our own connection: drop it and reconnect after the retry interval
+                    self.redis_client = None
+                    self._script = None
+                    self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_INTERVAL
+
         # Fallback to memory
-        return self._check_memory_rate_limit(key, max_requests, window_seconds)
-    
+        return self._evaluate_memory(f"{limit_type}:{key}", max_requests, window_seconds)
+
     async def _check_redis_rate_limit(
         self, key: str, max_requests: int, window: int, limit_type: str
-    ) -> bool:
-        """Check rate limit using Redis."""
+    ) -> RateLimitResult:
+        """Check rate limit using the GCRA script in Redis."""
         redis_key = f"rate_limit:{limit_type}:{key}"
-        
-        try:
-            # Use Redis INCR for atomic increment
-            current = await self.redis_client.incr(redis_key)
-            
-            # Set expiry on first request
-            if current == 1:
-                await self.redis_client.expire(redis_key, window)
-            
-            if current > max_requests:
-                # Log rate limit hit
-                logger.warning(
-                    f"Rate limit exceeded | Key: {key} | Type: {limit_type} | "
-                    f"Count: {current} | Limit: {max_requests}"
-                )
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Redis rate limit error: {e}")
-            # Allow request on error (fail open)
-            return True
-    
+        window_ms = window * 1000
+
+        if self._script is None:
+            self._script = self.redis_client.register_script(GCRA_SCRIPT)
+        allowed, remaining, retry_after, reset_after = await self._script(
+            keys=[redis_key], args=[window_ms / max_requests, window_ms]
+        )
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=max_requests,
+            remaining=int(remaining),
+            retry_after=float(retry_after) / 1000,
+            reset_after=float(reset_after) / 1000
+        )
+
+    def _evaluate_memory(self, key: str, max_requests: int, window: float) -> RateLimitResult:
+        """GCRA against the local time-wheel store (fallback)."""
+        now = time.monotonic()
+        emission = window / max_requests
+
+        tat = max(self._memory_store.get(key, now) or now, now)
+        new_tat = tat + emission
+        allow_at = new_tat - window
+        if now < allow_at:
+            logger.warning(f"Memory rate limit exceeded | Key: {key}")
+            return RateLimitResult(False, max_requests, 0, allow_at - now, tat - now)
+
+        self._memory_store.set(key, new_tat, expires_at=new_tat)
+        remaining = int(math.floor((now - allow_at) / emission + 1e-9))
+        return RateLimitResult(True, max_requests, remaining, 0.0, new_tat - now)
+
     def _check_memory_rate_limit(
         self, key: str, max_requests: int, window: int
     ) -> bool:
         """Check rate limit using in-memory store (fallback)."""
-        now = time.time()
-        
-        if key not in self._memory_store:
-            self._memory_store[key] = {
-                "count": 1,
-                "window_start": now
-            }
-            return True
-        
-        data = self._memory_store[key]
-        
-        # Check if window expired
-        if now - data["window_start"] > window:
-            # Reset window
-            data["count"] = 1
-            data["window_start"] = now
-            return True
-        
-        # Increment counter
-        data["count"] += 1
-        
-        if data["count"] > max_requests:
-            logger.warning(f"Memory rate limit exceeded | Key: {key}")
-            return False
-        
-        return True
-    
+        return self._evaluate_memory(key, max_requests, window).allowed
+
     async def _is_premium_user(self, user_id: str) -> bool:
         """Check if user has premium subscription (bypass rate limits)."""
         # TODO: Implement actual subscription check
         # For now, return False
         return False
-    
-    def get_rate_limit_headers(self, key: str, limit_type: str = "global") -> Dict[str, str]:
+
+    def get_rate_limit_headers(
+        self, key: str, limit_type: str = "global", result: Optional[RateLimitResult] = None
+    ) -> Dict[str, str]:
         """Get rate limit headers for response."""
         limit_config = self.limits.get(limit_type, self.limits["global"])
-        
-        # TODO: Get actual remaining count from Redis
-        return {
-            "X-RateLimit-Limit": str(limit_config["requests"]),
-            "X-RateLimit-Remaining": "0",  # TODO: Calculate
-            "X-RateLimit-Reset": str(int(time.time() + limit_config["window"]))
+
+        if result is None:
+            # Nothing checked yet: report a full allowance
+            result = RateLimitResult(True, limit_config["requests"], limit_config["requests"], 0.0, 0.0)
+
+        headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(int(time.time() + math.ceil(result.reset_after)))
         }
+        if not result.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(result.retry_after)))
+        return headers
 
 
 class RateLimitMiddleware:
     """FastAPI middleware for rate limiting."""
-    
+
+    # Liveness probes and scrapes must never be throttled
+    EXEMPT_PATHS = ("/health", "/ready", "/metrics")
+
     def __init__(self, app, rate_limiter: RateLimiter):
         self.app = app
         self.rate_limiter = rate_limiter
-    
+
+        from src.config import settings
+        self.jwt_secret = settings.secret_key
+        self.jwt_algorithm = settings.algorithm
+
     async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
+        if scope["type"] != "http" or scope["path"].startswith(self.EXEMPT_PATHS):
             await self.app(scope, receive, send)
             return
-        
+
         request = Request(scope, receive=receive)
-        
+
         # Determine rate limit type based on path
         limit_type = self._get_limit_type(request.url.path)
-        
-        # Get identifier (IP or user)
+
+        # Get identifier (user from JWT, else IP)
         identifier = self._get_identifier(request)
-        
+        user_id = identifier[len("user:"):] if identifier.startswith("user:") else None
+
         # Check rate limit
-        allowed = await self.rate_limiter.check_rate_limit(
-            identifier, limit_type
-        )
-        
-        if not allowed:
+        result = await self.rate_limiter.evaluate(identifier, limit_type, user_id)
+        headers = self.rate_limiter.get_rate_limit_headers(identifier, limit_type, result)
+        raw_headers = [[name.lower().encode(), value.encode()] for name, value in headers.items()]
+
+        if not result.allowed:
             # Return 429 Too Many Requests
             response_body = {
                 "error": "Rate Limit Exceeded",
                 "message": "Too many requests. Please try again later.",
-                "retry_after": 60
+                "retry_after": int(headers["Retry-After"])
             }
-            
-            import json
-            response = b"HTTP/1.1 429 Too Many Requests\r\n"
-            response += b"Content-Type: application/json\r\n"
-            response += b"Retry-After: 60\r\n"
-            response += b"\r\n"
-            response += json.dumps(response_body).encode()
-            
+
             await send({
                 "type": "http.response.start",
                 "status": 429,
-                "headers": [[b"content-type", b"application/json"]]
+                "headers": [[b"content-type", b"application/json"]] + raw_headers
             })
             await send({
                 "type": "http.response.body",
                 "body": json.dumps(response_body).encode()
             })
             return
-        
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + raw_headers
+            await send(message)
+
         # Request allowed, proceed
-        await self.app(scope, receive, send)
-    
+        await self.app(scope, receive, send_with_headers)
+
     def _get_limit_type(self, path: str) -> str:
         """Determine rate limit type from path."""
         if "/auth/register" in path:
@@ -223,22 +367,31 @@ class RateLimitMiddleware:
             return "websocket"
         else:
             return "global"
-    
+
     def _get_identifier(self, request: Request) -> str:
         """Get unique identifier for rate limiting."""
         # Try to get user ID from auth header
         auth_header = request.headers.get("authorization")
-        if auth_header:
-            # TODO: Extract user ID from JWT token
-            # For now, use IP
-            pass
-        
+        if auth_header and auth_header[:7].lower() == "bearer ":
+            try:
+                payload = jwt.decode(auth_header[7:], self.jwt_secret, algorithms=[self.jwt_algorithm])
+                user_id = payload.get("user_id") or payload.get("sub")
+                if user_id:
+                    return f"user:{user_id}"
+            except jwt.InvalidTokenError:
+                pass  # Unauthenticated; limit by IP
+
         # Use IP address
         if request.client:
             return request.client.host
-        
+
         return "unknown"
 
 
+def _create_rate_limiter() -> RateLimiter:
+    from src.config import settings
+    return RateLimiter(redis_url=settings.redis_url)
+
+
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = _create_rate_limiter()
@@ -2,12 +2,129 @@ import pandas as pd
 import numpy as np
 import xgboost as xgb
 import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+import multiprocessing
+from multiprocessing import shared_memory
 from pathlib import Path
 from sklearn.metrics import accuracy_score, log_loss, mean_absolute_error
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BacktestEngine")
 
+MIN_TRAIN_SAMPLES = 500
+
+MONEYLINE_DROP_COLS = ['Date', 'Target_HomeWin', 'Target_Win', 'HomeTeam', 'AwayTeam', 
+                       'Player1', 'Player2', 'Tour', 'Odds1', 'Odds2', 
+                       'Target_PointSpread', 'Target_TotalPoints', 'DateStr',
+                       'HomePoints', 'AwayPoints']
+TOTALS_DROP_COLS = ['Date', 'HomePoints', 'AwayPoints', 'Target_HomeWin', 'Target_Win', 'Target_PointSpread',
+                    'Target_TotalPoints', 'Target_TotalGames', 'HomeTeam', 'AwayTeam', 'Player1', 'Player2',
+                    'Tour', 'Odds1', 'Odds2', 'DateStr', 'Notes', 'pd_date']
+
+
+def flat_bet_pnl(preds, actual, odds1, odds2):
+    """
+    Per-bet P&L of flat 1u bets on the model's pick (decimal odds).
+    
+    Pred=1 bets P1 at Odds1, Pred=0 bets P2 at Odds2; a win pays odds-1, a loss costs 1.
+    """
+    preds = np.asarray(preds)
+    actual = np.asarray(actual)
+    odds = np.where(preds == 1, np.asarray(odds1, dtype=float), np.asarray(odds2, dtype=float))
+    odds = np.nan_to_num(odds, nan=0.0)
+    return np.where(preds == actual, odds - 1, -1.0)
+
+
+@dataclass
+class SharedArray:
+    """Handle to a NumPy array living in a shared memory block."""
+    name: str
+    shape: tuple
+    dtype: str
+    
+    @classmethod
+    def create(cls, array: np.ndarray, blocks: list) -> "SharedArray":
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        return cls(block.name, array.shape, array.dtype.str)
+    
+    def attach(self):
+        """Map the block into this process; returns (block, array view)."""
+        # Pool workers share the parent's resource tracker, and the parent unlinks the block
+        block = shared_memory.SharedMemory(name=self.name)
+        return block, np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+
+
+@dataclass
+class BacktestFold:
+    """One (sport, market, test year) walk-forward fold."""
+    sport: str
+    market: str
+    year: int
+    arrays: dict  # name -> SharedArray (or plain ndarray when run in-process)
+    n_jobs: int = 1
+
+
+def _resolve_arrays(arrays):
+    blocks, resolved = [], {}
+    for name, array in arrays.items():
+        if isinstance(array, SharedArray):
+            block, array = array.attach()
+            blocks.append(block)
+        resolved[name] = array
+    return blocks, resolved
+
+
+def run_fold(fold: BacktestFold) -> dict:
+    """Train on every earlier year and test on fold.year (runs in a worker process)."""
+    started = time.perf_counter()
+    blocks, arrays = _resolve_arrays(fold.arrays)
+    try:
+        years = arrays['years']
+        train = years < fold.year
+        test = years == fold.year
+        row = {'Sport': fold.sport, 'Market': fold.market, 'Year': fold.year,
+               'TrainSamples': int(train.sum()), 'TestSamples': int(test.sum())}
+        
+        if row['TrainSamples'] < MIN_TRAIN_SAMPLES or row['TestSamples'] == 0:
+            row['Skipped'] = True
+        elif fold.market == 'moneyline':
+            X, y = arrays['X'], arrays['y']
+            model = xgb.XGBClassifier(
+                n_estimators=100, 
+                max_depth=3, 
+                learning_rate=0.05, 
+                eval_metric='logloss',
+                n_jobs=fold.n_jobs
+            )
+            model.fit(X[train], y[train])
+            proba = model.predict_proba(X[test])
+            preds = proba.argmax(axis=1)
+            row['Accuracy'] = accuracy_score(y[test], preds)
+            row['LogLoss'] = log_loss(y[test], proba, labels=[0, 1])
+            row['ROI'] = 0.0
+            if 'odds1' in arrays:
+                row['ROI'] = float(flat_bet_pnl(preds, y[test], arrays['odds1'][test], arrays['odds2'][test]).mean())
+        else:
+            X, y = arrays['X'], arrays['y']
+            fit = train & (y > 0)
+            model = xgb.XGBRegressor(n_estimators=100, max_depth=3, learning_rate=0.1, n_jobs=fold.n_jobs)
+            model.fit(X[fit], y[fit])
+            row['MAE'] = mean_absolute_error(y[test], model.predict(X[test]))
+        
+        row['Seconds'] = time.perf_counter() - started
+        return row
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
 class BacktestEngine:
     def __init__(self):
         self.processed_dir = Path("data/processed")
@@ -45,166 +162,132 @@ class BacktestEngine:
                 return df.sort_values('Date')
             return None
 
-    def run_walk_forward(self, sport, start_year=2016):
-        """Run Walk-Forward Validation (Train on past, Test on next year)."""
-        df = self.load_data(sport)
-        if df is None:
-            logger.error(f"No data found for {sport}. Scraper might still be running.")
-            return
-            
-        logger.info(f"Starting {sport.upper()} Backtest (Total Records: {len(df)})")
-        years = sorted(df['Date'].dt.year.unique())
-        test_years = [y for y in years if y >= start_year]
-        
-        metrics = []
-        
-        for year in test_years:
-            # Expanding Window Training
-            train_df = df[df['Date'].dt.year < year]
-            test_df = df[df['Date'].dt.year == year]
-            
-            if len(train_df) < 500 or len(test_df) == 0:
-                logger.warning(f"Skipping {year}: Insufficient training data ({len(train_df)})")
-                continue
-                
-            logger.info(f"  Testing Season {year} (Train: {len(train_df)}, Test: {len(test_df)})")
-            
-            # Train
-            model = self._train_model(train_df, sport)
-            
-            # Predict & Evaluate
-            acc, loss, roi = self._evaluate(model, test_df, sport)
-            logger.info(f"  ➡️ Result {year}: Accuracy={acc:.1%}, ROI={roi:.1%}")
-            
-            metrics.append({
-                'Year': year,
-                'Accuracy': acc,
-                'ROI': roi,
-                'TrainSamples': len(train_df)
-            })
-            
-        # Summary
-        if metrics:
-            res_df = pd.DataFrame(metrics)
-            print("\n=== Backtest Summary ===")
-            print(res_df)
-            res_df.to_csv(self.results_dir / f"{sport}_backtest_results.csv", index=False)
-            logger.info(f"Results saved to {self.results_dir}")
+    @staticmethod
+    def _feature_frame(df, drop_cols):
+        return df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore').select_dtypes(include=np.number)
 
-    def _train_model(self, df, sport):
-        drop_cols = ['Date', 'Target_HomeWin', 'Target_Win', 'HomeTeam', 'AwayTeam', 
-                     'Player1', 'Player2', 'Tour', 'Odds1', 'Odds2', 
-                     'Target_PointSpread', 'Target_TotalPoints', 'DateStr',
-                     'HomePoints', 'AwayPoints']
-                     
-        X = df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore').select_dtypes(include=np.number)
+    def prepare_arrays(self, df, sport, market):
+        """
+        Slice a sport's data once into the NumPy arrays every fold of a market needs.
         
-        if sport == 'nba':
-            y = df['Target_HomeWin']
+        Returns:
+            Dict of arrays (years, X, y and odds for tennis moneyline), or None if the
+            market has no target column
+        """
+        if market == 'moneyline':
+            target = 'Target_HomeWin' if sport == 'nba' else 'Target_Win'
+            drop_cols = MONEYLINE_DROP_COLS
         else:
-            y = df['Target_Win']
-            
-        # Using typical params - can be grid-searched later
-        model = xgb.XGBClassifier(
-            n_estimators=100, 
-            max_depth=3, 
-            learning_rate=0.05, 
-            eval_metric='logloss',
-            n_jobs=-1
-        )
-        model.fit(X, y)
-        return model
-
-    def _evaluate(self, model, df, sport):
-        drop_cols = ['Date', 'Target_HomeWin', 'Target_Win', 'HomeTeam', 'AwayTeam', 
-                     'Player1', 'Player2', 'Tour', 'Odds1', 'Odds2', 
-                     'Target_PointSpread', 'Target_TotalPoints', 'DateStr',
-                     'HomePoints', 'AwayPoints']
-                     
-        X = df.drop(columns=[c for c in drop_cols if c in df.columns], errors='ignore').select_dtypes(include=np.number)
+            target = 'Target_TotalPoints' if sport == 'nba' else 'Target_TotalGames'
+            drop_cols = TOTALS_DROP_COLS
+        if target not in df.columns:
+            return None
         
-        if sport == 'nba':
-             y = df['Target_HomeWin']
-        else:
-             y = df['Target_Win']
-             
-        preds = model.predict(X)
-        acc = accuracy_score(y, preds)
-        loss = log_loss(y, model.predict_proba(X))
+        arrays = {
+            'years': df['Date'].dt.year.to_numpy(dtype=np.int32),
+            'X': self._feature_frame(df, drop_cols).to_numpy(dtype=np.float64),
+            'y': df[target].to_numpy(dtype=np.int64 if market == 'moneyline' else np.float64),
+        }
+        if market == 'moneyline' and sport == 'tennis' and 'Odds1' in df.columns:
+            arrays['odds1'] = df['Odds1'].to_numpy(dtype=np.float64)
+            arrays['odds2'] = df['Odds2'].to_numpy(dtype=np.float64) if 'Odds2' in df.columns else np.zeros(len(df))
+        return arrays
+
+    def run_backtests(self, sports=('nba', 'tennis'), markets=('moneyline', 'totals'), start_year=2016, max_workers=None,
+                      output_name="backtest_results.csv"):
+        """
+        Run every (sport, market, year) walk-forward fold across a process pool.
         
-        roi = 0.0
-        # ROI Calculation for Tennis (if odds available)
-        if sport == 'tennis' and 'Odds1' in df.columns:
-            # Flat betting simulation on Model Predictions
-            # If Pred=1 (P1 Win), Bet 1u on Odds1.
-            # If Result=1, Win (Odds1-1). Else Lose -1.
-            
-            pnl = []
-            for i, (pred, actual) in enumerate(zip(preds, y)):
-                if pred == 1: # Bet P1
-                    odds = df.iloc[i].get('Odds1', 0)
-                    if actual == 1: pnl.append(odds - 1)
-                    else: pnl.append(-1)
-                else: # Bet P2 (Target=0)
-                    odds = df.iloc[i].get('Odds2', 0)
-                    if actual == 0: pnl.append(odds - 1)
-                    else: pnl.append(-1)
+        Each sport is loaded once; its arrays go into shared memory so workers
+        slice folds without copying or re-reading the data. The fold table is
+        written to results_dir / output_name.
+        
+        Returns:
+            DataFrame with one row per fold (metrics plus Seconds of wall time)
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        blocks = []
+        folds = []
+        try:
+            for sport in sports:
+                df = self.load_data(sport)
+                if df is None:
+                    logger.error(f"No data found for {sport}. Scraper might still be running.")
+                    continue
+                logger.info(f"Preparing {sport.upper()} folds (Total Records: {len(df)})")
+                years = sorted(df['Date'].dt.year.unique())
+                for market in markets:
+                    arrays = self.prepare_arrays(df, sport, market)
+                    if arrays is None:
+                        continue
+                    if max_workers > 1:
+                        arrays = {name: SharedArray.create(array, blocks) for name, array in arrays.items()}
+                    folds.extend(
+                        BacktestFold(sport, market, int(year), arrays, n_jobs=1 if max_workers > 1 else -1)
+                        for year in years if year >= start_year
+                    )
             
-            if pnl:
-                roi = sum(pnl) / len(pnl) # ROI per bet
+            started = time.perf_counter()
+            if max_workers > 1 and len(folds) > 1:
+                # spawn: forking after XGBoost/OpenMP initialise can deadlock workers
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+                    futures = [pool.submit(run_fold, fold) for fold in folds]
+                    rows = [future.result() for future in as_completed(futures)]
+            else:
+                rows = [run_fold(fold) for fold in folds]
+            elapsed = time.perf_counter() - started
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
         
-        return acc, loss, roi
+        results = pd.DataFrame(rows)
+        if results.empty:
+            return results
+        results = results.sort_values(['Sport', 'Market', 'Year']).reset_index(drop=True)
+        for row in results.itertuples():
+            if getattr(row, 'Skipped', False) is True:
+                logger.warning(f"Skipping {row.Sport} {row.Market} {row.Year}: Insufficient training data ({row.TrainSamples})")
+        logger.info(f"✅ Ran {len(results)} folds in {elapsed:.1f}s with {max_workers} worker(s)")
+        results.to_csv(self.results_dir / output_name, index=False)
+        return results
+
+    def _completed_folds(self, results):
+        if results.empty:
+            return results
+        if 'Skipped' in results.columns:
+            results = results[results['Skipped'] != True]
+        return results
 
-    def run_totals_backtest(self, sport, start_year=2016):
-        df = self.load_data(sport)
-        if df is None: return
+    def run_walk_forward(self, sport, start_year=2016, max_workers=1):
+        """Run Walk-Forward Validation (Train on past, Test on next year)."""
+        results = self._completed_folds(self.run_backtests(
+            [sport], ['moneyline'], start_year, max_workers, output_name=f"{sport}_moneyline_folds.csv"
+        ))
         
+        # Summary
+        if not results.empty:
+            res_df = results[['Year', 'Accuracy', 'ROI', 'TrainSamples']]
+            for row in res_df.itertuples():
+                logger.info(f"  ➡️ Result {row.Year}: Accuracy={row.Accuracy:.1%}, ROI={row.ROI:.1%}")
+            print("\n=== Backtest Summary ===")
+            print(res_df)
+            res_df.to_csv(self.results_dir / f"{sport}_backtest_results.csv", index=False)
+            logger.info(f"Results saved to {self.results_dir}")
+
+    def run_totals_backtest(self, sport, start_year=2016, max_workers=1):
         logger.info(f"Backtesting {sport.upper()} TOTALS...")
-        years = sorted(df['Date'].dt.year.unique())
-        test_years = [y for y in years if y >= start_year]
-        
-        metrics = []
-        for year in test_years:
-            train_df = df[df['Date'].dt.year < year]
-            test_df = df[df['Date'].dt.year == year]
-            
-            if len(train_df) < 500: continue
-            
-            # Train Regressor
-            drop = ['Date', 'HomePoints', 'AwayPoints', 'Target_HomeWin', 'Target_Win', 'Target_PointSpread', 'Target_TotalPoints', 'Target_TotalGames', 'HomeTeam', 'AwayTeam', 'Player1', 'Player2', 'Tour', 'Odds1', 'Odds2', 'DateStr', 'Notes', 'pd_date']
-            X_train = train_df.drop(columns=[c for c in drop if c in train_df.columns], errors='ignore').select_dtypes(include=np.number)
-            
-            if sport == 'nba':
-                y_train = train_df['Target_TotalPoints']
-                y_test = test_df['Target_TotalPoints']
-            else:
-                if 'Target_TotalGames' not in train_df.columns: continue
-                y_train = train_df['Target_TotalGames']
-                y_test = test_df['Target_TotalGames']
-            
-            # Filter valid
-            X_train = X_train[y_train > 0]
-            y_train = y_train[y_train > 0]
-            
-            model = xgb.XGBRegressor(n_estimators=100, max_depth=3, learning_rate=0.1)
-            model.fit(X_train, y_train)
-            
-            # Predict
-            X_test = test_df.drop(columns=[c for c in drop if c in test_df.columns], errors='ignore').select_dtypes(include=np.number)
-            preds = model.predict(X_test)
-            
-            mae = mean_absolute_error(y_test, preds)
-            logger.info(f"  Year {year}: MAE={mae:.2f}")
-            metrics.append({'Year': year, 'MAE': mae})
-            
-        pd.DataFrame(metrics).to_csv(self.results_dir / f"{sport}_totals_backtest.csv", index=False)
+        results = self._completed_folds(self.run_backtests(
+            [sport], ['totals'], start_year, max_workers, output_name=f"{sport}_totals_folds.csv"
+        ))
+        if results.empty:
+            return
+        for row in results.itertuples():
+            logger.info(f"  Year {row.Year}: MAE={row.MAE:.2f}")
+        results[['Year', 'MAE']].to_csv(self.results_dir / f"{sport}_totals_backtest.csv", index=False)
 
 if __name__ == "__main__":
     bt = BacktestEngine()
-    # Run Tennis first (faster)
-    bt.run_walk_forward('tennis')
-    bt.run_walk_forward('nba')
-    
-    # Run Totals
-    bt.run_totals_backtest('nba')
-    bt.run_totals_backtest('tennis')
+    # Every sport/market/year fold in one parallel run
+    print(bt.run_backtests())
@@ -12,8 +12,10 @@ class TennisFeatureEngineer:
     """
     RAW_DIR = Path("data/raw/tennis")
     PROCESSED_DIR = Path("data/processed/tennis")
+    RANDOM_SEED = 42
     
-    def __init__(self):
+    def __init__(self, seed=RANDOM_SEED):
+        self.seed = seed
         self.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
         
     def process_data(self):
@@ -30,85 +32,81 @@ class TennisFeatureEngineer:
             
             output = self.PROCESSED_DIR / f"{tour}_training_data.csv"
             processed_df.to_csv(output, index=False)
+            self._write_parquet(processed_df, output.with_suffix('.parquet'))
             logger.info(f"✅ Saved {tour.upper()} training data: {len(processed_df)} records")
 
-    def _create_features(self, df):
+    def _write_parquet(self, df, path):
+        """Write a Parquet copy next to the CSV (needs pyarrow or fastparquet)."""
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError as e:
+            logger.warning(f"⚠️ Skipping Parquet output ({e})")
+
+    @staticmethod
+    def _column(df, names, default):
+        """First existing column among names (as a float Series), else a constant."""
+        for name in names:
+            if name in df.columns:
+                return pd.to_numeric(df[name], errors='coerce')
+        return pd.Series(default, index=df.index, dtype=float)
+
+    def _create_features(self, df, seed=None):
         # Expected cols: Winner, Loser, WRank, LRank, Wpts, Lpts, Surface, Odds(B365W, B365L)
         
         # We need to create symmetric training data:
         # Row 1: PlayerA=Winner, PlayerB=Loser, Target=1
         # Row 2: PlayerA=Loser, PlayerB=Winner, Target=0 (flipped)
         # But to avoid data leakage and double counting, we randomly flip.
+        # The flip mask comes from a seeded RNG so rebuilt datasets are reproducible.
         
-        data = []
+        # Basic cleanup
+        df = df[df['Winner'].notna() & df['Loser'].notna()]
         
-        for _, row in df.iterrows():
-            # Basic cleanup
-            try:
-                if pd.isna(row['Winner']) or pd.isna(row['Loser']):
-                    continue
-                    
-                # Skip retired (Totals valid only for completed)
-                comment = str(row.get('Comment', 'Completed'))
-                if 'Ret' in comment or 'Walkover' in comment:
-                    continue
-
-                # Calculate Total Games
-                total_games = 0
-                for i in range(1, 6):
-                    w_set = row.get(f'W{i}', 0)
-                    l_set = row.get(f'L{i}', 0)
-                    if pd.notna(w_set): total_games += w_set
-                    if pd.notna(l_set): total_games += l_set
-                
-                # Flip coin
-                if np.random.random() > 0.5:
-                    p1 = row['Winner']
-                    p2 = row['Loser']
-                    p1_rank = row.get('WRank', 1000)
-                    p2_rank = row.get('LRank', 1000)
-                    p1_pts = row.get('WPts', 0)
-                    p2_pts = row.get('LPts', 0)
-                    p1_odds = row.get('B365W', row.get('PSW', 0))
-                    p2_odds = row.get('B365L', row.get('PSL', 0))
-                    target = 1
-                else:
-                    p1 = row['Loser']
-                    p2 = row['Winner']
-                    p1_rank = row.get('LRank', 1000)
-                    p2_rank = row.get('WRank', 1000)
-                    p1_pts = row.get('LPts', 0)
-                    p2_pts = row.get('WPts', 0)
-                    p1_odds = row.get('B365L', row.get('PSL', 0))
-                    p2_odds = row.get('B365W', row.get('PSW', 0))
-                    target = 0
-                
-                # Handle NaNs in ranks
-                p1_rank = 1000 if pd.isna(p1_rank) else p1_rank
-                p2_rank = 1000 if pd.isna(p2_rank) else p2_rank
-                
-                # Features
-                feat = {
-                    'Date': row.get('Date'),
-                    'Player1': p1,
-                    'Player2': p2,
-                    'RankDiff': float(p2_rank) - float(p1_rank), # Positive if P1 is better (lower rank)
-                    'Rank1': float(p1_rank),
-                    'Rank2': float(p2_rank),
-                    'PtsDiff': float(p1_pts) - float(p2_pts) if pd.notna(p1_pts) and pd.notna(p2_pts) else 0,
-                    'Surface': row.get('Surface', 'Hard'), # Need One-Hot encoding later
-                    'Odds1': float(p1_odds) if pd.notna(p1_odds) else 0.0,
-                    'Odds2': float(p2_odds) if pd.notna(p2_odds) else 0.0,
-                    'Odds2': float(p2_odds) if pd.notna(p2_odds) else 0.0,
-                    'Target_Win': target,
-                    'Target_TotalGames': total_games
-                }
-                data.append(feat)
-                
-            except Exception as e:
-                continue
-                
-        return pd.DataFrame(data)
+        # Skip retired (Totals valid only for completed)
+        if 'Comment' in df.columns:
+            comment = df['Comment'].astype(str)
+            df = df[~(comment.str.contains('Ret', regex=False) | comment.str.contains('Walkover', regex=False))]
+        df = df.reset_index(drop=True)
+        
+        # Calculate Total Games (sum of W1..W5 and L1..L5 set scores)
+        set_cols = [f'{side}{i}' for i in range(1, 6) for side in ('W', 'L') if f'{side}{i}' in df.columns]
+        if set_cols:
+            total_games = df[set_cols].apply(pd.to_numeric, errors='coerce').sum(axis=1, min_count=0)
+        else:
+            total_games = pd.Series(0, index=df.index)
+        
+        # Flip coin
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        winner_first = rng.random(len(df)) > 0.5
+        
+        w_rank = self._column(df, ['WRank'], 1000).fillna(1000)
+        l_rank = self._column(df, ['LRank'], 1000).fillna(1000)
+        w_pts = self._column(df, ['WPts'], 0)
+        l_pts = self._column(df, ['LPts'], 0)
+        w_odds = self._column(df, ['B365W', 'PSW'], 0).fillna(0.0)
+        l_odds = self._column(df, ['B365L', 'PSL'], 0).fillna(0.0)
+        
+        p1_rank = np.where(winner_first, w_rank, l_rank)
+        p2_rank = np.where(winner_first, l_rank, w_rank)
+        p1_pts = np.where(winner_first, w_pts, l_pts)
+        p2_pts = np.where(winner_first, l_pts, w_pts)
+        pts_diff = p1_pts - p2_pts
+        
+        # Features
+        return pd.DataFrame({
+            'Date': df['Date'] if 'Date' in df.columns else None,
+            'Player1': np.where(winner_first, df['Winner'], df['Loser']),
+            'Player2': np.where(winner_first, df['Loser'], df['Winner']),
+            'RankDiff': p2_rank - p1_rank, # Positive if P1 is better (lower rank)
+            'Rank1': p1_rank,
+            'Rank2': p2_rank,
+            'PtsDiff': np.where(np.isnan(pts_diff), 0, pts_diff),
+            'Surface': df['Surface'] if 'Surface' in df.columns else 'Hard', # Need One-Hot encoding later
+            'Odds1': np.where(winner_first, w_odds, l_odds),
+            'Odds2': np.where(winner_first, l_odds, w_odds),
+            'Target_Win': winner_first.astype(int),
+            'Target_TotalGames': total_games.to_numpy()
+        })
 
 if __name__ == "__main__":
     engineer = TennisFeatureEngineer()
@@ -3,18 +3,36 @@ Agent Registry Service
 =====================
 Manages distributed sub-agent registration and discovery across multiple HeadAgent instances.
 Enables horizontal scaling by externalizing agent state to Redis.
+
+Reads and writes are pipelined (one round trip each, two for a sport's
+full listing). Heartbeat times are also kept in a sorted set, so finding
+stale agents is a single ZRANGEBYSCORE. Each process caches a per-sport
+snapshot of the registry. The snapshot is dropped on change notifications
+and after a short TTL. get_agent() then picks among healthy agents by
+round-robin, least in-flight requests or EWMA latency.
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional, Any
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 import redis.asyncio as redis
 import uuid
 
+from src.services.invalidation_listener import InvalidationListener
+
 logger = logging.getLogger(__name__)
 
+SELECTION_STRATEGIES = ("round_robin", "least_in_flight", "latency_weighted")
+
+# Latency sample charged for a failed call, so failing agents lose latency-weighted traffic
+FAILURE_LATENCY_PENALTY = 1.0  # seconds
+
 
 @dataclass
 class AgentInfo:
@@ -26,50 +44,90 @@ class AgentInfo:
     last_heartbeat: str
     status: str = "healthy"  # healthy, unhealthy, stale
     metadata: Dict[str, Any] = None
-    
+
     def __post_init__(self):
         if self.metadata is None:
             self.metadata = {}
 
 
+@dataclass
+class AgentLoad:
+    """This process's view of the traffic it sends to one agent."""
+    in_flight: int = 0
+    ewma_latency: Optional[float] = None  # seconds
+    requests: int = 0
+    failures: int = 0
+
+
 class AgentRegistry:
     """
     Distributed agent registry using Redis as backend.
-    
+
     Supports:
     - Multi-instance agent registration
-    - Agent discovery and load balancing
-    - Automatic stale agent cleanup
+    - Agent discovery and load balancing (round-robin, least in-flight, latency-weighted)
+    - Automatic stale agent cleanup from a heartbeat sorted set
     - Health monitoring
+    - Per-process registry snapshot, refreshed on change notifications
     """
-    
+
     # Redis key patterns
     AGENTS_SET_KEY = "agents:{sport}"  # Set of agent_ids for a sport
     AGENT_INFO_KEY = "agent:{agent_id}"  # Hash of agent metadata
     INSTANCE_AGENTS_KEY = "instance:{instance_id}:agents"  # Set of agent_ids for an instance
-    
+    HEARTBEATS_KEY = "agents:heartbeats"  # Sorted set of agent_id scored by last heartbeat (epoch seconds)
+    CHANGES_CHANNEL = "agents:changed"  # Pub/sub channel for registration changes
+
     HEARTBEAT_INTERVAL = 30  # seconds
     STALE_THRESHOLD = 120  # seconds - consider agent stale if no heartbeat
-    
-    def __init__(self, redis_url: str = None):
+
+    def __init__(self, redis_url: str = None, strategy: str = None, snapshot_ttl: float = None,
+                 latency_alpha: float = None):
         """Initialize the agent registry."""
         from src.config import settings
         self.redis_url = redis_url or settings.redis_url
-        self.redis_client = None
+        self.strategy = strategy or settings.agent_selection_strategy
+        if self.strategy not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown agent selection strategy: {self.strategy}")
+        self.snapshot_ttl = snapshot_ttl if snapshot_ttl is not None else settings.agent_registry_snapshot_ttl
+        self.latency_alpha = latency_alpha or settings.agent_latency_ewma_alpha
+        self.instance_id = uuid.uuid4().hex
+        # Changes may be missed if the listener stops; the snapshot TTL still bounds staleness
+        self._changes = InvalidationListener(
+            "AgentRegistry", self.CHANGES_CHANNEL, self.instance_id,
+            on_event=lambda event: self._invalidate(event.get("sports"))
+        )
+
+        # sport -> (loaded at, monotonic; agents)
+        self._snapshots: Dict[str, Tuple[float, List[AgentInfo]]] = {}
+        self._load: Dict[str, AgentLoad] = {}
+        self._round_robin: Dict[str, int] = {}
         logger.info("✅ AgentRegistry initialized")
-    
+
+    @property
+    def redis_client(self):
+        return self._changes.client
+
     async def _get_redis(self):
-        """Lazy-initialize async Redis connection."""
-        if self.redis_client is None:
-            try:
-                self.redis_client = await redis.from_url(self.redis_url, decode_responses=True)
-                await self.redis_client.ping()
-                logger.info("✅ AgentRegistry: Redis connection established")
-            except Exception as e:
-                logger.error(f"❌ AgentRegistry: Redis connection failed: {e}")
-                self.redis_client = False
-        return self.redis_client if self.redis_client is not False else None
-    
+        """Lazy-initialize async Redis connection and the change listener."""
+        return await self._changes.connect(lambda: redis.from_url(self.redis_url, decode_responses=True))
+
+    def _invalidate(self, sports: Optional[List[str]] = None):
+        if sports is None:
+            self._snapshots.clear()
+        for sport in sports or []:
+            self._snapshots.pop(sport, None)
+
+    def _notify(self, pipe, sports: List[str]):
+        """Queue a change notification on a write pipeline and drop the local snapshots."""
+        self._invalidate(sports)
+        pipe.publish(self.CHANGES_CHANNEL, json.dumps({"instance_id": self.instance_id, "sports": sports}))
+
+    async def close(self):
+        """Stop the change listener and close the Redis connection."""
+        await self._changes.close()
+        self._snapshots.clear()
+
     async def register_agent(
         self,
         sport: str,
@@ -78,12 +136,12 @@ class AgentRegistry:
     ) -> Optional[str]:
         """
         Register a new agent.
-        
+
         Args:
             sport: Sport type (e.g., "baseball", "basketball")
             instance_id: Unique identifier for the HeadAgent instance
             metadata: Optional metadata about the agent
-        
+
         Returns:
             Agent ID if successful, None otherwise
         """
@@ -91,262 +149,366 @@ class AgentRegistry:
         if not redis_client:
             logger.warning("⚠️ Cannot register agent: Redis not available")
             return None
-        
+
         try:
             # Generate unique agent ID
             agent_id = f"{instance_id}:{sport}:{uuid.uuid4().hex[:8]}"
-            
+
             # Create agent info
-            now = datetime.utcnow().isoformat()
+            now = datetime.utcnow()
             agent_info = AgentInfo(
                 sport=sport,
                 instance_id=instance_id,
                 agent_id=agent_id,
-                registered_at=now,
-                last_heartbeat=now,
+                registered_at=now.isoformat(),
+                last_heartbeat=now.isoformat(),
                 status="healthy",
                 metadata=metadata or {}
             )
-            
-            # Store agent info
+
             agent_key = self.AGENT_INFO_KEY.format(agent_id=agent_id)
-            await redis_client.hset(agent_key, mapping=self._serialize_agent_info(agent_info))
-            await redis_client.expire(agent_key, self.STALE_THRESHOLD * 2)  # Auto-cleanup
-            
-            # Add to sport's agent set
-            agents_set_key = self.AGENTS_SET_KEY.format(sport=sport)
-            await redis_client.sadd(agents_set_key, agent_id)
-            
-            # Add to instance's agent set
             instance_key = self.INSTANCE_AGENTS_KEY.format(instance_id=instance_id)
-            await redis_client.sadd(instance_key, agent_id)
-            await redis_client.expire(instance_key, self.STALE_THRESHOLD * 2)
-            
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(agent_key, mapping=self._serialize_agent_info(agent_info))
+                pipe.expire(agent_key, self.STALE_THRESHOLD * 2)  # Auto-cleanup
+                pipe.sadd(self.AGENTS_SET_KEY.format(sport=sport), agent_id)
+                pipe.sadd(instance_key, agent_id)
+                pipe.expire(instance_key, self.STALE_THRESHOLD * 2)
+                pipe.zadd(self.HEARTBEATS_KEY, {agent_id: time.time()})
+                self._notify(pipe, [sport])
+                await pipe.execute()
+
             logger.info(f"✅ Agent registered: {agent_id} (sport={sport}, instance={instance_id})")
             return agent_id
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to register agent: {e}")
             return None
-    
+
     async def unregister_agent(self, agent_id: str) -> bool:
         """
         Unregister an agent.
-        
+
         Args:
             agent_id: Agent identifier
-        
+
         Returns:
             True if successful, False otherwise
         """
         redis_client = await self._get_redis()
         if not redis_client:
             return False
-        
+
         try:
             # Get agent info
             agent_info = await self.get_agent_info(agent_id)
             if not agent_info:
                 return False
-            
-            # Remove from sport's agent set
-            agents_set_key = self.AGENTS_SET_KEY.format(sport=agent_info.sport)
-            await redis_client.srem(agents_set_key, agent_id)
-            
-            # Remove from instance's agent set
-            instance_key = self.INSTANCE_AGENTS_KEY.format(instance_id=agent_info.instance_id)
-            await redis_client.srem(instance_key, agent_id)
-            
-            # Delete agent info
-            agent_key = self.AGENT_INFO_KEY.format(agent_id=agent_id)
-            await redis_client.delete(agent_key)
-            
+
+            await self._remove_agents(redis_client, [(agent_id, agent_info.sport, agent_info.instance_id)])
+
             logger.info(f"✅ Agent unregistered: {agent_id}")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to unregister agent: {e}")
             return False
-    
-    async def get_agent(self, sport: str) -> Optional[AgentInfo]:
+
+    async def _remove_agents(self, redis_client, agents: List[Tuple[str, Optional[str], Optional[str]]]):
+        """Remove (agent_id, sport, instance_id) entries from every index in one transaction."""
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for agent_id, sport, instance_id in agents:
+                if sport:
+                    pipe.srem(self.AGENTS_SET_KEY.format(sport=sport), agent_id)
+                if instance_id:
+                    pipe.srem(self.INSTANCE_AGENTS_KEY.format(instance_id=instance_id), agent_id)
+                pipe.delete(self.AGENT_INFO_KEY.format(agent_id=agent_id))
+            pipe.zrem(self.HEARTBEATS_KEY, *[agent_id for agent_id, _, _ in agents])
+            self._notify(pipe, sorted({sport for _, sport, _ in agents if sport}))
+            await pipe.execute()
+        for agent_id, _, _ in agents:
+            self._load.pop(agent_id, None)
+
+    async def get_agent(self, sport: str, strategy: str = None) -> Optional[AgentInfo]:
         """
-        Get a healthy agent for a sport (round-robin).
-        
+        Get a healthy agent for a sport.
+
         Args:
             sport: Sport type
-        
+            strategy: "round_robin", "least_in_flight" or "latency_weighted"
+                (defaults to the registry's strategy)
+
         Returns:
             AgentInfo if available, None otherwise
         """
         agents = await self.get_all_agents(sport)
-        
+
         # Filter for healthy agents
         healthy_agents = [a for a in agents if a.status == "healthy"]
-        
+
         if not healthy_agents:
             return None
-        
-        # Simple round-robin: return first (could enhance with true round-robin later)
-        return healthy_agents[0]
-    
-    async def get_all_agents(self, sport: str) -> List[AgentInfo]:
+
+        return self._select(sport, healthy_agents, strategy or self.strategy)
+
+    def _select(self, sport: str, agents: List[AgentInfo], strategy: str) -> AgentInfo:
+        """Pick one of a sport's healthy agents."""
+        # Rotate a stable ordering so round-robin and tie-breaks spread across agents
+        agents = sorted(agents, key=lambda a: a.agent_id)
+        turn = self._round_robin.get(sport, 0)
+        self._round_robin[sport] = turn + 1
+        offset = turn % len(agents)
+        rotated = agents[offset:] + agents[:offset]
+
+        if strategy == "round_robin":
+            return rotated[0]
+
+        if strategy == "least_in_flight":
+            return min(rotated, key=lambda a: self._load_for(a.agent_id).in_flight)
+
+        if strategy == "latency_weighted":
+            latencies = [self._load_for(a.agent_id).ewma_latency for a in rotated]
+            known = [latency for latency in latencies if latency is not None]
+            # Unmeasured agents are assumed as fast as the fastest one, so they get tried
+            fastest = min(known) if known else 1.0
+            weights = [
+                1.0 / (max(latency if latency is not None else fastest, 1e-3)
+                       * (self._load_for(a.agent_id).in_flight + 1))
+                for a, latency in zip(rotated, latencies)
+            ]
+            return random.choices(rotated, weights=weights)[0]
+
+        raise ValueError(f"Unknown agent selection strategy: {strategy}")
+
+    def _load_for(self, agent_id: str) -> AgentLoad:
+        load = self._load.get(agent_id)
+        if load is None:
+            load = self._load[agent_id] = AgentLoad()
+        return load
+
+    def record_result(self, agent_id: str, latency: float, success: bool = True):
+        """Fold a finished call into the agent's EWMA latency."""
+        load = self._load_for(agent_id)
+        load.requests += 1
+        if not success:
+            load.failures += 1
+            latency = max(latency, FAILURE_LATENCY_PENALTY)
+        if load.ewma_latency is None:
+            load.ewma_latency = latency
+        else:
+            load.ewma_latency += self.latency_alpha * (latency - load.ewma_latency)
+
+    @asynccontextmanager
+    async def track(self, agent_id: str):
+        """
+        Count a call to an agent as in flight and record its latency when it finishes.
+
+        A cancelled call (e.g. the losing side of a hedge) says nothing about
+        the agent, so it is not recorded.
+        """
+        load = self._load_for(agent_id)
+        load.in_flight += 1
+        start = time.perf_counter()
+        success = cancelled = False
+        try:
+            yield
+            success = True
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            load.in_flight -= 1
+            if not cancelled:
+                self.record_result(agent_id, time.perf_counter() - start, success)
+
+    def get_load(self, agent_id: str) -> Dict[str, Any]:
+        """In-flight count and latency statistics for an agent, as seen by this process."""
+        return asdict(self._load_for(agent_id))
+
+    async def get_all_agents(self, sport: str, use_cache: bool = True) -> List[AgentInfo]:
         """
         Get all agents for a sport, with health status updated.
-        
+
         Args:
             sport: Sport type
-        
+            use_cache: Serve from the local snapshot when it is fresh
+
         Returns:
             List of AgentInfo objects
         """
         redis_client = await self._get_redis()
         if not redis_client:
             return []
-        
-        try:
-            # Get all agent IDs for this sport
-            agents_set_key = self.AGENTS_SET_KEY.format(sport=sport)
-            agent_ids = await redis_client.smembers(agents_set_key)
-            
-            agents = []
-            for agent_id in agent_ids:
-                agent_info = await self.get_agent_info(agent_id)
-                if agent_info:
-                    agents.append(agent_info)
-            
-            return agents
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to get agents for {sport}: {e}")
-            return []
-    
+
+        cached = self._snapshots.get(sport)
+        if use_cache and cached and time.monotonic() - cached[0] < self.snapshot_ttl:
+            agents = cached[1]
+        else:
+            try:
+                agents = await self._load_agents(redis_client, sport)
+            except Exception as e:
+                logger.error(f"❌ Failed to get agents for {sport}: {e}")
+                return []
+
+        # Health follows the clock, so it is recomputed (on copies) even for a cached snapshot
+        return [self._update_agent_health(replace(agent)) for agent in agents]
+
+    async def _load_agents(self, redis_client, sport: str) -> List[AgentInfo]:
+        """Read a sport's agents (SMEMBERS plus one pipelined HGETALL per agent) into the snapshot."""
+        loaded_at = time.monotonic()
+        agent_ids = sorted(await redis_client.smembers(self.AGENTS_SET_KEY.format(sport=sport)))
+
+        agents = []
+        if agent_ids:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for agent_id in agent_ids:
+                    pipe.hgetall(self.AGENT_INFO_KEY.format(agent_id=agent_id))
+                rows = await pipe.execute()
+            for agent_id, agent_data in zip(agent_ids, rows):
+                if not agent_data:
+                    continue  # Hash expired; cleanup_stale_agents removes the index entry
+                try:
+                    agents.append(self._deserialize_agent_info(agent_data))
+                except Exception as e:
+                    logger.error(f"❌ Failed to get agent info for {agent_id}: {e}")
+
+        self._snapshots[sport] = (loaded_at, agents)
+        # Forget load statistics of this sport's agents that are gone (e.g. removed by another instance)
+        present = {agent.agent_id for agent in agents}
+        for agent_id in [a for a in self._load if a not in present and self._sport_from_agent_id(a) == sport]:
+            del self._load[agent_id]
+        return agents
+
     async def get_agent_info(self, agent_id: str) -> Optional[AgentInfo]:
         """Get information about a specific agent."""
         redis_client = await self._get_redis()
         if not redis_client:
             return None
-        
+
         try:
             agent_key = self.AGENT_INFO_KEY.format(agent_id=agent_id)
             agent_data = await redis_client.hgetall(agent_key)
-            
+
             if not agent_data:
                 return None
-            
+
             # Deserialize and update health status
             agent_info = self._deserialize_agent_info(agent_data)
             agent_info = self._update_agent_health(agent_info)
-            
+
             return agent_info
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to get agent info for {agent_id}: {e}")
             return None
-    
-    async def heartbeat(self, agent_id: str) -> bool:
+
+    async def heartbeat(self, agent_id: str, status: str = "healthy") -> bool:
         """
         Update agent's last heartbeat timestamp.
-        
+
         Args:
             agent_id: Agent identifier
-        
+            status: Health reported by the agent's owner ("healthy" or "unhealthy")
+
         Returns:
             True if successful, False otherwise
         """
         redis_client = await self._get_redis()
         if not redis_client:
             return False
-        
+
         try:
             agent_key = self.AGENT_INFO_KEY.format(agent_id=agent_id)
-            now = datetime.utcnow().isoformat()
-            await redis_client.hset(agent_key, "last_heartbeat", now)
-            await redis_client.hset(agent_key, "status", "healthy")
-            
-            # Refresh TTL
-            await redis_client.expire(agent_key, self.STALE_THRESHOLD * 2)
-            
+            now = datetime.utcnow()
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(agent_key, mapping={"last_heartbeat": now.isoformat(), "status": status})
+                pipe.expire(agent_key, self.STALE_THRESHOLD * 2)  # Refresh TTL
+                pipe.zadd(self.HEARTBEATS_KEY, {agent_id: time.time()})
+                await pipe.execute()
+
+            # Keep this process's snapshot current without a reload
+            for _, agents in self._snapshots.values():
+                for agent in agents:
+                    if agent.agent_id == agent_id:
+                        agent.last_heartbeat = now.isoformat()
+                        agent.status = status
+
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to update heartbeat for {agent_id}: {e}")
             return False
-    
+
     async def cleanup_stale_agents(self) -> int:
         """
         Remove agents that haven't sent heartbeat within STALE_THRESHOLD.
-        
+
         Returns:
             Number of agents cleaned up
         """
         redis_client = await self._get_redis()
         if not redis_client:
             return 0
-        
+
         try:
-            cleaned = 0
-            
-            # Scan all agent info keys
-            cursor = 0
-            while True:
-                cursor, keys = await redis_client.scan(
-                    cursor, 
-                    match="agent:*",
-                    count=100
-                )
-                
-                for agent_key in keys:
-                    agent_data = await redis_client.hgetall(agent_key)
-                    if not agent_data:
-                        continue
-                    
-                    agent_info = self._deserialize_agent_info(agent_data)
-                    agent_info = self._update_agent_health(agent_info)
-                    
-                    if agent_info.status == "stale":
-                        await self.unregister_agent(agent_info.agent_id)
-                        cleaned += 1
-                
-                if cursor == 0:
-                    break
-            
-            if cleaned > 0:
-                logger.info(f"🧹 Cleaned up {cleaned} stale agents")
-            
-            return cleaned
-            
+            stale_ids = await redis_client.zrangebyscore(
+                self.HEARTBEATS_KEY, "-inf", time.time() - self.STALE_THRESHOLD
+            )
+            if not stale_ids:
+                return 0
+
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for agent_id in stale_ids:
+                    pipe.hmget(self.AGENT_INFO_KEY.format(agent_id=agent_id), "sport", "instance_id")
+                rows = await pipe.execute()
+
+            # An expired hash no longer names its sport; recover it from the ID (instance:sport:suffix)
+            stale = [
+                (agent_id, sport or self._sport_from_agent_id(agent_id), instance_id)
+                for agent_id, (sport, instance_id) in zip(stale_ids, rows)
+            ]
+            await self._remove_agents(redis_client, stale)
+
+            logger.info(f"🧹 Cleaned up {len(stale)} stale agents")
+            return len(stale)
+
         except Exception as e:
             logger.error(f"❌ Failed to cleanup stale agents: {e}")
             return 0
-    
+
+    @staticmethod
+    def _sport_from_agent_id(agent_id: str) -> Optional[str]:
+        parts = agent_id.rsplit(":", 2)
+        return parts[1] if len(parts) == 3 else None
+
     def _serialize_agent_info(self, agent_info: AgentInfo) -> Dict[str, str]:
         """Serialize AgentInfo to Redis hash."""
         data = asdict(agent_info)
         data['metadata'] = json.dumps(data.get('metadata', {}))
         return data
-    
+
     def _deserialize_agent_info(self, data: Dict[str, str]) -> AgentInfo:
         """Deserialize Redis hash to AgentInfo."""
         data = dict(data)  # Copy to avoid mutation
         data['metadata'] = json.loads(data.get('metadata', '{}'))
         return AgentInfo(**data)
-    
+
     def _update_agent_health(self, agent_info: AgentInfo) -> AgentInfo:
         """Update agent health status based on last heartbeat."""
         try:
             last_heartbeat = datetime.fromisoformat(agent_info.last_heartbeat)
             age = (datetime.utcnow() - last_heartbeat).total_seconds()
-            
+
             if age > self.STALE_THRESHOLD:
                 agent_info.status = "stale"
             elif age > self.HEARTBEAT_INTERVAL * 2:
                 agent_info.status = "unhealthy"
-            else:
+            elif agent_info.status != "unhealthy":  # Unless its owner reported it unhealthy
                 agent_info.status = "healthy"
-                
+
         except Exception:
             agent_info.status = "unknown"
-        
+
         return agent_info
 
 
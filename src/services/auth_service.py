@@ -14,13 +14,14 @@ from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, asdict
 from enum import Enum
 import jwt
-import bcrypt
 import redis.asyncio as redis
 from pydantic import BaseModel, EmailStr, validator
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from src.db.models.user import User as UserModel
+from src.services.token_cache import VerifiedTokenCache, token_cache as shared_token_cache
+from src.services.password_hasher import PasswordHasher, PasswordHasherBusy, password_hasher as shared_password_hasher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +43,7 @@ class AuthStatus(Enum):
     TOKEN_EXPIRED = "token_expired"
     INVALID_TOKEN = "invalid_token"
     RATE_LIMITED = "rate_limited"
+    SERVER_BUSY = "server_busy"
 
 @dataclass
 class User:
@@ -147,7 +149,8 @@ class AuthService:
     """Authentication and session management service."""
     
     def __init__(self, redis_url: str = None, 
-                 jwt_secret: str = None, jwt_algorithm: str = "HS256"):
+                 jwt_secret: str = None, jwt_algorithm: str = "HS256",
+                 token_cache: VerifiedTokenCache = None, password_hasher: PasswordHasher = None):
         """Initialize the authentication service."""
         from src.config import settings
         
@@ -166,6 +169,12 @@ class AuthService:
         self.rate_limit_requests = settings.rate_limit_requests_per_hour
         self.rate_limit_window = 3600  # seconds
         
+        # Verified tokens and revocations (shared by every AuthService in the process by default)
+        self.token_cache = token_cache or shared_token_cache
+        
+        # bcrypt runs on a bounded worker pool, never on the event loop
+        self.password_hasher = password_hasher or shared_password_hasher
+        
         # Redis client (lazy initialized)
         self.redis_client = None
         logger.info("✅ AuthService initialized (Redis will connect on first use)")
@@ -187,22 +196,26 @@ class AuthService:
         return f"user_{int(time.time())}_{secrets.token_hex(8)}"
     
     def _hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt."""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash a password using bcrypt (blocking; handlers use the hasher's pool)."""
+        return self.password_hasher.hash_sync(password)
     
     def _verify_password(self, password: str, password_hash: str) -> bool:
-        """Verify a password against its hash."""
-        try:
-            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
-        except Exception:
-            return False
+        """Verify a password against its hash (blocking; handlers use the hasher's pool)."""
+        return self.password_hasher.verify_sync(password, password_hash)
+    
+    def _busy_response(self, e: PasswordHasherBusy) -> Dict[str, Any]:
+        logger.warning(f"⚠️ Password hashing at capacity: {e}")
+        return {
+            "status": AuthStatus.SERVER_BUSY,
+            "message": "Authentication is busy. Please retry shortly."
+        }
     
     def _generate_session_id(self) -> str:
         """Generate a unique session ID."""
         return f"session_{int(time.time())}_{secrets.token_hex(16)}"
     
-    def _create_jwt_token(self, user_id: str, role: str, expires_in: int = None) -> str:
+    def _create_jwt_token(self, user_id: str, role: str, expires_in: int = None,
+                          session_id: str = None) -> str:
         """Create a JWT token for the user."""
         if expires_in is None:
             expires_in = self.session_timeout * 3600  # Convert hours to seconds
@@ -210,9 +223,12 @@ class AuthService:
         payload = {
             'user_id': user_id,
             'role': role,
-            'iat': datetime.utcnow(),
+            'jti': secrets.token_hex(16),
+            'iat': time.time(),  # Fractional, so revocation checks are exact within a second
             'exp': datetime.utcnow() + timedelta(seconds=expires_in)
         }
+        if session_id:
+            payload['sid'] = session_id
         
         return jwt.encode(payload, self.jwt_secret, algorithm=self.jwt_algorithm)
     
@@ -306,7 +322,7 @@ class AuthService:
             # Create new user
             import uuid
             user_id = str(uuid.uuid4())
-            password_hash = self._hash_password(registration.password)
+            password_hash = await self.password_hasher.hash(registration.password)
             
             user = UserModel(
                 id=user_id,
@@ -333,6 +349,8 @@ class AuthService:
                 "email": user.email
             }
             
+        except PasswordHasherBusy as e:
+            return self._busy_response(e)
         except Exception as e:
             await db.rollback()
             logger.error(f"❌ Registration failed: {e}")
@@ -370,7 +388,7 @@ class AuthService:
                 }
             
             # Verify password
-            if not self._verify_password(login.password, user.password_hash):
+            if not await self.password_hasher.verify(login.password, user.password_hash):
                 attempts = await self._increment_login_attempts(login.username)
                 return {
                     "status": AuthStatus.INVALID_CREDENTIALS,
@@ -380,6 +398,13 @@ class AuthService:
             # Reset login attempts
             await self._reset_login_attempts(login.username)
             
+            # Bring the hash up to the configured cost while the plaintext is at hand
+            if self.password_hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = await self.password_hasher.hash(login.password)
+                except PasswordHasherBusy:
+                    pass  # Retried on a later login
+            
             # Update last login
             user.last_login = datetime.utcnow()
             await db.commit()
@@ -389,7 +414,7 @@ class AuthService:
             session = await self._create_session(user.id, ip_address, user_agent, session_timeout)
             
             # Create JWT token
-            token = self._create_jwt_token(user.id, user.role, session_timeout * 3600)
+            token = self._create_jwt_token(user.id, user.role, session_timeout * 3600, session.session_id)
             
             logger.info(f"✅ User logged in successfully: {user.username}")
             
@@ -408,6 +433,8 @@ class AuthService:
                 "expires_in": session_timeout * 3600
             }
             
+        except PasswordHasherBusy as e:
+            return self._busy_response(e)
         except Exception as e:
             logger.error(f"❌ Login failed: {e}")
             return {
@@ -415,10 +442,23 @@ class AuthService:
                 "message": "Login failed. Please try again."
             }
     
-    async def logout_user(self, session_id: str) -> Dict[str, Any]:
-        """Logout a user by invalidating their session."""
+    async def logout_user(self, session_id: str = None, token: str = None) -> Dict[str, Any]:
+        """Logout a user by invalidating their session and revoking the token used."""
         try:
-            if await self._invalidate_session(session_id):
+            logged_out = False
+            if token:
+                payload = self._decode_jwt_token(token)
+                if payload:
+                    # Tokens issued before jti/sid claims existed simply run to expiry
+                    if payload.get('jti'):
+                        await self.token_cache.revoke("jti", payload['jti'])
+                    session_id = session_id or payload.get('sid')
+                    logged_out = True
+            
+            if session_id and await self._invalidate_session(session_id):
+                logged_out = True
+            
+            if logged_out:
                 return {
                     "status": AuthStatus.SUCCESS,
                     "message": "Logout successful"
@@ -436,8 +476,21 @@ class AuthService:
             }
     
     async def validate_token(self, db: AsyncSession, token: str) -> Dict[str, Any]:
-        """Validate a JWT token and return user information."""
+        """
+        Validate a JWT token and return user information.
+        
+        Tokens verified within the cache TTL are answered from the verified-token
+        cache without decoding or a database lookup; revoked tokens never are.
+        """
         try:
+            cached = await self.token_cache.get(token)
+            if cached:
+                return {
+                    "status": AuthStatus.SUCCESS,
+                    "message": "Token valid",
+                    "user": dict(cached.user)
+                }
+            
             payload = self._decode_jwt_token(token)
             if not payload:
                 return {
@@ -446,6 +499,13 @@ class AuthService:
                 }
             
             user_id = payload.get('user_id')
+            if self.token_cache.is_revoked(user_id, payload.get('jti'), payload.get('sid'),
+                                           float(payload.get('iat') or 0)):
+                return {
+                    "status": AuthStatus.INVALID_TOKEN,
+                    "message": "Token has been revoked"
+                }
+            
             user = await self._get_user_by_id(db, user_id)
             
             if not user or not user.is_active:
@@ -454,16 +514,19 @@ class AuthService:
                     "message": "User not found or inactive"
                 }
             
+            user_snapshot = {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "role": user.role.value,
+                "is_verified": user.is_verified
+            }
+            self.token_cache.put(token, payload, user_snapshot)
+            
             return {
                 "status": AuthStatus.SUCCESS,
                 "message": "Token valid",
-                "user": {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "role": user.role.value,
-                    "is_verified": user.is_verified
-                }
+                "user": dict(user_snapshot)
             }
             
         except Exception as e:
@@ -487,21 +550,22 @@ class AuthService:
                 }
             
             # Verify current password
-            if not self._verify_password(password_change.current_password, user.password_hash):
+            if not await self.password_hasher.verify(password_change.current_password, user.password_hash):
                 return {
                     "status": AuthStatus.INVALID_CREDENTIALS,
                     "message": "Current password is incorrect"
                 }
             
             # Hash new password
-            new_password_hash = self._hash_password(password_change.new_password)
+            new_password_hash = await self.password_hasher.hash(password_change.new_password)
             user.password_hash = new_password_hash
             
             # Commit changes
             await db.commit()
             
-            # Invalidate all sessions for this user
+            # Invalidate all sessions and every token issued so far
             await self._invalidate_user_sessions(user_id)
+            await self.token_cache.revoke("user", user_id)
             
             logger.info(f"✅ Password changed successfully for user: {user.username}")
             
@@ -510,6 +574,8 @@ class AuthService:
                 "message": "Password changed successfully"
             }
             
+        except PasswordHasherBusy as e:
+            return self._busy_response(e)
         except Exception as e:
             await db.rollback()
             logger.error(f"❌ Password change failed: {e}")
@@ -518,6 +584,40 @@ class AuthService:
                 "message": "Password change failed"
             }
     
+    async def deactivate_user(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
+        """Deactivate a user and revoke their sessions and tokens."""
+        try:
+            query = select(UserModel).where(UserModel.id == user_id)
+            result = await db.execute(query)
+            user = result.scalar_one_or_none()
+            
+            if not user:
+                return {
+                    "status": AuthStatus.USER_NOT_FOUND,
+                    "message": "User not found"
+                }
+            
+            user.is_active = False
+            await db.commit()
+            
+            await self._invalidate_user_sessions(user_id)
+            await self.token_cache.revoke("user", user_id)
+            
+            logger.info(f"✅ User deactivated: {user.username}")
+            
+            return {
+                "status": AuthStatus.SUCCESS,
+                "message": "User deactivated"
+            }
+            
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"❌ User deactivation failed: {e}")
+            return {
+                "status": AuthStatus.INVALID_CREDENTIALS,
+                "message": "User deactivation failed"
+            }
+    
     async def get_user_sessions(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all active sessions for a user."""
         try:
@@ -725,6 +825,9 @@ class AuthService:
                 user_sessions_key = f"user_sessions:{user_id}"
                 await redis_client.srem(user_sessions_key, session_id)
             
+            # Tokens bound to the session stop validating, cached or not
+            await self.token_cache.revoke("sid", session_id)
+            
             return True
         
         return False
@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 import asyncio
 
 from src.services.bet_tracker import bet_tracker
-from src.services.parlay_builder import parlay_builder
+from src.services.parlay_builder import parlay_builder, ParlayCandidatePool
 from src.services.data_validation import data_validator, DataValidationError
 from src.services.playoff_detector import playoff_detector
 
@@ -279,11 +279,15 @@ class AutonomousBettingEngine:
                 f"6-leg={'✅' if placed_6leg else '❌'}"
             )
             
+            # Convert eligible predictions to arrays once and reuse for every parlay size
+            candidate_pool = parlay_builder.prepare_candidates(eligible_predictions)
+            
             # Place 2-leg parlay if not already placed today
             if not placed_2leg and len(eligible_predictions) >= 2:
                 logger.info("🎯 Building 2-leg parlay (after daily picks)")
                 parlay_placed = await self._place_parlay(
-                    user_id, eligible_predictions, bankroll, num_legs=2
+                    user_id, eligible_predictions, bankroll, num_legs=2,
+                    pool=candidate_pool
                 )
                 if parlay_placed:
                     bets_placed += 1
@@ -295,7 +299,8 @@ class AutonomousBettingEngine:
             if not placed_3leg and len(eligible_predictions) >= 3:
                 logger.info("🎯 Building 3-leg parlay (after daily picks)")
                 parlay_placed = await self._place_parlay(
-                    user_id, eligible_predictions, bankroll, num_legs=3
+                    user_id, eligible_predictions, bankroll, num_legs=3,
+                    pool=candidate_pool
                 )
                 if parlay_placed:
                     bets_placed += 1
@@ -309,7 +314,8 @@ class AutonomousBettingEngine:
                 if len(eligible_predictions) >= 6:
                     logger.info("🎯 Building 6-leg parlay (after daily picks)")
                     parlay_placed = await self._place_parlay(
-                        user_id, eligible_predictions, bankroll, num_legs=6
+                        user_id, eligible_predictions, bankroll, num_legs=6,
+                        pool=candidate_pool
                     )
                     if parlay_placed:
                         bets_placed += 1
@@ -572,9 +578,15 @@ class AutonomousBettingEngine:
         user_id: str,
         predictions: List[Dict],
         bankroll: Dict,
-        num_legs: Optional[int] = None
+        num_legs: Optional[int] = None,
+        pool: Optional[ParlayCandidatePool] = None
     ) -> bool:
-        """Build and place a parlay bet."""
+        """
+        Build and place a parlay bet.
+        
+        Pass a candidate pool prepared from the same predictions to skip
+        re-converting them for every parlay size.
+        """
         try:
             from src.services.parlay_tracker import parlay_tracker
             
@@ -589,7 +601,7 @@ class AutonomousBettingEngine:
                 risk_level = "moderate"
             
             # Build parlay with specific number of legs
-            parlay = parlay_builder.build_parlay(predictions, risk_level, num_legs=num_legs)
+            parlay = parlay_builder.build_parlay(predictions, risk_level, num_legs=num_legs, pool=pool)
             
             if not parlay:
                 return False
@@ -765,120 +777,93 @@ class AutonomousBettingEngine:
             # Try to get predictions from database
             from src.db.database import AsyncSessionLocal
             from src.db.models.prediction import Prediction as PredictionModel
-            from sqlalchemy import select
+            from sqlalchemy import select, and_
             from datetime import datetime, timedelta
             
             # Get today's date for filtering (only games happening TODAY)
             now = datetime.utcnow()
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            today_date = today_start.date()
             # Also allow early tomorrow games if it's late at night (after 10 PM UTC)
-            # This handles games that start just after midnight
-            tomorrow_date = today_date + timedelta(days=1)
+            # This handles games that start just after midnight (before 6 AM)
             cutoff_hour = 22  # 10 PM UTC - after this, allow tomorrow's early games
             allow_tomorrow = now.hour >= cutoff_hour
-            
-            from dateutil import parser
+            window_end = today_start + (timedelta(days=1, hours=6) if allow_tomorrow else timedelta(days=1))
             
             async with AsyncSessionLocal() as session:
-                # Get recent predictions (last 48 hours to ensure we catch games from late yesterday)
-                cutoff = datetime.utcnow() - timedelta(hours=48)
+                # Recent predictions (last 48 hours to catch games from late yesterday),
+                # restricted to today's game window using the indexed game_date column
+                cutoff = now - timedelta(hours=48)
                 
                 result = await session.execute(
-                    select(PredictionModel)
-                    .where(PredictionModel.timestamp >= cutoff)
+                    select(
+                        PredictionModel.id,
+                        PredictionModel.sport,
+                        PredictionModel.confidence,
+                        PredictionModel.game_id,
+                        PredictionModel.game_date,
+                        PredictionModel.home_team,
+                        PredictionModel.away_team,
+                        PredictionModel.team,
+                        PredictionModel.bet_type,
+                        PredictionModel.line,
+                        PredictionModel.odds,
+                        PredictionModel.probability,
+                        PredictionModel.edge,
+                    )
+                    .where(
+                        and_(
+                            PredictionModel.game_date >= today_start,
+                            PredictionModel.game_date < window_end,
+                            PredictionModel.timestamp >= cutoff
+                        )
+                    )
                     .order_by(PredictionModel.timestamp.desc())
                 )
-                all_predictions = result.scalars().all()
+                rows = result.all()
                 
-                if not all_predictions:
-                    logger.warning("⚠️ No recent predictions found in database")
+                if not rows:
+                    logger.warning("⚠️ No predictions found in database for today's games")
                     return []
                 
-                # Convert to betting format and filter by game_date (ONLY TODAY, or early tomorrow if late at night)
+                confidence_map = {"low": 0.5, "medium": 0.65, "high": 0.85}
+                # Map bet_type to enum values
+                bet_type_mapping = {
+                    "total": "over_under",
+                    "over_under": "over_under",
+                    "moneyline": "moneyline",
+                    "spread": "spread"
+                }
+                
                 betting_predictions = []
-                for pred in all_predictions:
-                    # Extract metadata
-                    metadata = pred.metadata_json or {}
-                    game_date_str = metadata.get("game_date") or metadata.get("date")
-                    
-                    # Filter to only predictions for games scheduled today (or early tomorrow if late)
-                    game_date = None
-                    if game_date_str:
-                        try:
-                            if isinstance(game_date_str, str):
-                                game_date = parser.parse(game_date_str)
-                            else:
-                                game_date = game_date_str
-                            
-                            game_date_only = game_date.date()
-                            
-                            # Only include games happening TODAY
-                            # Optionally include tomorrow's early games (before 6 AM) if it's late at night
-                            include_prediction = False
-                            if game_date_only == today_date:
-                                include_prediction = True
-                            elif allow_tomorrow and game_date_only == tomorrow_date:
-                                # Only include tomorrow's games if they're early morning (before 6 AM)
-                                game_hour = game_date.hour if hasattr(game_date, 'hour') else 0
-                                if game_hour < 6:  # Early morning games (before 6 AM)
-                                    include_prediction = True
-                            
-                            if not include_prediction:
-                                continue  # Skip predictions not for today's (or early tomorrow's) games
-                        except Exception:
-                            # If we can't parse the date, skip this prediction
-                            logger.debug(f"Could not parse game_date for prediction {pred.id}: {game_date_str}")
-                            continue
-                    else:
-                        # If no game_date in metadata, skip it (we need game dates for betting)
-                        continue
-                    
+                for row in rows:
                     # Convert confidence string to float if needed
-                    confidence_value = pred.confidence
+                    confidence_value = row.confidence
                     if isinstance(confidence_value, str):
-                        confidence_map = {"low": 0.5, "medium": 0.65, "high": 0.85}
                         confidence_value = confidence_map.get(confidence_value.lower(), 0.65)
                     elif isinstance(confidence_value, (int, float)):
                         confidence_value = float(confidence_value) / 100.0 if confidence_value > 1 else float(confidence_value)
                     else:
                         confidence_value = 0.65
                     
-                    # Extract betting info from metadata or prediction text
-                    game_id = metadata.get("game_id", f"game_{pred.id}")
-                    home_team = metadata.get("home_team")
-                    away_team = metadata.get("away_team")
-                    team = metadata.get("team") or home_team  # Default to home team
-                    bet_type = metadata.get("bet_type", "moneyline")
-                    line = metadata.get("line")
-                    odds = metadata.get("odds", -110)  # Default -110
-                    probability = metadata.get("probability", confidence_value)
-                    edge = metadata.get("edge", 0.05)  # Default 5% edge
-                    
-                    # Map bet_type to enum values
-                    bet_type_mapping = {
-                        "total": "over_under",
-                        "over_under": "over_under",
-                        "moneyline": "moneyline",
-                        "spread": "spread"
-                    }
-                    mapped_bet_type = bet_type_mapping.get(bet_type.lower(), bet_type.lower())
+                    home_team = row.home_team
+                    bet_type = (row.bet_type or "moneyline").lower()
+                    game_date = row.game_date.isoformat()
                     
                     betting_predictions.append({
-                        "sport": pred.sport,
-                        "game_id": game_id,
+                        "sport": row.sport,
+                        "game_id": row.game_id or f"game_{row.id}",
                         "home_team": home_team,
-                        "away_team": away_team,
-                        "team": team,
-                        "bet_type": mapped_bet_type,
-                        "line": line,
-                        "odds": float(odds),
-                        "probability": float(probability),
-                        "confidence": float(confidence_value),
-                        "edge": float(edge),
-                        "game_date": game_date.isoformat() if hasattr(game_date, 'isoformat') else str(game_date),
-                        "date": game_date.isoformat() if hasattr(game_date, 'isoformat') else str(game_date),
-                        "prediction_id": pred.id
+                        "away_team": row.away_team,
+                        "team": row.team or home_team,  # Default to home team
+                        "bet_type": bet_type_mapping.get(bet_type, bet_type),
+                        "line": row.line,
+                        "odds": row.odds if row.odds is not None else -110.0,  # Default -110
+                        "probability": row.probability if row.probability is not None else confidence_value,
+                        "confidence": confidence_value,
+                        "edge": row.edge if row.edge is not None else 0.05,  # Default 5% edge
+                        "game_date": game_date,
+                        "date": game_date,
+                        "prediction_id": row.id
                     })
                 
                 logger.info(f"✅ Fetched {len(betting_predictions)} predictions from database")
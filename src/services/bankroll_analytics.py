@@ -0,0 +1,265 @@
+"""
+Bankroll Analytics
+==================
+Equity curve, drawdown, Sharpe ratio and streaks for each bankroll.
+
+Each settled bet updates the Bankroll row in O(1):
+- equity moves by the bet's realized profit;
+- the running peak and drawdown follow equity;
+- Welford's algorithm keeps the mean and variance of per-bet returns;
+- the streak counters advance.
+
+backfill() and rebuild() recompute the same state from bet history with
+NumPy, for existing data or after corrections to settled bets.
+"""
+
+import math
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import String, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.database import AsyncSessionLocal
+from src.db.models.bet import Bankroll, BankrollEquityPoint, Bet, BetStatus
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_INSERT_BATCH_SIZE = 5000
+
+
+@dataclass
+class SettledBet:
+    """The parts of a settled bet the analytics need."""
+    bet_id: Optional[str]
+    amount: float
+    payout: Optional[float]
+    status: BetStatus
+    settled_at: datetime
+
+    @property
+    def profit(self) -> float:
+        if self.status == BetStatus.WON:
+            return (self.payout or 0.0) - self.amount
+        if self.status == BetStatus.LOST:
+            return -self.amount
+        return 0.0
+
+
+def _drawdown(peak: float, equity: float) -> float:
+    return (peak - equity) / peak * 100 if peak > 0 else 0.0
+
+
+def _sharpe(count: int, mean: float, m2: float) -> Optional[float]:
+    """Per-bet Sharpe ratio (mean return over its sample standard deviation)."""
+    if count < 2 or m2 <= 0:
+        return None
+    return mean / math.sqrt(m2 / (count - 1))
+
+
+class BankrollAnalytics:
+    """
+    Incremental risk and performance analytics on the Bankroll model.
+
+    Features:
+    - Equity curve points per settled bet
+    - Peak equity, current and max drawdown (%)
+    - Welford mean/variance of per-bet returns for the Sharpe ratio
+    - Current and longest win/loss streaks (pushes leave streaks unchanged)
+    - Vectorized backfill from bet history
+    """
+
+    def apply(self, bankroll: Bankroll, bet: SettledBet) -> Dict[str, Any]:
+        """
+        Fold one settled bet into the bankroll's analytics.
+
+        Returns:
+            Row for the bankroll_equity_points table
+        """
+        equity = (bankroll.equity if bankroll.equity is not None else bankroll.initial_deposit) + bet.profit
+        peak = max(bankroll.peak_equity if bankroll.peak_equity is not None else bankroll.initial_deposit, equity)
+        drawdown = _drawdown(peak, equity)
+        bankroll.equity = equity
+        bankroll.peak_equity = peak
+        bankroll.current_drawdown = drawdown
+        bankroll.max_drawdown = max(bankroll.max_drawdown or 0.0, drawdown)
+
+        if bet.amount > 0:
+            count = (bankroll.returns_count or 0) + 1
+            mean = bankroll.returns_mean or 0.0
+            r = bet.profit / bet.amount
+            delta = r - mean
+            mean += delta / count
+            bankroll.returns_m2 = (bankroll.returns_m2 or 0.0) + delta * (r - mean)
+            bankroll.returns_count = count
+            bankroll.returns_mean = mean
+            bankroll.sharpe_ratio = _sharpe(count, mean, bankroll.returns_m2)
+
+        streak = bankroll.current_streak or 0
+        if bet.status == BetStatus.WON:
+            streak = streak + 1 if streak > 0 else 1
+            bankroll.longest_win_streak = max(bankroll.longest_win_streak or 0, streak)
+        elif bet.status == BetStatus.LOST:
+            streak = streak - 1 if streak < 0 else -1
+            bankroll.longest_loss_streak = max(bankroll.longest_loss_streak or 0, -streak)
+        bankroll.current_streak = streak
+
+        return {
+            "user_id": bankroll.user_id,
+            "bet_id": bet.bet_id,
+            "recorded_at": bet.settled_at,
+            "equity": equity,
+            "drawdown": drawdown
+        }
+
+    def apply_many(self, bankroll: Bankroll, bets: Iterable[SettledBet]) -> List[Dict[str, Any]]:
+        """Fold bets into the bankroll in settlement order."""
+        return [self.apply(bankroll, bet) for bet in bets]
+
+    def summary(self, bankroll: Bankroll) -> Dict[str, Any]:
+        """Analytics fields for API responses."""
+        return {
+            "equity": bankroll.equity if bankroll.equity is not None else bankroll.initial_deposit,
+            "peak_equity": bankroll.peak_equity if bankroll.peak_equity is not None else bankroll.initial_deposit,
+            "current_drawdown": round(bankroll.current_drawdown or 0.0, 2),
+            "max_drawdown": round(bankroll.max_drawdown or 0.0, 2),
+            "sharpe_ratio": round(bankroll.sharpe_ratio, 4) if bankroll.sharpe_ratio is not None else None,
+            "settled_bets": bankroll.returns_count or 0,
+            "current_streak": bankroll.current_streak or 0,
+            "longest_win_streak": bankroll.longest_win_streak or 0,
+            "longest_loss_streak": bankroll.longest_loss_streak or 0
+        }
+
+    async def get_equity_curve(self, user_id: str, since: Optional[datetime] = None,
+                               limit: int = 1000) -> List[Dict[str, Any]]:
+        """Most recent equity curve points, oldest first."""
+        query = select(BankrollEquityPoint).where(BankrollEquityPoint.user_id == user_id)
+        if since:
+            query = query.where(BankrollEquityPoint.recorded_at >= since)
+        query = query.order_by(BankrollEquityPoint.recorded_at.desc(), BankrollEquityPoint.id.desc()).limit(limit)
+
+        async with AsyncSessionLocal() as session:
+            points = (await session.execute(query)).scalars().all()
+
+        return [
+            {"recorded_at": p.recorded_at.isoformat(), "equity": p.equity, "drawdown": p.drawdown, "bet_id": p.bet_id}
+            for p in reversed(points)
+        ]
+
+    async def backfill(self, user_ids: Optional[List[str]] = None) -> int:
+        """
+        Recompute analytics and equity curves from settled bet history.
+
+        Each user's bets are replayed as arrays (cumulative profit, running
+        peak, run-length streaks), which gives the same state the incremental
+        path would have reached.
+
+        Args:
+            user_ids: Users to rebuild (None = every bankroll)
+
+        Returns:
+            Number of bankrolls rebuilt
+        """
+        async with AsyncSessionLocal() as session:
+            query = select(Bankroll)
+            if user_ids is not None:
+                query = query.where(Bankroll.user_id.in_(user_ids))
+            bankrolls = (await session.execute(query)).scalars().all()
+            if not bankrolls:
+                return 0
+
+            points = await self.rebuild(session, bankrolls)
+            await session.commit()
+
+        logger.info(f"📊 Rebuilt analytics for {len(bankrolls)} bankrolls ({len(points)} equity points)")
+        return len(bankrolls)
+
+    async def rebuild(self, session: AsyncSession, bankrolls: List[Bankroll]) -> List[Dict[str, Any]]:
+        """
+        Replace the bankrolls' analytics and equity curves with ones replayed from their settled bets.
+
+        Runs inside the caller's session and leaves the commit to it, so a
+        corrected settlement and its rebuilt analytics land together.
+
+        Returns:
+            The equity points written
+        """
+        user_ids = [b.user_id for b in bankrolls]
+        # Status may be stored as enum name or value, so compare lowercased text
+        status = func.lower(cast(Bet.status, String))
+        rows = (await session.execute(
+            select(Bet.user_id, Bet.id, Bet.amount, Bet.payout, status, Bet.settled_at)
+            .where(Bet.user_id.in_(user_ids))
+            .where(status.in_(["won", "lost", "pushed"]))
+            .order_by(Bet.user_id, Bet.settled_at, Bet.id)
+        )).all()
+        history: Dict[str, List[Any]] = {}
+        for row in rows:
+            history.setdefault(row[0], []).append(row)
+
+        points: List[Dict[str, Any]] = []
+        for bankroll in bankrolls:
+            points.extend(self._rebuild(bankroll, history.get(bankroll.user_id, [])))
+
+        await session.execute(delete(BankrollEquityPoint).where(BankrollEquityPoint.user_id.in_(user_ids)))
+        for start in range(0, len(points), BACKFILL_INSERT_BATCH_SIZE):
+            await session.execute(insert(BankrollEquityPoint), points[start:start + BACKFILL_INSERT_BATCH_SIZE])
+        return points
+
+    def _rebuild(self, bankroll: Bankroll, rows: List[Any]) -> List[Dict[str, Any]]:
+        """Reset one bankroll's analytics from its settled bets, in order."""
+        initial = bankroll.initial_deposit or 0.0
+        bankroll.equity = bankroll.peak_equity = initial
+        bankroll.current_drawdown = bankroll.max_drawdown = 0.0
+        bankroll.returns_count, bankroll.returns_mean, bankroll.returns_m2 = 0, 0.0, 0.0
+        bankroll.sharpe_ratio = None
+        bankroll.current_streak = bankroll.longest_win_streak = bankroll.longest_loss_streak = 0
+        if not rows:
+            return []
+
+        amount = np.array([r[2] or 0.0 for r in rows], dtype=float)
+        payout = np.array([r[3] or 0.0 for r in rows], dtype=float)
+        status = np.array([r[4] for r in rows])
+        won, lost = status == "won", status == "lost"
+
+        profit = np.where(won, payout - amount, np.where(lost, -amount, 0.0))
+        equity = initial + np.cumsum(profit)
+        peak = np.maximum.accumulate(np.concatenate(([initial], equity)))[1:]
+        drawdown = np.where(peak > 0, (peak - equity) / np.where(peak > 0, peak, 1) * 100, 0.0)
+
+        staked = amount > 0
+        returns = profit[staked] / amount[staked]
+        if returns.size:
+            mean = float(returns.mean())
+            m2 = float(((returns - mean) ** 2).sum())
+            bankroll.returns_count, bankroll.returns_mean, bankroll.returns_m2 = int(returns.size), mean, m2
+            bankroll.sharpe_ratio = _sharpe(int(returns.size), mean, m2)
+
+        # Streaks: run lengths over the win/loss sequence with pushes removed
+        signs = np.where(won, 1, np.where(lost, -1, 0))
+        signs = signs[signs != 0]
+        if signs.size:
+            run_starts = np.flatnonzero(np.concatenate(([True], signs[1:] != signs[:-1])))
+            run_lengths = np.diff(np.append(run_starts, signs.size))
+            run_signs = signs[run_starts]
+            bankroll.longest_win_streak = int(run_lengths[run_signs > 0].max(initial=0))
+            bankroll.longest_loss_streak = int(run_lengths[run_signs < 0].max(initial=0))
+            bankroll.current_streak = int(run_lengths[-1] * run_signs[-1])
+
+        bankroll.equity = float(equity[-1])
+        bankroll.peak_equity = float(peak[-1])
+        bankroll.current_drawdown = float(drawdown[-1])
+        bankroll.max_drawdown = float(drawdown.max())
+
+        return [
+            {"user_id": bankroll.user_id, "bet_id": row[1], "recorded_at": row[5] or datetime.utcnow(),
+             "equity": float(e), "drawdown": float(d)}
+            for row, e, d in zip(rows, equity, drawdown)
+        ]
+
+
+# Global analytics instance
+bankroll_analytics = BankrollAnalytics()
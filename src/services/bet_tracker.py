@@ -5,17 +5,29 @@ Track all bets in real-time and calculate performance metrics.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
 import uuid
-from sqlalchemy import select, and_, func
+from sqlalchemy import String, select, update, insert, and_, case, cast, func, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models.bet import Bet, Bankroll, DailyPerformance, BetStatus, BetType
+from src.db.models.bet import (
+    Bet, Bankroll, BankrollEquityPoint, DailyPerformance, BetPerformanceRollup, BetStatus, BetType
+)
 from src.db.database import AsyncSessionLocal
+from src.services.bankroll_analytics import SettledBet, bankroll_analytics
 
 logger = logging.getLogger(__name__)
 
+# (user_id, sport, bet_type, day) -> counter deltas
+RollupKey = Tuple[str, str, str, date]
+ROLLUP_COUNTERS = (
+    "bets_placed", "bets_settled", "bets_won", "bets_lost", "bets_pushed",
+    "amount_wagered", "amount_won", "amount_lost"
+)
+# Bets claimed per UPDATE; each bet binds ~7 parameters and asyncpg caps a statement at 32767
+CLAIM_CHUNK_SIZE = 1000
+
 
 class BetTracker:
     """
@@ -24,7 +36,7 @@ class BetTracker:
     Features:
     - Record all bets placed
     - Update bet status automatically
-    - Calculate ROI metrics
+    - Calculate ROI metrics from per-day rollups
     - Track daily/weekly/monthly performance
     """
     
@@ -47,6 +59,7 @@ class BetTracker:
         """
         async with AsyncSessionLocal() as session:
             bet_id = str(uuid.uuid4())
+            placed_at = datetime.utcnow()  # Set here so the bet and its rollup agree on the day
             
             # Parse game_date if provided as string or datetime
             game_date = bet_data.get("game_date")
@@ -75,13 +88,17 @@ class BetTracker:
                 predicted_probability=bet_data.get("predicted_probability"),
                 predicted_edge=bet_data.get("predicted_edge"),
                 model_confidence=bet_data.get("model_confidence"),
-                status=BetStatus.PENDING
+                status=BetStatus.PENDING,
+                placed_at=placed_at
             )
             
             session.add(bet)
             
-            # Update bankroll
+            # Update bankroll and ROI rollup
             await self._update_bankroll_on_bet(session, user_id, bet_data["amount"])
+            await self._record_placement(
+                session, user_id, bet_data["sport"], bet_data["bet_type"], bet_data["amount"], placed_at
+            )
             
             await session.commit()
             
@@ -116,6 +133,7 @@ class BetTracker:
                 logger.error(f"Bet {bet_id} not found")
                 return False
             
+            previous = (bet.status, bet.payout)
             bet.status = status
             bet.settled_at = datetime.utcnow()
             
@@ -135,17 +153,170 @@ class BetTracker:
                 bet.payout = bet.amount
                 bet.roi = 0.0
             
-            # Update bankroll
+            # Update bankroll (a corrected outcome replaces the previous one)
             await self._update_bankroll_on_settlement(
-                session, bet.user_id, bet.amount, bet.payout, status
+                session, bet.user_id, bet.amount, bet.payout, status, bet_id=bet.id, settled_at=bet.settled_at,
+                previous=previous if previous[0] not in (None, BetStatus.PENDING) else None
             )
             
+            # Move the bet's rollup counters to the new outcome
+            key = self._rollup_key(bet.user_id, bet.sport, bet.bet_type, bet.placed_at)
+            delta = self._settlement_delta(status, bet.amount, bet.payout)
+            if previous[0] not in (None, BetStatus.PENDING):
+                for column, value in self._settlement_delta(previous[0], bet.amount, previous[1]).items():
+                    delta[column] = delta.get(column, 0) - value
+            await self._apply_rollup_deltas(session, {key: delta})
+            
             await session.commit()
             
             logger.info(f"📊 Bet {bet_id} settled: {status.value} | ROI: {bet.roi}%")
             
             return True
     
+    async def settle_bets(self, settlements: List[Dict[str, Any]]) -> int:
+        """
+        Settle many bets in a single transaction.
+        
+        Bet rows are updated in chunked statements that only match bets still
+        pending, and each user's bankroll receives one aggregated update built
+        from the rows that statement changed, instead of a session per bet.
+        ROI rollups are updated in the same transaction. Bets that are missing
+        or already settled (e.g. by an overlapping run) are skipped.
+        
+        Args:
+            settlements: Dicts with id, amount, odds and status (won, lost, pushed)
+        
+        Returns:
+            Number of bets settled
+        """
+        if not settlements:
+            return 0
+        
+        settled_at = datetime.utcnow()
+        outcomes: Dict[str, Tuple[BetStatus, float, float, float]] = {}
+        for settlement in settlements:
+            status = settlement["status"]
+            amount = settlement["amount"]
+            
+            # Calculate payout and ROI
+            if status == BetStatus.WON:
+                payout = self._calculate_payout(amount, settlement["odds"])
+                roi = ((payout - amount) / amount) * 100
+            elif status == BetStatus.LOST:
+                payout = 0
+                roi = -100.0
+            else:
+                payout = amount
+                roi = 0.0
+            outcomes[settlement["id"]] = (status, amount, payout, roi)
+        
+        totals_by_user: Dict[str, Dict[str, float]] = {}
+        settled_by_user: Dict[str, List[SettledBet]] = {}
+        rollup_deltas: Dict[RollupKey, Dict[str, float]] = {}
+        
+        async with AsyncSessionLocal() as session:
+            # Only bets still pending are claimed, so overlapping runs never settle a bet twice
+            claimed = await self._claim_pending_bets(session, outcomes, settled_at)
+            skipped = [bet_id for bet_id in outcomes if bet_id not in claimed]
+            if skipped:
+                logger.warning(f"⚠️ Skipping {len(skipped)} settlement(s) for bets that are missing or already settled")
+            if not claimed:
+                return 0
+            
+            # Deltas come only from the rows this run actually changed
+            for bet_id, (status, amount, payout, _) in outcomes.items():
+                row = claimed.get(bet_id)
+                if row is None:
+                    continue
+                
+                totals = totals_by_user.setdefault(row.user_id, {
+                    "count": 0, "amount": 0.0, "won_payout": 0.0, "lost_amount": 0.0, "pushed_amount": 0.0
+                })
+                totals["count"] += 1
+                totals["amount"] += amount
+                if status == BetStatus.WON:
+                    totals["won_payout"] += payout
+                elif status == BetStatus.LOST:
+                    totals["lost_amount"] += amount
+                elif status == BetStatus.PUSHED:
+                    totals["pushed_amount"] += amount
+                if status != BetStatus.CANCELLED:
+                    settled_by_user.setdefault(row.user_id, []).append(
+                        SettledBet(bet_id, amount, payout, status, settled_at)
+                    )
+                
+                key = self._rollup_key(row.user_id, row.sport, row.bet_type, row.placed_at)
+                delta = rollup_deltas.setdefault(key, {})
+                for column, value in self._settlement_delta(status, amount, payout).items():
+                    delta[column] = delta.get(column, 0) + value
+            
+            result = await session.execute(
+                select(Bankroll).where(Bankroll.user_id.in_(list(totals_by_user)))
+            )
+            equity_points = []
+            for bankroll in result.scalars().all():
+                totals = totals_by_user[bankroll.user_id]
+                self._apply_settlement_totals(
+                    bankroll,
+                    int(totals["count"]),
+                    totals["amount"],
+                    totals["won_payout"],
+                    totals["lost_amount"],
+                    totals["pushed_amount"]
+                )
+                equity_points.extend(bankroll_analytics.apply_many(bankroll, settled_by_user.get(bankroll.user_id, [])))
+            
+            if equity_points:
+                await session.execute(insert(BankrollEquityPoint), equity_points)
+            await self._apply_rollup_deltas(session, rollup_deltas)
+            await session.commit()
+        
+        logger.info(f"📊 Settled {len(claimed)} bets for {len(totals_by_user)} users")
+        return len(claimed)
+    
+    async def _claim_pending_bets(
+        self,
+        session: AsyncSession,
+        outcomes: Dict[str, Tuple[BetStatus, float, float, float]],
+        settled_at: datetime
+    ) -> Dict[str, Any]:
+        """
+        Settle the given bets that are still pending, CLAIM_CHUNK_SIZE bets per UPDATE.
+        
+        All chunks run in the caller's transaction, so a run still commits or
+        rolls back as a whole.
+        
+        Returns:
+            Bet id -> (id, user_id, sport, bet_type, placed_at) row for each bet this call changed
+        """
+        columns = (Bet.id, Bet.user_id, Bet.sport, Bet.bet_type, Bet.placed_at)
+        ids = list(outcomes)
+        claimed: Dict[str, Any] = {}
+        for start in range(0, len(ids), CLAIM_CHUNK_SIZE):
+            chunk = {i: outcomes[i] for i in ids[start:start + CLAIM_CHUNK_SIZE]}
+            # Legacy rows may carry lowercase enum values, so compare case-insensitively
+            pending = and_(Bet.id.in_(list(chunk)), func.lower(cast(Bet.status, String)) == BetStatus.PENDING.value)
+            stmt = (
+                update(Bet)
+                .where(pending)
+                .values(
+                    status=case({i: literal(o[0], Bet.status.type) for i, o in chunk.items()}, value=Bet.id),
+                    payout=case({i: o[2] for i, o in chunk.items()}, value=Bet.id),
+                    roi=case({i: o[3] for i, o in chunk.items()}, value=Bet.id),
+                    settled_at=settled_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+            
+            if session.bind.dialect.update_returning:
+                rows = (await session.execute(stmt.returning(*columns))).all()
+            else:
+                # Lock the pending rows first so a concurrent run cannot claim them between the read and the write
+                rows = (await session.execute(select(*columns).where(pending).with_for_update())).all()
+                await session.execute(stmt)
+            claimed.update((row.id, row) for row in rows)
+        return claimed
+    
     async def get_active_bets(self, user_id: str) -> List[Dict]:
         """Get all active (pending) bets."""
         async with AsyncSessionLocal() as session:
@@ -185,59 +356,57 @@ class BetTracker:
         """
         Calculate ROI and performance metrics.
         
+        Sums the user's per-day rollup rows in one aggregate query instead of
+        loading every bet.
+        
         Args:
             user_id: User ID
-            days: Optional days to look back (None = all time)
+            days: Optional number of UTC calendar days to look back, including
+                today (None = all time)
         
         Returns:
             ROI metrics dict
         """
+        rollup = BetPerformanceRollup
+        query = select(*(func.coalesce(func.sum(getattr(rollup, column)), 0) for column in ROLLUP_COUNTERS))
+        query = query.where(rollup.user_id == user_id)
+        if days:
+            query = query.where(rollup.day > datetime.utcnow().date() - timedelta(days=days))
+        
         async with AsyncSessionLocal() as session:
-            query = select(Bet).where(Bet.user_id == user_id)
-            
-            if days:
-                since = datetime.utcnow() - timedelta(days=days)
-                query = query.where(Bet.placed_at >= since)
-            
-            result = await session.execute(query)
-            bets = result.scalars().all()
-            
-            if not bets:
-                return {
-                    "total_bets": 0,
-                    "total_wagered": 0.0,
-                    "total_won": 0.0,
-                    "net_profit": 0.0,
-                    "roi_percentage": 0.0,
-                    "win_rate": 0.0
-                }
-            
-            total_wagered = sum(bet.amount for bet in bets)
-            settled_bets = [b for b in bets if b.status != BetStatus.PENDING]
-            
-            wins = [b for b in settled_bets if b.status == BetStatus.WON]
-            losses = [b for b in settled_bets if b.status == BetStatus.LOST]
-            
-            total_won = sum(bet.payout for bet in wins if bet.payout)
-            total_lost = sum(bet.amount for bet in losses)
-            
-            net_profit = total_won - total_wagered
-            roi_percentage = (net_profit / total_wagered * 100) if total_wagered > 0 else 0.0
-            win_rate = (len(wins) / len(settled_bets) * 100) if settled_bets else 0.0
-            
+            totals = dict(zip(ROLLUP_COUNTERS, (await session.execute(query)).one()))
+        
+        if not totals["bets_placed"]:
             return {
-                "total_bets": len(bets),
-                "settled_bets": len(settled_bets),
-                "total_wagered": round(total_wagered, 2),
-                "total_won": round(total_won, 2),
-                "total_lost": round(total_lost, 2),
-                "net_profit": round(net_profit, 2),
-                "roi_percentage": round(roi_percentage, 2),
-                "win_rate": round(win_rate, 2),
-                "wins": len(wins),
-                "losses": len(losses),
-                "pushes": len([b for b in settled_bets if b.status == BetStatus.PUSHED])
+                "total_bets": 0,
+                "total_wagered": 0.0,
+                "total_won": 0.0,
+                "net_profit": 0.0,
+                "roi_percentage": 0.0,
+                "win_rate": 0.0
             }
+        
+        total_wagered = totals["amount_wagered"]
+        total_won = totals["amount_won"]
+        settled = totals["bets_settled"]
+        
+        net_profit = total_won - total_wagered
+        roi_percentage = (net_profit / total_wagered * 100) if total_wagered > 0 else 0.0
+        win_rate = (totals["bets_won"] / settled * 100) if settled else 0.0
+        
+        return {
+            "total_bets": int(totals["bets_placed"]),
+            "settled_bets": int(settled),
+            "total_wagered": round(total_wagered, 2),
+            "total_won": round(total_won, 2),
+            "total_lost": round(totals["amount_lost"], 2),
+            "net_profit": round(net_profit, 2),
+            "roi_percentage": round(roi_percentage, 2),
+            "win_rate": round(win_rate, 2),
+            "wins": int(totals["bets_won"]),
+            "losses": int(totals["bets_lost"]),
+            "pushes": int(totals["bets_pushed"])
+        }
     
     async def get_bankroll(self, user_id: str) -> Optional[Dict]:
         """Get current bankroll status."""
@@ -260,7 +429,8 @@ class BetTracker:
                 "win_rate": bankroll.win_rate,
                 "active_bets_count": bankroll.active_bets_count,
                 "active_bets_amount": bankroll.active_bets_amount,
-                "available_balance": bankroll.available_balance
+                "available_balance": bankroll.available_balance,
+                "analytics": bankroll_analytics.summary(bankroll)
             }
     
     def _calculate_payout(self, amount: float, american_odds: float) -> float:
@@ -295,30 +465,149 @@ class BetTracker:
         user_id: str,
         amount: float,
         payout: float,
-        status: BetStatus
+        status: BetStatus,
+        bet_id: Optional[str] = None,
+        settled_at: Optional[datetime] = None,
+        previous: Optional[Tuple[BetStatus, Optional[float]]] = None
     ):
-        """Update bankroll when bet settles."""
+        """
+        Update bankroll, its analytics and equity curve when a bet settles.
+        
+        previous is the (status, payout) of a bet that was already settled:
+        its totals are reversed first, and the analytics are rebuilt from
+        history because the running statistics cannot be unwound.
+        """
         result = await session.execute(
             select(Bankroll).where(Bankroll.user_id == user_id)
         )
         bankroll = result.scalar_one_or_none()
         
         if bankroll:
-            bankroll.active_bets_count -= 1
-            bankroll.active_bets_amount -= amount
-            
-            if status == BetStatus.WON:
-                bankroll.current_balance += payout
-                bankroll.available_balance += payout
-                bankroll.total_won += payout
-            elif status == BetStatus.LOST:
-                bankroll.total_lost += amount
-            elif status == BetStatus.PUSHED:
-                bankroll.available_balance += amount
+            if previous:
+                old_status, old_payout = previous
+                self._apply_settlement_totals(
+                    bankroll,
+                    settled_count=-1,
+                    settled_amount=-amount,
+                    won_payout=-(old_payout or 0.0) if old_status == BetStatus.WON else 0.0,
+                    lost_amount=-amount if old_status == BetStatus.LOST else 0.0,
+                    pushed_amount=-amount if old_status == BetStatus.PUSHED else 0.0
+                )
+            self._apply_settlement_totals(
+                bankroll,
+                settled_count=1,
+                settled_amount=amount,
+                won_payout=payout if status == BetStatus.WON else 0.0,
+                lost_amount=amount if status == BetStatus.LOST else 0.0,
+                pushed_amount=amount if status == BetStatus.PUSHED else 0.0
+            )
+            if previous:
+                await bankroll_analytics.rebuild(session, [bankroll])
+            elif status != BetStatus.CANCELLED:
+                # A cancelled bet has no return, so like the rebuild it leaves analytics and the curve alone
+                point = bankroll_analytics.apply(
+                    bankroll, SettledBet(bet_id, amount, payout, status, settled_at or datetime.utcnow())
+                )
+                session.add(BankrollEquityPoint(**point))
+    
+    def _apply_settlement_totals(
+        self,
+        bankroll: Bankroll,
+        settled_count: int,
+        settled_amount: float,
+        won_payout: float,
+        lost_amount: float,
+        pushed_amount: float
+    ):
+        """Apply the combined effect of one or more settled bets to a bankroll."""
+        bankroll.active_bets_count -= settled_count
+        bankroll.active_bets_amount -= settled_amount
+        
+        bankroll.current_balance += won_payout
+        bankroll.available_balance += won_payout + pushed_amount
+        bankroll.total_won += won_payout
+        bankroll.total_lost += lost_amount
+        
+        # Recalculate ROI
+        net = bankroll.total_won - (bankroll.total_wagered - bankroll.active_bets_amount)
+        bankroll.roi_percentage = (net / bankroll.initial_deposit * 100) if bankroll.initial_deposit > 0 else 0
+    
+    @staticmethod
+    def _rollup_key(user_id: str, sport: str, bet_type: Any, placed_at: Optional[datetime]) -> RollupKey:
+        """Rollup row a bet belongs to: its user, sport, bet type value and UTC placement day."""
+        if isinstance(bet_type, BetType):
+            bet_type = bet_type.value
+        day = placed_at.date() if placed_at else datetime.utcnow().date()
+        return (user_id, sport, str(bet_type).lower(), day)
+    
+    @staticmethod
+    def _settlement_delta(status: BetStatus, amount: float, payout: Optional[float]) -> Dict[str, float]:
+        """Rollup counter changes for one bet reaching status; a cancelled bet is never settled."""
+        if status in (BetStatus.PENDING, BetStatus.CANCELLED):
+            return {}
+        delta = {"bets_settled": 1}
+        if status == BetStatus.WON:
+            delta.update(bets_won=1, amount_won=payout or 0.0)
+        elif status == BetStatus.LOST:
+            delta.update(bets_lost=1, amount_lost=amount)
+        elif status == BetStatus.PUSHED:
+            delta["bets_pushed"] = 1
+        return delta
+    
+    async def _record_placement(
+        self,
+        session: AsyncSession,
+        user_id: str,
+        sport: str,
+        bet_type: Any,
+        amount: float,
+        placed_at: Optional[datetime] = None
+    ):
+        """Count a newly placed bet in its placement day's rollup row."""
+        key = self._rollup_key(user_id, sport, bet_type, placed_at)
+        await self._apply_rollup_deltas(session, {key: {"bets_placed": 1, "amount_wagered": amount}})
+    
+    async def _apply_rollup_deltas(self, session: AsyncSession, deltas: Dict[RollupKey, Dict[str, float]]):
+        """
+        Add counter deltas to rollup rows, creating missing rows.
+        
+        Uses one multi-row INSERT ... ON CONFLICT DO UPDATE on PostgreSQL and
+        SQLite (rows sorted by key so concurrent writers lock in the same
+        order); other dialects fall back to read-modify-write.
+        """
+        if not deltas:
+            return
+        
+        rows = [
+            {"user_id": key[0], "sport": key[1], "bet_type": key[2], "day": key[3],
+             **{column: delta.get(column, 0) for column in ROLLUP_COUNTERS}}
+            for key, delta in sorted(deltas.items())
+        ]
+        
+        dialect = session.bind.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
             
-            # Recalculate ROI
-            net = bankroll.total_won - (bankroll.total_wagered - bankroll.active_bets_amount)
-            bankroll.roi_percentage = (net / bankroll.initial_deposit * 100) if bankroll.initial_deposit > 0 else 0
+            rollup = BetPerformanceRollup.__table__
+            stmt = insert(rollup).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "sport", "bet_type", "day"],
+                set_={column: rollup.c[column] + stmt.excluded[column] for column in ROLLUP_COUNTERS}
+            )
+            await session.execute(stmt)
+            return
+        
+        for row in rows:
+            key = (row["user_id"], row["sport"], row["bet_type"], row["day"])
+            existing = await session.get(BetPerformanceRollup, key)
+            if existing is None:
+                session.add(BetPerformanceRollup(**row))
+            else:
+                for column in ROLLUP_COUNTERS:
+                    setattr(existing, column, getattr(existing, column) + row[column])
     
     def _bet_to_dict(self, bet: Bet) -> Dict:
         """Convert Bet model to dict."""
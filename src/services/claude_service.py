@@ -12,6 +12,7 @@ from typing import Dict, Any, Optional
 import httpx
 
 from src.config import settings
+from src.services.profiling import span
 
 logger = logging.getLogger(__name__)
 
@@ -211,7 +212,7 @@ class ClaudeService:
             ]
         }
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient() as client, span("llm", "claude"):
             response = await client.post(
                 self.base_url,
                 headers=headers,
@@ -3,18 +3,66 @@ Feature Flag Service for MultiSportsBettingPlatform
 ==================================================
 Provides runtime feature toggles for enabling/disabling features,
 A/B testing, and client-specific customization.
+
+Flag definitions are held in a per-process snapshot loaded with one
+pipelined read, so checks never touch Redis in steady state. Writes publish
+an invalidation message and every replica reloads its snapshot.
 """
 
+import asyncio
+import json
 import logging
-from typing import Dict, Any, Optional
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, FrozenSet, Optional, Set, Tuple
 import redis.asyncio as redis
 from src.config import settings
+from src.services.invalidation_listener import InvalidationListener
 
 logger = logging.getLogger(__name__)
 
+ROLLOUT_BUCKETS = 10000  # Rollout percentages resolve to 0.01%
+
+# Remove one override and drop the user from the override index once their
+# hash is empty, atomically so a concurrent set_user_flag is never un-indexed.
+DELETE_USER_FLAG_SCRIPT = """
+redis.call('HDEL', KEYS[1], ARGV[1])
+if redis.call('HLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class FlagSnapshot:
+    """Immutable view of every flag definition, swapped atomically on reload."""
+    global_flags: Dict[str, bool] = field(default_factory=dict)
+    # flag -> (hash seed, enabled buckets out of ROLLOUT_BUCKETS)
+    rollouts: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    override_users: FrozenSet[str] = frozenset()
+    loaded_at: float = 0.0
+
+
+def rollout_bucket(seed: int, user_id: str) -> int:
+    """Stable bucket in [0, ROLLOUT_BUCKETS) for a user under a flag's seed."""
+    return zlib.crc32(user_id.encode(), seed) % ROLLOUT_BUCKETS
+
 
 class FeatureFlagService:
-    """Service for managing feature flags with Redis backend."""
+    """
+    Service for managing feature flags with Redis backend.
+    
+    Features:
+    - Per-process snapshot of global flags and rollouts (one pipelined load)
+    - Cross-instance invalidation over Redis pub/sub on every write
+    - Percentage rollouts on a stable CRC32 hash of (flag, user)
+    - User overrides, fetched only for users that have any (LRU cached)
+    - Defaults served when Redis is unavailable
+    """
     
     # Default feature flags
     DEFAULT_FLAGS = {
@@ -28,31 +76,216 @@ class FeatureFlagService:
         "push_notifications": False,
     }
     
-    def __init__(self, redis_url: str = None):
-        """Initialize the feature flag service."""
+    GLOBAL_KEY = "flags:global"
+    ROLLOUT_KEY = "flags:rollout"
+    OVERRIDE_USERS_KEY = "flags:override_users"
+    USER_KEY_PREFIX = "flags:user:"
+    LEGACY_GLOBAL_PREFIX = "flags:global:"
+    SCHEMA_KEY = "flags:schema"
+    INVALIDATION_CHANNEL = "flags:invalidate"
+    
+    def __init__(self, redis_url: str = None, refresh_interval: float = None, user_cache_size: int = None):
+        """Initialize the feature flag service; Redis is connected on first use."""
         self.redis_url = redis_url or settings.redis_url
-        self.redis_client = None
-        self.cache: Dict[str, bool] = {}
-        self.cache_ttl = 60  # Cache flags for 60 seconds
-        self.last_cache_update = 0
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else settings.feature_flags_refresh_seconds
+        )
+        self.user_cache_size = user_cache_size or settings.feature_flags_user_cache_size
+        self.instance_id = str(uuid.uuid4())
+        self._invalidations = InvalidationListener(
+            "Feature flags", self.INVALIDATION_CHANNEL, self.instance_id,
+            on_event=self._on_invalidation, on_error=self._on_listener_error
+        )
+        
+        self._snapshot = FlagSnapshot()
+        self._loaded = False
+        # user_id -> (fetched_at, overrides), least recently used first; entries expire like the snapshot
+        self._user_cache: "OrderedDict[str, Tuple[float, Dict[str, bool]]]" = OrderedDict()
+        self._generation = 0
+        self._refresh_task: Optional[asyncio.Task] = None
         logger.info("✅ FeatureFlagService initialized")
     
+    @property
+    def redis_client(self):
+        return self._invalidations.client
+    
     async def _get_redis(self):
-        """Lazy-initialize async Redis connection."""
-        if self.redis_client is None:
-            try:
-                self.redis_client = await redis.from_url(self.redis_url, decode_responses=True)
-                await self.redis_client.ping()
-                logger.info("✅ Feature flags: Redis connection established")
-            except Exception as e:
-                logger.warning(f"⚠️ Feature flags: Redis connection failed: {e}")
-                self.redis_client = False  # Mark as failed
-        return self.redis_client if self.redis_client is not False else None
+        """Lazy-initialize async Redis connection and the invalidation listener."""
+        return await self._invalidations.connect(lambda: redis.from_url(self.redis_url, decode_responses=True))
+    
+    async def load(self) -> bool:
+        """
+        Load every flag definition in one pipelined read and swap the snapshot.
+        
+        Returns:
+            True if the snapshot came from Redis, False if defaults are in use
+        """
+        redis_client = await self._get_redis()
+        self._loaded = True
+        if not redis_client:
+            return False
+        
+        try:
+            generation = self._generation
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self.GLOBAL_KEY)
+                pipe.hgetall(self.ROLLOUT_KEY)
+                pipe.smembers(self.OVERRIDE_USERS_KEY)
+                pipe.get(self.SCHEMA_KEY)
+                global_flags, rollouts, override_users, schema = await pipe.execute()
+            
+            if schema is None:
+                global_flags, legacy_users = await self._import_legacy_flags(redis_client, global_flags)
+                override_users = set(override_users) | legacy_users
+            
+            self._snapshot = FlagSnapshot(
+                global_flags={name: value.lower() == "true" for name, value in global_flags.items()},
+                rollouts={
+                    name: (zlib.crc32(name.encode()), round(float(percentage) * ROLLOUT_BUCKETS / 100))
+                    for name, percentage in rollouts.items()
+                },
+                override_users=frozenset(override_users),
+                loaded_at=time.monotonic()
+            )
+            # Overrides cached before an invalidation that raced this load may be stale
+            if generation != self._generation:
+                self._user_cache.clear()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to load feature flags: {e}")
+            return False
+    
+    async def _import_legacy_flags(self, redis_client,
+                                   global_flags: Dict[str, str]) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        One-time move of per-key global flags (flags:global:<name>) into the flags hash.
+        
+        Users with an existing flags:user:<id> hash are added to the override
+        index, since check() only reads overrides for indexed users.
+        
+        Returns:
+            (merged global flags, users with overrides)
+        """
+        legacy: Dict[str, str] = {}
+        async for key in redis_client.scan_iter(match=f"{self.LEGACY_GLOBAL_PREFIX}*", count=500):
+            value = await redis_client.get(key)
+            if value is not None:
+                legacy[key[len(self.LEGACY_GLOBAL_PREFIX):]] = value
+        override_users = {
+            key[len(self.USER_KEY_PREFIX):]
+            async for key in redis_client.scan_iter(match=f"{self.USER_KEY_PREFIX}*", count=500)
+        }
+        
+        merged = {**legacy, **global_flags}
+        async with redis_client.pipeline(transaction=True) as pipe:
+            if merged:
+                pipe.hset(self.GLOBAL_KEY, mapping=merged)
+            if override_users:
+                pipe.sadd(self.OVERRIDE_USERS_KEY, *override_users)
+            pipe.set(self.SCHEMA_KEY, "1")
+            await pipe.execute()
+        if legacy:
+            logger.info(f"✅ Imported {len(legacy)} legacy global flags")
+        if override_users:
+            logger.info(f"✅ Indexed {len(override_users)} users with flag overrides")
+        return merged, override_users
+    
+    async def _on_invalidation(self, event: Dict[str, Any]):
+        """Reload the snapshot when another instance writes a flag."""
+        self._invalidate_user(event.get("user_id"))
+        await self.load()
+    
+    def _on_listener_error(self, error: Exception):
+        # Updates may have been missed; force a reload on the next check
+        self._snapshot = replace(self._snapshot, loaded_at=0.0)
+    
+    async def _publish_invalidation(self, redis_client, user_id: Optional[str] = None):
+        try:
+            await redis_client.publish(
+                self.INVALIDATION_CHANNEL, json.dumps({"instance_id": self.instance_id, "user_id": user_id})
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish feature flag invalidation: {e}")
+    
+    def _invalidate_user(self, user_id: Optional[str]):
+        self._generation += 1
+        if user_id:
+            self._user_cache.pop(user_id, None)
+    
+    async def close(self):
+        """Stop the invalidation listener and close the Redis connection."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.wait([self._refresh_task], timeout=2.0)
+            self._refresh_task = None
+        await self._invalidations.close()
+        self._loaded = False
+        self._snapshot = FlagSnapshot()
+        self._user_cache.clear()
+    
+    async def _ensure_fresh(self, user_id: Optional[str] = None):
+        """Load on first use, refresh a stale snapshot in the background, fetch a user's stale overrides."""
+        if not self._loaded:
+            await self.load()
+        elif (self.refresh_interval and self.redis_client
+              and time.monotonic() - self._snapshot.loaded_at > self.refresh_interval
+              and (self._refresh_task is None or self._refresh_task.done())):
+            # Safety net for missed invalidations; checks keep using the current snapshot
+            self._refresh_task = asyncio.create_task(self.load())
+        
+        if user_id is not None and user_id in self._snapshot.override_users:
+            cached = self._user_cache.get(user_id)
+            # Safety net for a missed invalidation, same as the snapshot; a failed fetch keeps the old entry
+            if cached is None or (self.refresh_interval
+                                  and time.monotonic() - cached[0] > self.refresh_interval):
+                await self._load_user_overrides(user_id)
+    
+    async def _load_user_overrides(self, user_id: str):
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return
+        try:
+            generation = self._generation
+            values = await redis_client.hgetall(f"{self.USER_KEY_PREFIX}{user_id}")
+            if generation != self._generation:
+                return
+            self._user_cache[user_id] = (
+                time.monotonic(), {name: value.lower() == "true" for name, value in values.items()}
+            )
+            self._user_cache.move_to_end(user_id)
+            while len(self._user_cache) > self.user_cache_size:
+                self._user_cache.popitem(last=False)
+        except Exception as e:
+            logger.error(f"❌ Failed to get user flags: {e}")
+    
+    def check(self, flag: str, user_id: Optional[str] = None, default: Optional[bool] = None) -> bool:
+        """
+        Evaluate a flag against the local snapshot without any I/O.
+        
+        Same rules as is_enabled(); a user's overrides are only seen once
+        is_enabled() or evaluate_all() has fetched them.
+        """
+        snapshot = self._snapshot
+        if user_id is not None:
+            if user_id in snapshot.override_users:
+                cached = self._user_cache.get(user_id)
+                if cached is not None and flag in cached[1]:
+                    return cached[1][flag]
+            rollout = snapshot.rollouts.get(flag)
+            if rollout is not None:
+                return rollout_bucket(rollout[0], user_id) < rollout[1]
+        
+        value = snapshot.global_flags.get(flag)
+        if value is not None:
+            return value
+        if default is not None:
+            return default
+        return self.DEFAULT_FLAGS.get(flag, False)
     
     async def is_enabled(
-        self, 
-        flag: str, 
-        user_id: Optional[str] = None, 
+        self,
+        flag: str,
+        user_id: Optional[str] = None,
         default: Optional[bool] = None
     ) -> bool:
         """
@@ -60,7 +293,7 @@ class FeatureFlagService:
         
         Args:
             flag: Feature flag name
-            user_id: Optional user ID for user-specific overrides
+            user_id: Optional user ID for user-specific overrides and rollouts
             default: Optional default value (falls back to DEFAULT_FLAGS)
         
         Returns:
@@ -68,59 +301,64 @@ class FeatureFlagService:
         
         Priority order:
         1. User-specific override (if user_id provided)
-        2. Global flag in Redis
-        3. Default value from DEFAULT_FLAGS
+        2. Percentage rollout (if user_id provided and the flag has one)
+        3. Global flag
         4. Provided default
-        5. False (safe default)
+        5. Default value from DEFAULT_FLAGS
+        6. False (safe default)
         """
-        # Check user-specific override
-        if user_id:
-            user_value = await self._get_user_flag(user_id, flag)
-            if user_value is not None:
-                return user_value
-        
-        # Check global flag
-        global_value = await self._get_global_flag(flag)
-        if global_value is not None:
-            return global_value
+        await self._ensure_fresh(user_id)
+        return self.check(flag, user_id, default)
+    
+    async def evaluate_all(self, user_id: Optional[str] = None) -> Dict[str, bool]:
+        """
+        Evaluate every known flag for a user in one pass over the snapshot.
         
-        # Fall back to defaults
-        if default is not None:
-            return default
+        Args:
+            user_id: Optional user ID for overrides and rollouts
         
-        return self.DEFAULT_FLAGS.get(flag, False)
+        Returns:
+            Dictionary of flag names to enabled status
+        """
+        await self._ensure_fresh(user_id)
+        snapshot = self._snapshot
+        overrides = self._user_cache[user_id][1] if user_id in self._user_cache else {}
+        names = set(self.DEFAULT_FLAGS) | set(snapshot.global_flags) | set(overrides)
+        if user_id is not None:
+            names |= set(snapshot.rollouts)
+        return {name: self.check(name, user_id) for name in names}
     
-    async def _get_user_flag(self, user_id: str, flag: str) -> Optional[bool]:
-        """Get user-specific flag override."""
-        redis_client = await self._get_redis()
-        if not redis_client:
-            return None
+    async def get_all_flags(self, user_id: Optional[str] = None) -> Dict[str, bool]:
+        """
+        Get all feature flags (global + user overrides if user_id provided).
         
-        try:
-            key = f"flags:user:{user_id}"
-            value = await redis_client.hget(key, flag)
-            if value is not None:
-                return value.lower() == "true"
-        except Exception as e:
-            logger.error(f"❌ Failed to get user flag: {e}")
+        Args:
+            user_id: Optional user ID for user-specific overrides
         
-        return None
+        Returns:
+            Dictionary of flag names to enabled status
+        """
+        return await self.evaluate_all(user_id)
     
-    async def _get_global_flag(self, flag: str) -> Optional[bool]:
-        """Get global flag value."""
+    async def _write(self, description: str, user_id: Optional[str], apply) -> bool:
+        """Run a write pipeline, then refresh this instance and notify the others."""
         redis_client = await self._get_redis()
         if not redis_client:
-            return None
+            logger.warning(f"⚠️ Cannot {description}: Redis not available")
+            return False
         
         try:
-            key = f"flags:global:{flag}"
-            value = await redis_client.get(key)
-            if value is not None:
-                return value.lower() == "true"
+            async with redis_client.pipeline(transaction=True) as pipe:
+                apply(pipe)
+                await pipe.execute()
         except Exception as e:
-            logger.error(f"❌ Failed to get global flag: {e}")
+            logger.error(f"❌ Failed to {description}: {e}")
+            return False
         
-        return None
+        self._invalidate_user(user_id)
+        await self.load()
+        await self._publish_invalidation(redis_client, user_id)
+        return True
     
     async def set_global_flag(self, flag: str, enabled: bool) -> bool:
         """
@@ -133,85 +371,59 @@ class FeatureFlagService:
         Returns:
             True if successful, False otherwise
         """
-        redis_client = await self._get_redis()
-        if not redis_client:
-            logger.warning(f"⚠️ Cannot set flag {flag}: Redis not available")
-            return False
-        
-        try:
-            key = f"flags:global:{flag}"
-            await redis_client.set(key, "true" if enabled else "false")
+        success = await self._write(
+            f"set flag {flag}", None,
+            lambda pipe: pipe.hset(self.GLOBAL_KEY, flag, "true" if enabled else "false")
+        )
+        if success:
             logger.info(f"✅ Global flag set: {flag} = {enabled}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to set global flag: {e}")
-            return False
+        return success
     
-    async def set_user_flag(self, user_id: str, flag: str, enabled: bool) -> bool:
+    async def set_rollout(self, flag: str, percentage: Optional[float]) -> bool:
         """
-        Set a user-specific feature flag override.
+        Enable a flag for a stable percentage of users (None removes the rollout).
         
         Args:
-            user_id: User ID
             flag: Feature flag name
-            enabled: True to enable, False to disable
+            percentage: 0-100; users hash to the same bucket on every replica
         
         Returns:
             True if successful, False otherwise
         """
-        redis_client = await self._get_redis()
-        if not redis_client:
-            logger.warning(f"⚠️ Cannot set user flag for {user_id}: Redis not available")
-            return False
+        if percentage is not None and not 0 <= percentage <= 100:
+            raise ValueError("Rollout percentage must be between 0 and 100")
         
-        try:
-            key = f"flags:user:{user_id}"
-            await redis_client.hset(key, flag, "true" if enabled else "false")
-            logger.info(f"✅ User flag set: {user_id} -> {flag} = {enabled}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to set user flag: {e}")
-            return False
+        def apply(pipe):
+            if percentage is None:
+                pipe.hdel(self.ROLLOUT_KEY, flag)
+            else:
+                pipe.hset(self.ROLLOUT_KEY, flag, str(percentage))
+        
+        success = await self._write(f"set rollout for {flag}", None, apply)
+        if success:
+            logger.info(f"✅ Rollout set: {flag} = {percentage}%")
+        return success
     
-    async def get_all_flags(self, user_id: Optional[str] = None) -> Dict[str, bool]:
+    async def set_user_flag(self, user_id: str, flag: str, enabled: bool) -> bool:
         """
-        Get all feature flags (global + user overrides if user_id provided).
+        Set a user-specific feature flag override.
         
         Args:
-            user_id: Optional user ID for user-specific overrides
+            user_id: User ID
+            flag: Feature flag name
+            enabled: True to enable, False to disable
         
         Returns:
-            Dictionary of flag names to enabled status
+            True if successful, False otherwise
         """
-        flags = {}
-        
-        # Start with defaults
-        flags.update(self.DEFAULT_FLAGS)
+        def apply(pipe):
+            pipe.hset(f"{self.USER_KEY_PREFIX}{user_id}", flag, "true" if enabled else "false")
+            pipe.sadd(self.OVERRIDE_USERS_KEY, user_id)
         
-        # Override with global flags from Redis
-        redis_client = await self._get_redis()
-        if redis_client:
-            try:
-                # Get all global flags
-                cursor = 0
-                while True:
-                    cursor, keys = await redis_client.scan(cursor, match="flags:global:*", count=100)
-                    for key in keys:
-                        flag_name = key.replace("flags:global:", "")
-                        value = await redis_client.get(key)
-                        flags[flag_name] = value.lower() == "true" if value else False
-                    if cursor == 0:
-                        break
-                
-                # Override with user-specific flags
-                if user_id:
-                    user_flags = await redis_client.hgetall(f"flags:user:{user_id}")
-                    for flag_name, value in user_flags.items():
-                        flags[flag_name] = value.lower() == "true" if value else False
-            except Exception as e:
-                logger.error(f"❌ Failed to get all flags: {e}")
-        
-        return flags
+        success = await self._write(f"set user flag for {user_id}", user_id, apply)
+        if success:
+            logger.info(f"✅ User flag set: {user_id} -> {flag} = {enabled}")
+        return success
     
     async def delete_user_flag(self, user_id: str, flag: str) -> bool:
         """
@@ -224,18 +436,15 @@ class FeatureFlagService:
         Returns:
             True if successful, False otherwise
         """
-        redis_client = await self._get_redis()
-        if not redis_client:
-            return False
-        
-        try:
-            key = f"flags:user:{user_id}"
-            await redis_client.hdel(key, flag)
+        success = await self._write(
+            f"delete user flag for {user_id}", user_id,
+            lambda pipe: pipe.eval(
+                DELETE_USER_FLAG_SCRIPT, 2, f"{self.USER_KEY_PREFIX}{user_id}", self.OVERRIDE_USERS_KEY, flag, user_id
+            )
+        )
+        if success:
             logger.info(f"✅ User flag deleted: {user_id} -> {flag}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to delete user flag: {e}")
-            return False
+        return success
 
 
 # Global instance
@@ -1,14 +1,27 @@
+import numpy as np
 import pandas as pd
 import logging
 from pathlib import Path
 from datetime import datetime
+from src.services.feature_store import ColumnarStore, TeamFormStore
+from src.services.team_normalization import normalization_service
 
 logger = logging.getLogger(__name__)
 
+NBA_FEATURE_COLUMNS = [
+    'Last5_PF_HomeStats', 'Last5_PA_HomeStats', 'Last5_WinPct_HomeStats', 'RestDays_HomeStats',
+    'Last5_PF_AwayStats', 'Last5_PA_AwayStats', 'Last5_WinPct_AwayStats', 'RestDays_AwayStats',
+]
+TENNIS_COLUMNS = ('Rank', 'Pts')
+
+
 class FeatureService:
     """
     Provides real-time features for live game predictions by looking up
     the latest historical stats for teams.
+    
+    Latest team/player state lives in columnar feature stores that load
+    from binary snapshots and take new results incrementally.
     """
     
     def __init__(self):
@@ -17,43 +30,56 @@ class FeatureService:
             'atp': Path("data/processed/tennis/atp_training_data.csv"),
             'wta': Path("data/processed/tennis/wta_training_data.csv")
         }
-        self.nba_stats = {}
-        self.tennis_stats = {}
+        self.nba_snapshot_path = Path("data/processed/nba/nba_feature_store.npz")
+        self.tennis_snapshot_path = Path("data/processed/tennis/tennis_feature_store.npz")
+        self.nba_store = TeamFormStore()
+        self.tennis_store = ColumnarStore(TENNIS_COLUMNS)
+        self.nba_index = None
+        self.tennis_index = None
         
     async def initialize(self):
         self._load_nba_stats()
         self._load_tennis_stats()
+        self.build_name_indexes()
 
-    def _load_nba_stats(self):
-        if not self.nba_data_path.exists():
-            return
+    def build_name_indexes(self):
+        """Build the team/player name resolution indexes over the loaded stats."""
+        self.nba_index = normalization_service.build_index(self.nba_store.keys)
+        self.tennis_index = normalization_service.build_index(self.tennis_store.keys, people=True)
+
+    @staticmethod
+    def _snapshot_is_fresh(snapshot: Path, sources) -> bool:
+        """A snapshot is usable if it exists and is newer than every source CSV."""
+        if not snapshot.exists():
+            return False
+        snapshot_mtime = snapshot.stat().st_mtime
+        return all(not source.exists() or source.stat().st_mtime <= snapshot_mtime for source in sources)
 
+    @staticmethod
+    def _save_snapshot(store: ColumnarStore, path: Path):
         try:
-            df = pd.read_csv(self.nba_data_path)
-            # We want the LATEST stats for every team.
-            # The Training Data has "Team_HomeStats" and "Last5_PF_HomeStats" etc.
-            # We can extract a "Team State" dataframe.
-            
-            # Extract Home stats
-            h = df[['pd_date', 'Team_HomeStats', 'Last5_PF_HomeStats', 'Last5_PA_HomeStats', 'Last5_WinPct_HomeStats']].copy()
-            h.columns = ['Date', 'Team', 'Last5_PF', 'Last5_PA', 'Last5_WinPct']
-            
-            # Extract Away stats
-            a = df[['pd_date', 'Team_AwayStats', 'Last5_PF_AwayStats', 'Last5_PA_AwayStats', 'Last5_WinPct_AwayStats']].copy()
-            a.columns = ['Date', 'Team', 'Last5_PF', 'Last5_PA', 'Last5_WinPct']
-            
-            # Combine
-            full = pd.concat([h, a]).sort_values('Date')
-            
-            # Drop entries where stats are NaN (start of season)
-            full = full.dropna()
-            
-            # Keep last row per Team
-            latest = full.groupby('Team').last().reset_index()
+            store.save(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write feature snapshot {path}: {e}")
+
+    def _load_nba_stats(self):
+        try:
+            if self._snapshot_is_fresh(self.nba_snapshot_path, [self.nba_data_path]):
+                self.nba_store = TeamFormStore.load(self.nba_snapshot_path)
+                logger.info(f"✅ Loaded NBA feature snapshot for {len(self.nba_store)} teams")
+                return
             
-            # Convert to dict for fast lookup
-            self.nba_stats = latest.set_index('Team').to_dict('index')
-            logger.info(f"✅ Loaded latest NBA stats for {len(self.nba_stats)} teams")
+            if not self.nba_data_path.exists():
+                return
+
+            # Rebuild each team's last-5 window from the game-level rows
+            df = pd.read_csv(
+                self.nba_data_path,
+                usecols=['pd_date', 'HomeTeam', 'AwayTeam', 'HomePoints', 'AwayPoints']
+            )
+            self.nba_store = TeamFormStore.from_games(df)
+            self._save_snapshot(self.nba_store, self.nba_snapshot_path)
+            logger.info(f"✅ Loaded latest NBA stats for {len(self.nba_store)} teams")
             
         except Exception as e:
             logger.error(f"Error loading NBA stats: {e}")
@@ -61,87 +87,143 @@ class FeatureService:
     def _load_tennis_stats(self):
         """Load latest stats for Tennis players."""
         try:
+            sources = list(self.tennis_data_paths.values())
+            if self._snapshot_is_fresh(self.tennis_snapshot_path, sources):
+                self.tennis_store = ColumnarStore.load(self.tennis_snapshot_path)
+                logger.info(f"✅ Loaded Tennis feature snapshot for {len(self.tennis_store)} players")
+                return
+            
             frames = []
             for tour in ['atp', 'wta']:
                 path = self.tennis_data_paths[tour]
                 if path.exists():
-                    df = pd.read_csv(path)
+                    df = pd.read_csv(path, usecols=['Date', 'Player1', 'Player2', 'Rank1', 'Rank2', 'Pts1', 'Pts2'])
                     # Helper to extract player stats from match rows
                     # Row: Player1, Player2, Rank1, Pts1...
                     p1 = df[['Date', 'Player1', 'Rank1', 'Pts1']].rename(columns={'Player1': 'Player', 'Rank1': 'Rank', 'Pts1': 'Pts'})
                     p2 = df[['Date', 'Player2', 'Rank2', 'Pts2']].rename(columns={'Player2': 'Player', 'Rank2': 'Rank', 'Pts2': 'Pts'})
-                    combined = pd.concat([p1, p2])
-                    
-                    # Sort by Date and keep last
-                    # Date format in csv usually YYYY-MM-DD from scraper
-                    combined['Date'] = pd.to_datetime(combined['Date'], errors='coerce')
-                    combined = combined.sort_values('Date').dropna(subset=['Date'])
-                    
-                    latest = combined.groupby('Player').last().reset_index()
-                    
-                    # Store in dict
-                    # Using a combined dict for simplicity, or separate by tour?
-                    # Player names usually distinct enough, or we check tour key.
-                    stats_dict = latest.set_index('Player')[['Rank', 'Pts', 'Date']].to_dict('index')
-                    self.tennis_stats.update(stats_dict)
+                    frames.extend([p1, p2])
+            
+            if not frames:
+                return
             
-            logger.info(f"✅ Loaded latest Tennis stats for {len(self.tennis_stats)} players")
+            combined = pd.concat(frames)
+            # Date format in csv usually YYYY-MM-DD from scraper
+            combined['Date'] = pd.to_datetime(combined['Date'], errors='coerce')
+            combined = combined.sort_values('Date', kind='stable').dropna(subset=['Date'])
+            latest = combined.groupby('Player').last()
+            
+            self.tennis_store = ColumnarStore.from_columns(
+                latest.index, TENNIS_COLUMNS, latest[list(TENNIS_COLUMNS)].to_numpy(dtype=float), latest['Date']
+            )
+            self._save_snapshot(self.tennis_store, self.tennis_snapshot_path)
+            logger.info(f"✅ Loaded latest Tennis stats for {len(self.tennis_store)} players")
             
         except Exception as e:
             logger.error(f"Error loading Tennis stats: {e}")
 
+    def apply_nba_result(self, home_team: str, away_team: str, home_points: float, away_points: float, game_date) -> bool:
+        """
+        Roll a finished NBA game into both teams' form.
+        
+        Idempotent per team and day: re-applying a game already seen is a no-op.
+        """
+        home_key = self._resolve_team_key(home_team) or home_team
+        away_key = self._resolve_team_key(away_team) or away_team
+        is_new_team = home_key not in self.nba_store or away_key not in self.nba_store
+        applied = self.nba_store.apply_game(home_key, away_key, home_points, away_points, game_date)
+        if is_new_team:
+            self.build_name_indexes()
+        return applied
+
+    def apply_final_games(self, sport: str, games) -> int:
+        """
+        Roll finished games (unified scoreboard format) into the feature stores.
+        
+        The snapshot is rewritten whenever a game is applied, so a restart
+        does not reload state from before these results.
+        
+        Returns:
+            Number of games applied
+        """
+        if sport.lower() != 'nba':
+            return 0
+        applied = 0
+        for game in games:
+            status = str(game.get('status', '')).lower()
+            if 'final' not in status and 'finished' not in status:
+                continue
+            try:
+                if self.apply_nba_result(
+                    game['home_team'], game['away_team'],
+                    float(game['home_score']), float(game['away_score']),
+                    game.get('game_date') or game.get('date')
+                ):
+                    applied += 1
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Skipping game for feature refresh: {e}")
+        if applied:
+            self._save_snapshot(self.nba_store, self.nba_snapshot_path)
+        return applied
+
+    def save_snapshots(self):
+        """Persist the current stores so the next process starts from fresh state."""
+        self._save_snapshot(self.nba_store, self.nba_snapshot_path)
+        self._save_snapshot(self.tennis_store, self.tennis_snapshot_path)
+
     def get_nba_features(self, home_team: str, away_team: str, game_date: datetime = None):
         """Construct feature vector for a matchup."""
-        home_stats = self._find_team_stats(home_team)
-        away_stats = self._find_team_stats(away_team)
-        
-        if not home_stats or not away_stats:
-            return None
-            
-        # Calculate Rest Days
         # If game_date is None, assume today
-        if not game_date:
-            game_date = datetime.now()
+        matrix, found = self.get_nba_feature_matrix([(home_team, away_team)], [game_date])
+        if not found[0]:
+            return None
         
-        def calc_rest(last_date_str):
-            try:
-                last_date = pd.to_datetime(last_date_str)
-                # Ensure we handle timezones or naive vs aware? 
-                # Scraper uses naive usually. datetime.now() is naive local.
-                # Let's strip time.
-                delta = (game_date - last_date).days
-                return max(1, min(delta, 10)) # Clip 1-10
-            except:
-                return 2 # Fallback
-                
-        rest_home = calc_rest(home_stats['Date'])
-        rest_away = calc_rest(away_stats['Date'])
-            
-        features = pd.DataFrame([{
-            'Last5_PF_HomeStats': home_stats['Last5_PF'],
-            'Last5_PA_HomeStats': home_stats['Last5_PA'],
-            'Last5_WinPct_HomeStats': home_stats['Last5_WinPct'],
-            'RestDays_HomeStats': rest_home,
+        return pd.DataFrame(matrix, columns=NBA_FEATURE_COLUMNS)
+
+    def get_nba_feature_matrix(self, matchups, game_dates=None):
+        """
+        Feature rows for many matchups at once (columns: NBA_FEATURE_COLUMNS).
+        
+        Args:
+            matchups: Sequence of (home_team, away_team)
+            game_dates: Optional per-game dates (defaults to now)
             
-            'Last5_PF_AwayStats': away_stats['Last5_PF'],
-            'Last5_PA_AwayStats': away_stats['Last5_PA'],
-            'Last5_WinPct_AwayStats': away_stats['Last5_WinPct'],
-            'RestDays_AwayStats': rest_away,
-        }])
+        Returns:
+            (float matrix, found mask); rows for unknown teams are NaN
+        """
+        matchups = list(matchups)
+        home_values, home_dates, home_found = self.nba_store.take(self._resolve_team_key(h) for h, _ in matchups)
+        away_values, away_dates, away_found = self.nba_store.take(self._resolve_team_key(a) for _, a in matchups)
         
-        return features
+        if game_dates is None:
+            game_dates = [None] * len(matchups)
+        now = np.datetime64(datetime.now(), 'D')
+        dates = np.array(
+            [np.datetime64(d, 'D') if d is not None else now for d in game_dates],
+            dtype='datetime64[D]'
+        )
+        
+        def rest_days(last_dates):
+            # Clip 1-10, fallback 2 when the last game date is unknown
+            last_days = last_dates.astype('datetime64[D]')
+            days = (dates - np.where(np.isnat(last_days), dates, last_days)).astype(int)
+            return np.where(np.isnat(last_days), 2, np.clip(days, 1, 10))
+        
+        matrix = np.column_stack([
+            home_values, rest_days(home_dates),
+            away_values, rest_days(away_dates),
+        ])
+        return matrix, home_found & away_found
 
     def get_tennis_features(self, player1: str, player2: str, odds1: float, odds2: float):
         """Construct feature vector for Tennis match."""
         # Tennis logic expects: RankDiff, PtsDiff, Odds1, Odds2, Rank1, Rank2
         # (Based on tennis_features.py implementation)
         
-        p1_stats = self.tennis_stats.get(player1)
-        p2_stats = self.tennis_stats.get(player2)
+        p1_stats = self._find_player_stats(player1)
+        p2_stats = self._find_player_stats(player2)
         
         if not p1_stats or not p2_stats:
-            # Try fuzzy match?
-            # For now return None
             return None
             
         rank1 = p1_stats.get('Rank', 100)
@@ -179,16 +261,30 @@ class FeatureService:
         
         return features
 
+    def _resolve_team_key(self, team_name):
+        """Resolve a team name to its store key (exact, alias, nickname, then fuzzy)."""
+        if team_name in self.nba_store:
+            return team_name
+        if self.nba_index is None:
+            self.build_name_indexes()
+        return self.nba_index.resolve(team_name)
+
+    def _resolve_player_key(self, player_name):
+        """Resolve a player name, matching 'First Last' against 'Last F.' style keys."""
+        if player_name in self.tennis_store:
+            return player_name
+        if self.tennis_index is None:
+            self.build_name_indexes()
+        return self.tennis_index.resolve(player_name)
+
     def _find_team_stats(self, team_name):
-        """Find stats with basic fuzzy matching."""
-        if team_name in self.nba_stats:
-            return self.nba_stats[team_name]
-            
-        # Try simple partial
-        for key in self.nba_stats:
-            if team_name in key or key in team_name:
-                return self.nba_stats[key]
-                
-        return None
+        """Find a team's latest stats via the name resolution index."""
+        key = self._resolve_team_key(team_name)
+        return self.nba_store.get(key) if key is not None else None
+
+    def _find_player_stats(self, player_name):
+        """Find a player's latest ranking stats via the name resolution index."""
+        key = self._resolve_player_key(player_name)
+        return self.tennis_store.get(key) if key is not None else None
 
 feature_service = FeatureService()
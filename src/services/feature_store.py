@@ -0,0 +1,249 @@
+"""
+Feature Store
+=============
+Compact, columnar latest-state store backing FeatureService.
+
+Rows are keyed by team/player name and held in NumPy arrays, so the store
+loads from a binary snapshot in milliseconds, takes new results
+incrementally and hands out ready-made feature matrices for batch inference.
+"""
+
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NAT = np.datetime64("NaT", "s")
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    """Coerce a date-like value to a day-resolution datetime64 (NaT if unparseable)."""
+    if value is None:
+        return NAT
+    if isinstance(value, np.datetime64):
+        parsed = value
+    else:
+        import pandas as pd
+        parsed = pd.to_datetime(value, errors="coerce", utc=isinstance(value, str))
+        if pd.isna(parsed):
+            return NAT
+        if parsed.tzinfo is not None:
+            parsed = parsed.tz_convert(None)
+        parsed = parsed.to_datetime64()
+    # Results are tracked per day: a team plays at most once on a given date
+    return parsed.astype("datetime64[D]").astype("datetime64[s]")
+
+
+class ColumnarStore:
+    """
+    Latest-state rows keyed by name, stored column-wise.
+
+    Features:
+    - O(1) key -> row lookup with amortized array growth
+    - Float feature columns plus a per-row "as of" date
+    - np.savez snapshots (save/load) instead of CSV parsing
+    """
+
+    def __init__(self, columns: Sequence[str], capacity: int = 64):
+        self.columns = tuple(columns)
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        self.keys: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.values = np.full((capacity, len(self.columns)), np.nan)
+        self.dates = np.full(capacity, NAT)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _grow(self, capacity: int):
+        self.values = np.vstack([self.values, np.full((capacity - len(self.values), len(self.columns)), np.nan)])
+        self.dates = np.concatenate([self.dates, np.full(capacity - len(self.dates), NAT)])
+
+    def _row(self, key: str) -> int:
+        """Row index for key, appending a new row if needed."""
+        row = self._index.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row >= len(self.values):
+                self._grow(max(64, len(self.values) * 2))
+            self.keys.append(key)
+            self._index[key] = row
+        return row
+
+    def upsert(self, key: str, values: Dict[str, float], date: Any = None):
+        """Set the given columns (and optionally the as-of date) for key."""
+        row = self._row(key)
+        for name, value in values.items():
+            self.values[row, self._column_index[name]] = np.nan if value is None else value
+        if date is not None:
+            self.dates[row] = _to_datetime64(date)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Row as a dict (columns plus 'Date'), or None if unknown or incomplete."""
+        row = self._index.get(key)
+        if row is None or np.isnan(self.values[row]).any():
+            return None
+        record = dict(zip(self.columns, self.values[row].tolist()))
+        date = self.dates[row]
+        record["Date"] = None if np.isnat(date) else date.astype(datetime)
+        return record
+
+    def take(self, keys: Iterable[Optional[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gather rows for many keys at once.
+
+        Returns:
+            (values matrix, dates, found mask); unknown keys give NaN rows
+        """
+        rows = np.array([self._index.get(key, -1) if key is not None else -1 for key in keys], dtype=np.int64)
+        found = rows >= 0
+        safe_rows = np.where(found, rows, 0)
+        values = self.values[safe_rows] if len(self.keys) else np.full((len(rows), len(self.columns)), np.nan)
+        dates = self.dates[safe_rows] if len(self.keys) else np.full(len(rows), NAT)
+        values = np.where(found[:, None], values, np.nan)
+        dates = np.where(found, dates, NAT)
+        found &= ~np.isnan(values).any(axis=1)
+        return values, dates, found
+
+    @classmethod
+    def from_columns(cls, keys: Sequence[str], columns: Sequence[str], values: np.ndarray, dates: Sequence[Any]) -> "ColumnarStore":
+        """Build a store from already-aggregated columns (one row per key)."""
+        import pandas as pd
+
+        keys = list(keys)
+        store = cls(columns)
+        store._restore_arrays({
+            "keys": np.array(keys, dtype=str),
+            "values": np.asarray(values, dtype=float).reshape(len(keys), len(columns)),
+            "dates": pd.to_datetime(pd.Series(list(dates), dtype=object), errors="coerce")
+                       .to_numpy(dtype="datetime64[D]").astype("datetime64[s]"),
+        })
+        return store
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        n = len(self.keys)
+        return {
+            "keys": np.array(self.keys, dtype=str),
+            "columns": np.array(self.columns, dtype=str),
+            "values": self.values[:n],
+            "dates": self.dates[:n],
+        }
+
+    def _restore_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.keys = arrays["keys"].tolist()
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self.values = arrays["values"].astype(float)
+        self.dates = arrays["dates"].astype("datetime64[s]")
+        if len(self.values) == 0:
+            self.values = np.full((64, len(self.columns)), np.nan)
+            self.dates = np.full(64, NAT)
+
+    def save(self, path: Path):
+        """Write a binary snapshot."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, **self._snapshot_arrays())
+
+    @classmethod
+    def load(cls, path: Path) -> "ColumnarStore":
+        """Load a snapshot written by save()."""
+        with np.load(Path(path), allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        store = cls(arrays["columns"].tolist())
+        store._restore_arrays(arrays)
+        return store
+
+
+class TeamFormStore(ColumnarStore):
+    """
+    Rolling team form (last-N points for/against and win rate).
+
+    Keeps each team's last N results in a small window so new games can be
+    applied one at a time without re-reading history.
+    """
+
+    WINDOW = 5
+    COLUMNS = ("Last5_PF", "Last5_PA", "Last5_WinPct")
+
+    def __init__(self, columns: Sequence[str] = COLUMNS, capacity: int = 64):
+        super().__init__(columns, capacity)
+        self.recent = np.full((capacity, 3, self.WINDOW), np.nan)  # points for, points against, won
+
+    def _grow(self, capacity: int):
+        super()._grow(capacity)
+        self.recent = np.concatenate([self.recent, np.full((capacity - len(self.recent), 3, self.WINDOW), np.nan)])
+
+    def apply_result(self, team: str, points_for: float, points_against: float, date: Any) -> bool:
+        """
+        Push one finished game into a team's window.
+
+        Returns:
+            False if the game is not newer than the team's latest (already applied)
+        """
+        game_date = _to_datetime64(date)
+        row = self._row(team)
+        last_date = self.dates[row]
+        if not np.isnat(last_date) and not np.isnat(game_date) and game_date <= last_date:
+            return False
+
+        window = self.recent[row]
+        window[:, :-1] = window[:, 1:]
+        window[:, -1] = (points_for, points_against, float(points_for > points_against))
+        if not np.isnan(window).any():
+            self.values[row] = window.mean(axis=1)
+        self.dates[row] = game_date
+        return True
+
+    def apply_game(self, home_team: str, away_team: str, home_points: float, away_points: float, date: Any) -> bool:
+        """Apply a final score to both teams."""
+        home_applied = self.apply_result(home_team, home_points, away_points, date)
+        away_applied = self.apply_result(away_team, away_points, home_points, date)
+        return home_applied or away_applied
+
+    @classmethod
+    def from_games(cls, games) -> "TeamFormStore":
+        """
+        Build from a game-level DataFrame with pd_date, HomeTeam, AwayTeam,
+        HomePoints and AwayPoints columns (e.g. the NBA training CSV).
+        """
+        import pandas as pd
+
+        home = pd.DataFrame({"Team": games["HomeTeam"], "Date": games["pd_date"],
+                             "PF": games["HomePoints"], "PA": games["AwayPoints"]})
+        away = pd.DataFrame({"Team": games["AwayTeam"], "Date": games["pd_date"],
+                             "PF": games["AwayPoints"], "PA": games["HomePoints"]})
+        logs = pd.concat([home, away]).dropna()
+        logs["Date"] = pd.to_datetime(logs["Date"], errors="coerce")
+        logs = logs.dropna(subset=["Date"]).sort_values(["Team", "Date"], kind="stable")
+        logs["Won"] = (logs["PF"] > logs["PA"]).astype(float)
+        recent = logs.groupby("Team").tail(cls.WINDOW)
+
+        teams = recent["Team"].drop_duplicates().tolist()
+        store = cls(capacity=max(64, len(teams)))
+        for team, group in recent.groupby("Team", sort=False):
+            row = store._row(team)
+            n = len(group)
+            store.recent[row, :, cls.WINDOW - n:] = group[["PF", "PA", "Won"]].to_numpy(dtype=float).T
+            store.dates[row] = _to_datetime64(group["Date"].iloc[-1].to_datetime64())
+            if n == cls.WINDOW:
+                store.values[row] = store.recent[row].mean(axis=1)
+        return store
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super()._snapshot_arrays()
+        arrays["recent"] = self.recent[:len(self.keys)]
+        return arrays
+
+    def _restore_arrays(self, arrays: Dict[str, np.ndarray]):
+        super()._restore_arrays(arrays)
+        self.recent = arrays["recent"].astype(float)
+        if len(self.recent) < len(self.values):
+            self.recent = np.concatenate([self.recent, np.full((len(self.values) - len(self.recent), 3, self.WINDOW), np.nan)])
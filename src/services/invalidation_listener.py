@@ -0,0 +1,119 @@
+"""
+Invalidation Listener
+=====================
+Lazily connected Redis client plus a pub/sub listener on one channel, for
+services that cache Redis state per process and drop it when another
+instance writes.
+
+Events are JSON objects carrying the publisher's instance_id. Events this
+instance published itself are skipped; the rest are passed to on_event.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationListener:
+    """
+    Shared connect / listen / close lifecycle for per-process Redis caches.
+
+    Features:
+    - First use connects under a lock, so concurrent callers share one attempt
+    - A failed connection is remembered; callers fall back to defaults
+    - The listener polls with a timeout, so close() is never stuck behind a read
+    - on_event may be a plain function or a coroutine function
+    """
+
+    def __init__(
+        self,
+        name: str,
+        channel: str,
+        instance_id: str,
+        on_event: Callable[[Dict[str, Any]], Any],
+        on_error: Optional[Callable[[Exception], None]] = None
+    ):
+        """
+        Args:
+            name: Service name for log messages
+            channel: Pub/sub channel carrying invalidation events
+            instance_id: This instance's id; its own events are ignored
+            on_event: Called with each event published by another instance
+            on_error: Called if the listener stops on an error (updates may have been missed)
+        """
+        self.name = name
+        self.channel = channel
+        self.instance_id = instance_id
+        self.on_event = on_event
+        self.on_error = on_error
+        self.client = None  # None until connected, False once a connection attempt failed
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def connect(self, create_client: Callable[[], redis.Redis]) -> Optional[redis.Redis]:
+        """Connect on first use and start listening; None if Redis is unavailable."""
+        if self.client is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.client is None:
+                    try:
+                        client = create_client()
+                        await client.ping()
+                        self.client = client
+                        self._task = asyncio.create_task(self._listen())
+                        logger.info(f"✅ {self.name}: Redis connection established")
+                    except Exception as e:
+                        logger.warning(f"⚠️ {self.name}: Redis connection failed: {e}")
+                        self.client = False  # Mark as failed
+        return self.client if self.client is not False else None
+
+    async def _listen(self):
+        pubsub = self.client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            # Poll with a timeout so close() is never stuck behind a blocking read
+            while not self._closing:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if event.get("instance_id") != self.instance_id:
+                    result = self.on_event(event)
+                    if inspect.isawaitable(result):
+                        await result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ {self.name} invalidation listener stopped: {e}")
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def close(self):
+        """Stop the listener and release the client's pooled connections."""
+        self._closing = True
+        if self._task:
+            # A cancel landing inside a socket read can be swallowed; the flag ends the loop then
+            self._task.cancel()
+            await asyncio.wait([self._task], timeout=2.0)
+            self._task = None
+        if self.client:
+            await self.client.aclose()
+            await self.client.connection_pool.disconnect()
+        self.client = None
+        self._closing = False
@@ -43,6 +43,7 @@ class BroadcastMessage:
     sender_id: Optional[str] = None
     target_channels: Optional[List[str]] = None
     target_users: Optional[List[str]] = None
+    target_sports: Optional[List[str]] = None
     expires_at: Optional[datetime] = None
     max_retries: int = 3
     retry_count: int = 0
@@ -59,6 +60,7 @@ class BroadcastMessage:
             "sender_id": self.sender_id,
             "target_channels": self.target_channels,
             "target_users": self.target_users,
+            "target_sports": self.target_sports,
             "expires_at": self.expires_at.isoformat() if self.expires_at else None,
             "max_retries": self.max_retries,
             "retry_count": self.retry_count,
@@ -77,6 +79,7 @@ class BroadcastMessage:
             sender_id=data.get("sender_id"),
             target_channels=data.get("target_channels"),
             target_users=data.get("target_users"),
+            target_sports=data.get("target_sports"),
             expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
             max_retries=data.get("max_retries", 3),
             retry_count=data.get("retry_count", 0),
@@ -102,8 +105,52 @@ class DeliveryReceipt:
             "error_message": self.error_message
         }
 
+# Atomically drain up to ARGV[1] messages across the priority queues in KEYS
+# (highest priority first). KEYS[#KEYS] is the per-message expiry index: any
+# message whose expires_at (ARGV[2], epoch seconds) has passed is discarded
+# instead of returned. Returns a flat list of [queue_index, payload, ...].
+DEQUEUE_BATCH_SCRIPT = """
+local expiry_key = KEYS[#KEYS]
+local remaining = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+local expired = redis.call('ZRANGEBYSCORE', expiry_key, '-inf', now)
+if #expired > 0 then
+    for i = 1, #KEYS - 1 do
+        for start = 1, #expired, 1000 do
+            redis.call('ZREM', KEYS[i], unpack(expired, start, math.min(start + 999, #expired)))
+        end
+    end
+    redis.call('ZREMRANGEBYSCORE', expiry_key, '-inf', now)
+end
+
+local result = {}
+for i = 1, #KEYS - 1 do
+    if remaining <= 0 then break end
+    local popped = redis.call('ZPOPMIN', KEYS[i], remaining)
+    for j = 1, #popped, 2 do
+        result[#result + 1] = i
+        result[#result + 1] = popped[j]
+        redis.call('ZREM', expiry_key, popped[j])
+    end
+    remaining = remaining - #popped / 2
+end
+return result
+"""
+
 class MessageQueue:
-    """Priority-based message queue with Redis backend."""
+    """
+    Priority-based message queue with Redis backend.
+
+    Features:
+    - One sorted set per priority, ordered by message timestamp
+    - Pipelined enqueue (one round trip for a whole batch)
+    - Atomic batched pop across priorities via a Lua script (safe with
+      several instances draining the same queues)
+    - Per-message expiry tracked in a separate sorted set
+    """
+    
+    DRAIN_ORDER = [MessagePriority.URGENT, MessagePriority.HIGH, MessagePriority.NORMAL, MessagePriority.LOW]
     
     def __init__(self, redis_client: redis.Redis):
         self.redis_client = redis_client
@@ -114,67 +161,83 @@ class MessageQueue:
             MessagePriority.NORMAL: f"{self.queue_prefix}normal",
             MessagePriority.LOW: f"{self.queue_prefix}low"
         }
+        self.expiry_key = f"{self.queue_prefix}expires_at"
+        self._dequeue_script = None  # Registered on first use; reloads itself if Redis drops its script cache
     
     async def enqueue_message(self, message: BroadcastMessage) -> bool:
         """Add message to appropriate priority queue."""
-        try:
-            queue_key = self.priority_queues[message.priority]
+        return await self.enqueue_messages([message]) == 1
+    
+    async def enqueue_messages(self, messages: List[BroadcastMessage]) -> int:
+        """Add several messages in one pipelined round trip; returns how many were queued."""
+        now = datetime.now()
+        pipe = self.redis_client.pipeline(transaction=False)
+        queued = 0
+        for message in messages:
+            if message.expires_at and message.expires_at <= now:
+                logger.warning(f"⚠️ Message {message.id} already expired, not enqueued")
+                continue
             message_data = json.dumps(message.to_dict())
             
-            # Add to Redis sorted set with timestamp as score for ordering
-            await self.redis_client.zadd(queue_key, {message_data: message.timestamp.timestamp()})
-            
-            # Set expiration for the message
+            # Sorted set with timestamp as score for ordering
+            pipe.zadd(self.priority_queues[message.priority], {message_data: message.timestamp.timestamp()})
             if message.expires_at:
-                ttl = int((message.expires_at - datetime.now()).total_seconds())
-                if ttl > 0:
-                    await self.redis_client.expire(queue_key, ttl)
-            
-            logger.info(f"✅ Message {message.id} enqueued with priority {message.priority.value}")
-            return True
-            
+                pipe.zadd(self.expiry_key, {message_data: message.expires_at.timestamp()})
+            queued += 1
+        
+        if not queued:
+            return 0
+        try:
+            await pipe.execute()
+            logger.debug(f"✅ Enqueued {queued} message(s)")
+            return queued
         except Exception as e:
-            logger.error(f"❌ Failed to enqueue message {message.id}: {e}")
-            return False
+            logger.error(f"❌ Failed to enqueue {queued} message(s): {e}")
+            return 0
     
-    async def dequeue_message(self, priority: MessagePriority = MessagePriority.URGENT) -> Optional[BroadcastMessage]:
-        """Get next message from specified priority queue."""
+    async def dequeue_batch(self, max_messages: int,
+                            priorities: Optional[List[MessagePriority]] = None) -> List[BroadcastMessage]:
+        """
+        Pop up to max_messages, highest priority first, in a single atomic call.
+        
+        Expired messages are dropped inside the same script.
+        """
+        priorities = priorities or self.DRAIN_ORDER
         try:
-            queue_key = self.priority_queues[priority]
-            
-            # Get message with lowest timestamp (oldest first)
-            messages = await self.redis_client.zrange(queue_key, 0, 0, withscores=True)
-            
-            if messages:
-                message_data, score = messages[0]
-                message_dict = json.loads(message_data)
-                message = BroadcastMessage.from_dict(message_dict)
-                
-                # Remove from queue
-                await self.redis_client.zrem(queue_key, message_data)
-                
-                logger.debug(f"📤 Dequeued message {message.id} from {priority.value} queue")
-                return message
-            
-            return None
-            
+            keys = [self.priority_queues[p] for p in priorities] + [self.expiry_key]
+            if self._dequeue_script is None:
+                self._dequeue_script = self.redis_client.register_script(DEQUEUE_BATCH_SCRIPT)
+            flat = await self._dequeue_script(keys=keys, args=[max_messages, datetime.now().timestamp()])
         except Exception as e:
-            logger.error(f"❌ Failed to dequeue message from {priority.value} queue: {e}")
-            return None
-    
-    async def get_queue_stats(self) -> Dict[str, Any]:
-        """Get statistics for all message queues."""
-        stats = {}
+            logger.error(f"❌ Failed to dequeue batch: {e}")
+            return []
         
-        for priority, queue_key in self.priority_queues.items():
+        messages = []
+        for i in range(0, len(flat), 2):
             try:
-                count = await self.redis_client.zcard(queue_key)
-                stats[priority.value] = count
+                messages.append(BroadcastMessage.from_dict(json.loads(flat[i + 1])))
             except Exception as e:
-                logger.error(f"❌ Failed to get stats for {priority.value} queue: {e}")
-                stats[priority.value] = 0
-        
-        return stats
+                logger.error(f"❌ Dropping undecodable message from {priorities[int(flat[i]) - 1].value} queue: {e}")
+        if messages:
+            logger.debug(f"📤 Dequeued {len(messages)} message(s)")
+        return messages
+    
+    async def dequeue_message(self, priority: MessagePriority = MessagePriority.URGENT) -> Optional[BroadcastMessage]:
+        """Get next message from specified priority queue."""
+        messages = await self.dequeue_batch(1, [priority])
+        return messages[0] if messages else None
+    
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """Get statistics for all message queues."""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for queue_key in self.priority_queues.values():
+                pipe.zcard(queue_key)
+            counts = await pipe.execute()
+            return {priority.value: count for priority, count in zip(self.priority_queues, counts)}
+        except Exception as e:
+            logger.error(f"❌ Failed to get queue stats: {e}")
+            return {priority.value: 0 for priority in self.priority_queues}
 
 class MessageBroadcaster:
     """Advanced message broadcasting system."""
@@ -185,7 +248,7 @@ class MessageBroadcaster:
         self.message_queue = MessageQueue(redis_client)
         self.delivery_receipts: Dict[str, List[DeliveryReceipt]] = defaultdict(list)
         self.batch_size = 50
-        self.batch_timeout = 1.0  # seconds
+        self._drain_requested = False
         self.retry_delays = [1, 5, 15, 60]  # seconds
         self.active_batches: Dict[str, asyncio.Task] = {}
         self.message_counter = 0
@@ -204,11 +267,7 @@ class MessageBroadcaster:
                 raise Exception("Failed to enqueue message")
             
             # Start batch processing if not already running
-            batch_key = f"batch_{message.priority.value}"
-            if batch_key not in self.active_batches or self.active_batches[batch_key].done():
-                self.active_batches[batch_key] = asyncio.create_task(
-                    self._process_message_batch(message.priority)
-                )
+            self._ensure_batch_processor()
             
             logger.info(f"📡 Message {message.id} queued for broadcasting")
             return message.id
@@ -217,6 +276,26 @@ class MessageBroadcaster:
             logger.error(f"❌ Failed to broadcast message: {e}")
             raise
     
+    async def broadcast_messages(self, messages: List[BroadcastMessage]) -> List[str]:
+        """Queue several messages with a single pipelined enqueue."""
+        for message in messages:
+            if not message.id:
+                self.message_counter += 1
+                message.id = f"broadcast_{int(datetime.now().timestamp())}_{self.message_counter}"
+        
+        if await self.message_queue.enqueue_messages(messages) == 0 and messages:
+            raise Exception("Failed to enqueue messages")
+        self._ensure_batch_processor()
+        logger.info(f"📡 {len(messages)} messages queued for broadcasting")
+        return [message.id for message in messages]
+    
+    def _ensure_batch_processor(self):
+        """Start the drain task unless one is already running."""
+        self._drain_requested = True
+        task = self.active_batches.get("drain")
+        if task is None or task.done():
+            self.active_batches["drain"] = asyncio.create_task(self._process_message_batch())
+    
     async def broadcast_to_channels(self, message: BroadcastMessage, channels: List[str]) -> str:
         """Broadcast a message to specific channels."""
         message.target_channels = channels
@@ -227,26 +306,30 @@ class MessageBroadcaster:
         message.target_users = user_ids
         return await self.broadcast_message(message)
     
-    async def _process_message_batch(self, priority: MessagePriority):
-        """Process a batch of messages for the given priority."""
-        batch_messages = []
-        start_time = datetime.now()
+    async def broadcast_to_sports(self, message: BroadcastMessage, sports: List[str]) -> str:
+        """Broadcast a message to connections following specific sports."""
+        message.target_sports = sports
+        return await self.broadcast_message(message)
+    
+    async def _process_message_batch(self, priority: Optional[MessagePriority] = None):
+        """
+        Drain the queues batch by batch until they are empty.
         
+        Each batch is one atomic Redis call, highest priority first, so
+        throughput is bounded by socket writes rather than round trips.
+        """
+        priorities = [priority] if priority else None
         try:
-            # Collect messages for batch processing
-            while len(batch_messages) < self.batch_size:
-                message = await self.message_queue.dequeue_message(priority)
-                if not message:
+            while True:
+                self._drain_requested = False
+                batch_messages = await self.message_queue.dequeue_batch(self.batch_size, priorities)
+                if not batch_messages:
+                    # Something was enqueued while the last pop was in flight
+                    if self._drain_requested:
+                        continue
                     break
                 
-                batch_messages.append(message)
-                
-                # Check if batch timeout reached
-                if (datetime.now() - start_time).total_seconds() >= self.batch_timeout:
-                    break
-            
-            if batch_messages:
-                logger.info(f"📦 Processing batch of {len(batch_messages)} {priority.value} priority messages")
+                logger.info(f"📦 Processing batch of {len(batch_messages)} messages")
                 await self._deliver_message_batch(batch_messages)
             
         except Exception as e:
@@ -255,6 +338,7 @@ class MessageBroadcaster:
     async def _deliver_message_batch(self, messages: List[BroadcastMessage]):
         """Deliver a batch of messages."""
         delivery_tasks = []
+        live_messages = []
         
         for message in messages:
             # Check if message has expired
@@ -265,6 +349,7 @@ class MessageBroadcaster:
             # Create delivery task
             task = asyncio.create_task(self._deliver_single_message(message))
             delivery_tasks.append(task)
+            live_messages.append(message)
         
         # Wait for all deliveries to complete
         if delivery_tasks:
@@ -272,7 +357,7 @@ class MessageBroadcaster:
             
             # Process results
             for i, result in enumerate(results):
-                message = messages[i]
+                message = live_messages[i]
                 if isinstance(result, Exception):
                     logger.error(f"❌ Failed to deliver message {message.id}: {result}")
                     await self._handle_delivery_failure(message, str(result))
@@ -282,40 +367,54 @@ class MessageBroadcaster:
     async def _deliver_single_message(self, message: BroadcastMessage) -> bool:
         """Deliver a single message with retry logic."""
         try:
-            # Determine target connections
-            target_connections = await self._get_target_connections(message)
-            
-            if not target_connections:
-                logger.warning(f"⚠️ No target connections found for message {message.id}")
-                return True  # Consider it successful if no targets
-            
-            # Create WebSocket message
-            ws_message = self.websocket_manager.WebSocketMessage(
-                type=self.websocket_manager.MessageType(message.type),
+            # Create WebSocket message, encoded once for every target connection
+            from src.services.websocket_service import WebSocketMessage, MessageType, encode_message
+            frame = encode_message(WebSocketMessage(
+                type=MessageType(message.type),
                 data=message.data,
                 timestamp=datetime.now(),
                 user_id=message.sender_id
-            )
+            ))
             
-            # Send to target connections
-            delivery_results = []
-            for connection_info in target_connections:
+            topics = self._get_target_topics(message)
+            if topics:
+                # Local subscribers are queued directly; instances with subscribers get the frame relayed
                 try:
-                    await self.websocket_manager.send_message(connection_info, ws_message)
-                    delivery_results.append(DeliveryReceipt(
+                    delivered = await self.websocket_manager.publish_to_topics(topics, frame)
+                    delivery_results = [DeliveryReceipt(
                         message_id=message.id,
-                        recipient_id=connection_info.session_id,
+                        recipient_id=f"{kind.value}:{key}",
                         delivered_at=datetime.now(),
                         status=MessageStatus.DELIVERED
-                    ))
+                    ) for kind, key in topics]
+                    logger.debug(f"📡 Message {message.id} queued for {delivered} local session(s)")
                 except Exception as e:
-                    delivery_results.append(DeliveryReceipt(
+                    delivery_results = [DeliveryReceipt(
                         message_id=message.id,
-                        recipient_id=connection_info.session_id,
+                        recipient_id=f"{kind.value}:{key}",
                         delivered_at=datetime.now(),
                         status=MessageStatus.FAILED,
                         error_message=str(e)
-                    ))
+                    ) for kind, key in topics]
+            else:
+                # Untargeted: every instance (this one included) fans out to its own sockets,
+                # since whichever instance popped the message holds only a share of them
+                try:
+                    await self.websocket_manager.broadcast_message(frame)
+                    delivery_results = [DeliveryReceipt(
+                        message_id=message.id,
+                        recipient_id="all",
+                        delivered_at=datetime.now(),
+                        status=MessageStatus.DELIVERED
+                    )]
+                except Exception as e:
+                    delivery_results = [DeliveryReceipt(
+                        message_id=message.id,
+                        recipient_id="all",
+                        delivered_at=datetime.now(),
+                        status=MessageStatus.FAILED,
+                        error_message=str(e)
+                    )]
             
             # Store delivery receipts
             self.delivery_receipts[message.id].extend(delivery_results)
@@ -332,30 +431,29 @@ class MessageBroadcaster:
             await self._handle_delivery_failure(message, str(e))
             return False
     
-    async def _get_target_connections(self, message: BroadcastMessage) -> List:
-        """Get target connections based on message configuration."""
-        target_connections = []
-        
-        # Get all active connections
-        all_connections = list(self.websocket_manager.active_connections.values())
-        
-        if message.target_channels:
-            # Filter by channels
-            for connection_info in all_connections:
-                if any(channel in connection_info.subscriptions for channel in message.target_channels):
-                    target_connections.append(connection_info)
+    @staticmethod
+    def _get_target_topics(message: BroadcastMessage) -> List:
+        """Channel, user and sport topics the message is addressed to (empty for a broadcast)."""
+        from src.services.websocket_service import SubscriptionIndex, TopicKind
         
-        elif message.target_users:
-            # Filter by user IDs
-            for connection_info in all_connections:
-                if connection_info.user_id in message.target_users:
-                    target_connections.append(connection_info)
-        
-        else:
-            # Broadcast to all connections
-            target_connections = all_connections
+        topics = []
+        for channel in message.target_channels or []:
+            topics.append(SubscriptionIndex.topic(TopicKind.CHANNEL, channel))
+        for user_id in message.target_users or []:
+            topics.append(SubscriptionIndex.topic(TopicKind.USER, user_id))
+        for sport in message.target_sports or []:
+            topics.append(SubscriptionIndex.topic(TopicKind.SPORT, sport))
+        return topics
+    
+    async def _get_target_connections(self, message: BroadcastMessage) -> List:
+        """Get local target connections based on message configuration."""
+        topics = self._get_target_topics(message)
+        if topics:
+            # Inverted-index lookup: only interested sessions, no scan over every connection
+            return self.websocket_manager.get_topic_connections(topics)
         
-        return target_connections
+        # Broadcast to all connections
+        return list(self.websocket_manager.local_connections.values())
     
     async def _schedule_retry(self, message: BroadcastMessage, failed_deliveries: List[DeliveryReceipt]):
         """Schedule message retry with exponential backoff."""
@@ -381,11 +479,7 @@ class MessageBroadcaster:
         await self.message_queue.enqueue_message(message)
         
         # Start batch processing for retry
-        batch_key = f"retry_batch_{message.priority.value}"
-        if batch_key not in self.active_batches or self.active_batches[batch_key].done():
-            self.active_batches[batch_key] = asyncio.create_task(
-                self._process_message_batch(message.priority)
-            )
+        self._ensure_batch_processor()
     
     async def _handle_delivery_failure(self, message: BroadcastMessage, error: str):
         """Handle delivery failure."""
@@ -0,0 +1,196 @@
+"""
+Prometheus Metrics
+==================
+Process-wide counters, gauges and histograms for the platform, rendered in
+Prometheus text format by the /metrics endpoint.
+
+Request latency is recorded by MetricsMiddleware; database and Redis
+latency by the hooks installed with instrument_sqlalchemy() and
+instrument_redis(); everything else is observed at the call site. The same
+hooks feed spans to any active request profile (see profiling.py).
+"""
+
+import time
+import logging
+from typing import Callable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from src.services.profiling import record_span
+
+logger = logging.getLogger(__name__)
+
+# Sub-millisecond to 10s: covers cache hits through slow upstream calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Settlement runs fetch scoreboards and write in bulk: seconds to minutes
+BATCH_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served")
+
+# Storage
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database statement latency", ["operation"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Database statements that raised", ["operation"])
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Redis command latency (pipelines count as one)",
+    ["command"], buckets=LATENCY_BUCKETS
+)
+REDIS_COMMAND_ERRORS = Counter("redis_command_errors_total", "Redis commands that raised", ["command"])
+
+# Upstream sports data APIs
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external data APIs",
+    ["api"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Calls to external data APIs by outcome (2xx, 4xx, 5xx, error)",
+    ["api", "outcome"]
+)
+
+# Models and predictions
+MODEL_INFERENCE_DURATION = Histogram(
+    "model_inference_duration_seconds", "Model scoring time per call", ["sport", "mode"], buckets=LATENCY_BUCKETS
+)
+PREDICTIONS = Counter("predictions_total", "Predictions produced", ["sport", "source"])
+
+# Settlement
+SETTLEMENT_BATCH_DURATION = Histogram(
+    "settlement_batch_duration_seconds", "Duration of a settle_pending_bets run", buckets=BATCH_BUCKETS
+)
+BETS_SETTLED = Counter("bets_settled_total", "Bets settled by outcome", ["outcome"])
+
+# WebSocket fan-out
+BROADCAST_FANOUT_DURATION = Histogram(
+    "websocket_broadcast_fanout_seconds", "Time to queue one message on every target connection",
+    ["scope"], buckets=LATENCY_BUCKETS
+)
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "Open WebSocket connections on this instance")
+
+# Process
+APP_START_TIME = Gauge("app_start_time_seconds", "Unix time the application started")
+APP_UPTIME = Gauge("app_uptime_seconds", "Seconds since the application started")
+AGENTS_REGISTERED = Gauge("agents_registered", "Sport agents registered by this instance")
+
+_started_at = time.time()
+APP_START_TIME.set(_started_at)
+APP_UPTIME.set_function(lambda: time.time() - _started_at)
+
+
+def _safe(read: Callable[[], float]) -> Callable[[], float]:
+    """Gauge callback that reports 0 instead of failing the scrape."""
+    def collect() -> float:
+        try:
+            return float(read())
+        except Exception:
+            return 0.0
+    return collect
+
+
+def _websocket_connections() -> int:
+    from src.services.websocket_service import websocket_manager
+    return len(websocket_manager.local_connections)
+
+
+def _agents_registered() -> int:
+    from src.api.routes import head_agent
+    return len(head_agent._local_agent_refs) if head_agent else 0
+
+
+WEBSOCKET_CONNECTIONS.set_function(_safe(_websocket_connections))
+AGENTS_REGISTERED.set_function(_safe(_agents_registered))
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """Collapse a status code to 2xx/4xx/5xx (or 'error' when there was no response)."""
+    return f"{status_code // 100}xx" if status_code else "error"
+
+
+def render_latest() -> bytes:
+    """Current metrics in Prometheus text exposition format."""
+    return generate_latest()
+
+
+def instrument_sqlalchemy(engine) -> None:
+    """Time every statement executed through an (async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if getattr(sync_engine, "_metrics_instrumented", False):
+        return
+
+    def operation(statement: str) -> str:
+        return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            elapsed = time.perf_counter() - starts.pop()
+            DB_QUERY_DURATION.labels(operation(statement)).observe(elapsed)
+            record_span("db", operation(statement), elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        statement = exception_context.statement or ""
+        DB_QUERY_ERRORS.labels(operation(statement)).inc()
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_query_start"):
+            conn.info["metrics_query_start"].pop()
+
+    sync_engine._metrics_instrumented = True
+
+
+def instrument_redis() -> None:
+    """
+    Time commands on every redis.asyncio client in the process.
+
+    Wraps Redis.execute_command and Pipeline.execute once; a pipeline is
+    observed as a single PIPELINE round trip.
+    """
+    from redis.asyncio.client import Pipeline, Redis
+
+    if getattr(Redis, "_metrics_instrumented", False):
+        return
+
+    execute_command = Redis.execute_command
+    execute_pipeline = Pipeline.execute
+
+    async def timed_execute_command(self, *args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        start = time.perf_counter()
+        try:
+            return await execute_command(self, *args, **options)
+        except Exception:
+            REDIS_COMMAND_ERRORS.labels(command).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REDIS_COMMAND_DURATION.labels(command).observe(elapsed)
+            record_span("redis", command, elapsed)
+
+    async def timed_execute_pipeline(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await execute_pipeline(self, raise_on_error)
+        except Exception:
+            REDIS_COMMAND_ERRORS.labels("PIPELINE").inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REDIS_COMMAND_DURATION.labels("PIPELINE").observe(elapsed)
+            record_span("redis", "PIPELINE", elapsed)
+
+    Redis.execute_command = timed_execute_command
+    Pipeline.execute = timed_execute_pipeline
+    Redis._metrics_instrumented = True
+
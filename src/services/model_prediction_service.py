@@ -7,12 +7,16 @@ Uses historical data-trained models to make smarter predictions.
 
 import logging
 import pickle
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Union
 from pathlib import Path
 import asyncio
+import time
 from datetime import datetime
 import joblib
 from src.services.feature_service import feature_service
+from src.services.metrics import MODEL_INFERENCE_DURATION, PREDICTIONS
+from src.services.profiling import record_span
+from src.services.team_normalization import normalization_service
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +34,7 @@ class ModelPredictionService:
         self.models = {}  # Stores loaded model objects
         self.model_metadata = {}  # Stores metadata about models (type, structure, etc.)
         self.model_loaded = False
+        self.team_indexes = {}  # model key -> (team stats, NameResolutionIndex over them)
         
     async def initialize(self):
         """Load trained models if they exist."""
@@ -70,6 +75,7 @@ class ModelPredictionService:
             
             if isinstance(model_data, dict) and 'model' in model_data:
                 self.models['nhl'] = model_data
+                self._build_team_index('nhl', model_data.get('stats', {}))
                 self.model_metadata['nhl'] = {
                     'type': 'dict_with_model',
                     'has_scaler': 'scaler' in model_data,
@@ -135,7 +141,16 @@ class ModelPredictionService:
                 - model_used: Whether a trained model was used
         """
         sport_lower = sport.lower()
-        
+        start = time.perf_counter()
+        result = await self._predict_single(sport_lower, game_data, odds)
+        elapsed = time.perf_counter() - start
+        MODEL_INFERENCE_DURATION.labels(sport_lower, "single").observe(elapsed)
+        record_span("model", sport_lower, elapsed)
+        PREDICTIONS.labels(sport_lower, "model" if result.get('model_used') else "fallback").inc()
+        return result
+    
+    async def _predict_single(self, sport_lower: str, game_data: Dict[str, Any], odds: float) -> Dict[str, Any]:
+        """Route one game to its sport's model, falling back to the odds heuristic."""
         # Try NHL model
         if sport_lower in ['hockey', 'nhl'] and 'nhl' in self.models:
             try:
@@ -168,6 +183,230 @@ class ModelPredictionService:
         # Fallback to odds-based calculation if no model available
         return await self._get_fallback_prediction(odds)
     
+    async def get_model_predictions_batch(
+        self,
+        sport: str,
+        games: Sequence[Dict[str, Any]],
+        odds: Union[float, Sequence[float]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Get model predictions for a whole slate of one sport.
+        
+        Builds one feature matrix per sport and scores it with a single
+        scaler/predict_proba call instead of one call per game.
+        
+        Args:
+            sport: Sport type (nhl, ncaaf, ncaab, etc.)
+            games: Game information dicts (home_team, away_team, etc.)
+            odds: Betting odds per game (or one value for every game)
+            
+        Returns:
+            List of prediction dicts (same schema as get_model_prediction), in game order
+        """
+        games = list(games)
+        odds_list = [odds] * len(games) if isinstance(odds, (int, float)) else list(odds)
+        if len(odds_list) != len(games):
+            raise ValueError(f"Expected {len(games)} odds values, got {len(odds_list)}")
+        if not games:
+            return []
+        
+        sport_lower = sport.lower()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(games)
+        
+        start = time.perf_counter()
+        try:
+            if sport_lower in ['hockey', 'nhl'] and 'nhl' in self.models:
+                self._score_nhl_batch(games, odds_list, results)
+            elif sport_lower in ['nba', 'basketball'] and 'nba_win' in self.models:
+                self._score_nba_batch(games, odds_list, results)
+            elif sport_lower in ['tennis', 'tennis_atp', 'tennis_wta'] and ('tennis_atp' in self.models or 'tennis_wta' in self.models):
+                self._score_tennis_batch(games, odds_list, results, sport_lower)
+        except Exception as e:
+            logger.warning(f"Batch model prediction failed for {sport}: {e}, scoring games individually")
+            results = [None] * len(games)
+        batch_scored = sum(result is not None for result in results)
+        if batch_scored:
+            elapsed = time.perf_counter() - start
+            MODEL_INFERENCE_DURATION.labels(sport_lower, "batch").observe(elapsed)
+            record_span("model", f"{sport_lower} batch", elapsed)
+            PREDICTIONS.labels(sport_lower, "model").inc(batch_scored)
+        
+        # Games without a batched score (unknown teams, no model, etc.) take the single-game path
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = await self.get_model_prediction(sport, games[i], odds_list[i])
+        
+        return results
+    
+    @staticmethod
+    def _implied_probability(odds: float) -> float:
+        """Implied probability of American odds."""
+        if odds > 0:
+            return 100 / (odds + 100)
+        return abs(odds) / (abs(odds) + 100)
+    
+    @staticmethod
+    def _positive_class_probabilities(model, X):
+        """Probability of the positive (home/P1 win) class for every row of X."""
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(X)[:, 1]
+        import numpy as np
+        return np.clip(np.asarray(model.predict(X), dtype=float), 0.1, 0.9)
+    
+    def _nhl_components(self):
+        model_data = self.models['nhl']
+        model = model_data.get('model')
+        scaler = model_data.get('scaler')
+        team_stats = model_data.get('stats', {})
+        if not model or not scaler or not team_stats:
+            raise ValueError("NHL model missing required components")
+        return model_data, model, scaler, team_stats
+    
+    def _find_nhl_team(self, name: str, team_stats: Dict[str, Any]) -> Optional[str]:
+        """Match a team name against the NHL model's stats keys."""
+        # Try exact match first
+        if name in team_stats:
+            return name
+        indexed_stats, index = self.team_indexes.get('nhl', (None, None))
+        if indexed_stats is not team_stats:
+            index = self._build_team_index('nhl', team_stats)
+        return index.resolve(name)
+    
+    def _build_team_index(self, model_key: str, team_stats: Dict[str, Any]):
+        """Build (and remember) the name resolution index for a model's team stats."""
+        index = normalization_service.build_index(team_stats.keys())
+        self.team_indexes[model_key] = (team_stats, index)
+        return index
+    
+    def _nhl_feature_row(self, model_data: Dict[str, Any], team_stats: Dict[str, Any], game_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the NHL model feature dict for one game (raises ValueError on unknown teams)."""
+        home_team = game_data.get('home_team', '')
+        away_team = game_data.get('away_team', '')
+        
+        home_key = self._find_nhl_team(home_team, team_stats)
+        away_key = self._find_nhl_team(away_team, team_stats)
+        
+        if not home_key or not away_key:
+            raise ValueError(f"Teams not found in model stats: {home_team}, {away_team}")
+        
+        # Get team stats
+        hs = team_stats[home_key]
+        ast = team_stats[away_key]
+        
+        # Build feature vector (based on nhl_predictions.py structure)
+        elite_home = model_data.get('elite_home', set())
+        road_warriors = model_data.get('road_warriors', set())
+        high_scoring = model_data.get('high_scoring', set())
+        low_scoring = model_data.get('low_scoring', set())
+        
+        return {
+            'h_gf': hs.get('gf', 0), 'h_ga': hs.get('ga', 0),
+            'a_gf': ast.get('gf', 0), 'a_ga': ast.get('ga', 0),
+            'h_wpct': hs.get('wpct', 0.5), 'a_wpct': ast.get('wpct', 0.5),
+            'h_home_pct': hs.get('home_pct', 0.5), 'a_away_pct': ast.get('away_pct', 0.5),
+            'h_l5': hs.get('l5', 0.5), 'a_l5': ast.get('l5', 0.5),
+            'h_l10': hs.get('l10', 0.5), 'a_l10': ast.get('l10', 0.5),
+            'h_games': hs.get('games', 0), 'a_games': ast.get('games', 0),
+            'h_diff': hs.get('diff', 0), 'a_diff': ast.get('diff', 0),
+            'h_elite_home': 1 if home_key in elite_home else 0,
+            'a_road_warrior': 1 if away_key in road_warriors else 0,
+            'h_high_scoring': 1 if home_key in high_scoring else 0,
+            'a_high_scoring': 1 if away_key in high_scoring else 0,
+            'h_low_scoring': 1 if home_key in low_scoring else 0,
+            'a_low_scoring': 1 if away_key in low_scoring else 0,
+            'is_february': 1 if datetime.now().month == 2 else 0,
+            'h_b2b': 0,  # Would need schedule data
+            'a_b2b': 0,
+        }
+    
+    def _nhl_result(self, prob: float, odds: float) -> Dict[str, Any]:
+        model_probability = float(prob)
+        model_confidence = 0.75  # Higher confidence for trained model
+        return {
+            'model_probability': model_probability,
+            'confidence': model_confidence,
+            'edge': model_probability - self._implied_probability(odds),
+            'reasoning': f"NHL trained model prediction (confidence: {model_confidence:.1%})",
+            'model_used': True
+        }
+    
+    def _score_nhl_batch(self, games, odds_list, results):
+        """Score every NHL game with known teams in one scaler/predict_proba call."""
+        import pandas as pd
+        
+        model_data, model, scaler, team_stats = self._nhl_components()
+        rows, indices = [], []
+        for i, game_data in enumerate(games):
+            try:
+                rows.append(self._nhl_feature_row(model_data, team_stats, game_data))
+                indices.append(i)
+            except ValueError as e:
+                logger.debug(f"NHL batch skipping game: {e}")
+        if not rows:
+            return
+        
+        X_pred_s = scaler.transform(pd.DataFrame(rows))
+        probs = self._positive_class_probabilities(model, X_pred_s)
+        for i, prob in zip(indices, probs):
+            results[i] = self._nhl_result(prob, odds_list[i])
+    
+    def _score_nba_batch(self, games, odds_list, results):
+        """Score every NBA game with available features in one predict_proba call."""
+        import numpy as np
+        import pandas as pd
+        from src.services.feature_service import NBA_FEATURE_COLUMNS
+        
+        model = self.models['nba_win']
+        matrix, found = feature_service.get_nba_feature_matrix(
+            [(game_data.get('home_team'), game_data.get('away_team')) for game_data in games],
+            [self._parse_commence_time(game_data) for game_data in games]
+        )
+        indices = [int(i) for i in np.flatnonzero(found)]
+        if not indices:
+            return
+        
+        X = pd.DataFrame(matrix[found], columns=NBA_FEATURE_COLUMNS)
+        probs = self._positive_class_probabilities(model, X)
+        for i, prob in zip(indices, probs):
+            results[i] = {
+                'model_probability': float(prob),
+                'confidence': 0.7,
+                'edge': float(prob) - self._implied_probability(odds_list[i]),
+                'reasoning': "NBA ML Model (Last 5 Form)",
+                'model_used': True
+            }
+    
+    def _score_tennis_batch(self, games, odds_list, results, sport: str):
+        """Score tennis matches with one predict_proba call per tour."""
+        import pandas as pd
+        
+        by_tour: Dict[str, Any] = {}
+        for i, game_data in enumerate(games):
+            tour = self._tennis_tour(game_data, sport)
+            model = self.models.get(f"tennis_{tour}") or self.models.get('tennis_atp')
+            if not model:
+                continue
+            prepared = self._tennis_features(game_data)
+            if prepared is None:
+                continue
+            features, odds1_decimal = prepared
+            entry = by_tour.setdefault(tour, {"model": model, "frames": [], "indices": [], "odds": []})
+            entry["frames"].append(features)
+            entry["indices"].append(i)
+            entry["odds"].append(odds1_decimal)
+        
+        for tour, entry in by_tour.items():
+            X = pd.concat(entry["frames"], ignore_index=True)
+            probs = entry["model"].predict_proba(X)[:, 1]
+            for i, prob, odds1_decimal in zip(entry["indices"], probs, entry["odds"]):
+                results[i] = {
+                    'model_probability': prob,
+                    'confidence': 0.75,
+                    'edge': prob - 1 / odds1_decimal,
+                    'reasoning': f"Tennis {tour.upper()} ML Model",
+                    'model_used': True
+                }
+    
     async def _get_nhl_model_prediction(
         self,
         game_data: Dict[str, Any],
@@ -175,98 +414,17 @@ class ModelPredictionService:
     ) -> Dict[str, Any]:
         """Get prediction from NHL model (pickle format with model/scaler/stats)."""
         try:
-            model_data = self.models['nhl']
-            
-            # NHL model structure: {'model', 'scaler', 'stats', 'elite_home', 'road_warriors', etc.}
-            model = model_data.get('model')
-            scaler = model_data.get('scaler')
-            team_stats = model_data.get('stats', {})
-            
-            if not model or not scaler or not team_stats:
-                raise ValueError("NHL model missing required components")
-            
-            home_team = game_data.get('home_team', '')
-            away_team = game_data.get('away_team', '')
-            
-            # Match team names (simple matching - could be improved)
-            def find_team(name):
-                # Try exact match first
-                if name in team_stats:
-                    return name
-                # Try partial match (team name or city)
-                for team in team_stats:
-                    if name.split()[-1] in team or team.split()[-1] in name:
-                        return team
-                return None
-            
-            home_key = find_team(home_team)
-            away_key = find_team(away_team)
-            
-            if not home_key or not away_key:
-                raise ValueError(f"Teams not found in model stats: {home_team}, {away_team}")
-            
-            # Get team stats
-            hs = team_stats[home_key]
-            ast = team_stats[away_key]
-            
-            # Build feature vector (based on nhl_predictions.py structure)
-            elite_home = model_data.get('elite_home', set())
-            road_warriors = model_data.get('road_warriors', set())
-            high_scoring = model_data.get('high_scoring', set())
-            low_scoring = model_data.get('low_scoring', set())
-            
-            from datetime import datetime
             import pandas as pd
             
-            feat = {
-                'h_gf': hs.get('gf', 0), 'h_ga': hs.get('ga', 0),
-                'a_gf': ast.get('gf', 0), 'a_ga': ast.get('ga', 0),
-                'h_wpct': hs.get('wpct', 0.5), 'a_wpct': ast.get('wpct', 0.5),
-                'h_home_pct': hs.get('home_pct', 0.5), 'a_away_pct': ast.get('away_pct', 0.5),
-                'h_l5': hs.get('l5', 0.5), 'a_l5': ast.get('l5', 0.5),
-                'h_l10': hs.get('l10', 0.5), 'a_l10': ast.get('l10', 0.5),
-                'h_games': hs.get('games', 0), 'a_games': ast.get('games', 0),
-                'h_diff': hs.get('diff', 0), 'a_diff': ast.get('diff', 0),
-                'h_elite_home': 1 if home_key in elite_home else 0,
-                'a_road_warrior': 1 if away_key in road_warriors else 0,
-                'h_high_scoring': 1 if home_key in high_scoring else 0,
-                'a_high_scoring': 1 if away_key in high_scoring else 0,
-                'h_low_scoring': 1 if home_key in low_scoring else 0,
-                'a_low_scoring': 1 if away_key in low_scoring else 0,
-                'is_february': 1 if datetime.now().month == 2 else 0,
-                'h_b2b': 0,  # Would need schedule data
-                'a_b2b': 0,
-            }
+            model_data, model, scaler, team_stats = self._nhl_components()
+            feat = self._nhl_feature_row(model_data, team_stats, game_data)
             
             # Prepare features and scale
-            X_pred = pd.DataFrame([feat])
-            X_pred_s = scaler.transform(X_pred)
-            
-            # Get prediction
-            if hasattr(model, 'predict_proba'):
-                prob = model.predict_proba(X_pred_s)[0][1]  # Probability home wins
-            else:
-                prob_raw = model.predict(X_pred_s)[0]
-                prob = max(0.1, min(0.9, float(prob_raw)))
-            
-            model_probability = float(prob)
-            model_confidence = 0.75  # Higher confidence for trained model
-            
-            # Calculate implied probability from odds
-            if odds > 0:
-                implied_prob = 100 / (odds + 100)
-            else:
-                implied_prob = abs(odds) / (abs(odds) + 100)
-            
-            edge = model_probability - implied_prob
+            X_pred_s = scaler.transform(pd.DataFrame([feat]))
             
-            return {
-                'model_probability': model_probability,
-                'confidence': model_confidence,
-                'edge': edge,
-                'reasoning': f"NHL trained model prediction (confidence: {model_confidence:.1%})",
-                'model_used': True
-            }
+            # Get prediction (probability home wins)
+            prob = self._positive_class_probabilities(model, X_pred_s)[0]
+            return self._nhl_result(prob, odds)
             
         except Exception as e:
             logger.warning(f"NHL model prediction error: {e}", exc_info=True)
@@ -399,19 +557,10 @@ class ModelPredictionService:
             if not model:
                 return await self._get_fallback_prediction(odds)
                 
-            # Parse game date (ISO format)
-            game_date = None
-            if game_data.get('commence_time'):
-                try:
-                    game_date = datetime.fromisoformat(str(game_data.get('commence_time')).replace('Z', '+00:00'))
-                    # Make naive if needed to match stats
-                    game_date = game_date.replace(tzinfo=None)
-                except: pass
-
             features = feature_service.get_nba_features(
                 game_data.get('home_team'), 
                 game_data.get('away_team'),
-                game_date=game_date
+                game_date=self._parse_commence_time(game_data)
             )
             
             if features is None or features.empty:
@@ -452,7 +601,7 @@ class ModelPredictionService:
         """Get prediction from Tennis model."""
         try:
             # Determine tour
-            tour = 'wta' if 'wta' in sport or 'women' in str(game_data).lower() else 'atp'
+            tour = self._tennis_tour(game_data, sport)
             model = self.models.get(f"tennis_{tour}")
             
             if not model:
@@ -462,32 +611,10 @@ class ModelPredictionService:
             if not model: 
                 return await self._get_fallback_prediction(odds)
             
-            p1 = game_data.get('home_team')
-            p2 = game_data.get('away_team')
-            
-            # Find Odds from Bookmakers (Decimal required for model)
-            odds1_am = 0
-            odds2_am = 0
-            
-            bookmakers = game_data.get('bookmakers', [])
-            if bookmakers:
-                h2h = next((m for m in bookmakers[0].get('markets', []) if m['key'] == 'h2h'), None)
-                if h2h:
-                    for outcome in h2h.get('outcomes', []):
-                        if outcome['name'] == p1: odds1_am = outcome['price']
-                        if outcome['name'] == p2: odds2_am = outcome['price']
-            
-            if odds1_am == 0 or odds2_am == 0:
-                return await self._get_fallback_prediction(odds)
-                
-            def to_decimal(am):
-                if am > 0: return (am / 100) + 1
-                return (100 / abs(am)) + 1
-                
-            features = feature_service.get_tennis_features(p1, p2, to_decimal(odds1_am), to_decimal(odds2_am))
-            
-            if features is None or features.empty:
+            prepared = self._tennis_features(game_data)
+            if prepared is None:
                  return await self._get_fallback_prediction(odds)
+            features, odds1_decimal = prepared
                  
             # Predict (Returns Probability of P1 winning usually, if trained on P1 features)
             # Tennis Feature Eng flipped rows randomly. Target_Win is 1 if P1 wins.
@@ -499,8 +626,8 @@ class ModelPredictionService:
             # "odds" passed to function is for the specific bet we are analyzing?
             # If Model Service is just "Predict Game Outcome", we usually return Home/P1 win prob.
             
-            # Implied Prob of P1 (derived from odds1_am)
-            implied = 1 / to_decimal(odds1_am)
+            # Implied Prob of P1 (derived from P1's bookmaker odds)
+            implied = 1 / odds1_decimal
             edge = prob - implied
             
             return {
@@ -515,6 +642,55 @@ class ModelPredictionService:
             logger.debug(f"Tennis prediction failed: {e}")
             return await self._get_fallback_prediction(odds)
 
+    @staticmethod
+    def _parse_commence_time(game_data: Dict[str, Any]) -> Optional[datetime]:
+        """Parse a game's ISO commence_time into a naive datetime (to match stats)."""
+        if not game_data.get('commence_time'):
+            return None
+        try:
+            return datetime.fromisoformat(str(game_data.get('commence_time')).replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _tennis_tour(game_data: Dict[str, Any], sport: str) -> str:
+        return 'wta' if 'wta' in sport or 'women' in str(game_data).lower() else 'atp'
+    
+    @staticmethod
+    def _tennis_features(game_data: Dict[str, Any]):
+        """
+        Build tennis model features from the match's h2h bookmaker odds.
+        
+        Returns:
+            (features DataFrame, P1 decimal odds), or None if odds/features are missing
+        """
+        p1 = game_data.get('home_team')
+        p2 = game_data.get('away_team')
+        
+        # Find Odds from Bookmakers (Decimal required for model)
+        odds1_am = 0
+        odds2_am = 0
+        
+        bookmakers = game_data.get('bookmakers', [])
+        if bookmakers:
+            h2h = next((m for m in bookmakers[0].get('markets', []) if m['key'] == 'h2h'), None)
+            if h2h:
+                for outcome in h2h.get('outcomes', []):
+                    if outcome['name'] == p1: odds1_am = outcome['price']
+                    if outcome['name'] == p2: odds2_am = outcome['price']
+        
+        if odds1_am == 0 or odds2_am == 0:
+            return None
+            
+        def to_decimal(am):
+            if am > 0: return (am / 100) + 1
+            return (100 / abs(am)) + 1
+            
+        features = feature_service.get_tennis_features(p1, p2, to_decimal(odds1_am), to_decimal(odds2_am))
+        if features is None or features.empty:
+            return None
+        return features, to_decimal(odds1_am)
+
     def has_model_for_sport(self, sport: str) -> bool:
         """Check if we have a trained model for this sport."""
         sport_lower = sport.lower()
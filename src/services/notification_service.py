@@ -8,8 +8,8 @@ import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 import redis.asyncio as redis
 from collections import defaultdict
@@ -366,29 +366,96 @@ class NotificationRouter:
         """Deliver notification in-app (same as WebSocket for now)."""
         return await self._deliver_websocket(notification, preferences)
 
+# One round trip per inbox page: resolve the page of ids from the user's
+# sorted set, then read each body and the user's read state in the same call.
+# KEYS[1] = inbox zset, KEYS[2] = read-state hash
+# ARGV = cursor score ("+inf" for the first page), cursor id ("" for none),
+#        offset, limit, body key prefix
+# Returns a flat list of [id, score, body, read_at, ...] ("" when missing).
+# Body keys are derived inside the script, so this assumes a single-shard
+# deployment (standalone or Sentinel), which is what this service runs on.
+INBOX_PAGE_SCRIPT = """
+local limit = tonumber(ARGV[4])
+local ids, scores = {}, {}
+local max = ARGV[1]
+if ARGV[2] ~= '' then
+    -- Members sharing the cursor's score sort by id; keep those after it
+    local ties = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[1])
+    for i = #ties, 1, -1 do
+        if #ids < limit and ties[i] < ARGV[2] then
+            ids[#ids + 1] = ties[i]
+            scores[#scores + 1] = ARGV[1]
+        end
+    end
+    max = '(' .. ARGV[1]
+end
+if #ids < limit then
+    local rest = redis.call('ZREVRANGEBYSCORE', KEYS[1], max, '-inf', 'WITHSCORES',
+                            'LIMIT', tonumber(ARGV[3]), limit - #ids)
+    for i = 1, #rest, 2 do
+        ids[#ids + 1] = rest[i]
+        scores[#scores + 1] = rest[i + 1]
+    end
+end
+local result = {}
+for i = 1, #ids do
+    result[#result + 1] = ids[i]
+    result[#result + 1] = scores[i]
+    result[#result + 1] = redis.call('GET', ARGV[5] .. ids[i]) or ''
+    result[#result + 1] = redis.call('HGET', KEYS[2], ids[i]) or ''
+end
+return result
+"""
+
 class NotificationPersistence:
-    """Persist notifications in Redis."""
+    """
+    Persist notifications in Redis.
+
+    Features:
+    - Notification bodies stored once as JSON (notification:<id>)
+    - Per-user inbox sorted set of ids scored by timestamp, trimmed to the
+      newest max_inbox_size entries
+    - Per-user read state kept apart from the body, so bulk notifications
+      share one body across every recipient
+    - Writes go out as MULTI/EXEC pipelines; bulk fan-out in chunked pipelines
+    - Inbox pages (offset or cursor) load in a single scripted round trip
+    """
+    
+    NOTIFICATION_TTL = 86400 * 30  # 30 days
+    INBOX_TTL = 86400 * 90         # 90 days
+    PREFERENCES_TTL = 86400 * 365  # 1 year
     
     def __init__(self, redis_client: redis.Redis):
         self.redis_client = redis_client
         self.notification_prefix = "notification:"
         self.user_notifications_prefix = "user_notifications:"
+        self.read_state_prefix = "user_notifications_read:"
         self.preferences_prefix = "notification_preferences:"
+        self.max_inbox_size = 1000
+        self.bulk_chunk_size = 2500  # 10k recipients = 4 pipeline flushes
+        self._page_script = None  # Registered on first use; reloads itself if Redis drops its script cache
+    
+    @staticmethod
+    def _score(notification: Notification) -> float:
+        return round(notification.timestamp.timestamp() * 1000)
+    
+    def _add_to_inbox(self, pipe, user_id: str, notification_id: str, score: float):
+        user_key = f"{self.user_notifications_prefix}{user_id}"
+        pipe.zadd(user_key, {notification_id: score})
+        pipe.zremrangebyrank(user_key, 0, -(self.max_inbox_size + 1))  # Keep the newest max_inbox_size
+        pipe.expire(user_key, self.INBOX_TTL)
     
     async def store_notification(self, notification: Notification) -> bool:
         """Store notification in Redis."""
         try:
-            # Store notification data
-            notification_key = f"{self.notification_prefix}{notification.id}"
-            await self.redis_client.hset(notification_key, mapping=notification.to_dict())
-            await self.redis_client.expire(notification_key, 86400 * 30)  # 30 days TTL
-            
-            # Add to user's notification list if recipient specified
-            if notification.recipient_id:
-                user_key = f"{self.user_notifications_prefix}{notification.recipient_id}"
-                await self.redis_client.lpush(user_key, notification.id)
-                await self.redis_client.ltrim(user_key, 0, 999)  # Keep last 1000 notifications
-                await self.redis_client.expire(user_key, 86400 * 90)  # 90 days TTL
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(f"{self.notification_prefix}{notification.id}", json.dumps(notification.to_dict()),
+                         ex=self.NOTIFICATION_TTL)
+                
+                # Add to user's inbox if recipient specified
+                if notification.recipient_id:
+                    self._add_to_inbox(pipe, notification.recipient_id, notification.id, self._score(notification))
+                await pipe.execute()
             
             logger.info(f"✅ Notification {notification.id} stored in Redis")
             return True
@@ -397,32 +464,102 @@ class NotificationPersistence:
             logger.error(f"❌ Failed to store notification {notification.id}: {e}")
             return False
     
+    async def store_bulk_notification(self, notification: Notification, user_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Write one shared body and push its id into every recipient's inbox.
+        
+        Inbox updates go out in pipelines of bulk_chunk_size users, so a 10k
+        user send is a handful of round trips.
+        
+        Returns:
+            (user ids stored, user ids that failed)
+        """
+        try:
+            await self.redis_client.set(f"{self.notification_prefix}{notification.id}",
+                                        json.dumps(notification.to_dict()), ex=self.NOTIFICATION_TTL)
+        except Exception as e:
+            logger.error(f"❌ Failed to store bulk notification {notification.id}: {e}")
+            return [], list(user_ids)
+        
+        score = self._score(notification)
+        stored, failed = [], []
+        for start in range(0, len(user_ids), self.bulk_chunk_size):
+            chunk = user_ids[start:start + self.bulk_chunk_size]
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for user_id in chunk:
+                        self._add_to_inbox(pipe, user_id, notification.id, score)
+                    await pipe.execute()
+                stored.extend(chunk)
+            except Exception as e:
+                logger.error(f"❌ Failed to fan out notification {notification.id} to {len(chunk)} users: {e}")
+                failed.extend(chunk)
+        
+        logger.info(f"✅ Bulk notification {notification.id} stored for {len(stored)} users")
+        return stored, failed
+    
     async def get_notification(self, notification_id: str) -> Optional[Notification]:
         """Retrieve notification from Redis."""
         try:
-            notification_key = f"{self.notification_prefix}{notification_id}"
-            data = await self.redis_client.hgetall(notification_key)
+            data = await self.redis_client.get(f"{self.notification_prefix}{notification_id}")
             
             if data:
-                return Notification.from_dict(data)
+                return Notification.from_dict(json.loads(data))
             return None
             
         except Exception as e:
             logger.error(f"❌ Failed to get notification {notification_id}: {e}")
             return None
     
+    @staticmethod
+    def _encode_cursor(score: Any, notification_id: str) -> str:
+        return f"{int(float(score))}:{notification_id}"
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, str]:
+        score, _, notification_id = cursor.partition(":")
+        int(score)  # Validate
+        return score, notification_id
+    
+    async def get_user_notifications_page(self, user_id: str, limit: int = 50, cursor: Optional[str] = None,
+                                          offset: int = 0) -> Tuple[List[Notification], Optional[str]]:
+        """
+        Load one page of a user's inbox, newest first.
+        
+        Pass the returned cursor back to get the next page; unlike offsets it
+        stays stable while new notifications arrive.
+        
+        Returns:
+            (notifications, next cursor or None when the inbox is exhausted)
+        """
+        max_score, cursor_id = self._decode_cursor(cursor) if cursor else ("+inf", "")
+        keys = [f"{self.user_notifications_prefix}{user_id}", f"{self.read_state_prefix}{user_id}"]
+        if self._page_script is None:
+            self._page_script = self.redis_client.register_script(INBOX_PAGE_SCRIPT)
+        rows = await self._page_script(
+            keys=keys, args=[max_score, cursor_id, 0 if cursor else offset, limit, self.notification_prefix]
+        )
+        
+        notifications = []
+        for i in range(0, len(rows), 4):
+            notification_id, _, body, read_at = rows[i:i + 4]
+            if not body:
+                continue  # Body expired before the inbox entry
+            notification = Notification.from_dict(json.loads(body))
+            if read_at:
+                notification.status = NotificationStatus.READ
+                notification.read_at = datetime.fromisoformat(read_at)
+            notifications.append(notification)
+        
+        next_cursor = None
+        if rows and len(rows) // 4 == limit:
+            next_cursor = self._encode_cursor(rows[-3], rows[-4])
+        return notifications, next_cursor
+    
     async def get_user_notifications(self, user_id: str, limit: int = 50, offset: int = 0) -> List[Notification]:
         """Get notifications for a specific user."""
         try:
-            user_key = f"{self.user_notifications_prefix}{user_id}"
-            notification_ids = await self.redis_client.lrange(user_key, offset, offset + limit - 1)
-            
-            notifications = []
-            for notification_id in notification_ids:
-                notification = await self.get_notification(notification_id)
-                if notification:
-                    notifications.append(notification)
-            
+            notifications, _ = await self.get_user_notifications_page(user_id, limit, offset=offset)
             return notifications
             
         except Exception as e:
@@ -432,13 +569,16 @@ class NotificationPersistence:
     async def mark_notification_read(self, notification_id: str, user_id: str) -> bool:
         """Mark notification as read."""
         try:
-            notification = await self.get_notification(notification_id)
-            if notification:
-                notification.status = NotificationStatus.READ
-                notification.read_at = datetime.now()
-                await self.store_notification(notification)
-                return True
-            return False
+            user_key = f"{self.user_notifications_prefix}{user_id}"
+            if await self.redis_client.zscore(user_key, notification_id) is None:
+                return False
+            
+            read_key = f"{self.read_state_prefix}{user_id}"
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(read_key, notification_id, datetime.now().isoformat())
+                pipe.expire(read_key, self.INBOX_TTL)
+                await pipe.execute()
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to mark notification {notification_id} as read: {e}")
@@ -448,8 +588,7 @@ class NotificationPersistence:
         """Store user notification preferences."""
         try:
             preferences_key = f"{self.preferences_prefix}{preferences.user_id}"
-            await self.redis_client.hset(preferences_key, mapping=preferences.to_dict())
-            await self.redis_client.expire(preferences_key, 86400 * 365)  # 1 year TTL
+            await self.redis_client.set(preferences_key, json.dumps(preferences.to_dict()), ex=self.PREFERENCES_TTL)
             
             logger.info(f"✅ Preferences stored for user {preferences.user_id}")
             return True
@@ -462,15 +601,30 @@ class NotificationPersistence:
         """Get user notification preferences."""
         try:
             preferences_key = f"{self.preferences_prefix}{user_id}"
-            data = await self.redis_client.hgetall(preferences_key)
+            data = await self.redis_client.get(preferences_key)
             
             if data:
-                return NotificationPreference.from_dict(data)
+                return NotificationPreference.from_dict(json.loads(data))
             return None
             
         except Exception as e:
             logger.error(f"❌ Failed to get preferences for user {user_id}: {e}")
             return None
+    
+    async def get_preferences_many(self, user_ids: List[str]) -> Dict[str, NotificationPreference]:
+        """Preferences for many users via chunked MGET; users without any are omitted."""
+        preferences = {}
+        for start in range(0, len(user_ids), self.bulk_chunk_size):
+            chunk = user_ids[start:start + self.bulk_chunk_size]
+            try:
+                values = await self.redis_client.mget([f"{self.preferences_prefix}{u}" for u in chunk])
+            except Exception as e:
+                logger.error(f"❌ Failed to get preferences for {len(chunk)} users: {e}")
+                continue
+            for user_id, data in zip(chunk, values):
+                if data:
+                    preferences[user_id] = NotificationPreference.from_dict(json.loads(data))
+        return preferences
 
 class NotificationService:
     """Main notification service."""
@@ -516,27 +670,79 @@ class NotificationService:
             raise
     
     async def send_bulk_notification(self, notification: Notification, user_ids: List[str]) -> Dict[str, Any]:
-        """Send notification to multiple users."""
+        """
+        Send notification to multiple users.
+        
+        The body is stored once under a single id and only that id is pushed
+        into each recipient's inbox; WebSocket delivery goes out as one topic
+        publish to every recipient whose preferences allow it.
+        """
         results = {
             "successful": [],
             "failed": [],
             "total": len(user_ids)
         }
         
-        for user_id in user_ids:
-            try:
-                notification_id = await self.send_notification(notification, user_id)
-                results["successful"].append({"user_id": user_id, "notification_id": notification_id})
-            except Exception as e:
-                results["failed"].append({"user_id": user_id, "error": str(e)})
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return results
+        
+        notification_id = notification.id
+        if not notification_id:
+            self.notification_counter += 1
+            notification_id = f"notif_{int(datetime.now().timestamp())}_{self.notification_counter}"
+        # Shared body; recipients live in their inboxes. Copied so the caller's object is untouched
+        notification = replace(notification, id=notification_id, recipient_id=None)
+        
+        stored, failed = await self.persistence.store_bulk_notification(notification, user_ids)
+        results["successful"] = [{"user_id": u, "notification_id": notification.id} for u in stored]
+        results["failed"] = [{"user_id": u, "error": "storage failed"} for u in failed]
+        
+        try:
+            await self._deliver_bulk(notification, stored)
+        except Exception as e:
+            logger.error(f"❌ Bulk delivery failed for notification {notification.id}: {e}")
         
         logger.info(f"📡 Bulk notification sent: {len(results['successful'])}/{results['total']} successful")
         return results
     
+    async def _deliver_bulk(self, notification: Notification, user_ids: List[str]):
+        """Push one WebSocket frame to every recipient that accepts it."""
+        preferences = await self.persistence.get_preferences_many(user_ids)
+        recipients = []
+        for user_id in user_ids:
+            user_preferences = preferences.get(user_id, self.filter.default_preferences)
+            if not self.filter.should_deliver_notification(notification, user_preferences):
+                continue
+            channels = self.filter.get_delivery_channels(notification, user_preferences)
+            if NotificationChannel.WEBSOCKET in channels or NotificationChannel.IN_APP in channels:
+                recipients.append(user_id)
+        if not recipients:
+            return
+        
+        from src.services.websocket_service import WebSocketMessage, MessageType, SubscriptionIndex, TopicKind
+        
+        ws_message = WebSocketMessage(
+            type=MessageType.NOTIFICATION,
+            data={
+                "notification": notification.to_dict()
+            },
+            timestamp=datetime.now()
+        )
+        
+        topics = [SubscriptionIndex.topic(TopicKind.USER, user_id) for user_id in recipients]
+        await self.websocket_manager.publish_to_topics(topics, ws_message.to_dict())
+        notification.status = NotificationStatus.SENT
+    
     async def get_user_notifications(self, user_id: str, limit: int = 50, offset: int = 0) -> List[Notification]:
         """Get notifications for a user."""
         return await self.persistence.get_user_notifications(user_id, limit, offset)
     
+    async def get_user_notifications_page(self, user_id: str, limit: int = 50,
+                                          cursor: Optional[str] = None) -> Tuple[List[Notification], Optional[str]]:
+        """Get a cursor-paged slice of a user's notifications."""
+        return await self.persistence.get_user_notifications_page(user_id, limit, cursor)
+    
     async def mark_as_read(self, notification_id: str, user_id: str) -> bool:
         """Mark notification as read."""
         return await self.persistence.mark_notification_read(notification_id, user_id)
@@ -556,7 +762,7 @@ class NotificationService:
             notifications = await self.get_user_notifications(user_id, limit=1000)
             
             total_notifications = len(notifications)
-            unread_notifications = len([n for n in notifications if n.status == NotificationStatus.SENT])
+            unread_notifications = len([n for n in notifications if n.status != NotificationStatus.READ])
             read_notifications = len([n for n in notifications if n.status == NotificationStatus.READ])
             
             # Count by type
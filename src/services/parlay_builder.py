@@ -5,15 +5,38 @@ Creates optimal parlay combinations based on AI predictions.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import itertools
+from dataclasses import dataclass
+from math import comb, log
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import uuid
 
-from src.services.playoff_detector import playoff_detector
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ParlayCandidatePool:
+    """
+    Eligible parlay legs converted to arrays once, so every parlay size and
+    risk level can be searched without touching the prediction dicts again.
+    """
+    legs: List[Dict[str, Any]]
+    decimal_odds: np.ndarray  # Decimal odds per leg
+    probabilities: np.ndarray  # Model win probability per leg
+    confidence: np.ndarray
+    edge: np.ndarray
+    game_codes: np.ndarray  # Integer code per game_id
+    leg_codes: np.ndarray  # Integer code per (game_id, bet_type)
+    log_values: np.ndarray  # log(probability * decimal_odds) - sums to log(1 + EV)
+    log_probabilities: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.legs)
+
+
 class ParlayBuilder:
     """
     Build parlay bets with optimal edge and risk management.
@@ -49,6 +72,12 @@ class ParlayBuilder:
                 "min_leg_edge": 0.02  # Lowered from 0.03 to allow more legs to qualify
             }
         }
+        
+        # Candidate search tuning: enumerate every combination when the pool is
+        # small enough, otherwise fall back to beam search
+        self.max_exhaustive_combinations = 250_000
+        self.combination_batch_size = 50_000
+        self.beam_width = 256
     
     def calculate_combined_odds(self, american_odds_list: List[float]) -> float:
         """
@@ -98,142 +127,310 @@ class ParlayBuilder:
         
         return combined
     
+    def prepare_candidates(self, predictions: List[Dict[str, Any]]) -> ParlayCandidatePool:
+        """
+        Convert predictions to a NumPy-backed candidate pool.
+        
+        The pool can be passed to build_parlay/find_top_parlays repeatedly
+        (e.g. for the daily 2/3/6-leg parlays) without re-deriving odds.
+        """
+        n = len(predictions)
+        american = np.array([float(p.get("odds", -110) or -110) for p in predictions], dtype=float)
+        provided_prob = np.array([float(p.get("probability", 0.5) or 0.5) for p in predictions], dtype=float)
+        confidence = np.array([float(p.get("confidence", 0) or 0) for p in predictions], dtype=float)
+        edge = np.array([float(p.get("edge", 0) or 0) for p in predictions], dtype=float)
+        
+        positive = american > 0
+        abs_odds = np.abs(american)
+        decimal_odds = np.where(positive, american / 100 + 1, 100 / np.maximum(abs_odds, 1e-9) + 1)
+        implied_prob = np.where(positive, 100 / (american + 100), abs_odds / (abs_odds + 100))
+        
+        # Model probability = implied probability + edge (what we think the true probability is),
+        # falling back to the provided probability when there is no positive edge
+        probabilities = np.where(edge > 0, np.clip(implied_prob + edge, 0.01, 0.99), provided_prob)
+        probabilities = np.clip(probabilities, 1e-9, 1.0)
+        
+        game_index: Dict[Any, int] = {}
+        leg_index: Dict[Tuple[Any, str], int] = {}
+        game_codes = np.empty(n, dtype=np.int64)
+        leg_codes = np.empty(n, dtype=np.int64)
+        for i, pred in enumerate(predictions):
+            game_id = pred.get("game_id")
+            bet_type = pred.get("bet_type", "moneyline")
+            game_codes[i] = game_index.setdefault(game_id, len(game_index))
+            leg_codes[i] = leg_index.setdefault((game_id, bet_type), len(leg_index))
+        
+        log_probabilities = np.log(probabilities)
+        return ParlayCandidatePool(
+            legs=list(predictions),
+            decimal_odds=decimal_odds,
+            probabilities=probabilities,
+            confidence=confidence,
+            edge=edge,
+            game_codes=game_codes,
+            leg_codes=leg_codes,
+            log_values=log_probabilities + np.log(decimal_odds),
+            log_probabilities=log_probabilities
+        )
+    
     def build_parlay(
         self,
         predictions: List[Dict[str, Any]],
         risk_level: str = "moderate",
-        num_legs: Optional[int] = None
+        num_legs: Optional[int] = None,
+        pool: Optional[ParlayCandidatePool] = None
     ) -> Optional[Dict[str, Any]]:
         """
-        Build a parlay from available predictions.
+        Build the highest expected-value parlay from available predictions.
         
         Args:
             predictions: List of prediction dicts with confidence, odds, etc.
             risk_level: conservative, moderate, or aggressive
             num_legs: Optional specific number of legs
+            pool: Optional pre-built candidate pool for these predictions
         
         Returns:
             Parlay recommendation or None
         """
+        parlays = self.find_top_parlays(predictions, risk_level, num_legs=num_legs, top_k=1, pool=pool)
+        if not parlays:
+            return None
+        
+        parlay = parlays[0]
+        
+        # Log detailed reasoning for 6-leg parlays
+        if num_legs == 6:
+            logger.info(
+                f"📊 6-leg parlay built: {parlay['confidence_level']} confidence "
+                f"(combined prob: {parlay['combined_probability']:.3f}, odds: {parlay['combined_odds']:+.0f}, "
+                f"EV: {parlay['expected_value']:+.3f})"
+            )
+            logger.info(f"🎯 Parlay Reasoning: {parlay['reasoning']}")
+            # Log each leg with reasoning
+            for i, (leg, leg_prob) in enumerate(zip(parlay["legs"], parlay["leg_probabilities"]), 1):
+                leg_edge = leg.get("edge", 0)
+                leg_conf = leg.get("confidence", 0)
+                logger.info(
+                    f"   Leg {i}: {leg.get('sport', 'unknown')} - {leg.get('team', 'TBD')} | "
+                    f"Prob: {leg_prob:.2%}, Edge: {leg_edge:.2%}, Conf: {leg_conf:.2%}, Odds: {leg.get('odds', 0):+.0f}"
+                )
+        
+        return parlay
+    
+    def find_top_parlays(
+        self,
+        predictions: List[Dict[str, Any]],
+        risk_level: str = "moderate",
+        num_legs: Optional[int] = None,
+        top_k: int = 5,
+        pool: Optional[ParlayCandidatePool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search leg combinations and return the top-K parlays by expected value.
+        
+        Legs must meet the risk profile's confidence/edge thresholds and no two legs
+        may share a (game_id, bet_type). Parlays across distinct games are preferred;
+        same-game combinations are only used when distinct games cannot fill the parlay.
+        
+        Returns:
+            Parlays sorted by expected value (best first), possibly empty
+        """
         profile = self.risk_profiles.get(risk_level, self.risk_profiles["moderate"])
+        if pool is None:
+            pool = self.prepare_candidates(predictions)
         
         # Filter predictions by confidence and edge
-        eligible_legs = []
-        for pred in predictions:
-            confidence = pred.get("confidence", 0)
-            edge = pred.get("edge", 0)
-            
-            if (confidence >= profile["min_leg_confidence"] and 
-                edge >= profile["min_leg_edge"]):
-                eligible_legs.append(pred)
+        eligible = np.flatnonzero(
+            (pool.confidence >= profile["min_leg_confidence"]) &
+            (pool.edge >= profile["min_leg_edge"])
+        )
         
         # Not enough eligible legs
-        if len(eligible_legs) < profile["min_legs"]:
+        if len(eligible) < profile["min_legs"]:
             logger.warning(f"Not enough eligible legs for {risk_level} parlay")
-            return None
+            return []
         
         # Determine number of legs
         if num_legs:
             # If specific number requested, use that exactly (if we have enough)
-            if len(eligible_legs) < num_legs:
-                logger.warning(f"Not enough eligible legs ({len(eligible_legs)}) for {num_legs}-leg parlay")
-                return None
+            if len(eligible) < num_legs:
+                logger.warning(f"Not enough eligible legs ({len(eligible)}) for {num_legs}-leg parlay")
+                return []
             target_legs = num_legs
         else:
-            target_legs = min(profile["max_legs"], len(eligible_legs))
+            target_legs = min(profile["max_legs"], len(eligible))
             target_legs = max(target_legs, profile["min_legs"])
         
-        # Sort by confidence * edge (best picks first)
-        eligible_legs.sort(
-            key=lambda x: x.get("confidence", 0) * x.get("edge", 0),
-            reverse=True
-        )
+        min_log_prob = log(profile["min_combined_probability"]) if profile["min_combined_probability"] > 0 else -np.inf
         
-        # Filter legs to ensure no exact duplicates (same game + same bet type)
-        # But allow same game with different bet types, and for 6-leg allow duplicate teams
-        selected_legs = []
-        seen_leg_keys = set()  # Track (game_id, bet_type) combinations
+        combos: List[Tuple[np.ndarray, float]] = []
+        for allow_same_game in (False, True):
+            combos = self._search_combinations(pool, eligible, target_legs, top_k, min_log_prob, allow_same_game)
+            if combos:
+                break
         
-        for leg in eligible_legs:
-            game_id = leg.get("game_id")
-            bet_type = leg.get("bet_type", "moneyline")
-            leg_key = (game_id, bet_type)
-            
-            # For 6-leg parlays, allow same game with different bet types
-            # For other parlays, ensure unique game/bet_type combinations
-            if leg_key not in seen_leg_keys:
-                selected_legs.append(leg)
-                seen_leg_keys.add(leg_key)
-                if len(selected_legs) >= target_legs:
+        if not combos and num_legs == 6:
+            # For 6-leg parlays, don't block placement on combined probability (user wants daily placement)
+            for allow_same_game in (False, True):
+                combos = self._search_combinations(pool, eligible, target_legs, top_k, -np.inf, allow_same_game)
+                if combos:
                     break
+            if combos:
+                logger.warning(
+                    f"⚠️ 6-leg parlay has low combined probability "
+                    f"(below {profile['min_combined_probability']}) - PLACING ANYWAY to ensure daily placement"
+                )
         
-        # If we don't have enough unique legs, check if we can use same game with different bet types
-        if len(selected_legs) < target_legs and num_legs == 6:
-            # For 6-leg, allow multiple bets from same game if different bet types
-            seen_games_only = set([leg.get("game_id") for leg in selected_legs])
-            for leg in eligible_legs:
-                if len(selected_legs) >= target_legs:
-                    break
-                game_id = leg.get("game_id")
-                bet_type = leg.get("bet_type", "moneyline")
-                leg_key = (game_id, bet_type)
-                
-                # Allow if it's a different bet type for a game we already have
-                if leg_key not in seen_leg_keys:
-                    # Check if we already have this game with a different bet type
-                    has_game_diff_bet = any(
-                        l.get("game_id") == game_id and l.get("bet_type") != bet_type 
-                        for l in selected_legs
-                    )
-                    if has_game_diff_bet or game_id not in seen_games_only:
-                        selected_legs.append(leg)
-                        seen_leg_keys.add(leg_key)
-                        seen_games_only.add(game_id)
-        
-        if len(selected_legs) < profile["min_legs"]:
-            logger.warning(f"Not enough unique legs ({len(selected_legs)}) for {target_legs}-leg parlay")
-            return None
+        if not combos:
+            logger.warning(
+                f"No {target_legs}-leg combination meets {risk_level} constraints "
+                f"(unique legs, min combined probability {profile['min_combined_probability']})"
+            )
+            return []
+        
+        return [
+            self._assemble_parlay(pool, indices, risk_level, num_legs)
+            for indices, _ in combos
+        ]
+    
+    def _search_combinations(
+        self,
+        pool: ParlayCandidatePool,
+        candidates: np.ndarray,
+        k: int,
+        top_k: int,
+        min_log_prob: float,
+        allow_same_game: bool
+    ) -> List[Tuple[np.ndarray, float]]:
+        """
+        Find the top-K leg combinations by log(1 + EV).
         
-        # Calculate combined metrics
-        odds_list = [leg.get("odds", -110) for leg in selected_legs]
+        Enumerates all combinations in batches when C(n, k) is small enough,
+        otherwise runs a beam search. Returns (pool indices, score) pairs, best first.
+        """
+        if len(candidates) < k or top_k < 1:
+            return []
+        
+        codes = pool.leg_codes if allow_same_game else pool.game_codes
+        if comb(len(candidates), k) <= self.max_exhaustive_combinations:
+            rows, scores = self._exhaustive_search(pool, candidates, codes, k, top_k, min_log_prob)
+        else:
+            rows, scores = self._beam_search(pool, candidates, codes, k, top_k, min_log_prob)
         
-        # Use model probabilities (with edge) for parlay calculations, not just implied probabilities
-        probs = []
-        for leg in selected_legs:
-            prob = leg.get("probability", 0.5)
-            edge = leg.get("edge", 0)
+        return [(candidates[row], float(score)) for row, score in zip(rows, scores)]
+    
+    def _exhaustive_search(
+        self,
+        pool: ParlayCandidatePool,
+        candidates: np.ndarray,
+        codes: np.ndarray,
+        k: int,
+        top_k: int,
+        min_log_prob: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every k-combination of candidates in fixed-size batches."""
+        log_values = pool.log_values[candidates]
+        log_probs = pool.log_probabilities[candidates]
+        cand_codes = codes[candidates]
+        
+        best_rows = np.empty((0, k), dtype=np.int64)
+        best_scores = np.empty(0, dtype=float)
+        combinations = itertools.combinations(range(len(candidates)), k)
+        
+        while True:
+            batch = np.fromiter(
+                itertools.chain.from_iterable(itertools.islice(combinations, self.combination_batch_size)),
+                dtype=np.int64
+            ).reshape(-1, k)
+            if not len(batch):
+                break
             
-            # Calculate implied probability from odds
-            american_odds = leg.get("odds", -110)
-            if american_odds > 0:
-                implied_prob = 100 / (american_odds + 100)
-            else:
-                implied_prob = abs(american_odds) / (abs(american_odds) + 100)
+            scores = log_values[batch].sum(axis=1)
+            valid = log_probs[batch].sum(axis=1) >= min_log_prob
+            if k > 1:
+                sorted_codes = np.sort(cand_codes[batch], axis=1)
+                valid &= (np.diff(sorted_codes, axis=1) != 0).all(axis=1)
             
-            # Model probability = implied probability + edge (what we think the true probability is)
-            if edge > 0:
-                model_prob = implied_prob + edge
-                model_prob = max(0.01, min(0.99, model_prob))  # Cap at reasonable bounds
-                probs.append(model_prob)
-            else:
-                # Fallback to provided probability
-                probs.append(prob)
+            best_rows = np.concatenate([best_rows, batch[valid]])
+            best_scores = np.concatenate([best_scores, scores[valid]])
+            best_rows, best_scores = self._top_rows(best_rows, best_scores, top_k)
         
-        combined_odds = self.calculate_combined_odds(odds_list)
-        combined_prob = self.calculate_combined_probability(probs)
+        return best_rows, best_scores
+    
+    def _beam_search(
+        self,
+        pool: ParlayCandidatePool,
+        candidates: np.ndarray,
+        codes: np.ndarray,
+        k: int,
+        top_k: int,
+        min_log_prob: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Grow combinations one leg at a time, keeping the best beam_width partial parlays."""
+        log_values = pool.log_values[candidates]
+        log_probs = pool.log_probabilities[candidates]
+        cand_codes = codes[candidates]
+        beam_width = max(self.beam_width, top_k)
+        
+        # Combined probability only decreases as legs are added, so partial
+        # parlays already below the floor can be pruned immediately
+        start = np.flatnonzero(log_probs >= min_log_prob)
+        beam, beam_scores = self._top_rows(start.reshape(-1, 1), log_values[start], beam_width)
+        beam_log_probs = log_probs[beam[:, 0]] if len(beam) else np.empty(0)
+        
+        for _ in range(1, k):
+            if not len(beam):
+                break
+            
+            # Expand every beam state with every candidate leg: shape (beam, n)
+            conflicts = (cand_codes[beam][:, :, None] == cand_codes[None, None, :]).any(axis=1)
+            new_scores = beam_scores[:, None] + log_values[None, :]
+            new_log_probs = beam_log_probs[:, None] + log_probs[None, :]
+            valid = ~conflicts & (new_log_probs >= min_log_prob)
+            
+            state_idx, leg_idx = np.nonzero(valid)
+            if not len(state_idx):
+                return np.empty((0, k), dtype=np.int64), np.empty(0)
+            
+            rows = np.sort(np.column_stack([beam[state_idx], leg_idx]), axis=1)
+            scores = new_scores[state_idx, leg_idx]
+            
+            # The same leg set can be reached from different states - keep one copy
+            rows, unique_idx = np.unique(rows, axis=0, return_index=True)
+            scores = scores[unique_idx]
+            
+            beam, beam_scores = self._top_rows(rows, scores, beam_width)
+            beam_log_probs = log_probs[beam].sum(axis=1)
         
-        # Check if meets minimum probability
-        # For 6-leg parlays, log confidence level but don't block placement (user wants daily placement)
-        if combined_prob < profile["min_combined_probability"]:
-            if num_legs == 6:
-                # For 6-leg parlays, log as warning but still allow (ensuring daily placement)
-                logger.warning(
-                    f"⚠️ 6-leg parlay has low combined probability {combined_prob:.4f} "
-                    f"(below {profile['min_combined_probability']}) - PLACING ANYWAY to ensure daily placement"
-                )
-            else:
-                logger.warning(f"Combined probability {combined_prob:.4f} too low for {risk_level} (min: {profile['min_combined_probability']})")
-                return None
+        if not len(beam) or beam.shape[1] < k:
+            return np.empty((0, k), dtype=np.int64), np.empty(0)
+        
+        return self._top_rows(beam, beam_scores, top_k)
+    
+    @staticmethod
+    def _top_rows(rows: np.ndarray, scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Keep the top_k highest-scoring rows, sorted best first."""
+        if len(scores) > top_k:
+            keep = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+    
+    def _assemble_parlay(
+        self,
+        pool: ParlayCandidatePool,
+        indices: np.ndarray,
+        risk_level: str,
+        num_legs: Optional[int]
+    ) -> Dict[str, Any]:
+        """Build a parlay card from selected pool indices."""
+        # Present legs in the familiar best-pick-first order
+        indices = sorted(indices, key=lambda i: pool.confidence[i] * pool.edge[i], reverse=True)
+        selected_legs = [pool.legs[i] for i in indices]
+        probs = [float(pool.probabilities[i]) for i in indices]
+        
+        combined_odds = self.calculate_combined_odds([leg.get("odds", -110) for leg in selected_legs])
+        combined_prob = self.calculate_combined_probability(probs)
         
         # Calculate expected value
         decimal_odds = self._american_to_decimal(combined_odds)
@@ -249,14 +446,17 @@ class ParlayBuilder:
             confidence_level = "LOW"
         
         # Build reasoning for why these legs were selected
-        reasoning = self._build_parlay_reasoning(selected_legs, combined_prob, confidence_level, num_legs)
+        reasoning = self._build_parlay_reasoning(
+            selected_legs, combined_prob, confidence_level, num_legs or len(selected_legs)
+        )
         
         # Build parlay card
-        parlay = {
+        return {
             "id": str(uuid.uuid4()),
             "risk_level": risk_level,
             "num_legs": len(selected_legs),
             "legs": selected_legs,
+            "leg_probabilities": probs,
             "combined_odds": combined_odds,
             "combined_probability": combined_prob,
             "expected_value": expected_value,
@@ -265,25 +465,6 @@ class ParlayBuilder:
             "recommended_amount": None,  # Will be calculated by bankroll manager
             "created_at": datetime.utcnow().isoformat()
         }
-        
-        # Log detailed reasoning for 6-leg parlays
-        if num_legs == 6:
-            logger.info(
-                f"📊 6-leg parlay built: {confidence_level} confidence "
-                f"(combined prob: {combined_prob:.3f}, odds: {combined_odds:+.0f}, EV: {expected_value:+.3f})"
-            )
-            logger.info(f"🎯 Parlay Reasoning: {reasoning}")
-            # Log each leg with reasoning
-            for i, leg in enumerate(selected_legs, 1):
-                leg_prob = probs[i-1] if i-1 < len(probs) else 0.5
-                leg_edge = leg.get("edge", 0)
-                leg_conf = leg.get("confidence", 0)
-                logger.info(
-                    f"   Leg {i}: {leg.get('sport', 'unknown')} - {leg.get('team', 'TBD')} | "
-                    f"Prob: {leg_prob:.2%}, Edge: {leg_edge:.2%}, Conf: {leg_conf:.2%}, Odds: {leg.get('odds', 0):+.0f}"
-                )
-        
-        return parlay
     
     def _build_parlay_reasoning(
         self, 
@@ -315,7 +496,7 @@ class ParlayBuilder:
                 f"{confidence_level} confidence 6-leg parlay ({combined_prob:.1%} win probability). "
                 f"Selected from multiple sports ({sport_breakdown}) for diversification. "
                 f"Average edge: {avg_edge:.1%}, average confidence: {avg_confidence:.1%}. "
-                f"Legs chosen based on highest confidence×edge product to maximize expected value."
+                f"Legs chosen as the highest expected-value combination across eligible picks."
             )
         else:
             reasoning = f"{num_legs}-leg parlay with {combined_prob:.1%} win probability ({confidence_level} confidence)"
@@ -330,25 +511,26 @@ class ParlayBuilder:
         include_aggressive: bool = True
     ) -> List[Dict[str, Any]]:
         """
-        Build multiple parlays at different risk levels.
+        Build multiple parlays at different risk levels from one candidate pool.
         
         Returns:
             List of parlay recommendations
         """
         parlays = []
+        pool = self.prepare_candidates(predictions)
         
         if include_conservative:
-            conservative = self.build_parlay(predictions, "conservative")
+            conservative = self.build_parlay(predictions, "conservative", pool=pool)
             if conservative:
                 parlays.append(conservative)
         
         if include_moderate:
-            moderate = self.build_parlay(predictions, "moderate")
+            moderate = self.build_parlay(predictions, "moderate", pool=pool)
             if moderate:
                 parlays.append(moderate)
         
         if include_aggressive:
-            aggressive = self.build_parlay(predictions, "aggressive")
+            aggressive = self.build_parlay(predictions, "aggressive", pool=pool)
             if aggressive:
                 parlays.append(aggressive)
         
@@ -52,6 +52,7 @@ class ParlayTracker:
         """
         async with AsyncSessionLocal() as session:
             parlay_bet_id = str(uuid.uuid4())
+            placed_at = datetime.utcnow()
             legs = parlay_data.get("legs", [])
             
             if not legs:
@@ -85,7 +86,8 @@ class ParlayTracker:
                 predicted_probability=parlay_data.get("combined_probability"),
                 predicted_edge=parlay_data.get("expected_edge"),
                 model_confidence=parlay_data.get("combined_confidence"),
-                status=BetStatus.PENDING
+                status=BetStatus.PENDING,
+                placed_at=placed_at
             )
             
             session.add(parlay_bet)
@@ -133,10 +135,13 @@ class ParlayTracker:
                 
                 session.add(leg)
             
-            # Update bankroll
+            # Update bankroll and ROI rollup
             await bet_tracker._update_bankroll_on_bet(
                 session, user_id, parlay_data["amount"]
             )
+            await bet_tracker._record_placement(
+                session, user_id, "multi", BetType.PARLAY, parlay_data["amount"], placed_at
+            )
             
             await session.commit()
             
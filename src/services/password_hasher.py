@@ -0,0 +1,136 @@
+"""
+Password Hasher
+===============
+bcrypt hashing and verification off the event loop.
+
+Every bcrypt call costs tens to hundreds of milliseconds of CPU. Calls run
+on a dedicated, size-bounded thread pool instead of the event loop. bcrypt
+releases the GIL while it works, so threads run in parallel up to the
+number of cores. Calls beyond the pool and its admission queue are
+rejected with PasswordHasherBusy, so overload never turns into
+unbounded latency.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool and its admission queue are full."""
+
+
+def hash_rounds(password_hash: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt worker pool with admission control.
+
+    Features:
+    - BCRYPT_POOL_SIZE worker threads (default: one per core, at most 4)
+    - Up to BCRYPT_QUEUE_SIZE calls wait for a worker; beyond that calls fail fast
+    - Configurable cost (BCRYPT_ROUNDS); needs_rehash() flags hashes made at another cost
+    - Counters for completed, failed, rejected and in-flight calls
+    """
+
+    def __init__(self, pool_size: int = None, queue_size: int = None, rounds: int = None):
+        """Initialize the hasher; worker threads start on first use."""
+        self.pool_size = pool_size or settings.bcrypt_pool_size or min(4, os.cpu_count() or 1)
+        self.queue_size = queue_size if queue_size is not None else settings.bcrypt_queue_size
+        self.rounds = rounds or settings.bcrypt_rounds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password at the configured cost (blocking)."""
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def verify_sync(self, password: str, password_hash: str) -> bool:
+        """Verify a password against its hash (blocking)."""
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except Exception:
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a hash was made at a different cost than the configured one."""
+        return hash_rounds(password_hash) != self.rounds
+
+    async def _run(self, fn, *args):
+        # Admission is decided up front: waiting calls hold a queue slot, so the backlog stays bounded
+        if self._in_flight >= self.pool_size + self.queue_size:
+            self.rejected += 1
+            raise PasswordHasherBusy(
+                f"{self._in_flight} password operations in flight (pool {self.pool_size}, queue {self.queue_size})"
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="bcrypt")
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        future = self._executor.submit(fn, *args)
+        # The slot is held until the worker is done, even if the caller stops waiting:
+        # cancelling a running bcrypt call does not stop its thread
+        future.add_done_callback(lambda f: self._call_on_loop(loop, self._release, f))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _call_on_loop(loop: asyncio.AbstractEventLoop, callback, *args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def _release(self, future):
+        self._in_flight -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool."""
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Verify a password on the worker pool."""
+        return await self._run(self.verify_sync, password, password_hash)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "queue_size": self.queue_size,
+            "rounds": self.rounds,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        """Stop the worker threads; the pool is recreated on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hasher shared by every AuthService in the process
+password_hasher = PasswordHasher()
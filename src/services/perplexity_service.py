@@ -12,6 +12,7 @@ from typing import Dict, Any, Optional, List
 import httpx
 
 from src.config import settings
+from src.services.profiling import span
 
 logger = logging.getLogger(__name__)
 
@@ -170,7 +171,7 @@ class PerplexityService:
             "stream": False
         }
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient() as client, span("llm", "perplexity"):
             response = await client.post(
                 self.base_url,
                 headers=headers,
@@ -0,0 +1,293 @@
+"""
+Request Profiling
+=================
+Opt-in, per-request profiling: spans for DB, Redis, upstream HTTP, model
+inference and LLM calls, optional stack samples of the event loop, and
+collapsed-stack output that flamegraph.pl / speedscope / inferno can read.
+
+Spans are recorded through a context variable, so the hooks cost a single
+lookup when no profile is active. Stack samples are taken from the event
+loop thread while the request is in flight; requests running concurrently
+on the same loop share those samples, so profile stacks on a quiet instance
+or at a low sampling rate.
+"""
+
+import os
+import sys
+import time
+import heapq
+import hmac
+import random
+import asyncio
+import logging
+import threading
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+@dataclass
+class RequestProfile:
+    """Spans and stack samples collected for one request."""
+    id: str
+    method: str
+    path: str
+    stacks_enabled: bool
+    thread_id: int
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    start: float = field(default_factory=time.perf_counter)
+    spans: List[Tuple[str, str, float]] = field(default_factory=list)
+    stacks: Counter = field(default_factory=Counter)
+
+    def span_summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and total milliseconds per span kind."""
+        summary: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+        for kind, _, duration in self.spans:
+            summary[kind]["count"] += 1
+            summary[kind]["total_ms"] += duration * 1000
+        return {kind: {"count": s["count"], "total_ms": round(s["total_ms"], 3)} for kind, s in summary.items()}
+
+
+def record_span(kind: str, name: str, duration: float) -> None:
+    """Attach an already-timed operation to the current request's profile, if any."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.spans.append((kind, name, duration))
+
+
+@contextmanager
+def span(kind: str, name: str):
+    """Time the enclosed block as a span of the current request's profile, if any."""
+    profile = _active_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans.append((kind, name, time.perf_counter() - start))
+
+
+def _collapse(frame) -> str:
+    """Render a frame's stack root-first as 'qualname (file);...'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Background thread sampling the stacks of threads serving profiled requests.
+
+    The thread only runs while at least one stack-sampled profile is active.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: Dict[str, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles.values())
+            frames = sys._current_frames()
+            collapsed: Dict[int, str] = {}
+            for profile in profiles:
+                frame = frames.get(profile.thread_id)
+                if frame is None:
+                    continue
+                if profile.thread_id not in collapsed:
+                    collapsed[profile.thread_id] = _collapse(frame)
+                profile.stacks[collapsed[profile.thread_id]] += 1
+
+
+class Profiler:
+    """
+    Decides which requests to profile and keeps their results.
+
+    Features:
+    - Header trigger (X-Profile: spans|stacks), guarded by a shared token
+    - Random sampling of a fraction of all requests
+    - Collapsed-stack files for spans and stack samples
+    - In-memory top-N slowest profiled requests
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        sample_stacks: Optional[bool] = None,
+        token: Optional[str] = None,
+        allow_header: Optional[bool] = None,
+        stack_interval: Optional[float] = None,
+        output_dir: Optional[str] = None,
+        min_duration_ms: Optional[float] = None,
+        slow_log_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            sample_rate: Fraction of requests profiled without a header
+            sample_stacks: Also take stack samples for randomly sampled requests
+            token: Value required in X-Profile-Token for header-triggered profiles
+            allow_header: Honour X-Profile without a token (defaults to debug mode)
+            stack_interval: Seconds between stack samples
+            output_dir: Directory for collapsed-stack files (None disables files)
+            min_duration_ms: Sampled requests faster than this are not written to disk
+            slow_log_size: Number of slowest profiled requests to keep
+        """
+        self.sample_rate = sample_rate if sample_rate is not None else settings.profiling_sample_rate
+        self.sample_stacks = sample_stacks if sample_stacks is not None else settings.profiling_sample_stacks
+        self.token = token if token is not None else settings.profiling_token
+        self.allow_header = allow_header if allow_header is not None else settings.debug
+        self.output_dir = output_dir if output_dir is not None else settings.profiling_output_dir
+        self.min_duration_ms = min_duration_ms if min_duration_ms is not None else settings.profiling_min_duration_ms
+        self.slow_log_size = slow_log_size if slow_log_size is not None else settings.profiling_slow_log_size
+        interval = stack_interval if stack_interval is not None else settings.profiling_stack_interval_ms / 1000
+        self.sampler = StackSampler(interval)
+        self._slow_log: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether a caller may trigger profiles or read the slow-request log."""
+        if self.token:
+            return token is not None and hmac.compare_digest(token, self.token)
+        return self.allow_header
+
+    def choose(self, mode: Optional[str], token: Optional[str]) -> Optional[bool]:
+        """
+        Decide whether to profile a request.
+
+        Returns None to skip it, otherwise whether to take stack samples.
+        """
+        if mode is not None and self.authorized(token):
+            return mode.lower() == "stacks"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.sample_stacks
+        return None
+
+    def begin(self, method: str, path: str, stacks: bool) -> RequestProfile:
+        """Start profiling the current request; spans in this context attach to it."""
+        profile = RequestProfile(
+            id=uuid.uuid4().hex[:12], method=method, path=path,
+            stacks_enabled=stacks, thread_id=threading.get_ident()
+        )
+        if stacks:
+            self.sampler.add(profile)
+        return profile
+
+    def activate(self, profile: RequestProfile):
+        """Make profile the target of record_span()/span() in this context."""
+        return _active_profile.set(profile)
+
+    def deactivate(self, token) -> None:
+        _active_profile.reset(token)
+
+    async def finish(self, profile: RequestProfile, route: str, status_code: int, forced: bool) -> Dict[str, Any]:
+        """Stop sampling, write collapsed stacks and update the slow-request log."""
+        duration_ms = (time.perf_counter() - profile.start) * 1000
+        if profile.stacks_enabled:
+            self.sampler.remove(profile)
+
+        files: List[str] = []
+        if self.output_dir and (forced or duration_ms >= self.min_duration_ms):
+            try:
+                files = await asyncio.to_thread(self._write, profile, route, duration_ms)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write profile {profile.id}: {e}")
+
+        entry = {
+            "id": profile.id,
+            "method": profile.method,
+            "route": route,
+            "path": profile.path,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "started_at": profile.started_at.isoformat(),
+            "spans": profile.span_summary(),
+            "stack_samples": sum(profile.stacks.values()),
+            "files": files,
+        }
+        self._seq += 1
+        item = (duration_ms, self._seq, entry)
+        if len(self._slow_log) < self.slow_log_size:
+            heapq.heappush(self._slow_log, item)
+        elif self._slow_log and duration_ms > self._slow_log[0][0]:
+            heapq.heapreplace(self._slow_log, item)
+
+        spans = ", ".join(f"{kind} {s['total_ms']:.1f}ms x{s['count']}" for kind, s in entry["spans"].items())
+        logger.info(f"📊 Profiled {profile.method} {route} in {duration_ms:.1f}ms ({spans or 'no spans'}) [{profile.id}]")
+        return entry
+
+    def slow_requests(self) -> List[Dict[str, Any]]:
+        """Slowest profiled requests, slowest first."""
+        return [entry for _, _, entry in sorted(self._slow_log, reverse=True)]
+
+    def collapsed_spans(self, profile: RequestProfile, route: str, duration_ms: float) -> List[str]:
+        """
+        Spans as collapsed-stack lines weighted in microseconds.
+
+        Time not covered by any span is reported as 'self'. Concurrent spans
+        overlap, so their sum can exceed the request's wall time.
+        """
+        root = f"{profile.method} {route}"
+        totals: Dict[str, float] = defaultdict(float)
+        for kind, name, duration in profile.spans:
+            totals[f"{kind};{name}"] += duration
+        lines = [f"{root};{key} {max(1, round(total * 1e6))}" for key, total in sorted(totals.items())]
+        remaining = duration_ms * 1000 - sum(totals.values()) * 1e6
+        if remaining >= 1:
+            lines.append(f"{root};self {round(remaining)}")
+        return lines
+
+    def _write(self, profile: RequestProfile, route: str, duration_ms: float) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"{profile.started_at:%Y%m%dT%H%M%S}-{profile.id}")
+        files = []
+
+        path = f"{prefix}.spans.folded"
+        with open(path, "w") as f:
+            f.write("\n".join(self.collapsed_spans(profile, route, duration_ms)) + "\n")
+        files.append(path)
+
+        if profile.stacks:
+            root = f"{profile.method} {route}"
+            path = f"{prefix}.stacks.folded"
+            with open(path, "w") as f:
+                for stack, count in profile.stacks.most_common():
+                    f.write(f"{root};{stack} {count}\n")
+            files.append(path)
+        return files
+
+
+# Global profiler instance
+profiler = Profiler()
@@ -1,14 +1,167 @@
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+from datetime import date as date_type
+from urllib.parse import urlsplit
 from src.config import settings
+from src.services.metrics import UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS, status_class
+from src.services.profiling import record_span
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# (sport, date as YYYYMMDD or None for "current", market)
+CacheKey = Tuple[str, Optional[str], str]
+
+
+class HostRateLimiter:
+    """Token bucket limiting requests per second to a single upstream host."""
+    
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class CachedResponse:
+    """A cached upstream JSON payload with its HTTP validators."""
+    payload: Any
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """
+    TTL cache for upstream JSON responses keyed by (sport, date, market).
+    
+    Features:
+    - Fresh entries are served without touching the network
+    - Stale entries are revalidated with If-None-Match / If-Modified-Since
+    - Single-flight: concurrent misses for one key share a single upstream call
+    """
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: Dict[CacheKey, CachedResponse] = {}
+        self._in_flight: Dict[CacheKey, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "shared": 0}
+    
+    async def get_or_fetch(
+        self,
+        key: CacheKey,
+        fetch: Callable[[Dict[str, str]], Awaitable[httpx.Response]],
+        ttl_for: Callable[[Any], float]
+    ) -> Any:
+        """
+        Return the cached payload for key, fetching/revalidating it if stale.
+        
+        Args:
+            key: (sport, date, market) cache key
+            fetch: Coroutine sending the request with the given conditional headers
+            ttl_for: Maps a fresh payload to its time-to-live in seconds
+        """
+        entry = self._entries.get(key)
+        if entry and entry.expires_at > time.monotonic():
+            self.stats["hits"] += 1
+            return entry.payload
+        
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats["shared"] += 1
+            return await asyncio.shield(in_flight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            payload = await self._refresh(key, entry, fetch, ttl_for)
+            future.set_result(payload)
+            return payload
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+    
+    async def _refresh(self, key, entry, fetch, ttl_for) -> Any:
+        headers = {}
+        if entry:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        
+        response = await fetch(headers)
+        if response.status_code == 304 and entry:
+            self.stats["revalidated"] += 1
+            entry.expires_at = time.monotonic() + ttl_for(entry.payload)
+            return entry.payload
+        
+        response.raise_for_status()
+        self.stats["misses"] += 1
+        payload = response.json()
+        ttl = ttl_for(payload)
+        if ttl > 0:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = CachedResponse(
+                payload=payload,
+                expires_at=time.monotonic() + ttl,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return payload
+    
+    def _evict(self):
+        """Drop expired entries, or the soonest-expiring one if none are expired."""
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        if not expired:
+            expired = [min(self._entries, key=lambda key: self._entries[key].expires_at)]
+        for key in expired:
+            del self._entries[key]
+    
+    def clear(self):
+        """Drop every cached entry."""
+        self._entries.clear()
+
+
 class RealSportsService:
     """
     Service to fetch REAL sports data using public ESPN endpoints and The Odds API.
+    
+    All requests share one pooled, keep-alive (HTTP/2 when available) client.
+    Concurrent fan-out is bounded by a global concurrency limit and a
+    per-host request-rate budget. Scoreboard and odds responses are cached
+    per (sport, date, market) with sport-specific TTLs and conditional
+    revalidation.
     """
     
     BASE_URL = "https://site.api.espn.com/apis/site/v2/sports"
@@ -36,7 +189,161 @@ class RealSportsService:
         "ncaaw": "basketball_ncaaw" # Assuming this key, may degrade gracefully if invalid
     }
     
-    async def get_live_games(self, sport: str, date: Optional[datetime.date] = None) -> List[Dict[str, Any]]:
+    REQUEST_TIMEOUT = 10.0
+    
+    # Scoreboard cache TTLs (seconds) while games are scheduled or live
+    SCOREBOARD_TTLS = {
+        "nfl": 30,
+        "ncaaf": 30,
+        "mlb": 20,
+        "nhl": 15,
+        "ncaab": 15,
+        "ncaaw": 15,
+        "wnba": 15
+    }
+    DEFAULT_SCOREBOARD_TTL = 15
+    # Past-dated scoreboards where every game is final never change
+    FINAL_SCOREBOARD_TTL = 6 * 3600
+    ODDS_TTL = 60
+    ODDS_MARKETS = "h2h,spreads,totals"
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        odds_api_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        host_rate_limit: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ResponseCache] = None
+    ):
+        """
+        Args:
+            base_url: ESPN API base URL override (e.g. a local stub server in tests)
+            odds_api_url: The Odds API base URL override
+            max_concurrency: Max in-flight upstream requests across all hosts
+            host_rate_limit: Max requests per second to any single host
+            transport: Optional httpx transport (for tests)
+            cache: Response cache (a private one is created by default)
+        """
+        self.base_url = base_url or self.BASE_URL
+        self.odds_api_url = odds_api_url or self.ODDS_API_URL
+        self.max_concurrency = max_concurrency or settings.sports_api_max_concurrency
+        self.host_rate_limit = host_rate_limit if host_rate_limit is not None else settings.sports_api_host_rate_limit
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_limiters: Dict[str, HostRateLimiter] = {}
+        self.cache = cache or ResponseCache()
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared pooled client (created lazily on the running event loop)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE and self._transport is None,
+                timeout=self.REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0
+                ),
+                transport=self._transport
+            )
+            self._client_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_limiters = {}
+        return self._client
+    
+    async def aclose(self):
+        """Close the shared HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    def _scoreboard_ttl(self, sport_code: str, date: Optional[date_type], payload: Dict[str, Any]) -> float:
+        """
+        TTL for a raw ESPN scoreboard: long once every game on a past date is final.
+        
+        The undated scoreboard rolls over to the next slate, so it keeps the
+        live TTL even when every game on it is final.
+        """
+        events = payload.get('events') or []
+        if date is not None and date < date_type.today() and events and all(event.get('status', {}).get('type', {}).get('completed') for event in events):
+            return self.FINAL_SCOREBOARD_TTL
+        return self.SCOREBOARD_TTLS.get(sport_code, self.DEFAULT_SCOREBOARD_TTL)
+    
+    async def _get(self, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET through the shared client under the concurrency limit and host rate budget."""
+        client = self._get_client()
+        host = urlsplit(url).netloc
+        limiter = self._host_limiters.get(host)
+        if limiter is None:
+            limiter = self._host_limiters[host] = HostRateLimiter(self.host_rate_limit)
+        
+        api = self._api_label(host)
+        async with self._semaphore:
+            await limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, params=params, headers=headers)
+            except Exception:
+                UPSTREAM_REQUESTS.labels(api, "error").inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                UPSTREAM_REQUEST_DURATION.labels(api).observe(elapsed)
+                record_span("http", api, elapsed)
+            UPSTREAM_REQUESTS.labels(api, status_class(response.status_code)).inc()
+            return response
+    
+    @staticmethod
+    def _api_label(host: str) -> str:
+        """Metrics label for an upstream host."""
+        if "espn" in host:
+            return "espn"
+        if "the-odds-api" in host:
+            return "odds_api"
+        return host
+    
+    async def get_live_games_many(
+        self,
+        sports: Iterable[str],
+        dates: Optional[Iterable[Optional[date_type]]] = None
+    ) -> Dict[Tuple[str, Optional[date_type]], List[Dict[str, Any]]]:
+        """
+        Fetch games for every (sport, date) pair concurrently.
+        
+        Odds are fetched once per sport and merged into every date's games.
+        
+        Args:
+            sports: Sport codes (nfl, nhl, etc.)
+            dates: Dates to fetch (defaults to today only)
+        
+        Returns:
+            Dict mapping (sport, date) to games; failed fetches map to []
+        """
+        sport_codes = list(dict.fromkeys(sport.lower() for sport in sports))
+        date_list = list(dict.fromkeys(dates)) if dates is not None else [None]
+        keys = [(sport, day) for sport in sport_codes for day in date_list]
+        
+        game_lists = await asyncio.gather(
+            *(self._fetch_espn_games(sport, day) for sport, day in keys)
+        )
+        results = dict(zip(keys, game_lists))
+        
+        # Only fetch odds for sports that actually have games
+        if settings.the_odds_api_key:
+            sports_with_games = [sport for sport in sport_codes if any(results[(sport, day)] for day in date_list)]
+            odds_lists = await asyncio.gather(*(self._fetch_live_odds(sport) for sport in sports_with_games))
+            for sport, odds_data in zip(sports_with_games, odds_lists):
+                if odds_data:
+                    for day in date_list:
+                        self._merge_odds_data(results[(sport, day)], odds_data)
+        
+        return results
+    
+    async def get_live_games(self, sport: str, date: Optional[date_type] = None) -> List[Dict[str, Any]]:
         """
         Fetch games for a specific sport from ESPN and enrich with Odds API data if available.
         
@@ -45,65 +352,68 @@ class RealSportsService:
             date: Optional date to fetch games for (defaults to today)
         """
         sport_code = sport.lower()
+        games = await self._fetch_espn_games(sport_code, date)
+
+        # 2. Fetch Odds from The Odds API (if key matches)
+        # Only fetch if we have games and an API key
+        if games and settings.the_odds_api_key:
+             odds_data = await self._fetch_live_odds(sport_code)
+             if odds_data:
+                 self._merge_odds_data(games, odds_data)
+
+        return games
+
+    async def _fetch_espn_games(self, sport_code: str, date: Optional[date_type] = None) -> List[Dict[str, Any]]:
+        """Fetch and parse one ESPN scoreboard."""
         if sport_code not in self.ENDPOINTS:
-            logger.warning(f"Unsupported sport for real data: {sport}")
+            logger.warning(f"Unsupported sport for real data: {sport_code}")
             return []
             
         # 1. Fetch Games from ESPN
-        url = f"{self.BASE_URL}{self.ENDPOINTS[sport_code]}"
+        url = f"{self.base_url}{self.ENDPOINTS[sport_code]}"
         
         # Add date parameter if specified (ESPN API format: dates=YYYYMMDD)
         params = {}
         if date:
             date_str = date.strftime('%Y%m%d')
             params['dates'] = date_str
-            logger.info(f"Fetching games for {sport} on {date} (ESPN date: {date_str})")
-        
-        games = []
+            logger.info(f"Fetching games for {sport_code} on {date} (ESPN date: {date_str})")
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                games = self._parse_espn_response(data, sport_code)
-                
+            payload = await self.cache.get_or_fetch(
+                (sport_code, params.get('dates'), "scoreboard"),
+                lambda headers: self._get(url, params, headers),
+                lambda data: self._scoreboard_ttl(sport_code, date, data)
+            )
+            return self._parse_espn_response(payload, sport_code)
         except Exception as e:
-            logger.error(f"Failed to fetch real data for {sport}: {e}")
+            logger.error(f"Failed to fetch real data for {sport_code}: {e}")
             return []
 
-        # 2. Fetch Odds from The Odds API (if key matches)
-        # Only fetch if we have games and an API key
-        if games and settings.the_odds_api_key:
-             odds_data = await self._fetch_live_odds(sport_code)
-             if odds_data:
-                 self._merge_odds_data(games, odds_data)
-
-        return games
-
     async def _fetch_live_odds(self, sport_code: str) -> List[Dict[str, Any]]:
         """Fetch live odds from The Odds API."""
         if sport_code not in self.ODDS_API_SPORTS:
             return []
             
         sport_key = self.ODDS_API_SPORTS[sport_code]
-        url = f"{self.ODDS_API_URL}/{sport_key}/odds"
+        url = f"{self.odds_api_url}/{sport_key}/odds"
         
         params = {
             "apiKey": settings.the_odds_api_key,
             "regions": "us",
-            "markets": "h2h,spreads,totals",
+            "markets": self.ODDS_MARKETS,
             "oddsFormat": "american"
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"Odds API error: {response.status_code} - {response.text}")
-                    return []
+            return await self.cache.get_or_fetch(
+                (sport_code, None, self.ODDS_MARKETS),
+                lambda headers: self._get(url, params, headers),
+                lambda data: self.ODDS_TTL
+            )
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Odds API error: {e.response.status_code} - {e.response.text}")
+            return []
         except Exception as e:
             logger.error(f"Failed to fetch odds from API: {e}")
             return []
@@ -7,10 +7,195 @@ between different data providers (e.g., ESPN and The Odds API).
 
 import re
 import logging
-from typing import Dict, List, Any, Optional
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Any, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+# Provider spellings (ESPN / The Odds API / scraped data) -> canonical name, both normalized
+TEAM_ALIASES = {
+    "la clippers": "los angeles clippers",
+    "la lakers": "los angeles lakers",
+    "la kings": "los angeles kings",
+    "la rams": "los angeles rams",
+    "la chargers": "los angeles chargers",
+    "la dodgers": "los angeles dodgers",
+    "la angels": "los angeles angels",
+    "ny rangers": "new york rangers",
+    "ny islanders": "new york islanders",
+    "ny knicks": "new york knicks",
+    "ny giants": "new york giants",
+    "ny jets": "new york jets",
+    "ny yankees": "new york yankees",
+    "ny mets": "new york mets",
+    "ny liberty": "new york liberty",
+    "tb lightning": "tampa bay lightning",
+    "tampa bay bolts": "tampa bay lightning",
+    "nj devils": "new jersey devils",
+    "sj sharks": "san jose sharks",
+    "gs warriors": "golden state warriors",
+    "okc thunder": "oklahoma city thunder",
+    "sixers": "philadelphia 76ers",
+    "blazers": "portland trail blazers",
+    "portland blazers": "portland trail blazers",
+    "cavs": "cleveland cavaliers",
+    "mavs": "dallas mavericks",
+    "wolves": "minnesota timberwolves",
+    "habs": "montreal canadiens",
+    "man utd": "manchester united",
+    "man city": "manchester city",
+}
+
+# Multi-word nicknames that must not be split into city + last word
+COMPOUND_NICKNAMES = (
+    "red wings", "maple leafs", "blue jackets", "golden knights", "trail blazers",
+    "white sox", "red sox", "blue jays", "golden state",
+)
+
+
+class NameResolutionIndex:
+    """
+    Precomputed index resolving provider team/player names to canonical keys.
+    
+    Features:
+    - O(1) lookups for normalized names, nicknames, city prefixes and provider aliases
+    - "Surname F." / "First Surname" signatures for player names
+    - Trigram fuzzy fallback for everything else
+    - Bounded LRU memo of results (including misses) so repeat lookups stay O(1)
+    """
+    
+    FUZZY_THRESHOLD = 0.6
+    MEMO_SIZE = 4096
+    
+    def __init__(
+        self,
+        names: Iterable[str],
+        aliases: Optional[Dict[str, str]] = None,
+        people: bool = False,
+        normalizer: Optional["TeamNormalizationService"] = None
+    ):
+        """
+        Args:
+            names: Canonical keys (e.g. team names in a stats table)
+            aliases: Extra {alias: canonical name} spellings (matched after normalization)
+            people: Index player-name signatures instead of city/nickname splits
+            normalizer: Normalization service (defaults to the global instance)
+        """
+        self._normalize = (normalizer or normalization_service).normalize_name
+        self.people = people
+        self._exact: Dict[str, str] = {}
+        self._partial: Dict[str, Optional[str]] = {}  # None marks an ambiguous key
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._trigram_counts: Dict[str, int] = {}
+        # normalized query -> result, least recently used first
+        self._memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        
+        for name in names:
+            if name is None:
+                continue
+            normalized = self._normalize(str(name))
+            if not normalized:
+                continue
+            self._exact.setdefault(normalized, name)
+            for key in self._variants(normalized):
+                self._add_partial(key, name)
+            grams = self._grams(normalized)
+            self._trigram_counts[name] = len(grams)
+            for gram in grams:
+                self._trigrams[gram].add(name)
+        
+        for alias, target in {**TEAM_ALIASES, **(aliases or {})}.items():
+            canonical = self._exact.get(self._normalize(target))
+            alias_key = self._normalize(alias)
+            if canonical is not None and alias_key not in self._exact:
+                self._exact[alias_key] = canonical
+    
+    def __len__(self) -> int:
+        return len(self._trigram_counts)
+    
+    def _add_partial(self, key: str, name: str):
+        if not key or key in self._exact:
+            return
+        existing = self._partial.get(key, name)
+        self._partial[key] = name if existing == name else None
+    
+    def _variants(self, normalized: str, query: bool = False) -> List[str]:
+        """
+        Secondary keys for a normalized name (nickname, city, player signature).
+        
+        Queries never resolve through their city alone, so "Los Angeles Lakers"
+        cannot land on the only indexed Los Angeles team.
+        """
+        tokens = normalized.split()
+        if len(tokens) < 2:
+            return []
+        if self.people:
+            surname = tokens[-1] if len(tokens[-1]) > 1 else tokens[0]
+            return [self._signature(tokens), surname]
+        
+        nickname_len = 2 if " ".join(tokens[-2:]) in COMPOUND_NICKNAMES else 1
+        nickname = " ".join(tokens[-nickname_len:])
+        city = " ".join(tokens[:-nickname_len])
+        keys = [nickname, tokens[-1]] if query else [nickname, city, tokens[-1]]
+        return [key for key in keys if key]
+    
+    @staticmethod
+    def _signature(tokens: List[str]) -> str:
+        """'surname f' for both 'Djokovic N.' and 'Novak Djokovic'."""
+        if len(tokens[-1]) == 1:
+            return " ".join(tokens)
+        return " ".join(tokens[1:] + [tokens[0][0]])
+    
+    @staticmethod
+    def _grams(normalized: str) -> Set[str]:
+        padded = f"  {normalized} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Resolve a provider name to its canonical key (None if no confident match)."""
+        if not name:
+            return None
+        normalized = self._normalize(str(name))
+        if normalized in self._memo:
+            self._memo.move_to_end(normalized)
+            return self._memo[normalized]
+        
+        result = self._exact.get(normalized)
+        if result is None:
+            result = self._partial.get(normalized)
+        if result is None:
+            for key in self._variants(normalized, query=True):
+                result = self._exact.get(key) or self._partial.get(key)
+                if result is not None:
+                    break
+        if result is None:
+            result = self._fuzzy(normalized)
+        
+        self._memo[normalized] = result
+        if len(self._memo) > self.MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return result
+    
+    def _fuzzy(self, normalized: str) -> Optional[str]:
+        """Best trigram-Jaccard match above the threshold (ties are treated as no match)."""
+        grams = self._grams(normalized)
+        shared = Counter()
+        for gram in grams:
+            for name in self._trigrams.get(gram, ()):
+                shared[name] += 1
+        if not shared:
+            return None
+        
+        scored = sorted(
+            ((count / (len(grams) + self._trigram_counts[name] - count), name) for name, count in shared.items()),
+            reverse=True
+        )
+        best_score, best_name = scored[0]
+        if best_score < self.FUZZY_THRESHOLD or (len(scored) > 1 and scored[1][0] == best_score):
+            return None
+        return best_name
+
 class TeamNormalizationService:
     """Service to normalize and match team names efficiently."""
     
@@ -40,8 +225,9 @@ class TeamNormalizationService:
         if not name:
             return ""
             
-        # Lowercase
-        normalized = name.lower()
+        # Lowercase and fold accents (Montréal -> montreal)
+        normalized = unicodedata.normalize('NFKD', name.lower())
+        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
         
         # Remove punctuation
         normalized = re.sub(r'[^\w\s]', '', normalized)
@@ -51,6 +237,20 @@ class TeamNormalizationService:
         
         return normalized
     
+    def build_index(
+        self,
+        names: Iterable[str],
+        aliases: Optional[Dict[str, str]] = None,
+        people: bool = False
+    ) -> NameResolutionIndex:
+        """Build a reusable name resolution index over canonical names."""
+        return NameResolutionIndex(
+            names,
+            aliases={**self.manual_overrides, **(aliases or {})},
+            people=people,
+            normalizer=self
+        )
+    
     def create_lookup_map(self, items: List[Dict[str, Any]], name_key: str = 'home_team') -> Dict[str, Dict[str, Any]]:
         """
         Create a hash map for O(1) lookups from a list of dictionaries.
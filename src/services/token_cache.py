@@ -0,0 +1,236 @@
+"""
+Verified Token Cache
+====================
+Per-process cache of verified JWTs for AuthService.validate_token.
+
+A hit returns the decoded claims and a compact user snapshot without
+touching the database. Revocations (logout, password change, deactivation)
+are written to a Redis sorted set and mirrored into every process, which
+re-reads new entries at most once per AUTH_REVOCATION_SYNC_SECONDS.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Re-read this much history on each sync so small clock skew between replicas is harmless
+REVOCATION_SYNC_OVERLAP = 5.0
+
+
+def token_key(token: str) -> str:
+    """Cache key for a raw token; the full token is hashed so a key cannot be forged."""
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    """A verified token: the claims revocation is checked against and the user it resolved to."""
+    user_id: str
+    jti: Optional[str]
+    session_id: Optional[str]
+    issued_at: float
+    user: Dict[str, Any]
+    cached_at: float
+    expires_at: float
+
+
+class VerifiedTokenCache:
+    """
+    Bounded TTL cache of verified tokens with a shared revocation list.
+
+    Features:
+    - LRU of up to AUTH_TOKEN_CACHE_SIZE entries, each kept at most
+      AUTH_TOKEN_CACHE_TTL_SECONDS and never past the token's own expiry
+    - Revocation by token (jti), by session (sid) or by user
+    - Revocations mirrored from the auth:revocations sorted set
+    - Revocations still apply locally when Redis is unavailable
+
+    A user revocation rejects tokens issued before that second and drops
+    anything cached before that instant, so the next request for the user
+    is re-checked against the database.
+    """
+
+    REVOCATIONS_KEY = "auth:revocations"
+
+    def __init__(self, redis_url: str = None, ttl_seconds: float = None, max_size: int = None,
+                 sync_interval: float = None):
+        """Initialize the cache; Redis is connected on first use."""
+        self.redis_url = redis_url or settings.redis_url
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.auth_token_cache_ttl_seconds
+        self.max_size = max_size or settings.auth_token_cache_size
+        self.sync_interval = (
+            sync_interval if sync_interval is not None else settings.auth_revocation_sync_seconds
+        )
+        # Revocation entries only need to outlive the longest-lived token
+        self.retention_seconds = settings.remember_me_timeout_days * 86400
+        self.redis_client = None
+
+        self._entries: "OrderedDict[str, CachedToken]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}  # "jti:..", "sid:..", "user:.." -> revoked at (epoch seconds)
+        self._synced_through: Optional[float] = None
+        self._next_sync = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    async def _get_redis(self):
+        """Lazy-initialize async Redis connection."""
+        if self.redis_client is None:
+            try:
+                client = redis.from_url(self.redis_url, decode_responses=True)
+                await client.ping()
+                self.redis_client = client
+            except Exception as e:
+                logger.warning(f"⚠️ Token cache: Redis connection failed, revocations stay local: {e}")
+                self.redis_client = False
+        return self.redis_client if self.redis_client is not False else None
+
+    async def sync_revocations(self, force: bool = False):
+        """Pull revocations written since the last sync (everything still relevant on the first one)."""
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval  # Claimed before awaiting so concurrent callers skip
+        self._prune_revocations(time.time())
+
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return
+        try:
+            started = time.time()
+            if self._synced_through is None:
+                low = started - self.retention_seconds
+            else:
+                low = self._synced_through - REVOCATION_SYNC_OVERLAP
+            for member, revoked_at in await redis_client.zrangebyscore(
+                self.REVOCATIONS_KEY, low, "+inf", withscores=True
+            ):
+                self._mark_revoked(member, revoked_at)
+            self._synced_through = started
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to sync token revocations: {e}")
+
+    def _prune_revocations(self, now: float):
+        """Forget revocations older than any token that could still be valid, as Redis does."""
+        cutoff = now - self.retention_seconds
+        for member in [m for m, revoked_at in self._revoked.items() if revoked_at < cutoff]:
+            del self._revoked[member]
+
+    def _mark_revoked(self, member: str, revoked_at: float):
+        if revoked_at > self._revoked.get(member, 0.0):
+            self._revoked[member] = revoked_at
+
+    def is_revoked(self, user_id: str, jti: Optional[str], session_id: Optional[str],
+                   issued_at: float, cached_at: Optional[float] = None) -> bool:
+        """Whether a token with these claims (cached at `cached_at`, if it was) has been revoked."""
+        revoked = self._revoked
+        if not revoked:
+            return False
+        if jti and f"jti:{jti}" in revoked:
+            return True
+        if session_id and f"sid:{session_id}" in revoked:
+            return True
+        user_revoked_at = revoked.get(f"user:{user_id}")
+        if user_revoked_at is not None:
+            if issued_at < user_revoked_at:
+                return True
+            if cached_at is not None and cached_at <= user_revoked_at:
+                return True
+        return False
+
+    async def revoke(self, kind: str, value: str):
+        """
+        Revoke a token ("jti"), session ("sid") or every existing token of a user ("user").
+
+        Applies to this process immediately and to others on their next sync.
+        """
+        member = f"{kind}:{value}"
+        revoked_at = time.time()
+        self._mark_revoked(member, revoked_at)
+
+        redis_client = await self._get_redis()
+        if not redis_client:
+            return
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.REVOCATIONS_KEY, {member: revoked_at})
+                pipe.zremrangebyscore(self.REVOCATIONS_KEY, "-inf", revoked_at - self.retention_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Failed to publish token revocation {member}: {e}")
+
+    async def get(self, token: str) -> Optional[CachedToken]:
+        """Cached verification for a token, or None if it must be verified again."""
+        await self.sync_revocations()  # Revocations are enforced even with caching disabled
+        if not self.enabled:
+            return None
+
+        key = token_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if (time.time() >= entry.expires_at
+                or self.is_revoked(entry.user_id, entry.jti, entry.session_id, entry.issued_at, entry.cached_at)):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, token: str, claims: Dict[str, Any], user: Dict[str, Any]):
+        """Cache a token that was just verified against the database."""
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, float(claims["exp"]))
+        self._entries[token_key(token)] = CachedToken(
+            user_id=claims.get("user_id"),
+            jti=claims.get("jti"),
+            session_id=claims.get("sid"),
+            issued_at=float(claims.get("iat") or 0),
+            user=user,
+            cached_at=now,
+            expires_at=expires_at
+        )
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop cached tokens (revocations are kept)."""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "revocations": len(self._revoked)
+        }
+
+    async def close(self):
+        if self.redis_client:
+            await self.redis_client.aclose()
+        self.redis_client = None
+
+
+# Global token cache shared by every AuthService in the process
+token_cache = VerifiedTokenCache()
@@ -5,13 +5,19 @@ This module manages user preferences, settings, and personalized features
 for the MultiSportsBettingPlatform.
 """
 
+import copy
 import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 from datetime import datetime, timedelta
-import redis
+import redis.asyncio as redis
+
+from src.services.invalidation_listener import InvalidationListener
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -114,127 +120,203 @@ class UserPreferences:
             self.updated_at = datetime.utcnow()
 
 class UserPreferencesService:
-    """Service for managing user preferences."""
+    """
+    Async service for managing user preferences.
+    
+    Features:
+    - Non-blocking Redis access over a shared connection pool
+    - Per-process LRU cache of deserialized preferences with a TTL
+    - Cross-instance invalidation over Redis pub/sub on every write
+    - Defaults served when Redis is unavailable
+    
+    Preferences returned by get_user_preferences are the cached objects;
+    treat them as read-only and go through the update_* methods to change them.
+    """
     
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        """Initialize the preferences service."""
-        self.redis_url = redis_url
+    KEY_PREFIX = "user_preferences:"
+    INVALIDATION_CHANNEL = "user_preferences:invalidate"
+    PREFERENCES_TTL = 86400 * 30  # 30 days
+    
+    def __init__(self, redis_url: str = None, cache_size: int = None, cache_ttl: float = None):
+        """Initialize the preferences service; Redis is connected on first use."""
+        from src.config import settings
+        self.redis_url = redis_url or settings.redis_url
+        self.max_connections = settings.preferences_redis_max_connections
+        self.cache_size = cache_size or settings.preferences_cache_size
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.preferences_cache_ttl
+        self.instance_id = str(uuid.uuid4())
+        self._invalidations = InvalidationListener(
+            "Preferences", self.INVALIDATION_CHANNEL, self.instance_id,
+            on_event=lambda event: self._invalidate(event.get("user_id")),
+            # Updates may have been missed; start cold rather than serve stale entries
+            on_error=lambda e: self.clear_cache()
+        )
         
-        # Initialize Redis connection
+        # user_id -> (expires_at, preferences), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, UserPreferences]]" = OrderedDict()
+        # Bumped on every invalidation so reads that raced a write are not cached
+        self._generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def redis_client(self):
+        return self._invalidations.client
+    
+    async def _get_redis(self):
+        """Lazy-initialize the pooled Redis connection and the invalidation listener."""
+        return await self._invalidations.connect(
+            lambda: redis.Redis(connection_pool=redis.ConnectionPool.from_url(
+                self.redis_url, decode_responses=True, max_connections=self.max_connections
+            ))
+        )
+    
+    async def close(self):
+        """Stop the invalidation listener and release pooled connections."""
+        await self._invalidations.close()
+        self.clear_cache()
+    
+    def _cache_get(self, user_id: str) -> Optional[UserPreferences]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        expires_at, preferences = entry
+        if expires_at < time.monotonic():
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return preferences
+    
+    def _cache_put(self, preferences: UserPreferences):
+        self._cache[preferences.user_id] = (time.monotonic() + self.cache_ttl, preferences)
+        self._cache.move_to_end(preferences.user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def _invalidate(self, user_id: Optional[str]):
+        self._generation += 1
+        if user_id:
+            self._cache.pop(user_id, None)
+    
+    def clear_cache(self):
+        """Drop every locally cached entry."""
+        self._generation += 1
+        self._cache.clear()
+    
+    async def _publish_invalidation(self, client, user_id: str):
         try:
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            self.redis_client.ping()
-            logger.info("✅ Redis connection established for preferences")
+            await client.publish(
+                self.INVALIDATION_CHANNEL, json.dumps({"instance_id": self.instance_id, "user_id": user_id})
+            )
         except Exception as e:
-            logger.warning(f"⚠️ Redis connection failed for preferences: {e}")
-            self.redis_client = None
+            logger.warning(f"⚠️ Failed to publish preferences invalidation for {user_id}: {e}")
     
-    def get_user_preferences(self, user_id: str) -> Optional[UserPreferences]:
-        """Get user preferences."""
+    async def get_user_preferences(self, user_id: str) -> Optional[UserPreferences]:
+        """Get user preferences, served from the local cache when fresh."""
+        preferences = self._cache_get(user_id)
+        if preferences is not None:
+            self.hits += 1
+            return preferences
+        self.misses += 1
+        
         try:
-            if not self.redis_client:
+            client = await self._get_redis()
+            if not client:
                 return self._get_default_preferences(user_id)
             
-            key = f"user_preferences:{user_id}"
-            preferences_data = self.redis_client.get(key)
+            generation = self._generation
+            preferences_data = await client.get(f"{self.KEY_PREFIX}{user_id}")
             
             if preferences_data:
-                data = json.loads(preferences_data)
-                return self._deserialize_preferences(data)
+                preferences = self._deserialize_preferences(json.loads(preferences_data))
             else:
                 # Create default preferences
-                default_prefs = self._get_default_preferences(user_id)
-                self.save_user_preferences(default_prefs)
-                return default_prefs
+                preferences = self._get_default_preferences(user_id)
+                await self.save_user_preferences(preferences)
+                return preferences
+            
+            if generation == self._generation:
+                self._cache_put(preferences)
+            return preferences
                 
         except Exception as e:
             logger.error(f"❌ Failed to get user preferences: {e}")
             return self._get_default_preferences(user_id)
     
-    def save_user_preferences(self, preferences: UserPreferences) -> bool:
-        """Save user preferences."""
+    async def save_user_preferences(self, preferences: UserPreferences) -> bool:
+        """Save user preferences and invalidate other instances' copies."""
         try:
-            if not self.redis_client:
+            client = await self._get_redis()
+            if not client:
                 return False
             
             preferences.updated_at = datetime.utcnow()
-            key = f"user_preferences:{preferences.user_id}"
+            key = f"{self.KEY_PREFIX}{preferences.user_id}"
             
             # Serialize preferences
             data = self._serialize_preferences(preferences)
             json_data = json.dumps(data)
             
             # Save to Redis with expiration (30 days)
-            self.redis_client.setex(key, 86400 * 30, json_data)
+            await client.set(key, json_data, ex=self.PREFERENCES_TTL)
+            self._invalidate(preferences.user_id)
+            self._cache_put(preferences)
+            await self._publish_invalidation(client, preferences.user_id)
             
             logger.info(f"✅ Preferences saved for user: {preferences.user_id}")
             return True
             
         except Exception as e:
             logger.error(f"❌ Failed to save user preferences: {e}")
+            self._invalidate(preferences.user_id)
             return False
     
-    def update_betting_preferences(self, user_id: str, 
-                                 betting_prefs: Dict[str, Any]) -> bool:
+    async def _update_section(self, user_id: str, section: str, values: Dict[str, Any]) -> bool:
+        preferences = await self.get_user_preferences(user_id)
+        if not preferences:
+            return False
+        
+        # Work on a copy so a failed save leaves the cached entry untouched
+        preferences = copy.deepcopy(preferences)
+        target = getattr(preferences, section)
+        for key, value in values.items():
+            if hasattr(target, key):
+                setattr(target, key, value)
+        
+        return await self.save_user_preferences(preferences)
+    
+    async def update_betting_preferences(self, user_id: str, 
+                                         betting_prefs: Dict[str, Any]) -> bool:
         """Update user betting preferences."""
         try:
-            preferences = self.get_user_preferences(user_id)
-            if not preferences:
-                return False
-            
-            # Update betting preferences
-            for key, value in betting_prefs.items():
-                if hasattr(preferences.betting, key):
-                    setattr(preferences.betting, key, value)
-            
-            return self.save_user_preferences(preferences)
-            
+            return await self._update_section(user_id, "betting", betting_prefs)
         except Exception as e:
             logger.error(f"❌ Failed to update betting preferences: {e}")
             return False
     
-    def update_notification_preferences(self, user_id: str, 
-                                      notification_prefs: Dict[str, Any]) -> bool:
+    async def update_notification_preferences(self, user_id: str, 
+                                              notification_prefs: Dict[str, Any]) -> bool:
         """Update user notification preferences."""
         try:
-            preferences = self.get_user_preferences(user_id)
-            if not preferences:
-                return False
-            
-            # Update notification preferences
-            for key, value in notification_prefs.items():
-                if hasattr(preferences.notifications, key):
-                    setattr(preferences.notifications, key, value)
-            
-            return self.save_user_preferences(preferences)
-            
+            return await self._update_section(user_id, "notifications", notification_prefs)
         except Exception as e:
             logger.error(f"❌ Failed to update notification preferences: {e}")
             return False
     
-    def update_display_preferences(self, user_id: str, 
-                                 display_prefs: Dict[str, Any]) -> bool:
+    async def update_display_preferences(self, user_id: str, 
+                                         display_prefs: Dict[str, Any]) -> bool:
         """Update user display preferences."""
         try:
-            preferences = self.get_user_preferences(user_id)
-            if not preferences:
-                return False
-            
-            # Update display preferences
-            for key, value in display_prefs.items():
-                if hasattr(preferences.display, key):
-                    setattr(preferences.display, key, value)
-            
-            return self.save_user_preferences(preferences)
-            
+            return await self._update_section(user_id, "display", display_prefs)
         except Exception as e:
             logger.error(f"❌ Failed to update display preferences: {e}")
             return False
     
-    def get_user_sport_preferences(self, user_id: str) -> List[SportType]:
+    async def get_user_sport_preferences(self, user_id: str) -> List[SportType]:
         """Get user's preferred sports."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.betting:
                 return preferences.betting.preferred_sports
             return [SportType.BASEBALL, SportType.BASKETBALL, SportType.FOOTBALL, SportType.HOCKEY]
@@ -242,10 +324,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get sport preferences: {e}")
             return [SportType.BASEBALL, SportType.BASKETBALL, SportType.FOOTBALL, SportType.HOCKEY]
     
-    def get_user_risk_level(self, user_id: str) -> RiskLevel:
+    async def get_user_risk_level(self, user_id: str) -> RiskLevel:
         """Get user's risk level."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.betting:
                 return preferences.betting.risk_level
             return RiskLevel.MODERATE
@@ -253,10 +335,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get risk level: {e}")
             return RiskLevel.MODERATE
     
-    def get_user_confidence_threshold(self, user_id: str) -> float:
+    async def get_user_confidence_threshold(self, user_id: str) -> float:
         """Get user's minimum confidence threshold."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.betting:
                 return preferences.betting.min_confidence_threshold
             return 0.6
@@ -264,10 +346,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get confidence threshold: {e}")
             return 0.6
     
-    def get_user_max_bet_amount(self, user_id: str) -> float:
+    async def get_user_max_bet_amount(self, user_id: str) -> float:
         """Get user's maximum bet amount."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.betting:
                 return preferences.betting.max_bet_amount
             return 100.0
@@ -275,10 +357,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get max bet amount: {e}")
             return 100.0
     
-    def is_notification_enabled(self, user_id: str, notification_type: NotificationType) -> bool:
+    async def is_notification_enabled(self, user_id: str, notification_type: NotificationType) -> bool:
         """Check if a specific notification type is enabled for the user."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if not preferences or not preferences.notifications:
                 return True  # Default to enabled
             
@@ -297,10 +379,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to check notification status: {e}")
             return True
     
-    def get_user_timezone(self, user_id: str) -> str:
+    async def get_user_timezone(self, user_id: str) -> str:
         """Get user's timezone."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.display:
                 return preferences.display.timezone
             return "UTC"
@@ -308,10 +390,10 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get timezone: {e}")
             return "UTC"
     
-    def get_user_currency(self, user_id: str) -> str:
+    async def get_user_currency(self, user_id: str) -> str:
         """Get user's preferred currency."""
         try:
-            preferences = self.get_user_preferences(user_id)
+            preferences = await self.get_user_preferences(user_id)
             if preferences and preferences.display:
                 return preferences.display.currency
             return "USD"
@@ -319,23 +401,25 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to get currency: {e}")
             return "USD"
     
-    def reset_user_preferences(self, user_id: str) -> bool:
+    async def reset_user_preferences(self, user_id: str) -> bool:
         """Reset user preferences to defaults."""
         try:
             default_prefs = self._get_default_preferences(user_id)
-            return self.save_user_preferences(default_prefs)
+            return await self.save_user_preferences(default_prefs)
         except Exception as e:
             logger.error(f"❌ Failed to reset preferences: {e}")
             return False
     
-    def delete_user_preferences(self, user_id: str) -> bool:
+    async def delete_user_preferences(self, user_id: str) -> bool:
         """Delete user preferences."""
         try:
-            if not self.redis_client:
+            client = await self._get_redis()
+            if not client:
                 return False
             
-            key = f"user_preferences:{user_id}"
-            self.redis_client.delete(key)
+            await client.delete(f"{self.KEY_PREFIX}{user_id}")
+            self._invalidate(user_id)
+            await self._publish_invalidation(client, user_id)
             
             logger.info(f"✅ Preferences deleted for user: {user_id}")
             return True
@@ -344,14 +428,14 @@ class UserPreferencesService:
             logger.error(f"❌ Failed to delete preferences: {e}")
             return False
     
-    def get_preferences_stats(self) -> Dict[str, Any]:
+    async def get_preferences_stats(self) -> Dict[str, Any]:
         """Get statistics about user preferences."""
         try:
-            if not self.redis_client:
+            client = await self._get_redis()
+            if not client:
                 return {"error": "Redis not available"}
             
-            pattern = "user_preferences:*"
-            keys = self.redis_client.keys(pattern)
+            keys = [key async for key in client.scan_iter(match=f"{self.KEY_PREFIX}*", count=1000)]
             
             total_users = len(keys)
             
@@ -362,10 +446,10 @@ class UserPreferencesService:
             
             sample_size = min(100, total_users)  # Sample up to 100 users
             sample_keys = keys[:sample_size]
+            sample_values = await client.mget(sample_keys) if sample_keys else []
             
-            for key in sample_keys:
+            for data in sample_values:
                 try:
-                    data = self.redis_client.get(key)
                     if data:
                         prefs_data = json.loads(data)
                         if "betting" in prefs_data:
@@ -392,7 +476,12 @@ class UserPreferencesService:
                 "sport_preferences": sport_counts,
                 "risk_levels": risk_counts,
                 "theme_preferences": theme_counts,
-                "sample_size": sample_size
+                "sample_size": sample_size,
+                "cache": {
+                    "entries": len(self._cache),
+                    "hits": self.hits,
+                    "misses": self.misses
+                }
             }
             
         except Exception as e:
@@ -501,4 +590,7 @@ class UserPreferencesService:
             
         except Exception as e:
             logger.error(f"❌ Failed to deserialize preferences: {e}")
-            return self._get_default_preferences(data["user_id"]) 
\ No newline at end of file
+            return self._get_default_preferences(data["user_id"]) 
+
+# Global preferences service instance
+user_preferences_service = UserPreferencesService()
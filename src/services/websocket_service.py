@@ -7,9 +7,11 @@ Advanced WebSocket management with authentication, Redis integration, and compre
 import json
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterable, Union
 from dataclasses import dataclass, asdict
+from collections import defaultdict
 from enum import Enum
 import redis.asyncio as redis
 from fastapi import WebSocket, WebSocketDisconnect, HTTPException
@@ -17,6 +19,7 @@ from fastapi.security import HTTPBearer
 import jwt
 import uuid
 from src.config import settings
+from src.services.metrics import BROADCAST_FANOUT_DURATION
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +45,20 @@ class MessageType(str, Enum):
     WELCOME = "welcome"
     CONNECTION_STATUS = "connection_status"
 
+class TopicKind(str, Enum):
+    """Dimensions a connection can be addressed by."""
+    CHANNEL = "channel"
+    USER = "user"
+    SPORT = "sport"
+
+Topic = Tuple[TopicKind, str]
+
+class BackpressurePolicy(str, Enum):
+    """What to do when a connection's send queue is full."""
+    DROP_OLDEST = "drop_oldest"    # Evict the oldest queued frame, keep the new one
+    DROP_NEWEST = "drop_newest"    # Discard the new frame
+    DISCONNECT = "disconnect"      # Close the slow consumer
+
 @dataclass
 class WebSocketMessage:
     """WebSocket message structure."""
@@ -74,7 +91,8 @@ class ConnectionInfo:
     subscriptions: Set[str]
     user_preferences: Dict[str, Any]
     user_id: Optional[str] = None
-    
+    sender: Optional["ConnectionSender"] = None
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization."""
         return {
@@ -89,6 +107,174 @@ class ConnectionInfo:
             "user_preferences": self.user_preferences
         }
 
+def encode_message(message: Any) -> str:
+    """Serialize a message (WebSocketMessage or plain dict) to a text frame once."""
+    if isinstance(message, WebSocketMessage):
+        message = message.to_dict()
+    return json.dumps(message, default=str)
+
+class ConnectionSender:
+    """
+    Bounded outbound queue and writer task for one WebSocket.
+
+    Features:
+    - Enqueue never awaits the socket, so one slow client cannot stall a broadcast
+    - Frames are pre-encoded strings shared by every connection
+    - Back-pressure policy applied when the queue is full
+    - Writes that exceed send_timeout mark the connection as failed
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, queue_size: int,
+                 policy: BackpressurePolicy, send_timeout: float, on_failure):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.sent = 0
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the writer task."""
+        self._task = asyncio.create_task(self._writer())
+
+    def enqueue(self, frame: str) -> bool:
+        """Queue a frame without waiting; returns False if it was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == BackpressurePolicy.DISCONNECT:
+            self._fail("send queue full")
+            return False
+        self.dropped += 1
+        if self.policy == BackpressurePolicy.DROP_OLDEST:
+            self.queue.get_nowait()
+            self.queue.put_nowait(frame)
+            return True
+        return False
+
+    async def _writer(self):
+        """Drain the queue onto the socket, one frame at a time."""
+        while not self.closed:
+            frame = await self.queue.get()
+            try:
+                # asyncio.timeout avoids the extra task wait_for creates per send
+                async with asyncio.timeout(self.send_timeout):
+                    await self.websocket.send_text(frame)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._fail(f"send timed out after {self.send_timeout}s")
+                return
+            except Exception as e:
+                self._fail(str(e))
+                return
+
+    def _fail(self, reason: str):
+        if not self.closed:
+            self.closed = True
+            self.on_failure(self.session_id, reason)
+
+    async def close(self):
+        """Stop the writer task and discard anything still queued."""
+        self.closed = True
+        if self._task and self._task is not asyncio.current_task() and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+class SubscriptionIndex:
+    """
+    Inverted index from topic to local session ids.
+
+    Features:
+    - channel / user_id / sport -> set of sessions, so targeted sends skip
+      the full connection scan
+    - Reverse map per session for O(topics) cleanup on disconnect
+    - add/remove report when a topic gains its first or loses its last local
+      subscriber, which is when the instance joins or leaves it in Redis
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Topic, Set[str]] = defaultdict(set)
+        self._topics: Dict[str, Set[Topic]] = defaultdict(set)
+
+    @staticmethod
+    def topic(kind: TopicKind, key: str) -> Topic:
+        key = str(key)
+        return (kind, key.lower() if kind == TopicKind.SPORT else key)
+
+    def add(self, topic: Topic, session_id: str) -> bool:
+        """Subscribe a session; True if this is the topic's first local subscriber."""
+        sessions = self._sessions[topic]
+        first = not sessions
+        sessions.add(session_id)
+        self._topics[session_id].add(topic)
+        return first
+
+    def remove(self, topic: Topic, session_id: str) -> bool:
+        """Unsubscribe a session; True if the topic has no local subscribers left."""
+        sessions = self._sessions.get(topic)
+        if not sessions or session_id not in sessions:
+            return False
+        sessions.discard(session_id)
+        topics = self._topics.get(session_id)
+        if topics is not None:
+            topics.discard(topic)
+            if not topics:
+                del self._topics[session_id]
+        if not sessions:
+            del self._sessions[topic]
+            return True
+        return False
+
+    def remove_session(self, session_id: str) -> Tuple[List[Topic], List[Topic]]:
+        """
+        Drop a session from every topic.
+
+        Returns:
+            (topics the session was in, topics now empty locally)
+        """
+        topics = list(self._topics.pop(session_id, ()))
+        emptied = []
+        for topic in topics:
+            sessions = self._sessions.get(topic)
+            if sessions is None:
+                continue
+            sessions.discard(session_id)
+            if not sessions:
+                del self._sessions[topic]
+                emptied.append(topic)
+        return topics, emptied
+
+    def sessions(self, topics: Iterable[Topic]) -> Set[str]:
+        """Union of local sessions subscribed to any of the topics."""
+        result: Set[str] = set()
+        for topic in topics:
+            result |= self._sessions.get(topic, set())
+        return result
+
+    def topics_for(self, session_id: str) -> Set[Topic]:
+        return set(self._topics.get(session_id, ()))
+
+    def items(self) -> List[Tuple[Topic, Set[str]]]:
+        """Snapshot of every topic with its local sessions."""
+        return [(topic, set(sessions)) for topic, sessions in self._sessions.items()]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
 class WebSocketAuthenticationService:
     """Handle WebSocket authentication using JWT tokens."""
     
@@ -155,6 +341,27 @@ class EnhancedWebSocketManager:
         self.max_connections = 10000
         self.heartbeat_interval = 30
         
+        # Fan-out: bounded per-connection queues, yielding to the loop between shards
+        self.send_queue_size = settings.websocket_send_queue_size
+        self.backpressure_policy = BackpressurePolicy(settings.websocket_backpressure_policy)
+        self.send_timeout = settings.websocket_send_timeout
+        self.broadcast_shard_size = max(1, settings.websocket_broadcast_shard_size)
+        # Topic routing: channel / user / sport -> local sessions, mirrored in Redis sets
+        # that expire unless a live instance keeps refreshing them
+        self.subscriptions = SubscriptionIndex()
+        self.topic_ttl = settings.websocket_topic_ttl
+        self.pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._topic_refresh_task: Optional[asyncio.Task] = None
+        # Pending slow-consumer drops; referenced here so they are not garbage collected mid-run
+        self._drop_tasks: Set[asyncio.Task] = set()
+        self.broadcast_stats = {
+            "broadcasts": 0,
+            "frames_queued": 0,
+            "frames_dropped": 0,
+            "slow_consumers_disconnected": 0,
+        }
+        
     async def initialize(self):
         """Initialize the WebSocket manager and start Redis listener."""
         await self.redis_manager.connect_redis()
@@ -164,8 +371,9 @@ class EnhancedWebSocketManager:
         self.pubsub = redis_client.pubsub()
         await self.pubsub.subscribe(f"instance:{self.instance_id}", "broadcast:all")
         
-        # Start listening task
-        asyncio.create_task(self._redis_listener())
+        # Start listening task and keep this instance's topic memberships alive
+        self._listener_task = asyncio.create_task(self._redis_listener())
+        self._topic_refresh_task = asyncio.create_task(self._topic_refresh_loop())
         logger.info(f"🚀 WebSocket Manager initialized (Instance: {self.instance_id})")
     
     async def _redis_listener(self):
@@ -182,10 +390,12 @@ class EnhancedWebSocketManager:
                         # Direct message to specific session on this instance
                         session_id = data.get("session_id")
                         if session_id in self.local_connections:
-                            await self.send_local_message(
-                                self.local_connections[session_id], 
-                                WebSocketMessage(**data["payload"])
-                            )
+                            frame = data["frame"] if "frame" in data else encode_message(data["payload"])
+                            self._enqueue(self.local_connections[session_id], frame)
+                    elif target_type == "topic":
+                        # Topic fan-out relayed from another instance; the frame is pre-encoded
+                        topics = [SubscriptionIndex.topic(TopicKind(kind), key) for kind, key in data["topics"]]
+                        self._deliver_to_topics(topics, data["frame"])
                 except Exception as e:
                     logger.error(f"❌ Error processing Redis message: {e}")
 
@@ -209,7 +419,7 @@ class EnhancedWebSocketManager:
         )
         
         # Store locally
-        self.local_connections[session_id] = connection_info
+        self._register_local(connection_info)
         
         # Register in Redis (Global Registry)
         r = await self.redis_manager.get_redis()
@@ -220,22 +430,282 @@ class EnhancedWebSocketManager:
         })
         await r.expire(f"websocket:session:{session_id}", 3600*24)
         
+        sports = connection_info.user_preferences.get("sports") or []
+        if sports:
+            await self._subscribe(connection_info, [SubscriptionIndex.topic(TopicKind.SPORT, sport) for sport in sports])
+        
         logger.info(f"🔌 New WebSocket connection: {session_id}")
         return connection_info
 
+    def _register_local(self, connection_info: ConnectionInfo):
+        """Track a local connection and start its writer task."""
+        connection_info.sender = ConnectionSender(
+            connection_info.websocket,
+            connection_info.session_id,
+            queue_size=self.send_queue_size,
+            policy=self.backpressure_policy,
+            send_timeout=self.send_timeout,
+            on_failure=self._on_send_failure
+        )
+        connection_info.sender.start()
+        self.local_connections[connection_info.session_id] = connection_info
+
     async def disconnect(self, session_id: str):
         """Disconnect a client."""
-        if session_id in self.local_connections:
-            del self.local_connections[session_id]
+        connection_info = self.local_connections.pop(session_id, None)
+        if connection_info is not None:
+            if connection_info.sender:
+                await connection_info.sender.close()
+            topics, emptied = self.subscriptions.remove_session(session_id)
             
             # Remove from Redis
             r = await self.redis_manager.get_redis()
             await r.delete(f"websocket:session:{session_id}")
+            if topics:
+                await self._sync_topics(session_id, removed=topics, emptied=emptied)
             
             logger.info(f"🔌 WebSocket disconnected: {session_id}")
 
-    async def send_message(self, session_id: str, message: WebSocketMessage):
-        """Send message to a session (local or remote)."""
+    async def shutdown(self):
+        """Stop writer tasks and the Redis listener (application shutdown)."""
+        # Let in-progress drops finish their cleanup; each close is bounded by send_timeout
+        if self._drop_tasks:
+            await asyncio.gather(*self._drop_tasks, return_exceptions=True)
+        connections = list(self.local_connections.values())
+        self.local_connections.clear()
+        await asyncio.gather(
+            *(conn.sender.close() for conn in connections if conn.sender),
+            return_exceptions=True
+        )
+        for task in (self._listener_task, self._topic_refresh_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._topic_refresh_task = None
+        if self.pubsub is not None:
+            try:
+                close = getattr(self.pubsub, "aclose", self.pubsub.close)  # aclose: redis>=5.0.1
+                await close()
+            except Exception:
+                pass
+            self.pubsub = None
+
+    def _on_send_failure(self, session_id: str, reason: str):
+        """Called by a sender whose socket failed or fell too far behind."""
+        logger.warning(f"⚠️ Dropping WebSocket {session_id}: {reason}")
+        self.broadcast_stats["slow_consumers_disconnected"] += 1
+        task = asyncio.create_task(self._drop_connection(session_id))
+        self._drop_tasks.add(task)
+        task.add_done_callback(self._drop_tasks.discard)
+
+    async def _drop_connection(self, session_id: str):
+        connection_info = self.local_connections.get(session_id)
+        if connection_info is None:
+            return
+        try:
+            # 1013: try again later
+            await asyncio.wait_for(connection_info.websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+        try:
+            await self.disconnect(session_id)
+        except Exception as e:
+            logger.error(f"❌ Disconnect cleanup failed for {session_id}: {e}")
+
+    @staticmethod
+    def _topic_key(topic: Topic) -> str:
+        return f"websocket:topic:{topic[0].value}:{topic[1]}"
+
+    @staticmethod
+    def _topic_instances_key(topic: Topic) -> str:
+        return f"websocket:topic_instances:{topic[0].value}:{topic[1]}"
+
+    async def _sync_topics(self, session_id: str, added: Iterable[Topic] = (), first: Iterable[Topic] = (),
+                           removed: Iterable[Topic] = (), emptied: Iterable[Topic] = ()):
+        """
+        Mirror index changes into Redis in one round trip.
+
+        websocket:topic:<kind>:<key> holds every subscribed session across the
+        cluster; websocket:topic_instances:<kind>:<key> holds the instances
+        with at least one local subscriber, which is where topic messages are
+        published. Both expire after topic_ttl unless refreshed, so entries
+        left behind by a crashed instance do not live forever.
+        """
+        try:
+            r = await self.redis_manager.get_redis()
+            pipe = r.pipeline(transaction=False)
+            for topic in added:
+                pipe.sadd(self._topic_key(topic), session_id)
+                pipe.expire(self._topic_key(topic), self.topic_ttl)
+            for topic in first:
+                pipe.sadd(self._topic_instances_key(topic), self.instance_id)
+                pipe.expire(self._topic_instances_key(topic), self.topic_ttl)
+            for topic in removed:
+                pipe.srem(self._topic_key(topic), session_id)
+            for topic in emptied:
+                pipe.srem(self._topic_instances_key(topic), self.instance_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to sync subscription index to Redis: {e}")
+
+    async def refresh_topics(self) -> int:
+        """
+        Re-assert this instance's topic memberships and push their expiry out.
+
+        Returns:
+            Number of topics refreshed
+        """
+        topics = self.subscriptions.items()
+        if not topics:
+            return 0
+        r = await self.redis_manager.get_redis()
+        pipe = r.pipeline(transaction=False)
+        for topic, sessions in topics:
+            pipe.sadd(self._topic_key(topic), *sessions)
+            pipe.expire(self._topic_key(topic), self.topic_ttl)
+            pipe.sadd(self._topic_instances_key(topic), self.instance_id)
+            pipe.expire(self._topic_instances_key(topic), self.topic_ttl)
+        await pipe.execute()
+        return len(topics)
+
+    async def _topic_refresh_loop(self):
+        """Refresh topic memberships every heartbeat, well inside topic_ttl."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.refresh_topics()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to refresh topic memberships: {e}")
+
+    async def _subscribe(self, connection_info: ConnectionInfo, topics: List[Topic]):
+        first = [topic for topic in topics if self.subscriptions.add(topic, connection_info.session_id)]
+        await self._sync_topics(connection_info.session_id, added=topics, first=first)
+
+    async def _unsubscribe(self, connection_info: ConnectionInfo, topics: List[Topic]):
+        emptied = [topic for topic in topics if self.subscriptions.remove(topic, connection_info.session_id)]
+        await self._sync_topics(connection_info.session_id, removed=topics, emptied=emptied)
+
+    async def subscribe_to_channel(self, connection_info: ConnectionInfo, channel: str):
+        """Subscribe a connection to a named channel."""
+        connection_info.subscriptions.add(channel)
+        await self._subscribe(connection_info, [SubscriptionIndex.topic(TopicKind.CHANNEL, channel)])
+
+    async def unsubscribe_from_channel(self, connection_info: ConnectionInfo, channel: str):
+        """Unsubscribe a connection from a channel."""
+        connection_info.subscriptions.discard(channel)
+        await self._unsubscribe(connection_info, [SubscriptionIndex.topic(TopicKind.CHANNEL, channel)])
+
+    async def subscribe_to_sport(self, connection_info: ConnectionInfo, sport: str):
+        """Subscribe a connection to per-sport updates (e.g. live odds)."""
+        await self._subscribe(connection_info, [SubscriptionIndex.topic(TopicKind.SPORT, sport)])
+
+    async def unsubscribe_from_sport(self, connection_info: ConnectionInfo, sport: str):
+        """Unsubscribe a connection from per-sport updates."""
+        await self._unsubscribe(connection_info, [SubscriptionIndex.topic(TopicKind.SPORT, sport)])
+
+    async def authenticate_connection(self, connection_info: ConnectionInfo, token: str) -> bool:
+        """Authenticate a connection and index it under its user id."""
+        user_id = await self.auth_service.authenticate_websocket(token)
+        if not user_id:
+            return False
+
+        if connection_info.user_id and connection_info.user_id != user_id:
+            await self._unsubscribe(connection_info, [SubscriptionIndex.topic(TopicKind.USER, connection_info.user_id)])
+        connection_info.user_id = user_id
+        connection_info.status = ConnectionStatus.AUTHENTICATED
+        await self._subscribe(connection_info, [SubscriptionIndex.topic(TopicKind.USER, user_id)])
+
+        r = await self.redis_manager.get_redis()
+        await r.hset(f"websocket:session:{connection_info.session_id}", "user_id", user_id)
+        return True
+
+    async def handle_heartbeat(self, connection_info: ConnectionInfo):
+        """Record activity and answer a ping."""
+        connection_info.last_activity = datetime.now()
+        await self.send_local_message(connection_info, WebSocketMessage(
+            type=MessageType.PONG,
+            data={},
+            timestamp=datetime.now(),
+            session_id=connection_info.session_id
+        ))
+
+    def get_topic_connections(self, topics: Iterable[Topic]) -> List[ConnectionInfo]:
+        """Local connections subscribed to any of the topics (index lookup, no scan)."""
+        return [
+            self.local_connections[session_id]
+            for session_id in self.subscriptions.sessions(topics)
+            if session_id in self.local_connections
+        ]
+
+    def _deliver_to_topics(self, topics: Iterable[Topic], frame: str) -> int:
+        delivered = 0
+        for connection_info in self.get_topic_connections(topics):
+            if self._enqueue(connection_info, frame):
+                delivered += 1
+        return delivered
+
+    async def publish_to_topics(self, topics: List[Topic], message: Any) -> int:
+        """
+        Deliver a message to every session subscribed to any of the topics.
+
+        Local subscribers are resolved from the index; other instances are
+        looked up in Redis and only those with subscribers receive the frame.
+        A session in several topics gets the message once per instance.
+
+        Returns:
+            Number of local sessions the frame was queued for
+        """
+        started = time.perf_counter()
+        topics = list(topics)
+        frame = message if isinstance(message, str) else encode_message(message)
+        delivered = self._deliver_to_topics(topics, frame)
+        BROADCAST_FANOUT_DURATION.labels("topics").observe(time.perf_counter() - started)
+
+        try:
+            r = await self.redis_manager.get_redis()
+            pipe = r.pipeline(transaction=False)
+            for topic in topics:
+                pipe.smembers(self._topic_instances_key(topic))
+            instances = set().union(*(await pipe.execute())) if topics else set()
+            instances.discard(self.instance_id)
+            if instances:
+                envelope = json.dumps({
+                    "target_type": "topic",
+                    "topics": [[kind.value, key] for kind, key in topics],
+                    "frame": frame
+                })
+                pipe = r.pipeline(transaction=False)
+                for instance_id in instances:
+                    pipe.publish(f"instance:{instance_id}", envelope)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Failed to relay topic message to other instances: {e}")
+        return delivered
+
+    async def send_to_user(self, user_id: str, message: Any) -> int:
+        """Send to every session of a user, on any instance."""
+        return await self.publish_to_topics([SubscriptionIndex.topic(TopicKind.USER, user_id)], message)
+
+    async def broadcast_to_channel(self, channel: str, message: Any) -> int:
+        """Send to every subscriber of a channel, on any instance."""
+        return await self.publish_to_topics([SubscriptionIndex.topic(TopicKind.CHANNEL, channel)], message)
+
+    async def broadcast_to_sport(self, sport: str, message: Any) -> int:
+        """Send to every session following a sport (e.g. a live-odds tick), on any instance."""
+        return await self.publish_to_topics([SubscriptionIndex.topic(TopicKind.SPORT, sport)], message)
+
+    async def send_message(self, session_id: Any, message: Union[WebSocketMessage, str]):
+        """
+        Send message to a session (local or remote), given its id or ConnectionInfo.
+
+        A str message is taken as an already-encoded frame, so callers sending
+        one payload to many sessions serialize it once.
+        """
+        if isinstance(session_id, ConnectionInfo):
+            session_id = session_id.session_id
         if session_id in self.local_connections:
             # Optimized local send
             await self.send_local_message(self.local_connections[session_id], message)
@@ -246,32 +716,67 @@ class EnhancedWebSocketManager:
             
             if session_data:
                 target_instance = session_data.get("instance_id")
-                await r.publish(f"instance:{target_instance}", json.dumps({
-                    "target_type": "direct",
-                    "session_id": session_id,
-                    "payload": message.to_dict()
-                }))
-
-    async def send_local_message(self, connection_info: ConnectionInfo, message: WebSocketMessage):
-        """Send message directly to local socket."""
-        try:
-            await connection_info.websocket.send_text(json.dumps(message.to_dict()))
-        except Exception as e:
-            logger.error(f"❌ Send failed: {e}")
-            await self.disconnect(connection_info.session_id)
+                envelope = {"target_type": "direct", "session_id": session_id}
+                if isinstance(message, str):
+                    envelope["frame"] = message
+                else:
+                    envelope["payload"] = message.to_dict()
+                await r.publish(f"instance:{target_instance}", json.dumps(envelope))
+
+    async def send_local_message(self, connection_info: ConnectionInfo, message: Union[WebSocketMessage, str]):
+        """Queue a message (or a pre-encoded frame) for a local socket."""
+        frame = message if isinstance(message, str) else encode_message(message)
+        self._enqueue(connection_info, frame)
+
+    def _enqueue(self, connection_info: ConnectionInfo, frame: str) -> bool:
+        if connection_info.sender is None:
+            self._register_local(connection_info)
+        sender = connection_info.sender
+        dropped_before = sender.dropped
+        queued = sender.enqueue(frame)
+        if queued:
+            self.broadcast_stats["frames_queued"] += 1
+        self.broadcast_stats["frames_dropped"] += sender.dropped - dropped_before
+        return queued
 
-    async def _local_broadcast(self, message_dict: Dict[str, Any]):
-        """Broadcast message to all *local* connections."""
-        message = WebSocketMessage(**message_dict)
-        for conn in self.local_connections.values():
-            await self.send_local_message(conn, message)
+    async def _local_broadcast(self, message: Any):
+        """
+        Broadcast to all *local* connections.
+
+        The payload is serialized once and the same frame is queued on every
+        connection; the loop yields between shards so a 10k fan-out does not
+        monopolize the event loop.
+        """
+        started = time.perf_counter()
+        frame = message if isinstance(message, str) else encode_message(message)
+        connections = list(self.local_connections.values())
+        self.broadcast_stats["broadcasts"] += 1
+        for start in range(0, len(connections), self.broadcast_shard_size):
+            for conn in connections[start:start + self.broadcast_shard_size]:
+                self._enqueue(conn, frame)
+            if start + self.broadcast_shard_size < len(connections):
+                await asyncio.sleep(0)
+        BROADCAST_FANOUT_DURATION.labels("all").observe(time.perf_counter() - started)
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Local connection count and fan-out counters."""
+        return {
+            "instance_id": self.instance_id,
+            "local_connections": len(self.local_connections),
+            "queued_frames": sum(
+                conn.sender.queue.qsize() for conn in self.local_connections.values() if conn.sender
+            ),
+            "backpressure_policy": self.backpressure_policy.value,
+            "indexed_topics": len(self.subscriptions),
+            **self.broadcast_stats,
+        }
 
-    async def broadcast_message(self, message: WebSocketMessage):
-        """Broadcast to ALL users across ALL instances."""
+    async def broadcast_message(self, message: Union[WebSocketMessage, str]):
+        """Broadcast to ALL users across ALL instances (a str message is a pre-encoded frame)."""
         r = await self.redis_manager.get_redis()
         await r.publish("broadcast:all", json.dumps({
             "target_type": "broadcast",
-            "payload": message.to_dict()
+            "payload": message if isinstance(message, str) else message.to_dict()
         }))
 
 # Global Instance
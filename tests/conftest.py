@@ -10,6 +10,9 @@ from sqlalchemy.orm import sessionmaker
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Keep the app-wide rate limiter out of API tests; its own tests wrap RateLimitMiddleware directly
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
 from src.main import app
 from src.db.database import Base, get_db
 from src.config import settings
@@ -2,13 +2,29 @@
 Load Tests for Authentication
 =============================
 Tests concurrent authentication requests to validate async performance improvements.
+
+Run the authenticated-request throughput comparison standalone:
+    python tests/load/test_concurrent_auth.py --requests 5000
 """
 
+import argparse
+import os
+import sys
+import time
+from unittest.mock import patch
+
 import pytest
 import pytest_asyncio
 import asyncio
-from httpx import AsyncClient
-from src.main import app
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.main import app  # noqa: E402
 
 
 @pytest_asyncio.fixture
@@ -143,3 +159,99 @@ class TestConcurrentTokenValidation:
         
         # All should succeed
         assert successes == 100, f"Only {successes}/100 validations succeeded"
+
+
+async def run_authenticated_throughput(requests: int = 2000, users: int = 200, concurrency: int = 50,
+                                       cached: bool = True) -> dict:
+    """
+    Authenticated requests per second through the real get_current_user dependency.
+
+    Each of `users` users holds one token; requests are spread round-robin
+    and `concurrency` run at a time against an in-memory database.
+    """
+    from src.api import auth_routes
+    from src.db.database import Base, get_db
+    from src.db.models.user import User as UserModel
+    from src.services.token_cache import VerifiedTokenCache
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    service = auth_routes.auth_service
+    async with factory() as session:
+        session.add_all([
+            UserModel(id=f"bench_{u}", username=f"bench_{u}", email=f"bench_{u}@example.com", password_hash="x")
+            for u in range(users)
+        ])
+        await session.commit()
+    tokens = [service._create_jwt_token(f"bench_{u}", "user") for u in range(users)]
+
+    async def bench_db():
+        async with factory() as session:
+            yield session
+
+    bench_app = FastAPI()
+
+    @bench_app.get("/whoami")
+    async def whoami(user=Depends(auth_routes.get_current_user)):
+        return {"id": user["id"]}
+
+    bench_app.dependency_overrides[get_db] = bench_db
+    cache = VerifiedTokenCache(ttl_seconds=None if cached else 0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(client, i):
+        async with semaphore:
+            response = await client.get("/whoami", headers={"Authorization": f"Bearer {tokens[i % users]}"})
+            return response.status_code
+
+    try:
+        with patch.object(service, "token_cache", cache):
+            async with AsyncClient(transport=ASGITransport(app=bench_app), base_url="http://test") as client:
+                await asyncio.gather(*(call(client, i) for i in range(users)))  # Warm-up: one miss per token
+                start = time.perf_counter()
+                statuses = await asyncio.gather(*(call(client, i) for i in range(requests)))
+                elapsed = time.perf_counter() - start
+    finally:
+        await cache.close()
+        await engine.dispose()
+
+    return {
+        "cached": cached,
+        "requests": requests,
+        "ok": sum(1 for status in statuses if status == 200),
+        "requests_per_second": requests / elapsed,
+        "cache": cache.get_stats(),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.benchmark
+class TestAuthenticatedThroughput:
+    """Authenticated-request throughput with and without the verified-token cache."""
+    
+    async def test_token_cache_raises_throughput(self):
+        """Test cached validation serves every request and outpaces per-request user lookups."""
+        uncached = await run_authenticated_throughput(requests=1000, cached=False)
+        cached = await run_authenticated_throughput(requests=1000, cached=True)
+        print(f"\n📊 Without token cache: {uncached['requests_per_second']:.0f} req/s")
+        print(f"📊 With token cache: {cached['requests_per_second']:.0f} req/s ({cached['cache']})")
+        
+        assert uncached["ok"] == cached["ok"] == 1000
+        assert cached["cache"]["hits"] == 1000
+        assert cached["requests_per_second"] > uncached["requests_per_second"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Authenticated-request throughput with and without the token cache")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    for use_cache in (False, True):
+        result = asyncio.run(run_authenticated_throughput(args.requests, args.users, args.concurrency, use_cache))
+        print(f"cache={'on ' if use_cache else 'off'}  {result['requests_per_second']:8.0f} req/s  "
+              f"ok={result['ok']}/{result['requests']}  {result['cache']}")
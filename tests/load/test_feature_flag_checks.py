@@ -0,0 +1,107 @@
+"""
+Load Tests for Feature Flag Checks
+==================================
+Micro-benchmark of FeatureFlagService.check() against a loaded snapshot:
+global flags, percentage rollouts and user overrides are evaluated in a
+tight loop while every Redis command is counted.
+
+Run standalone for a longer report:
+    python tests/load/test_feature_flag_checks.py --checks 1000000
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.services.feature_flags import FeatureFlagService  # noqa: E402
+
+
+async def run_check_benchmark(checks: int = 200000, users: int = 1000, redis_url: str = None) -> dict:
+    """
+    Nanoseconds per check() call, and Redis commands issued while timing.
+
+    One global flag, one 30% rollout and one user-overridden flag are
+    checked round-robin across `users` distinct users.
+    """
+    service = FeatureFlagService(redis_url=redis_url, refresh_interval=0)
+    redis_client = await service._get_redis()
+    commands = []
+    try:
+        if redis_client:
+            await redis_client.delete(service.GLOBAL_KEY, service.ROLLOUT_KEY, service.OVERRIDE_USERS_KEY)
+            await service.set_global_flag("bench_global", True)
+            await service.set_rollout("bench_rollout", 30)
+            await service.set_user_flag("bench_user_0", "bench_override", True)
+        await service.load()
+        user_ids = [f"bench_user_{u}" for u in range(users)]
+        await service.evaluate_all(user_ids[0])  # Fetch the overridden user's flags once
+
+        if redis_client:
+            original = redis_client.execute_command
+
+            async def counting(*args, **kwargs):
+                commands.append(args[0])
+                return await original(*args, **kwargs)
+
+            redis_client.execute_command = counting
+
+        flags = ["bench_global", "bench_rollout", "bench_override"]
+        calls = [(flags[i % 3], user_ids[i % users]) for i in range(checks)]
+        check = service.check
+        # Best of three rounds with the collector off, as timeit does, to keep noise out of the figure
+        rounds = []
+        gc.disable()
+        try:
+            for _ in range(3):
+                start = time.perf_counter()
+                enabled = sum(check(flag, user_id) for flag, user_id in calls)
+                rounds.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+        issued = len(commands)
+    finally:
+        if redis_client:
+            await redis_client.delete(service.GLOBAL_KEY, service.ROLLOUT_KEY, service.OVERRIDE_USERS_KEY,
+                                      f"{service.USER_KEY_PREFIX}bench_user_0")
+        await service.close()
+
+    return {
+        "backend": "redis" if redis_client else "defaults",
+        "checks": checks,
+        "ns_per_check": min(rounds) / checks * 1e9,
+        "enabled_ratio": enabled / checks,
+        "redis_commands": issued,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.benchmark
+class TestFeatureFlagChecks:
+    """Steady-state cost of a feature flag check."""
+
+    async def test_check_is_sub_microsecond_without_redis_traffic(self):
+        """Test a snapshot check costs under a microsecond and sends nothing to Redis."""
+        report = await run_check_benchmark(checks=100000)
+        print(f"\n📊 Feature flag checks: {report}")
+
+        assert report["redis_commands"] == 0
+        assert report["ns_per_check"] < 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature flag check benchmark")
+    parser.add_argument("--checks", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_check_benchmark(args.checks, args.users, args.redis_url))
+    for key, value in result.items():
+        print(f"{key:>14}: {value:.4f}" if isinstance(value, float) else f"{key:>14}: {value}")
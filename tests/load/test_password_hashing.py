@@ -0,0 +1,142 @@
+"""
+Load Tests for Password Hashing
+===============================
+Concurrent logins through AuthService.login_user while a probe measures
+event-loop lag. bcrypt runs on the PasswordHasher pool, so lag should stay
+flat while login throughput grows with the pool size (up to the number of
+cores).
+
+Run standalone for a longer report:
+    python tests/load/test_password_hashing.py --logins 200 --pool-sizes 1 2 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from src.db.database import Base  # noqa: E402
+from src.db.models.user import User as UserModel  # noqa: E402
+from src.services.auth_service import AuthService, AuthStatus, UserLogin  # noqa: E402
+from src.services.password_hasher import PasswordHasher  # noqa: E402
+from src.services.token_cache import VerifiedTokenCache  # noqa: E402
+
+PASSWORD = "Test123456!"
+PROBE_INTERVAL = 0.005
+
+
+async def _probe_lag(samples: list, stop: asyncio.Event):
+    """Record how late each fixed-interval wake-up is, in milliseconds."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def run_login_benchmark(logins: int = 40, pool_size: int = 1, rounds: int = 10, users: int = 20) -> dict:
+    """
+    Login throughput and event-loop lag with `logins` concurrent logins.
+
+    The hasher queue is sized to admit every login, so the run measures
+    throughput rather than shedding.
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    hasher = PasswordHasher(pool_size=pool_size, queue_size=logins, rounds=rounds)
+    password_hash = hasher.hash_sync(PASSWORD)
+    async with factory() as session:
+        session.add_all([
+            UserModel(id=f"bench_{u}", username=f"bench_{u}", email=f"bench_{u}@example.com",
+                      password_hash=password_hash)
+            for u in range(users)
+        ])
+        await session.commit()
+
+    # No Redis: rate limiting and sessions would add their own round trips to every login
+    service = AuthService(password_hasher=hasher, token_cache=VerifiedTokenCache(ttl_seconds=0))
+    service.redis_client = False
+
+    async def login(i: int):
+        async with factory() as session:
+            result = await service.login_user(session, UserLogin(username=f"bench_{i % users}", password=PASSWORD))
+            return result["status"]
+
+    lag, stop = [], asyncio.Event()
+    probe = asyncio.create_task(_probe_lag(lag, stop))
+    try:
+        await asyncio.sleep(PROBE_INTERVAL * 4)  # Idle baseline samples
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        await probe
+        hasher.shutdown()
+        await engine.dispose()
+
+    return {
+        "pool_size": pool_size,
+        "logins": logins,
+        "ok": sum(1 for s in statuses if s == AuthStatus.SUCCESS),
+        "logins_per_second": logins / elapsed,
+        "lag_p50_ms": float(np.percentile(lag, 50)),
+        "lag_p99_ms": float(np.percentile(lag, 99)),
+        "lag_max_ms": float(max(lag)),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.benchmark
+class TestPasswordHashingUnderLoad:
+    """Event-loop health and throughput of concurrent logins."""
+
+    async def test_event_loop_lag_stays_flat(self):
+        """Test concurrent logins leave the loop responsive at every pool size."""
+        hasher = PasswordHasher(rounds=10)
+        start = time.perf_counter()
+        hasher.hash_sync(PASSWORD)
+        single_hash_ms = (time.perf_counter() - start) * 1000
+
+        for pool_size in (1, 2):
+            report = await run_login_benchmark(logins=30, pool_size=pool_size)
+            print(f"\n📊 Logins (pool={pool_size}): {report}")
+            assert report["ok"] == 30
+            # Inline bcrypt would stall the loop for a full hash at a time
+            assert report["lag_p99_ms"] < single_hash_ms / 2
+
+    @pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="Throughput scaling needs more than one core")
+    async def test_throughput_scales_with_pool_size(self):
+        """Test two workers log users in faster than one."""
+        single = await run_login_benchmark(logins=40, pool_size=1)
+        double = await run_login_benchmark(logins=40, pool_size=2)
+        print(f"\n📊 Logins/s: pool=1 {single['logins_per_second']:.1f}, pool=2 {double['logins_per_second']:.1f}")
+
+        assert double["logins_per_second"] > single["logins_per_second"] * 1.4
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent login benchmark with event-loop lag")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    for size in args.pool_sizes:
+        result = asyncio.run(run_login_benchmark(args.logins, size, args.rounds))
+        print(f"pool={size:<3} {result['logins_per_second']:7.1f} logins/s  ok={result['ok']}/{result['logins']}  "
+              f"lag p50={result['lag_p50_ms']:.2f} ms  p99={result['lag_p99_ms']:.2f} ms  "
+              f"max={result['lag_max_ms']:.2f} ms")
@@ -0,0 +1,205 @@
+"""
+Unit Tests for HeadAgent Fan-Out
+================================
+Tests that aggregate_predictions queries sub-agents concurrently under a
+deadline, hedges slow calls, returns partial results, reads health from the
+registry instead of probing per call, and saves predictions in one INSERT.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.agents.head_agent import HeadAgent, Prediction, PredictionConfidence, SportType, UserQuery
+from src.db.database import Base
+from src.db.models.prediction import Prediction as PredictionModel
+from src.services.agent_registry import AgentRegistry
+
+
+class FakeSubAgent:
+    """Sub-agent with scripted per-call delays and failures."""
+
+    def __init__(self, sport: SportType, delays=(0.0,), healthy: bool = True, fail_first: bool = False):
+        self.sport = sport
+        self.delays = list(delays)
+        self.healthy = healthy
+        self.fail_first = fail_first
+        self.calls = 0
+        self.cancelled = 0
+        self.health_checks = 0
+
+    async def get_prediction(self, query_params: dict) -> Prediction:
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("upstream error")
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return Prediction(
+            sport=self.sport,
+            prediction=f"{self.sport.value} pick",
+            confidence=PredictionConfidence.HIGH,
+            reasoning="Analysis",
+            timestamp=datetime.utcnow(),
+            metadata={"game_id": f"{self.sport.value}_1", "odds": -110}
+        )
+
+    async def report_outcome(self, prediction_id: str, outcome: bool) -> None:
+        pass
+
+    async def get_health_status(self):
+        self.health_checks += 1
+        return {"healthy": self.healthy}
+
+
+@asynccontextmanager
+async def _head_agent(timeout: float = 2.0, hedge_delay: float = 0.0):
+    """A HeadAgent with its own registry and an in-memory predictions table.
+
+    Created inside each test so the Redis clients belong to the test's event loop.
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    agent = HeadAgent()
+    agent.agent_registry = AgentRegistry(snapshot_ttl=60)
+    agent.agent_timeout = timeout
+    agent.hedge_delay = hedge_delay
+    try:
+        with patch("src.agents.head_agent.AsyncSessionLocal", factory):
+            yield agent, engine, factory
+    finally:
+        await agent._stop_heartbeat_loop()
+        for sport in list(agent._local_agent_ids):
+            await agent.unregister_sub_agent(sport)
+        await agent.agent_registry.close()
+        await engine.dispose()
+
+
+def _query(*sports: SportType) -> UserQuery:
+    return UserQuery(user_id="test_user", sports=list(sports), query_text="Who will win?",
+                     preferences={}, timestamp=datetime.utcnow())
+
+
+@pytest.mark.asyncio
+async def test_fan_out_takes_as_long_as_the_slowest_agent():
+    """Test agents run concurrently, health is not probed per call and rows land in one INSERT."""
+    async with _head_agent() as (head, engine, factory):
+        agents = [
+            FakeSubAgent(SportType.BASEBALL, [0.1]),
+            FakeSubAgent(SportType.BASKETBALL, [0.2]),
+            FakeSubAgent(SportType.FOOTBALL, [0.3]),
+        ]
+        for agent in agents:
+            await head.register_sub_agent(agent.sport, agent)
+
+        inserts = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO predictions"):
+                inserts.append(statement)
+
+        for _ in range(3):
+            start = time.perf_counter()
+            result = await head.aggregate_predictions(_query(*(a.sport for a in agents)))
+            elapsed = time.perf_counter() - start
+
+            assert elapsed < 0.45  # Sequential calls would take 0.6s
+            assert set(result["predictions"]) == {"baseball", "basketball", "football"}
+            assert result["combined_prediction"]["sports_contributing"] == 3
+            assert result["sports_timed_out"] == []
+
+        assert len(inserts) == 3  # One per aggregation
+        assert [a.health_checks for a in agents] == [1, 1, 1]  # Only the probe at registration
+        async with factory() as db:
+            assert await db.scalar(select(func.count()).select_from(PredictionModel)) == 9
+            row = (await db.execute(select(PredictionModel).limit(1))).scalar_one()
+            assert row.odds == -110.0 and row.game_id.endswith("_1")
+
+
+@pytest.mark.asyncio
+async def test_slow_agent_is_reported_and_the_rest_are_kept():
+    """Test an agent that misses the deadline yields a partial result instead of a stall."""
+    async with _head_agent(timeout=0.3) as (head, _, factory):
+        fast = FakeSubAgent(SportType.BASEBALL, [0.05])
+        stuck = FakeSubAgent(SportType.HOCKEY, [5.0])
+        sick = FakeSubAgent(SportType.FOOTBALL, healthy=False)
+        for agent in (fast, stuck, sick):
+            await head.register_sub_agent(agent.sport, agent)
+
+        start = time.perf_counter()
+        result = await head.aggregate_predictions(_query(SportType.BASEBALL, SportType.HOCKEY, SportType.FOOTBALL))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.6
+        assert result["sports_timed_out"] == ["hockey"]
+        assert "error" in result["predictions"]["hockey"]
+        assert "football" not in result["predictions"]  # Unhealthy agents are skipped
+        assert sick.calls == 0 and sick.health_checks == 1
+        assert isinstance(result["predictions"]["baseball"], Prediction)
+        assert stuck.cancelled == 1
+        async with factory() as db:
+            assert await db.scalar(select(func.count()).select_from(PredictionModel)) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_attempt_rescues_slow_and_failed_calls():
+    """Test a second attempt starts after the hedge delay, or at once after a failure."""
+    async with _head_agent(timeout=1.0, hedge_delay=0.05) as (head, _, _):
+        slow_first = FakeSubAgent(SportType.BASEBALL, [2.0, 0.01])
+        flaky = FakeSubAgent(SportType.BASKETBALL, [0.01], fail_first=True)
+        for agent in (slow_first, flaky):
+            await head.register_sub_agent(agent.sport, agent)
+
+        start = time.perf_counter()
+        result = await head.aggregate_predictions(_query(SportType.BASEBALL, SportType.BASKETBALL))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.5
+        assert all(isinstance(result["predictions"][s], Prediction) for s in ("baseball", "basketball"))
+        assert (slow_first.calls, slow_first.cancelled) == (2, 1)  # The hedge won; the slow call was cancelled
+        assert flaky.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_health_changes_reach_aggregation_through_the_heartbeat():
+    """Test the heartbeat's health probe, not a per-call probe, decides whether an agent is used."""
+    async with _head_agent() as (head, _, _):
+        agent = FakeSubAgent(SportType.BASEBALL)
+        await head.register_sub_agent(agent.sport, agent)
+        assert "baseball" in (await head.aggregate_predictions(_query(SportType.BASEBALL)))["predictions"]
+
+        agent.healthy = False
+        assert "baseball" in (await head.aggregate_predictions(_query(SportType.BASEBALL)))["predictions"]
+
+        await head._report_health(agent.sport, head._local_agent_ids[agent.sport])
+        assert "baseball" not in (await head.aggregate_predictions(_query(SportType.BASEBALL)))["predictions"]
+        assert agent.health_checks == 2
+
+
+@pytest.mark.asyncio
+async def test_zero_deadline_times_out_instead_of_crashing():
+    """Test a non-positive agent timeout reports the sport as timed out without calling the agent."""
+    async with _head_agent() as (head, _, _):
+        agent = FakeSubAgent(SportType.BASEBALL)
+        await head.register_sub_agent(agent.sport, agent)
+        head.agent_timeout = 0.0
+
+        result = await head.aggregate_predictions(_query(SportType.BASEBALL))
+
+        assert result["sports_timed_out"] == ["baseball"]
+        assert agent.calls == 0
@@ -0,0 +1,76 @@
+"""
+Unit Tests for Prometheus Metrics
+=================================
+Tests route-template labelling in MetricsMiddleware, the Redis command
+hooks and the text exposition rendered for /metrics.
+"""
+
+import pytest
+import redis.asyncio as redis
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from src.config import settings
+from src.middleware.metrics import MetricsMiddleware
+from src.services.metrics import instrument_redis, render_latest, status_class
+
+
+def _count(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template():
+    """Test path parameters collapse into the route template and unknown paths share a label."""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"item_id": item_id}
+
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = _count("http_request_duration_seconds_count", **labels)
+    unmatched = _count("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for item_id in ("a", "b", "c"):
+            assert (await client.get(f"/items/{item_id}")).status_code == 200
+        assert (await client.get("/nope")).status_code == 404
+
+    assert _count("http_request_duration_seconds_count", **labels) == before + 3
+    assert _count("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") == unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_redis_commands_and_pipelines_are_timed():
+    """Test each command is observed under its name and a pipeline as one round trip."""
+    instrument_redis()
+    instrument_redis()  # Idempotent
+    client = redis.from_url(settings.redis_url, decode_responses=True)
+    try:
+        sets = _count("redis_command_duration_seconds_count", command="SET")
+        pipelines = _count("redis_command_duration_seconds_count", command="PIPELINE")
+
+        await client.set("metrics:test", "1")
+        async with client.pipeline() as pipe:
+            await pipe.set("metrics:test", "2").get("metrics:test").execute()
+
+        assert _count("redis_command_duration_seconds_count", command="SET") == sets + 1
+        assert _count("redis_command_duration_seconds_count", command="PIPELINE") == pipelines + 1
+    finally:
+        await client.delete("metrics:test")
+        await client.aclose()
+
+
+def test_status_class_and_exposition():
+    """Test status collapsing and that the exposition lists the platform metrics."""
+    assert status_class(204) == "2xx"
+    assert status_class(503) == "5xx"
+    assert status_class(None) == "error"
+
+    body = render_latest().decode()
+    for name in ("http_request_duration_seconds", "db_query_duration_seconds", "upstream_requests_total",
+                 "settlement_batch_duration_seconds", "websocket_connections", "app_uptime_seconds"):
+        assert name in body
@@ -0,0 +1,113 @@
+"""
+Unit Tests for ProfilingMiddleware
+==================================
+Tests header and sampling triggers, span capture across tasks, collapsed
+stack output and the top-N slow-request log.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.middleware.profiling import ProfilingMiddleware
+from src.services.profiling import Profiler, record_span, span
+
+
+def _app(profiler: Profiler) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/games/{game_id}")
+    async def get_game(game_id: str):
+        async def fetch(kind: str):
+            with span(kind, "fetch"):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(fetch("http"), fetch("db"))
+        record_span("redis", "GET", 0.002)
+        return {"game_id": game_id}
+
+    @app.get("/busy")
+    async def busy():
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+        return {}
+
+    return app
+
+
+async def _get(app: FastAPI, path: str, headers: dict = None):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, headers=headers or {})
+
+
+@pytest.mark.asyncio
+async def test_header_profile_writes_collapsed_spans(tmp_path):
+    """Test a token-authorised header profiles the request, including spans from child tasks."""
+    profiler = Profiler(sample_rate=0, token="secret", output_dir=str(tmp_path))
+    app = _app(profiler)
+
+    response = await _get(app, "/games/1", {"X-Profile": "spans", "X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    [entry] = profiler.slow_requests()
+    assert entry["id"] == profile_id
+    assert entry["route"] == "/games/{game_id}"
+    assert set(entry["spans"]) == {"http", "db", "redis"}
+
+    [path] = entry["files"]
+    lines = open(path).read().splitlines()
+    assert "GET /games/{game_id};redis;GET 2000" in lines
+    for line in lines:
+        stack, weight = line.rsplit(" ", 1)
+        assert stack.startswith("GET /games/{game_id};") and int(weight) > 0
+
+
+@pytest.mark.asyncio
+async def test_unauthorised_and_unsampled_requests_are_not_profiled(tmp_path):
+    """Test the header needs the token and sampling at rate 1 profiles everything."""
+    profiler = Profiler(sample_rate=0, token="secret", output_dir=str(tmp_path))
+    app = _app(profiler)
+
+    response = await _get(app, "/games/1", {"X-Profile": "spans", "X-Profile-Token": "wrong"})
+    assert "x-profile-id" not in response.headers
+    response = await _get(app, "/games/1")
+    assert "x-profile-id" not in response.headers
+    assert profiler.slow_requests() == []
+
+    profiler.sample_rate = 1.0
+    response = await _get(app, "/games/1")
+    assert "x-profile-id" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_stack_samples_show_the_hot_function(tmp_path):
+    """Test stack sampling attributes busy time to the endpoint's frame."""
+    profiler = Profiler(sample_rate=0, token="secret", output_dir=str(tmp_path), stack_interval=0.002)
+    app = _app(profiler)
+
+    await _get(app, "/busy", {"X-Profile": "stacks", "X-Profile-Token": "secret"})
+
+    [entry] = profiler.slow_requests()
+    assert entry["stack_samples"] > 0
+    stacks_file = next(path for path in entry["files"] if path.endswith(".stacks.folded"))
+    assert "busy (test_profiling.py)" in open(stacks_file).read()
+
+
+@pytest.mark.asyncio
+async def test_slow_log_keeps_the_slowest_requests():
+    """Test the slow-request log is bounded and ordered slowest first."""
+    profiler = Profiler(sample_rate=1.0, output_dir="", slow_log_size=2)
+    for delay in (0.0, 0.03, 0.01, 0.02):
+        profile = profiler.begin("GET", "/x", stacks=False)
+        await asyncio.sleep(delay)
+        await profiler.finish(profile, "/x", 200, forced=False)
+
+    durations = [entry["duration_ms"] for entry in profiler.slow_requests()]
+    assert len(durations) == 2
+    assert durations[0] >= durations[1] >= 20
@@ -7,7 +7,12 @@ Unit tests for rate limiting functionality.
 import pytest
 import pytest_asyncio
 import asyncio
-from src.middleware.rate_limiter import RateLimiter
+import jwt
+import redis.asyncio as redis
+from unittest.mock import AsyncMock, Mock
+from httpx import ASGITransport, AsyncClient
+from src.config import settings
+from src.middleware.rate_limiter import RateLimiter, RateLimitMiddleware, TimeWheelStore
 
 
 @pytest_asyncio.fixture
@@ -138,3 +143,135 @@ class TestRateLimitHeaders:
         
         # Check limit is correct
         assert headers["X-RateLimit-Limit"] == "100"
+
+
+@pytest.mark.asyncio
+class TestGCRA:
+    """Test the single-call GCRA limiter."""
+    
+    async def test_redis_burst_then_steady_rate(self):
+        """Test a full burst is allowed once, then requests are spaced by window/limit."""
+        client = redis.from_url(settings.redis_url, decode_responses=True)
+        await client.flushdb()
+        limiter = RateLimiter(redis_client=client)
+        limiter.limits["global"] = {"requests": 5, "window": 1}
+        try:
+            results = [await limiter.evaluate("gcra_ip") for _ in range(6)]
+            
+            assert [r.allowed for r in results] == [True] * 5 + [False]
+            assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+            assert 0 < results[5].retry_after <= 0.2
+            
+            # One emission interval later exactly one more request fits: no 2x edge burst
+            await asyncio.sleep(0.21)
+            assert await limiter.check_rate_limit("gcra_ip")
+            assert not await limiter.check_rate_limit("gcra_ip")
+            assert 0 < await client.pttl("rate_limit:global:gcra_ip") <= 1000
+        finally:
+            await client.flushdb()
+            await client.aclose()
+    
+    async def test_script_is_reloaded_after_cache_flush(self):
+        """Test a flushed script cache reloads the GCRA script instead of failing the request."""
+        client = redis.from_url(settings.redis_url, decode_responses=True)
+        await client.flushdb()
+        limiter = RateLimiter(redis_client=client)
+        try:
+            assert await limiter.check_rate_limit("gcra_flush")
+            stale_sha = limiter._script.sha
+            await client.script_flush()
+            
+            result = await limiter.evaluate("gcra_flush")
+            
+            assert result.allowed and result.remaining == limiter.limits["global"]["requests"] - 2
+            assert limiter._script.sha == stale_sha
+            assert await client.script_exists(stale_sha) == [True]
+        finally:
+            await client.flushdb()
+            await client.aclose()
+    
+    async def test_memory_matches_redis_semantics(self, rate_limiter):
+        """Test the memory fallback enforces the same burst and spacing."""
+        results = [rate_limiter._evaluate_memory("mem_gcra", 4, 1) for _ in range(5)]
+        
+        assert [r.allowed for r in results] == [True] * 4 + [False]
+        assert results[0].remaining == 3
+        await asyncio.sleep(0.26)
+        assert rate_limiter._check_memory_rate_limit("mem_gcra", 4, 1)
+    
+    async def test_redis_failure_falls_back_to_memory(self, rate_limiter):
+        """Test a broken Redis client degrades to the local limiter."""
+        rate_limiter.redis_client = Mock()
+        rate_limiter.redis_client.register_script.return_value = AsyncMock(side_effect=ConnectionError("down"))
+        rate_limiter.limits["global"] = {"requests": 2, "window": 60}
+        
+        assert [await rate_limiter.check_rate_limit("fallback_ip") for _ in range(3)] == [True, True, False]
+        assert "global:fallback_ip" in rate_limiter._memory_store
+
+
+class TestTimeWheelStore:
+    """Test the bounded fallback store."""
+    
+    def test_expired_keys_are_swept(self):
+        """Test keys are removed once the wheel passes their expiry."""
+        store = TimeWheelStore(slots=8, tick=1.0)
+        store.set("short", 1, expires_at=store._cursor + 2)
+        store.set("long", 2, expires_at=store._cursor + 20)  # Beyond one revolution
+        
+        assert store.get("short", now=store._cursor + 1) == 1
+        assert store.get("long", now=store._cursor + 3) == 2
+        assert len(store) == 1
+        assert store.get("long", now=store._cursor + 21) is None
+        assert len(store) == 0
+    
+    def test_capacity_evicts_oldest(self):
+        """Test the store never grows past max_keys."""
+        store = TimeWheelStore(max_keys=3)
+        expires_at = store._cursor + 60
+        for key in ("a", "b", "c"):
+            store.set(key, 0, expires_at)
+        store.set("a", 1, expires_at)  # Refresh moves "a" to the back
+        store.set("d", 0, expires_at)
+        
+        assert len(store) == 3
+        assert "b" not in store
+        assert store.get("a") == 1
+
+
+@pytest.mark.asyncio
+class TestRateLimitMiddleware:
+    """Test identifiers and responses from the middleware."""
+    
+    @staticmethod
+    async def _app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    
+    async def test_jwt_user_is_limited_across_ips(self, rate_limiter):
+        """Test a bearer token limits by user and sets rate limit headers."""
+        rate_limiter.limits["global"] = {"requests": 2, "window": 60}
+        app = RateLimitMiddleware(self._app, rate_limiter)
+        token = jwt.encode({"user_id": "user_42"}, settings.secret_key, algorithm=settings.algorithm)
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        responses = []
+        for ip in ("1.1.1.1", "2.2.2.2", "3.3.3.3"):
+            transport = ASGITransport(app=app, client=(ip, 1234))
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                responses.append(await client.get("/api/v1/games", headers=headers))
+        
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["x-ratelimit-remaining"] == "1"
+        assert int(responses[2].headers["retry-after"]) >= 1
+        assert "global:user:user_42" in rate_limiter._memory_store
+    
+    async def test_invalid_token_and_health_checks(self, rate_limiter):
+        """Test a bad token falls back to the IP and health checks are never limited."""
+        rate_limiter.limits["global"] = {"requests": 1, "window": 60}
+        transport = ASGITransport(app=RateLimitMiddleware(self._app, rate_limiter), client=("9.9.9.9", 1))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            for _ in range(3):
+                assert (await client.get("/health")).status_code == 200
+                assert (await client.get("/ready")).status_code == 200
+            assert (await client.get("/x", headers={"Authorization": "Bearer junk"})).status_code == 200
+            assert (await client.get("/x")).status_code == 429
@@ -4,15 +4,16 @@ Unit Tests for AgentRegistry
 Tests distributed agent registration, discovery, health monitoring, and cleanup.
 """
 
+import time
 import pytest
 import pytest_asyncio
 from datetime import datetime, timedelta
 from src.services.agent_registry import AgentRegistry, AgentInfo
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(loop_scope="function")
 async def registry():
-    """Provide a test AgentRegistry instance."""
+    """Provide a test AgentRegistry instance (on the test's event loop, so teardown can close it)."""
     registry = AgentRegistry()
     yield registry
     
@@ -21,18 +22,16 @@ async def registry():
     if redis_client:
         # Clean up test data
         await redis_client.flushdb()
+    await registry.close()
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(loop_scope="function")
 async def clean_redis(registry):
     """Clean Redis before each test."""
     redis_client = await registry._get_redis()
     if redis_client:
         await redis_client.flushdb()
     yield
-    # Cleanup after
-    if redis_client:
-        await redis_client.flushdb()
 
 
 @pytest.mark.asyncio
@@ -241,6 +240,7 @@ class TestStaleAgentCleanup:
         old_time = (datetime.utcnow() - timedelta(seconds=200)).isoformat()
         agent_key = registry.AGENT_INFO_KEY.format(agent_id=agent1)
         await redis_client.hset(agent_key, "last_heartbeat", old_time)
+        await redis_client.zadd(registry.HEARTBEATS_KEY, {agent1: time.time() - 200})
         
         # Run cleanup
         cleaned = await registry.cleanup_stale_agents()
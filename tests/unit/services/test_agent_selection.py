@@ -0,0 +1,157 @@
+"""
+Unit Tests for AgentRegistry Selection and Snapshots
+====================================================
+Tests round-robin, least-in-flight and latency-weighted selection, that
+reads and heartbeats are single pipelined round trips, that stale agents
+are found through the heartbeat index, and that registry changes reach
+another instance's snapshot and load statistics.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import pytest
+
+from src.services.agent_registry import AgentRegistry
+
+
+@asynccontextmanager
+async def _registries(count: int = 1, **kwargs):
+    """Registries sharing one Redis, as separate HeadAgent instances would.
+
+    Created inside each test so the Redis clients belong to the test's event loop.
+    """
+    registries = [AgentRegistry(**kwargs) for _ in range(count)]
+    for registry in registries:
+        if await registry._get_redis() is None:
+            pytest.skip("Redis not available")
+    await registries[0].redis_client.flushdb()
+    try:
+        yield registries
+    finally:
+        await registries[0].redis_client.flushdb()
+        for registry in registries:
+            await registry.close()
+
+
+async def _register(registry: AgentRegistry, count: int, sport: str = "baseball") -> list:
+    return [await registry.register_agent(sport, f"instance_{i}") for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_round_robin_and_least_in_flight_spread_traffic():
+    """Test round-robin cycles through agents and least-in-flight avoids busy ones."""
+    async with _registries() as (registry,):
+        agent_ids = await _register(registry, 3)
+
+        picks = Counter([(await registry.get_agent("baseball", "round_robin")).agent_id for _ in range(30)])
+        assert picks == Counter({agent_id: 10 for agent_id in agent_ids})
+
+        # Two calls stay open on the first agent, one on the second
+        async with registry.track(agent_ids[0]), registry.track(agent_ids[0]), registry.track(agent_ids[1]):
+            assert registry.get_load(agent_ids[0])["in_flight"] == 2
+            assert (await registry.get_agent("baseball", "least_in_flight")).agent_id == agent_ids[2]
+
+        # Idle again: ties rotate instead of always picking the first agent
+        picks = {(await registry.get_agent("baseball", "least_in_flight")).agent_id for _ in range(3)}
+        assert picks == set(agent_ids)
+        load = registry.get_load(agent_ids[0])
+        assert (load["in_flight"], load["requests"], load["failures"]) == (0, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_latency_weighted_prefers_fast_agents():
+    """Test slow and failing agents get less traffic, and unmeasured agents still get some."""
+    async with _registries() as (registry,):
+        fast, slow, new = await _register(registry, 3)
+        for _ in range(20):
+            registry.record_result(fast, 0.01)
+            registry.record_result(slow, 0.2)
+
+        picks = Counter([(await registry.get_agent("baseball", "latency_weighted")).agent_id for _ in range(600)])
+        assert picks[fast] > 5 * picks[slow]
+        assert picks[new] > 5 * picks[slow]  # Assumed as fast as the fastest until measured
+
+        with pytest.raises(RuntimeError):
+            async with registry.track(fast):
+                raise RuntimeError("agent down")
+        load = registry.get_load(fast)
+        assert load["failures"] == 1
+        assert load["ewma_latency"] > 0.01  # The failure counted as a slow call
+
+
+@pytest.mark.asyncio
+async def test_reads_and_heartbeats_are_single_round_trips():
+    """Test listing, heartbeats and stale cleanup use pipelines and the heartbeat index."""
+    async with _registries(snapshot_ttl=0) as (registry,):
+        agent_ids = await _register(registry, 5)
+        client = registry.redis_client
+
+        with patch.object(client, "execute_command", wraps=client.execute_command) as single:
+            agents = await registry.get_all_agents("baseball")
+            assert await registry.heartbeat(agent_ids[0]) is True
+        assert len(agents) == 5
+        assert single.call_count == 1  # SMEMBERS; the HGETALLs and heartbeat writes are pipelined
+
+        stale = agent_ids[:2]
+        await client.zadd(registry.HEARTBEATS_KEY, {agent_id: time.time() - 200 for agent_id in stale})
+        await client.delete(registry.AGENT_INFO_KEY.format(agent_id=stale[1]))  # Hash already expired
+
+        assert await registry.cleanup_stale_agents() == 2
+        remaining = {a.agent_id for a in await registry.get_all_agents("baseball")}
+        assert remaining == set(agent_ids[2:])
+        assert await client.zcard(registry.HEARTBEATS_KEY) == 3
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refreshes_on_change_notifications():
+    """Test another instance's registrations reach a cached snapshot before its TTL expires."""
+    async with _registries(2, snapshot_ttl=60) as (here, there):
+        await _register(here, 1)
+        assert len(await there.get_all_agents("baseball")) == 1
+
+        with patch.object(there.redis_client, "smembers", wraps=there.redis_client.smembers) as smembers:
+            for _ in range(10):
+                await there.get_all_agents("baseball")
+            assert smembers.call_count == 0  # Served from the snapshot
+
+            agent_id = await here.register_agent("baseball", "instance_9")
+            for _ in range(50):
+                if agent_id in {a.agent_id for a in await there.get_all_agents("baseball")}:
+                    break
+                await asyncio.sleep(0.02)
+            assert smembers.call_count >= 1
+
+        assert len(await there.get_all_agents("baseball")) == 2
+        there.record_result(agent_id, 0.01)
+        await here.unregister_agent(agent_id)
+        for _ in range(50):
+            if len(await there.get_all_agents("baseball")) == 1:
+                break
+            await asyncio.sleep(0.02)
+        assert agent_id not in {a.agent_id for a in await there.get_all_agents("baseball")}
+        assert agent_id not in there._load  # Load statistics go with the agent
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_are_not_failures():
+    """Test a call cancelled mid-flight (a losing hedge) leaves the agent's statistics alone."""
+    async with _registries() as (registry,):
+        agent_id, = await _register(registry, 1)
+
+        async def slow_call():
+            async with registry.track(agent_id):
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(slow_call())
+        await asyncio.sleep(0.01)
+        assert registry.get_load(agent_id)["in_flight"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        load = registry.get_load(agent_id)
+        assert (load["in_flight"], load["requests"], load["failures"], load["ewma_latency"]) == (0, 0, 0, None)
@@ -0,0 +1,133 @@
+"""
+Unit Tests for AutonomousBettingEngine
+======================================
+Tests prediction loading from the typed, indexed prediction columns.
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.models.prediction import Prediction, betting_columns_from_metadata
+from src.services.autonomous_betting_engine import AutonomousBettingEngine
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Provide an isolated in-memory database session factory."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def _prediction(pred_id: str, game_date: datetime, **metadata) -> Prediction:
+    return Prediction(
+        id=pred_id,
+        sport="nba",
+        prediction_text="Home team wins",
+        confidence="high",
+        timestamp=datetime.utcnow(),
+        metadata_json={"game_id": pred_id, "game_date": game_date.isoformat() + "Z", **metadata},
+    )
+
+
+def test_betting_columns_from_metadata_normalizes_types():
+    """Test metadata is coerced to naive UTC dates and floats."""
+    columns = betting_columns_from_metadata({
+        "game_id": 401585,
+        "game_date": "2025-12-18T19:30:00-05:00",
+        "odds": "-150",
+        "line": None,
+        "edge": 0.07,
+    })
+
+    assert columns["game_id"] == "401585"
+    assert columns["game_date"] == datetime(2025, 12, 19, 0, 30)
+    assert columns["odds"] == -150.0
+    assert columns["line"] is None
+    assert columns["edge"] == 0.07
+
+
+@pytest.mark.asyncio
+async def test_insert_populates_typed_columns(session_factory):
+    """Test rows written with only metadata_json get their typed columns filled."""
+    game_date = datetime.utcnow().replace(microsecond=0)
+    async with session_factory() as session:
+        session.add(_prediction("p1", game_date, odds=-120, edge=0.08, team="Lakers"))
+        await session.commit()
+        stored = await session.get(Prediction, "p1")
+
+    assert stored.game_id == "p1"
+    assert stored.game_date == game_date
+    assert stored.odds == -120.0
+    assert stored.team == "Lakers"
+
+
+@pytest.mark.asyncio
+async def test_insert_keeps_explicit_columns_missing_from_metadata(session_factory):
+    """Test a column set directly survives insert when metadata_json does not carry that key."""
+    game_date = datetime.utcnow().replace(microsecond=0)
+    async with session_factory() as session:
+        prediction = _prediction("p1", game_date, team="Lakers")
+        prediction.odds = -110.0
+        prediction.edge = 0.05
+        prediction.team = "Celtics"
+        session.add(prediction)
+        await session.commit()
+        stored = await session.get(Prediction, "p1")
+
+    assert (stored.odds, stored.edge) == (-110.0, 0.05)
+    assert stored.team == "Lakers"  # Metadata still wins for keys it carries
+    assert stored.game_date == game_date
+
+
+@pytest.mark.asyncio
+async def test_metadata_update_recomputes_typed_columns(session_factory):
+    """Test reassigning metadata_json overwrites the typed columns, clearing removed keys."""
+    game_date = datetime.utcnow().replace(microsecond=0)
+    async with session_factory() as session:
+        session.add(_prediction("p1", game_date, odds=-120, edge=0.08, team="Lakers"))
+        await session.commit()
+        stored = await session.get(Prediction, "p1")
+        stored.metadata_json = {**stored.metadata_json, "odds": 135, "team": "Celtics"}
+        stored.metadata_json.pop("edge")
+        await session.commit()
+        stored.outcome = True  # Unrelated updates leave the columns alone
+        await session.commit()
+
+    assert (stored.odds, stored.team, stored.edge) == (135.0, "Celtics", None)
+    assert stored.game_date == game_date
+
+
+@pytest.mark.asyncio
+async def test_get_predictions_filters_to_todays_games(session_factory):
+    """Test only today's games are returned, with values read from typed columns."""
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    async with session_factory() as session:
+        session.add_all([
+            _prediction("today", today, home_team="Lakers", away_team="Celtics",
+                        bet_type="total", line=221.5, odds=-105, probability=0.6, edge=0.09),
+            _prediction("next_week", today + timedelta(days=7)),
+            _prediction("yesterday", today - timedelta(days=1)),
+        ])
+        await session.commit()
+
+    engine = AutonomousBettingEngine()
+    with patch("src.db.database.AsyncSessionLocal", session_factory):
+        predictions = await engine._get_predictions("user_1")
+
+    assert [p["prediction_id"] for p in predictions] == ["today"]
+    pred = predictions[0]
+    assert pred["team"] == "Lakers"  # Defaults to home team
+    assert pred["bet_type"] == "over_under"
+    assert pred["line"] == 221.5
+    assert pred["odds"] == -105.0
+    assert pred["confidence"] == 0.85
+    assert pred["edge"] == 0.09
+    assert pred["game_date"] == today.isoformat()
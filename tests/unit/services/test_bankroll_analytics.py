@@ -0,0 +1,167 @@
+"""
+Unit Tests for BankrollAnalytics
+================================
+Tests O(1) per-settlement updates of equity, drawdown, Welford Sharpe and
+streaks, and that the vectorized backfill reproduces the same state.
+"""
+
+import random
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.models.bet import Bankroll, BankrollEquityPoint, BetStatus, BetType
+from src.services.bankroll_analytics import BankrollAnalytics, SettledBet
+from src.services.bet_tracker import BetTracker
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Provide an isolated in-memory database with one funded bankroll."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Bankroll(id="br", user_id="u1", sportsbook="paper_trading", initial_deposit=1000.0,
+                             current_balance=1000.0, available_balance=1000.0, total_wagered=0.0,
+                             active_bets_count=0, active_bets_amount=0.0, total_won=0.0, total_lost=0.0))
+        await session.commit()
+    with patch("src.services.bet_tracker.AsyncSessionLocal", factory), \
+            patch("src.services.bankroll_analytics.AsyncSessionLocal", factory):
+        yield factory
+    await engine.dispose()
+
+
+def _bankroll() -> Bankroll:
+    return Bankroll(user_id="u1", initial_deposit=100.0)
+
+
+def test_incremental_state_matches_closed_form():
+    """Test equity, drawdown, Welford Sharpe and streaks after a known sequence."""
+    analytics = BankrollAnalytics()
+    bankroll = _bankroll()
+    sequence = [
+        (BetStatus.WON, 10.0, 20.0), (BetStatus.WON, 10.0, 19.0), (BetStatus.LOST, 20.0, 0.0),
+        (BetStatus.PUSHED, 5.0, 5.0), (BetStatus.LOST, 10.0, 0.0), (BetStatus.LOST, 10.0, 0.0),
+        (BetStatus.WON, 10.0, 25.0),
+    ]
+    points = analytics.apply_many(bankroll, [SettledBet(str(i), a, p, s, datetime.utcnow())
+                                             for i, (s, a, p) in enumerate(sequence)])
+
+    profits = [10.0, 9.0, -20.0, 0.0, -10.0, -10.0, 15.0]
+    equity = 100.0 + np.cumsum(profits)
+    assert [p["equity"] for p in points] == pytest.approx(list(equity))
+    assert bankroll.peak_equity == 119.0
+    assert bankroll.max_drawdown == pytest.approx((119.0 - 79.0) / 119.0 * 100)
+    assert bankroll.current_drawdown == pytest.approx((119.0 - 94.0) / 119.0 * 100)
+
+    returns = np.array([1.0, 0.9, -1.0, 0.0, -1.0, -1.0, 1.5])
+    assert bankroll.returns_mean == pytest.approx(returns.mean())
+    assert bankroll.sharpe_ratio == pytest.approx(returns.mean() / returns.std(ddof=1))
+
+    assert bankroll.current_streak == 1
+    assert bankroll.longest_win_streak == 2
+    assert bankroll.longest_loss_streak == 3  # The push does not break the run
+
+
+@pytest.mark.asyncio
+async def test_settlements_maintain_analytics_and_backfill_reproduces_them(session_factory):
+    """Test tracker settlements update analytics as they go and a rebuild agrees."""
+    tracker = BetTracker()
+    rng = random.Random(7)
+    statuses = [rng.choice([BetStatus.WON, BetStatus.LOST, BetStatus.LOST, BetStatus.PUSHED]) for _ in range(40)]
+
+    bet_ids = []
+    for status in statuses[:30]:
+        bet_id = await tracker.place_bet("u1", {"sport": "nba", "game_id": "g", "bet_type": BetType.MONEYLINE,
+                                                "amount": rng.choice([10.0, 25.0, 50.0]), "odds": -110.0})
+        bet_ids.append(bet_id)
+        assert await tracker.update_bet_status(bet_id, status)
+
+    batch = []
+    for status in statuses[30:]:
+        bet_id = await tracker.place_bet("u1", {"sport": "nba", "game_id": "g", "bet_type": BetType.MONEYLINE,
+                                                "amount": 20.0, "odds": 120.0})
+        batch.append({"id": bet_id, "user_id": "u1", "amount": 20.0, "odds": 120.0, "status": status})
+    batch.sort(key=lambda s: s["id"])  # Same settled_at for the batch; the rebuild orders ties by id
+    await tracker.settle_bets(batch)
+
+    incremental = (await tracker.get_bankroll("u1"))["analytics"]
+    async with session_factory() as session:
+        curve = (await session.execute(
+            select(BankrollEquityPoint.equity).order_by(BankrollEquityPoint.recorded_at, BankrollEquityPoint.bet_id)
+        )).scalars().all()
+    assert incremental["settled_bets"] == 40
+    assert len(curve) == 40
+
+    assert await BankrollAnalytics().backfill(["u1"]) == 1
+    rebuilt = (await tracker.get_bankroll("u1"))["analytics"]
+    async with session_factory() as session:
+        rebuilt_curve = (await session.execute(
+            select(BankrollEquityPoint.equity).order_by(BankrollEquityPoint.recorded_at, BankrollEquityPoint.bet_id)
+        )).scalars().all()
+
+    assert rebuilt == pytest.approx(incremental)
+    assert rebuilt_curve == pytest.approx(curve)
+
+
+@pytest.mark.asyncio
+async def test_resettling_a_bet_replaces_its_outcome(session_factory):
+    """Test a corrected settlement is counted once, in analytics and in bankroll totals."""
+    tracker = BetTracker()
+    bet_ids = []
+    for _ in range(3):
+        bet_ids.append(await tracker.place_bet("u1", {"sport": "nba", "game_id": "g", "bet_type": BetType.MONEYLINE,
+                                                      "amount": 100.0, "odds": 100.0}))
+    assert await tracker.update_bet_status(bet_ids[0], BetStatus.WON)
+    assert await tracker.update_bet_status(bet_ids[1], BetStatus.LOST)
+    assert await tracker.update_bet_status(bet_ids[1], BetStatus.WON)  # Corrected outcome
+
+    bankroll = await tracker.get_bankroll("u1")
+    analytics = bankroll["analytics"]
+    assert analytics["settled_bets"] == 2
+    assert analytics["equity"] == pytest.approx(1200.0)
+    assert (analytics["current_streak"], analytics["longest_loss_streak"]) == (2, 0)
+    assert bankroll["active_bets_count"] == 1
+    assert (bankroll["total_won"], bankroll["total_lost"]) == (400.0, 0.0)
+    async with session_factory() as session:
+        curve = (await session.execute(
+            select(BankrollEquityPoint.bet_id).order_by(BankrollEquityPoint.recorded_at, BankrollEquityPoint.id)
+        )).scalars().all()
+    assert sorted(curve) == sorted(bet_ids[:2])
+
+    assert await BankrollAnalytics().backfill(["u1"]) == 1
+    assert (await tracker.get_bankroll("u1"))["analytics"] == pytest.approx(analytics)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_bets_leave_analytics_as_the_rebuild_does(session_factory):
+    """Test a cancelled bet adds no return or equity point, so apply and rebuild agree."""
+    tracker = BetTracker()
+    bet_ids = []
+    for _ in range(4):
+        bet_ids.append(await tracker.place_bet("u1", {"sport": "nba", "game_id": "g", "bet_type": BetType.MONEYLINE,
+                                                      "amount": 100.0, "odds": 100.0}))
+    assert await tracker.update_bet_status(bet_ids[0], BetStatus.WON)
+    assert await tracker.update_bet_status(bet_ids[1], BetStatus.CANCELLED)
+    assert await tracker.update_bet_status(bet_ids[2], BetStatus.LOST)
+    assert await tracker.update_bet_status(bet_ids[3], BetStatus.WON)
+
+    incremental = (await tracker.get_bankroll("u1"))["analytics"]
+    async with session_factory() as session:
+        curve = (await session.execute(
+            select(BankrollEquityPoint.bet_id).order_by(BankrollEquityPoint.recorded_at, BankrollEquityPoint.id)
+        )).scalars().all()
+    assert incremental["settled_bets"] == 3
+    assert bet_ids[1] not in curve and len(curve) == 3
+
+    assert await BankrollAnalytics().backfill(["u1"]) == 1
+    assert (await tracker.get_bankroll("u1"))["analytics"] == pytest.approx(incremental)
@@ -0,0 +1,149 @@
+"""
+Unit Tests for BetSettlementService
+===================================
+Tests batched settlement: single-query load, game index matching and
+one aggregated bankroll update per user.
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.models.bet import Bet, Bankroll, BetStatus, BetType
+from src.services.bet_settlement_service import BetSettlementService, GameIndex, PendingBet
+
+
+GAMES = [
+    {"id": "g1", "home_team": "Boston Celtics", "away_team": "Los Angeles Lakers",
+     "home_score": 110, "away_score": 100, "status": "Final"},
+    {"id": "g2", "home_team": "Miami Heat", "away_team": "New York Knicks",
+     "home_score": 95, "away_score": 99, "status": "Final"},
+    {"id": "g3", "home_team": "Chicago Bulls", "away_team": "Detroit Pistons",
+     "home_score": 0, "away_score": 0, "status": "In Progress"},
+]
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Provide an isolated in-memory database patched into the settlement path."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    with patch("src.services.bet_settlement_service.AsyncSessionLocal", factory), \
+            patch("src.services.bet_tracker.AsyncSessionLocal", factory):
+        yield factory
+    await engine.dispose()
+
+
+def _bet(bet_id: str, user_id: str, game_id: str, team: str, amount: float = 100.0, odds: float = 100.0,
+         game_date: datetime = None) -> Bet:
+    return Bet(
+        id=bet_id, user_id=user_id, sportsbook="paper_trading", sport="nba", game_id=game_id,
+        game_date=game_date or datetime.utcnow(), bet_type=BetType.MONEYLINE, team=team,
+        amount=amount, odds=odds, status=BetStatus.PENDING
+    )
+
+
+def _live_games_many():
+    """Stand-in for get_live_games_many returning GAMES on every requested date."""
+    async def fetch(sports, dates):
+        return {(sport, day): [dict(game, date=day.isoformat()) for game in GAMES] for sport in sports for day in dates}
+    return AsyncMock(side_effect=fetch)
+
+
+def test_game_index_matches_by_id_then_team_pair():
+    """Test index lookups by game_id, normalized team pair and single team."""
+    index = GameIndex(GAMES)
+
+    by_id = PendingBet("b1", "u", "nba", "g2", None, datetime.utcnow(), None, None,
+                       BetType.MONEYLINE, "Miami Heat", None, 10.0, -110.0)
+    by_pair = PendingBet("b2", "u", "nba", "unknown", None, datetime.utcnow(), "boston celtics",
+                         "Los Angeles Lakers!", BetType.MONEYLINE, "Celtics", None, 10.0, -110.0)
+    by_team = PendingBet("b3", "u", "nba", None, None, datetime.utcnow(), None, None,
+                         BetType.MONEYLINE, "Pistons", None, 10.0, -110.0)
+
+    assert index.find(by_id)["id"] == "g2"
+    assert index.find(by_pair)["id"] == "g1"
+    assert index.find(by_team)["id"] == "g3"
+
+
+@pytest.mark.asyncio
+async def test_settle_pending_bets_bulk_updates_and_aggregates_bankroll(session_factory):
+    """Test outcomes are written in bulk and each bankroll gets one combined delta."""
+    async with session_factory() as session:
+        session.add_all([
+            _bet("won_1", "user_a", "g1", "Boston Celtics"),
+            _bet("lost_1", "user_a", "g2", "Miami Heat"),
+            _bet("won_2", "user_b", "g2", "New York Knicks", amount=50.0, odds=-200.0),
+            _bet("live_1", "user_b", "g3", "Chicago Bulls"),
+            Bankroll(id="br_a", user_id="user_a", sportsbook="paper_trading", initial_deposit=1000.0, current_balance=1000.0,
+                     available_balance=800.0, total_wagered=200.0, active_bets_count=2,
+                     active_bets_amount=200.0, total_won=0.0, total_lost=0.0),
+            Bankroll(id="br_b", user_id="user_b", sportsbook="paper_trading", initial_deposit=1000.0, current_balance=1000.0,
+                     available_balance=850.0, total_wagered=150.0, active_bets_count=2,
+                     active_bets_amount=150.0, total_won=0.0, total_lost=0.0),
+        ])
+        await session.commit()
+        # Legacy rows may carry lowercase enum values
+        await session.execute(text("UPDATE bets SET status = 'pending' WHERE id = 'lost_1'"))
+        await session.commit()
+
+    service = BetSettlementService()
+    with patch("src.services.bet_settlement_service.real_sports_service.get_live_games_many",
+               _live_games_many()) as fetch:
+        result = await service.settle_pending_bets(days_back=7)
+
+    assert fetch.await_count == 1  # One (sport, date) group
+    assert result["bets_checked"] == 4
+    assert result["bets_settled"] == 3
+    assert result["bets_won"] == 2
+    assert result["bets_lost"] == 1
+    assert result["bets_skipped"] == 1
+
+    async with session_factory() as session:
+        bets = {b.id: b for b in (await session.execute(select(Bet))).scalars()}
+        bankrolls = {b.user_id: b for b in (await session.execute(select(Bankroll))).scalars()}
+
+    assert bets["won_1"].status == BetStatus.WON and bets["won_1"].payout == 200.0
+    assert bets["lost_1"].status == BetStatus.LOST and bets["lost_1"].roi == -100.0
+    assert bets["won_2"].payout == 75.0
+    assert bets["live_1"].status == BetStatus.PENDING
+
+    assert bankrolls["user_a"].active_bets_count == 0
+    assert bankrolls["user_a"].total_won == 200.0
+    assert bankrolls["user_a"].total_lost == 100.0
+    assert bankrolls["user_a"].available_balance == 1000.0
+    assert bankrolls["user_b"].active_bets_count == 1
+    assert bankrolls["user_b"].active_bets_amount == 100.0
+    assert bankrolls["user_b"].available_balance == 925.0
+
+
+@pytest.mark.asyncio
+async def test_settlement_fetches_all_recent_dates_in_one_call(session_factory):
+    """Test bets spread over several recent dates share one get_live_games_many call."""
+    today = datetime.utcnow()
+    async with session_factory() as session:
+        session.add_all([
+            _bet(f"bet_{days}", "user_a", "g1", "Boston Celtics", game_date=today - timedelta(days=days))
+            for days in range(3)
+        ])
+        await session.commit()
+
+    service = BetSettlementService()
+    with patch("src.services.bet_settlement_service.real_sports_service.get_live_games_many",
+               _live_games_many()) as fetch, \
+            patch("src.services.bet_settlement_service.real_sports_service.get_live_games") as single:
+        result = await service.settle_pending_bets(days_back=7)
+
+    assert fetch.await_count == 1
+    sports, dates = fetch.await_args.args
+    assert sports == ["nba"]
+    assert sorted(dates) == sorted((today - timedelta(days=days)).date() for days in range(3))
+    single.assert_not_called()
+    assert result["bets_won"] == 3
@@ -0,0 +1,237 @@
+"""
+Unit Tests for BetTracker ROI rollups
+=====================================
+Tests that placements and settlements keep per-day rollups in step with the
+bets table, that calculate_roi reads them with a single aggregate, and that
+the migration backfill matches the incremental totals.
+"""
+
+import importlib.util
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.models.bet import Bankroll, Bet, BetPerformanceRollup, BetStatus, BetType
+from src.services.bet_tracker import BetTracker
+
+
+@pytest_asyncio.fixture
+async def database():
+    """Provide an isolated in-memory database patched into BetTracker."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Bankroll(id="br", user_id="u1", sportsbook="paper_trading", initial_deposit=1000.0,
+                             current_balance=1000.0, available_balance=1000.0, total_wagered=0.0,
+                             active_bets_count=0, active_bets_amount=0.0, total_won=0.0, total_lost=0.0))
+        await session.commit()
+    with patch("src.services.bet_tracker.AsyncSessionLocal", factory):
+        yield engine, factory
+    await engine.dispose()
+
+
+def _bet_data(sport: str = "nba", bet_type: BetType = BetType.MONEYLINE, amount: float = 100.0,
+              odds: float = 150.0) -> dict:
+    return {"sport": sport, "game_id": "g1", "bet_type": bet_type, "amount": amount, "odds": odds}
+
+
+async def _legacy_roi(factory, user_id: str) -> dict:
+    """The totals calculate_roi used to compute by loading every bet."""
+    async with factory() as session:
+        bets = (await session.execute(select(Bet).where(Bet.user_id == user_id))).scalars().all()
+    settled = [b for b in bets if b.status != BetStatus.PENDING]
+    return {
+        "total_bets": len(bets),
+        "settled_bets": len(settled),
+        "total_wagered": round(sum(b.amount for b in bets), 2),
+        "total_won": round(sum(b.payout for b in settled if b.status == BetStatus.WON and b.payout), 2),
+        "total_lost": round(sum(b.amount for b in settled if b.status == BetStatus.LOST), 2),
+        "wins": len([b for b in settled if b.status == BetStatus.WON]),
+        "losses": len([b for b in settled if b.status == BetStatus.LOST]),
+        "pushes": len([b for b in settled if b.status == BetStatus.PUSHED]),
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollups_track_placement_and_settlement(database):
+    """Test every write path leaves calculate_roi equal to a full scan of the bets."""
+    engine, factory = database
+    tracker = BetTracker()
+
+    ids = [await tracker.place_bet("u1", _bet_data()) for _ in range(3)]
+    ids += [await tracker.place_bet("u1", _bet_data("nhl", BetType.SPREAD, 50.0, -110.0)) for _ in range(3)]
+    ids.append(await tracker.place_bet("u1", _bet_data("nfl", "over_under", 20.0, -105.0)))
+
+    assert await tracker.update_bet_status(ids[0], BetStatus.WON)
+    assert await tracker.update_bet_status(ids[1], BetStatus.LOST)
+    assert await tracker.update_bet_status(ids[1], BetStatus.PUSHED)  # Corrected outcome replaces the old one
+    await tracker.settle_bets([
+        {"id": ids[3], "user_id": "u1", "amount": 50.0, "odds": -110.0, "status": BetStatus.WON},
+        {"id": ids[4], "user_id": "u1", "amount": 50.0, "odds": -110.0, "status": BetStatus.LOST},
+    ])
+
+    roi = await tracker.calculate_roi("u1")
+    expected = await _legacy_roi(factory, "u1")
+    assert {key: roi[key] for key in expected} == expected
+    assert roi["net_profit"] == round(expected["total_won"] - expected["total_wagered"], 2)
+    assert roi["win_rate"] == round(2 / 4 * 100, 2)
+
+    async with factory() as session:
+        rows = (await session.execute(select(BetPerformanceRollup))).scalars().all()
+    assert {(r.sport, r.bet_type) for r in rows} == {("nba", "moneyline"), ("nhl", "spread"), ("nfl", "over_under")}
+
+
+@pytest.mark.asyncio
+async def test_settle_bets_skips_unknown_bets_it_cannot_attribute(database):
+    """Test a settlement for a missing bet without sport/bet_type/placed_at is skipped, not fatal."""
+    engine, factory = database
+    tracker = BetTracker()
+    bet_id = await tracker.place_bet("u1", _bet_data())
+
+    settled = await tracker.settle_bets([
+        {"id": "ghost", "user_id": "u1", "amount": 10.0, "odds": 100.0, "status": BetStatus.WON},
+        {"id": bet_id, "user_id": "u1", "amount": 100.0, "odds": 150.0, "status": BetStatus.LOST},
+    ])
+
+    assert settled == 1
+    roi = await tracker.calculate_roi("u1")
+    assert (roi["settled_bets"], roi["losses"], roi["total_won"]) == (1, 1, 0)
+    async with factory() as session:
+        bankroll = await session.scalar(select(Bankroll).where(Bankroll.user_id == "u1"))
+    assert bankroll.total_lost == 100.0 and bankroll.total_won == 0.0
+    assert await tracker.settle_bets([{"id": "ghost", "user_id": "u1", "amount": 10.0, "odds": 100.0,
+                                       "status": BetStatus.WON}]) == 0
+
+
+@pytest.mark.asyncio
+async def test_settle_bets_applies_each_bet_once(database):
+    """Test overlapping settlement runs only apply bankroll and rollup deltas for bets still pending."""
+    engine, factory = database
+    tracker = BetTracker()
+    first = await tracker.place_bet("u1", _bet_data())
+    second = await tracker.place_bet("u1", _bet_data(amount=50.0))
+    won = {"id": first, "user_id": "u1", "amount": 100.0, "odds": 150.0, "status": BetStatus.WON}
+
+    assert await tracker.settle_bets([won]) == 1
+    assert await tracker.settle_bets([won, {"id": second, "user_id": "u1", "amount": 50.0, "odds": 150.0,
+                                            "status": BetStatus.LOST}]) == 1
+    assert await tracker.settle_bets([won]) == 0
+
+    roi = await tracker.calculate_roi("u1")
+    assert (roi["settled_bets"], roi["wins"], roi["losses"]) == (2, 1, 1)
+    async with factory() as session:
+        bankroll = await session.scalar(select(Bankroll).where(Bankroll.user_id == "u1"))
+        bet = await session.get(Bet, first)
+    assert bankroll.total_won == 250.0 and bankroll.total_lost == 50.0
+    assert bet.status == BetStatus.WON and bet.payout == 250.0
+    expected = await _legacy_roi(factory, "u1")
+    assert {key: roi[key] for key in expected} == expected
+
+    # A cancelled bet counts as placed but never as settled
+    assert await tracker.update_bet_status(await tracker.place_bet("u1", _bet_data(amount=25.0)), BetStatus.CANCELLED)
+    roi = await tracker.calculate_roi("u1")
+    assert (roi["total_bets"], roi["settled_bets"]) == (3, 2)
+
+
+@pytest.mark.asyncio
+async def test_settle_bets_claims_in_chunks(database):
+    """Test a run larger than the claim chunk is split into bounded UPDATEs and still settles every bet."""
+    engine, factory = database
+    tracker = BetTracker()
+    ids = [await tracker.place_bet("u1", _bet_data(amount=10.0)) for _ in range(5)]
+
+    updates = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args:
+                 updates.append(statement) if statement.startswith("UPDATE bets") else None)
+
+    with patch("src.services.bet_tracker.CLAIM_CHUNK_SIZE", 2):
+        settled = await tracker.settle_bets([
+            {"id": bet_id, "user_id": "u1", "amount": 10.0, "odds": 100.0, "status": BetStatus.WON}
+            for bet_id in ids
+        ])
+
+    assert settled == 5
+    assert len(updates) == 3
+    roi = await tracker.calculate_roi("u1")
+    assert (roi["settled_bets"], roi["wins"]) == (5, 5)
+    async with factory() as session:
+        bankroll = await session.scalar(select(Bankroll).where(Bankroll.user_id == "u1"))
+    assert bankroll.total_won == 100.0
+
+
+@pytest.mark.asyncio
+async def test_calculate_roi_is_one_aggregate_over_the_window(database):
+    """Test windowed ROI reads only rollup rows inside the window, in one statement."""
+    engine, factory = database
+    tracker = BetTracker()
+    today = datetime.utcnow().date()
+    async with factory() as session:
+        session.add_all([
+            BetPerformanceRollup(user_id="u1", sport="nba", bet_type="moneyline", day=today - timedelta(days=age),
+                                 bets_placed=10, bets_settled=10, bets_won=5, bets_lost=5, bets_pushed=0,
+                                 amount_wagered=100.0, amount_won=120.0, amount_lost=50.0)
+            for age in (0, 3, 10, 40)
+        ])
+        await session.commit()
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    assert (await tracker.calculate_roi("u1", 1))["total_bets"] == 10
+    assert (await tracker.calculate_roi("u1", 7))["total_bets"] == 20
+    assert (await tracker.calculate_roi("u1", 30))["total_bets"] == 30
+    all_time = await tracker.calculate_roi("u1")
+    assert all_time["total_bets"] == 40
+    assert all_time["roi_percentage"] == 20.0
+
+    assert len(statements) == 4
+    assert all("bet_performance_rollups" in s and "FROM bets" not in s for s in statements)
+    assert (await tracker.calculate_roi("nobody"))["total_bets"] == 0
+
+
+def test_migration_backfill_matches_bets():
+    """Test the migration's grouped backfill produces the same rollups as the bets imply, cancelled ones unsettled."""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "..", "alembic", "versions",
+                        "20261016_add_bet_performance_rollups.py")
+    spec = importlib.util.spec_from_file_location("rollup_migration", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    engine = create_engine("sqlite://")
+    Bet.__table__.create(engine)
+    placed = datetime(2026, 10, 1, 15, 30)
+    with engine.begin() as conn:
+        conn.execute(Bet.__table__.insert(), [
+            {"id": "a", "user_id": "u1", "sportsbook": "x", "sport": "nba", "game_id": "g", "bet_type": "MONEYLINE",
+             "amount": 100.0, "odds": 150.0, "status": "WON", "payout": 250.0, "placed_at": placed},
+            {"id": "b", "user_id": "u1", "sportsbook": "x", "sport": "nba", "game_id": "g", "bet_type": "MONEYLINE",
+             "amount": 40.0, "odds": 150.0, "status": "LOST", "payout": 0.0, "placed_at": placed},
+            {"id": "d", "user_id": "u1", "sportsbook": "x", "sport": "nba", "game_id": "g", "bet_type": "MONEYLINE",
+             "amount": 25.0, "odds": 150.0, "status": "CANCELLED", "payout": None, "placed_at": placed},
+            {"id": "c", "user_id": "u1", "sportsbook": "x", "sport": "nba", "game_id": "g", "bet_type": "MONEYLINE",
+             "amount": 10.0, "odds": 150.0, "status": "PENDING", "payout": None,
+             "placed_at": placed + timedelta(days=1)},
+        ])
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        rows = conn.execute(select(BetPerformanceRollup.__table__).order_by("day")).mappings().all()
+
+    assert [(str(r["day"]), r["bet_type"], r["bets_placed"], r["bets_settled"], r["bets_won"], r["bets_lost"],
+             r["amount_wagered"], r["amount_won"], r["amount_lost"]) for r in rows] == [
+        ("2026-10-01", "moneyline", 3, 2, 1, 1, 165.0, 250.0, 40.0),
+        ("2026-10-02", "moneyline", 1, 0, 0, 0, 10.0, 0.0, 0.0),
+    ]
@@ -0,0 +1,154 @@
+"""
+Unit Tests for the Feature Flag Snapshot
+========================================
+Tests that flag checks are served from the process-local snapshot, that
+percentage rollouts bucket users stably, and that writes on one instance
+invalidate the others over pub/sub.
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.feature_flags import ROLLOUT_BUCKETS, FeatureFlagService, rollout_bucket
+
+
+async def _service() -> FeatureFlagService:
+    service = FeatureFlagService(refresh_interval=0)
+    redis_client = await service._get_redis()
+    if redis_client is None:
+        pytest.skip("Redis not available")
+    await redis_client.flushdb()
+    return service
+
+
+async def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.02)
+    return predicate()
+
+
+@pytest.mark.asyncio
+async def test_checks_issue_no_redis_commands_once_loaded():
+    """Test is_enabled() and check() answer from memory after the first load."""
+    service = await _service()
+    try:
+        await service.set_global_flag("advanced_ai", True)
+        await service.set_user_flag("vip", "advanced_ai", False)
+        assert await service.is_enabled("advanced_ai", user_id="vip") is False  # Fetches vip's overrides once
+
+        commands = []
+        original = service.redis_client.execute_command
+
+        async def counting(*args, **kwargs):
+            commands.append(args[0])
+            return await original(*args, **kwargs)
+
+        service.redis_client.execute_command = counting
+        for i in range(1000):
+            assert await service.is_enabled("advanced_ai", user_id=f"user{i}") is True
+            assert service.check("advanced_ai", user_id="vip") is False
+            assert service.check("websocket_enabled") is True
+
+        assert commands == []
+    finally:
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_rollout_buckets_are_stable_and_proportional():
+    """Test a 25% rollout enables about a quarter of users, the same ones every time."""
+    service = await _service()
+    try:
+        await service.set_global_flag("new_ui", False)
+        assert await service.set_rollout("new_ui", 25)
+        users = [f"user{i}" for i in range(20000)]
+
+        enabled = {u for u in users if service.check("new_ui", user_id=u)}
+        assert 0.23 < len(enabled) / len(users) < 0.27
+        assert enabled == {u for u in users if service.check("new_ui", user_id=u)}
+        assert service.check("new_ui") is False  # No user, no rollout
+
+        # Raising the percentage only adds users
+        await service.set_rollout("new_ui", 50)
+        assert enabled <= {u for u in users if service.check("new_ui", user_id=u)}
+
+        assert 0 <= rollout_bucket(0, "anyone") < ROLLOUT_BUCKETS
+        with pytest.raises(ValueError):
+            await service.set_rollout("new_ui", 150)
+    finally:
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_instances():
+    """Test a write on one instance reaches another's snapshot over pub/sub."""
+    writer = await _service()
+    reader = FeatureFlagService(refresh_interval=0)
+    try:
+        await reader.load()
+        assert reader.check("sms_notifications") is False
+        await asyncio.sleep(0.1)  # Let the reader's listener subscribe
+
+        await writer.set_global_flag("sms_notifications", True)
+        assert await _wait_for(lambda: reader.check("sms_notifications"))
+
+        await writer.set_user_flag("user1", "sms_notifications", False)
+        assert await _wait_for(lambda: "user1" in reader._snapshot.override_users)
+        assert (await reader.evaluate_all("user1"))["sms_notifications"] is False
+        assert (await reader.evaluate_all("user2"))["sms_notifications"] is True
+
+        await writer.delete_user_flag("user1", "sms_notifications")
+        assert await _wait_for(lambda: "user1" not in reader._user_cache)
+        assert await reader.is_enabled("sms_notifications", user_id="user1") is True
+    finally:
+        await reader.close()
+        await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_legacy_user_overrides_are_indexed():
+    """Test pre-index flags:user:<id> hashes still apply, and the index shrinks as overrides go."""
+    service = await _service()
+    redis_client = service.redis_client
+    try:
+        await redis_client.set("flags:global:advanced_ai", "true")
+        await redis_client.hset("flags:user:legacy", mapping={"advanced_ai": "false", "sms_notifications": "true"})
+
+        await service.load()
+        assert service.check("advanced_ai") is True
+        assert await service.is_enabled("advanced_ai", user_id="legacy") is False
+        assert await redis_client.smembers(service.OVERRIDE_USERS_KEY) == {"legacy"}
+
+        await service.delete_user_flag("legacy", "advanced_ai")
+        assert "legacy" in service._snapshot.override_users  # sms_notifications is still overridden
+        await service.delete_user_flag("legacy", "sms_notifications")
+        assert "legacy" not in service._snapshot.override_users
+        assert await redis_client.smembers(service.OVERRIDE_USERS_KEY) == set()
+        assert await service.is_enabled("advanced_ai", user_id="legacy") is True
+    finally:
+        await redis_client.flushdb()
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_user_overrides_expire_after_refresh_interval():
+    """Test a cached user's overrides are re-fetched once older than refresh_interval."""
+    service = await _service()
+    service.refresh_interval = 0.05
+    redis_client = service.redis_client
+    try:
+        await service.set_user_flag("vip", "advanced_ai", False)
+        assert await service.is_enabled("advanced_ai", user_id="vip") is False
+
+        # A write whose invalidation was missed is only seen after the entry expires
+        await redis_client.hset("flags:user:vip", "advanced_ai", "true")
+        assert await service.is_enabled("advanced_ai", user_id="vip") is False
+        await asyncio.sleep(0.1)
+        assert await service.is_enabled("advanced_ai", user_id="vip") is True
+    finally:
+        await redis_client.flushdb()
+        await service.close()
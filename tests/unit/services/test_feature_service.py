@@ -0,0 +1,131 @@
+"""
+Unit Tests for FeatureService
+=============================
+Tests the columnar feature store: CSV build, binary snapshots, incremental
+results and batched feature matrices.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.feature_service import FeatureService, NBA_FEATURE_COLUMNS
+from src.services.feature_store import TeamFormStore
+
+
+def _nba_games():
+    """Eight games: Celtics and Lakers each play six, alternating home/away."""
+    rows = []
+    for day in range(1, 7):
+        home, away = ("Boston Celtics", "Los Angeles Lakers") if day % 2 else ("Los Angeles Lakers", "Boston Celtics")
+        rows.append({"pd_date": f"2025-01-{day:02d}", "HomeTeam": home, "AwayTeam": away,
+                     "HomePoints": 100 + day, "AwayPoints": 100, "Last5_PF_HomeStats": 0.0})
+    rows.append({"pd_date": "2025-01-08", "HomeTeam": "Miami Heat", "AwayTeam": "Boston Celtics",
+                 "HomePoints": 90, "AwayPoints": 120, "Last5_PF_HomeStats": 0.0})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def service(tmp_path):
+    svc = FeatureService()
+    svc.nba_data_path = tmp_path / "nba_training_data.csv"
+    svc.nba_snapshot_path = tmp_path / "nba_feature_store.npz"
+    svc.tennis_data_paths = {"atp": tmp_path / "atp.csv", "wta": tmp_path / "wta.csv"}
+    svc.tennis_snapshot_path = tmp_path / "tennis_feature_store.npz"
+    _nba_games().to_csv(svc.nba_data_path, index=False)
+    pd.DataFrame([
+        {"Date": "2025-01-01", "Player1": "Djokovic N.", "Player2": "Alcaraz C.",
+         "Rank1": 2, "Rank2": 3, "Pts1": 8000, "Pts2": 7000},
+        {"Date": "2025-01-05", "Player1": "Alcaraz C.", "Player2": "Sinner J.",
+         "Rank1": 1, "Rank2": 4, "Pts1": 9000, "Pts2": 6000},
+    ]).to_csv(svc.tennis_data_paths["atp"], index=False)
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_initialize_builds_latest_team_form(service):
+    """Test each team's last-5 window is rebuilt from game rows."""
+    await service.initialize()
+
+    celtics = service._find_team_stats("Celtics")
+    # Last five Celtics games: days 3 (W 103), 4 (L 100-104), 5 (W 105), 6 (L 100-106), 8 (W 120-90)
+    assert celtics["Last5_PF"] == pytest.approx((103 + 100 + 105 + 100 + 120) / 5)
+    assert celtics["Last5_PA"] == pytest.approx((100 + 104 + 100 + 106 + 90) / 5)
+    assert celtics["Last5_WinPct"] == pytest.approx(0.6)
+    assert service._find_team_stats("Miami Heat") is None  # Fewer than five games
+    assert service.nba_snapshot_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip_skips_csv(service):
+    """Test a fresh snapshot is loaded instead of re-parsing the CSV."""
+    await service.initialize()
+    expected = service._find_team_stats("Boston Celtics")
+
+    reloaded = FeatureService()
+    reloaded.nba_data_path = service.nba_data_path
+    reloaded.nba_snapshot_path = service.nba_snapshot_path
+    reloaded.tennis_data_paths = service.tennis_data_paths
+    reloaded.tennis_snapshot_path = service.tennis_snapshot_path
+    service.nba_data_path.write_text("not,a,valid\ncsv")
+    import os
+    os.utime(service.nba_data_path, (0, 0))  # Older than the snapshot
+    await reloaded.initialize()
+
+    assert reloaded._find_team_stats("Boston Celtics") == expected
+    assert reloaded._find_player_stats("Carlos Alcaraz")["Rank"] == 1
+
+
+@pytest.mark.asyncio
+async def test_apply_final_games_updates_form_once(service):
+    """Test new results roll into the window and re-applying them is a no-op."""
+    await service.initialize()
+    before = service._find_team_stats("Boston Celtics")
+    game = {"home_team": "Boston Celtics", "away_team": "Los Angeles Lakers",
+            "home_score": 130, "away_score": 80, "status": "Final", "date": "2025-01-10T00:30Z"}
+
+    assert service.apply_final_games("nba", [game]) == 1
+    assert service.apply_final_games("nba", [game]) == 0
+    after = service._find_team_stats("Boston Celtics")
+
+    assert after["Last5_PF"] == pytest.approx(before["Last5_PF"] + (130 - 103) / 5)
+    assert after["Date"].date().isoformat() == "2025-01-10"
+
+    # The snapshot carries the result, so a restart does not fall back to older state
+    restarted = FeatureService()
+    restarted.nba_data_path = service.nba_data_path
+    restarted.nba_snapshot_path = service.nba_snapshot_path
+    restarted.tennis_data_paths = service.tennis_data_paths
+    restarted.tennis_snapshot_path = service.tennis_snapshot_path
+    await restarted.initialize()
+    assert restarted._find_team_stats("Boston Celtics") == after
+
+
+@pytest.mark.asyncio
+async def test_feature_matrix_matches_single_game_features(service):
+    """Test batched feature rows equal per-game DataFrames, with unknown teams masked."""
+    await service.initialize()
+    game_date = pd.Timestamp("2025-01-10").to_pydatetime()
+
+    matrix, found = service.get_nba_feature_matrix(
+        [("Boston Celtics", "Los Angeles Lakers"), ("Boston Celtics", "Unknown Team")],
+        [game_date, game_date]
+    )
+    single = service.get_nba_features("Boston Celtics", "Los Angeles Lakers", game_date=game_date)
+
+    assert list(found) == [True, False]
+    assert list(single.columns) == NBA_FEATURE_COLUMNS
+    np.testing.assert_allclose(matrix[0], single.to_numpy()[0])
+    assert matrix[0][3] == 2  # Celtics last played on the 8th
+    assert service.get_nba_features("Boston Celtics", "Unknown Team") is None
+
+
+def test_team_form_store_grows_past_capacity():
+    """Test rows are appended beyond the initial capacity."""
+    store = TeamFormStore(capacity=2)
+    for i in range(10):
+        for day in range(5):
+            store.apply_result(f"Team {i}", 100 + day, 90, f"2025-02-{day + 1:02d}")
+
+    assert len(store) == 10
+    assert store.get("Team 9")["Last5_PF"] == pytest.approx(102)
@@ -0,0 +1,68 @@
+"""
+Unit Tests for InvalidationListener
+===================================
+Tests the shared lazy connection, that events published by other instances
+reach the callback while an instance's own are skipped, and shutdown.
+"""
+
+import asyncio
+import json
+
+import pytest
+import redis.asyncio as redis
+
+from src.config import settings
+from src.services.invalidation_listener import InvalidationListener
+
+
+async def _wait_for(predicate, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def _connect():
+    return redis.from_url(settings.redis_url, decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_connect_is_shared_and_delivers_other_instances_events():
+    """Test concurrent first calls share one client and only foreign events reach on_event."""
+    received = []
+
+    async def on_event(event):
+        received.append(event["user_id"])
+
+    listener = InvalidationListener("Test", "test:invalidate", "me", on_event)
+    clients = await asyncio.gather(*(listener.connect(_connect) for _ in range(5)))
+    if clients[0] is None:
+        pytest.skip("Redis not available")
+    try:
+        assert all(client is clients[0] for client in clients)
+        await asyncio.sleep(0.05)  # Listener subscribed
+
+        await clients[0].publish("test:invalidate", json.dumps({"instance_id": "me", "user_id": "own"}))
+        await clients[0].publish("test:invalidate", "not json")
+        await clients[0].publish("test:invalidate", json.dumps({"instance_id": "peer", "user_id": "u1"}))
+
+        assert await _wait_for(lambda: received == ["u1"])
+    finally:
+        await listener.close()
+    assert listener.client is None and listener._task is None
+
+
+@pytest.mark.asyncio
+async def test_failed_connection_is_remembered():
+    """Test an unreachable Redis yields None without retrying on every call."""
+    attempts = []
+
+    def unreachable():
+        attempts.append(1)
+        return redis.from_url("redis://127.0.0.1:1", socket_connect_timeout=0.1)
+
+    listener = InvalidationListener("Test", "test:invalidate", "me", lambda event: None)
+    assert await listener.connect(unreachable) is None
+    assert await listener.connect(unreachable) is None
+    assert len(attempts) == 1
+    await listener.close()
@@ -0,0 +1,142 @@
+"""
+Unit Tests for MessageQueue and MessageBroadcaster
+==================================================
+Tests pipelined enqueue, the atomic Lua batch pop across priorities,
+per-message expiry and batch draining.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+import redis.asyncio as redis
+
+from src.config import settings
+from src.services.message_broadcasting import BroadcastMessage, MessageBroadcaster, MessagePriority, MessageQueue
+
+
+def _message(i: int, priority=MessagePriority.NORMAL, expires_in: float = None, offset: float = 0.0):
+    now = datetime.now()
+    return BroadcastMessage(
+        id=f"m{i}", type="notification", data={"i": i}, priority=priority,
+        timestamp=now + timedelta(seconds=offset),
+        expires_at=now + timedelta(seconds=expires_in) if expires_in else None
+    )
+
+
+async def _queue():
+    client = redis.from_url(settings.redis_url, decode_responses=True)
+    await client.flushdb()
+    return client, MessageQueue(client)
+
+
+@pytest.mark.asyncio
+async def test_batch_pop_drains_highest_priority_first():
+    """Test one call returns urgent before normal before low, oldest first within a queue."""
+    client, queue = await _queue()
+    try:
+        assert await queue.enqueue_messages([
+            _message(1, MessagePriority.LOW),
+            _message(2, MessagePriority.NORMAL, offset=1),
+            _message(3, MessagePriority.NORMAL),
+            _message(4, MessagePriority.URGENT),
+        ]) == 4
+
+        batch = await queue.dequeue_batch(3)
+
+        assert [m.id for m in batch] == ["m4", "m3", "m2"]
+        assert await queue.get_queue_stats() == {"urgent": 0, "high": 0, "normal": 0, "low": 1}
+        assert (await queue.dequeue_message(MessagePriority.LOW)).id == "m1"
+        assert await queue.dequeue_batch(10) == []
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_expiry_is_per_message():
+    """Test an expired message is dropped without touching others in the same queue."""
+    client, queue = await _queue()
+    try:
+        await queue.enqueue_messages([_message(1, expires_in=0.05), _message(2, offset=1, expires_in=60), _message(3, offset=2)])
+        assert await client.ttl(queue.priority_queues[MessagePriority.NORMAL]) == -1
+        await asyncio.sleep(0.1)
+
+        batch = await queue.dequeue_batch(10)
+
+        assert [m.id for m in batch] == ["m2", "m3"]
+        assert await client.zcard(queue.expiry_key) == 0
+        assert not await queue.enqueue_message(_message(4, expires_in=-1))
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_pops_never_duplicate():
+    """Test competing consumers each get a disjoint slice of the queue."""
+    client, queue = await _queue()
+    try:
+        await queue.enqueue_messages([_message(i, offset=i / 1000) for i in range(200)])
+        consumers = [MessageQueue(client) for _ in range(8)]
+
+        batches = await asyncio.gather(*(c.dequeue_batch(30) for c in consumers))
+
+        ids = [m.id for batch in batches for m in batch]
+        assert len(ids) == len(set(ids)) == 200
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_drains_in_batches():
+    """Test queued messages are delivered with one Redis pop per batch."""
+    client, _ = await _queue()
+    try:
+        manager = AsyncMock()
+        manager.local_connections = {}
+        broadcaster = MessageBroadcaster(client, manager)
+        broadcaster.batch_size = 50
+        pops = []
+        dequeue = broadcaster.message_queue.dequeue_batch
+
+        async def counting_dequeue(*args, **kwargs):
+            batch = await dequeue(*args, **kwargs)
+            pops.append(len(batch))
+            return batch
+
+        broadcaster.message_queue.dequeue_batch = counting_dequeue
+        delivered = []
+
+        async def deliver(message):
+            delivered.append(message.id)
+            return True
+
+        broadcaster._deliver_single_message = deliver
+
+        await broadcaster.broadcast_messages([_message(i, offset=i / 1000) for i in range(120)])
+        await broadcaster.active_batches["drain"]
+
+        assert sorted(delivered) == sorted(f"m{i}" for i in range(120))
+        assert pops == [50, 50, 20, 0]
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batch_pop_survives_script_flush():
+    """Test the pop script is reloaded when Redis has dropped its script cache."""
+    client, queue = await _queue()
+    try:
+        await queue.enqueue_messages([_message(1), _message(2, offset=1)])
+        assert [m.id for m in await queue.dequeue_batch(1)] == ["m1"]
+
+        await client.script_flush()
+
+        assert [m.id for m in await queue.dequeue_batch(1)] == ["m2"]
+    finally:
+        await client.flushdb()
+        await client.aclose()
@@ -0,0 +1,100 @@
+"""
+Unit Tests for ModelPredictionService
+=====================================
+Tests batched slate scoring matches single-game predictions with one model call.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from src.services.model_prediction_service import ModelPredictionService
+
+
+class CountingModel:
+    """Wraps an estimator and counts predict_proba calls."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        return self.model.predict_proba(X)
+
+
+def _nhl_service(num_teams: int = 32):
+    """Build a service with a small trained NHL model over synthetic team stats."""
+    rng = np.random.default_rng(3)
+    stats = {
+        f"City{i} Team{i}": {
+            "gf": rng.uniform(2, 4), "ga": rng.uniform(2, 4), "wpct": rng.uniform(0.3, 0.7),
+            "home_pct": rng.uniform(0.3, 0.7), "away_pct": rng.uniform(0.3, 0.7),
+            "l5": rng.uniform(0, 1), "l10": rng.uniform(0, 1), "games": 40, "diff": rng.normal(0, 10),
+        }
+        for i in range(num_teams)
+    }
+    service = ModelPredictionService()
+    model_data = {"stats": stats, "elite_home": {"City0 Team0"}, "road_warriors": set(),
+                  "high_scoring": set(), "low_scoring": set()}
+    service.models["nhl"] = model_data
+
+    teams = list(stats)
+    rows = [service._nhl_feature_row(model_data, stats, {"home_team": h, "away_team": a})
+            for h, a in zip(teams, teams[1:] + teams[:1])]
+    X = pd.DataFrame(rows)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), rng.integers(0, 2, len(rows)))
+    model_data.update(model=CountingModel(model), scaler=scaler)
+    return service, teams
+
+
+@pytest.mark.asyncio
+async def test_nhl_batch_matches_single_game_predictions():
+    """Test the batched slate returns the same results as scoring games one by one."""
+    service, teams = _nhl_service()
+    games = [{"home_team": teams[i], "away_team": teams[-i - 1]} for i in range(10)]
+    odds = [-150 + 10 * i for i in range(10)]
+
+    single = [await service.get_model_prediction("nhl", game, o) for game, o in zip(games, odds)]
+    model = service.models["nhl"]["model"]
+    model.calls = 0
+    batch = await service.get_model_predictions_batch("nhl", games, odds)
+
+    assert model.calls == 1
+    assert len(batch) == len(single)
+    for b, s in zip(batch, single):
+        assert b.keys() == s.keys()
+        assert b["model_probability"] == pytest.approx(s["model_probability"])
+        assert b["edge"] == pytest.approx(s["edge"])
+        assert b["model_used"] is True
+
+
+@pytest.mark.asyncio
+async def test_batch_falls_back_per_game_for_unknown_teams():
+    """Test unmatched games get the odds-based fallback while the rest stay batched."""
+    service, teams = _nhl_service()
+    games = [{"home_team": teams[0], "away_team": teams[1]}, {"home_team": "Nowhere", "away_team": "Nobody"}]
+
+    results = await service.get_model_predictions_batch("nhl", games, -110)
+
+    assert results[0]["model_used"] is True
+    assert results[1]["model_used"] is False
+    assert service.models["nhl"]["model"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_without_model_uses_fallback():
+    """Test sports without a trained model return fallback results in game order."""
+    service = ModelPredictionService()
+    games = [{"home_team": f"Home {i}", "away_team": f"Away {i}"} for i in range(300)]
+
+    results = await service.get_model_predictions_batch("ncaab", games, [-200 if i % 2 else 150 for i in range(300)])
+
+    assert len(results) == 300
+    assert results[0]["model_probability"] == 0.45 + abs(100 / 250 - 0.5) * 0.15
+    assert all(not r["model_used"] for r in results)
+    with pytest.raises(ValueError):
+        await service.get_model_predictions_batch("ncaab", games, [-110])
@@ -0,0 +1,174 @@
+"""
+Unit Tests for NotificationPersistence and bulk notifications
+=============================================================
+Tests transactional writes, single round-trip inbox pages with cursor
+paging, read state, and shared-body bulk fan-out.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+import redis.asyncio as redis
+
+from src.config import settings
+from src.services.notification_service import (
+    Notification,
+    NotificationPersistence,
+    NotificationPreference,
+    NotificationPriority,
+    NotificationService,
+    NotificationStatus,
+    NotificationType,
+)
+
+
+def _notification(i: int, recipient_id: str = None, seconds_ago: float = 0.0, type=NotificationType.SYSTEM_ALERT):
+    return Notification(
+        id=f"n{i}", type=type, priority=NotificationPriority.NORMAL, title=f"Title {i}",
+        message=f"Message {i}", data={"i": i}, recipient_id=recipient_id,
+        timestamp=datetime.now() - timedelta(seconds=seconds_ago)
+    )
+
+
+async def _client():
+    client = redis.from_url(settings.redis_url, decode_responses=True)
+    await client.flushdb()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_inbox_page_is_one_round_trip():
+    """Test a 50-item inbox page loads with a single Redis command, newest first."""
+    client = await _client()
+    try:
+        persistence = NotificationPersistence(client)
+        for i in range(60):
+            assert await persistence.store_notification(_notification(i, "u1", seconds_ago=i))
+        await persistence.get_user_notifications("u1", limit=1)  # Script is loaded
+
+        calls = []
+        original = client.execute_command
+
+        async def counting(*args, **kwargs):
+            calls.append(args[0])
+            return await original(*args, **kwargs)
+
+        client.execute_command = counting
+        notifications = await persistence.get_user_notifications("u1", limit=50)
+
+        assert calls == ["EVALSHA"]
+        assert [n.id for n in notifications] == [f"n{i}" for i in range(50)]
+        assert notifications[0].data == {"i": 0}
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cursor_paging_handles_ties_and_new_arrivals():
+    """Test cursor pages cover the inbox exactly once, even with equal timestamps."""
+    client = await _client()
+    try:
+        persistence = NotificationPersistence(client)
+        same_time = datetime.now() - timedelta(minutes=1)
+        for i in range(7):
+            notification = _notification(i, "u1")
+            notification.timestamp = same_time if i < 5 else same_time - timedelta(seconds=i)
+            await persistence.store_notification(notification)
+
+        first, cursor = await persistence.get_user_notifications_page("u1", limit=3)
+        await persistence.store_notification(_notification(99, "u1"))  # Newer; must not shift later pages
+        second, cursor = await persistence.get_user_notifications_page("u1", limit=3, cursor=cursor)
+        third, cursor = await persistence.get_user_notifications_page("u1", limit=3, cursor=cursor)
+
+        ids = [n.id for n in first + second + third]
+        assert sorted(ids) == sorted(f"n{i}" for i in range(7))
+        assert cursor is None
+        with pytest.raises(ValueError):
+            await persistence.get_user_notifications_page("u1", cursor="bogus")
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_inbox_page_survives_script_flush():
+    """Test the page script is reloaded when Redis has dropped its script cache."""
+    client = await _client()
+    try:
+        persistence = NotificationPersistence(client)
+        for i in range(3):
+            await persistence.store_notification(_notification(i, "u1", seconds_ago=i))
+        assert len(await persistence.get_user_notifications("u1")) == 3
+
+        await client.script_flush()
+
+        assert [n.id for n in await persistence.get_user_notifications("u1")] == ["n0", "n1", "n2"]
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_read_state_and_preferences_round_trip():
+    """Test read state overlays the shared body and preferences survive storage."""
+    client = await _client()
+    try:
+        persistence = NotificationPersistence(client)
+        await persistence.store_notification(_notification(1, "u1"))
+
+        assert await persistence.mark_notification_read("n1", "u1")
+        assert not await persistence.mark_notification_read("n1", "someone-else")
+        [notification] = await persistence.get_user_notifications("u1")
+        assert notification.status == NotificationStatus.READ
+        assert notification.read_at is not None
+
+        preferences = NotificationPreference(user_id="u1", notification_types={NotificationType.MARKETING: True},
+                                             channels={}, priority_levels={})
+        assert await persistence.store_preferences(preferences)
+        assert (await persistence.get_preferences("u1")).notification_types == {NotificationType.MARKETING: True}
+        assert list(await persistence.get_preferences_many(["u1", "u2"])) == ["u1"]
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_send_stores_body_once():
+    """Test a bulk send writes one body, fans ids out in a few pipelines and publishes once."""
+    client = await _client()
+    try:
+        websocket_manager = AsyncMock()
+        service = NotificationService(client, websocket_manager)
+        user_ids = [f"user{i}" for i in range(10000)]
+        await service.persistence.store_preferences(NotificationPreference(
+            user_id="user0", notification_types={NotificationType.SYSTEM_ALERT: False}, channels={},
+            priority_levels={}
+        ))
+
+        pipelines = []
+        original = client.pipeline
+
+        def counting(*args, **kwargs):
+            pipelines.append(kwargs.get("transaction", True))
+            return original(*args, **kwargs)
+
+        client.pipeline = counting
+        notification = _notification(1, recipient_id="admin")
+        results = await service.send_bulk_notification(notification, user_ids + ["user1"])
+
+        assert results["total"] == 10001
+        assert len(results["successful"]) == 10000
+        assert {r["notification_id"] for r in results["successful"]} == {"n1"}
+        assert len(pipelines) == 4
+        assert notification.recipient_id == "admin"  # Caller's object is not modified
+        assert await client.keys("notification:*") == ["notification:n1"]
+        assert [n.id for n in await service.get_user_notifications("user9999")] == ["n1"]
+
+        websocket_manager.publish_to_topics.assert_awaited_once()
+        topics, _ = websocket_manager.publish_to_topics.await_args.args
+        assert len(topics) == 9999  # user0 turned this type off
+    finally:
+        await client.flushdb()
+        await client.aclose()
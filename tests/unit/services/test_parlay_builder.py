@@ -0,0 +1,110 @@
+"""
+Unit Tests for ParlayBuilder
+============================
+Tests EV-optimal candidate search, leg uniqueness constraints and search speed.
+"""
+
+import itertools
+import math
+import random
+import time
+
+import pytest
+from src.services.parlay_builder import ParlayBuilder
+
+
+def _predictions(num_games: int, seed: int = 7):
+    """Generate a realistic slate: up to two bet types per game."""
+    rng = random.Random(seed)
+    predictions = []
+    for game in range(num_games):
+        for bet_type in ("moneyline", "spread"):
+            predictions.append({
+                "game_id": f"game_{game}",
+                "sport": rng.choice(["nba", "nhl", "ncaab"]),
+                "team": f"Team {game}",
+                "bet_type": bet_type,
+                "odds": rng.choice([-220, -150, -110, 105, 130, 180]),
+                "confidence": rng.uniform(0.55, 0.9),
+                "edge": rng.uniform(0.0, 0.12),
+                "probability": 0.55,
+            })
+    return predictions
+
+
+@pytest.fixture
+def builder():
+    return ParlayBuilder()
+
+
+def test_legs_are_unique_games(builder):
+    """Test parlays never repeat a game when distinct games are available."""
+    parlay = builder.build_parlay(_predictions(30), "moderate", num_legs=3)
+
+    assert parlay is not None
+    game_ids = [leg["game_id"] for leg in parlay["legs"]]
+    assert len(game_ids) == len(set(game_ids)) == 3
+
+
+def test_same_game_fallback_keeps_bet_types_unique(builder):
+    """Test same-game legs are only used with different bet types."""
+    predictions = [
+        {"game_id": "g1", "bet_type": "moneyline", "odds": -150, "confidence": 0.8, "edge": 0.1},
+        {"game_id": "g1", "bet_type": "spread", "odds": -150, "confidence": 0.8, "edge": 0.1},
+        {"game_id": "g1", "bet_type": "spread", "odds": 120, "confidence": 0.8, "edge": 0.1},
+    ]
+
+    parlay = builder.build_parlay(predictions, "conservative", num_legs=2)
+
+    assert parlay is not None
+    assert sorted(leg["bet_type"] for leg in parlay["legs"]) == ["moneyline", "spread"]
+
+
+def test_top_parlays_match_brute_force(builder):
+    """Test exhaustive search returns the true top-K parlays by expected value."""
+    predictions = _predictions(12)
+    profile = builder.risk_profiles["moderate"]
+
+    parlays = builder.find_top_parlays(predictions, "moderate", num_legs=3, top_k=3)
+
+    pool = builder.prepare_candidates(predictions)
+    eligible = [
+        i for i in range(len(predictions))
+        if pool.confidence[i] >= profile["min_leg_confidence"] and pool.edge[i] >= profile["min_leg_edge"]
+    ]
+    expected = []
+    for combo in itertools.combinations(eligible, 3):
+        if len({predictions[i]["game_id"] for i in combo}) < 3:
+            continue
+        if math.prod(pool.probabilities[i] for i in combo) < profile["min_combined_probability"]:
+            continue
+        expected.append(math.prod(pool.probabilities[i] * pool.decimal_odds[i] for i in combo) - 1)
+    expected.sort(reverse=True)
+
+    assert [p["expected_value"] for p in parlays] == pytest.approx(expected[:3], rel=1e-3)
+
+
+def test_beam_search_matches_exhaustive(builder):
+    """Test beam search finds the same best parlay on a pool small enough to enumerate."""
+    predictions = _predictions(20)
+    beam_builder = ParlayBuilder()
+    beam_builder.max_exhaustive_combinations = 0
+
+    exhaustive = builder.build_parlay(predictions, "aggressive", num_legs=4)
+    beam = beam_builder.build_parlay(predictions, "aggressive", num_legs=4)
+
+    assert beam["expected_value"] == pytest.approx(exhaustive["expected_value"])
+
+
+def test_six_leg_search_on_large_slate_is_fast(builder):
+    """Test a 6-leg search over 200+ predictions finishes well under a second."""
+    predictions = _predictions(120)
+
+    start = time.perf_counter()
+    pool = builder.prepare_candidates(predictions)
+    parlays = {legs: builder.build_parlay(predictions, risk, num_legs=legs, pool=pool)
+               for legs, risk in ((2, "conservative"), (3, "moderate"), (6, "aggressive"))}
+    elapsed = time.perf_counter() - start
+
+    assert parlays[6] is not None and parlays[6]["num_legs"] == 6
+    assert elapsed < 1.0
@@ -0,0 +1,157 @@
+"""
+Unit Tests for PasswordHasher
+=============================
+Tests that bcrypt runs off the event loop, that the admission queue sheds
+excess work, and that logins transparently rehash at a changed cost.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.models.user import User as UserModel
+from src.services.auth_service import AuthService, AuthStatus, UserLogin
+from src.services.password_hasher import PasswordHasher, PasswordHasherBusy, hash_rounds
+from src.services.token_cache import VerifiedTokenCache
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Provide an in-memory database session."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_the_event_loop():
+    """Test the loop keeps ticking while bcrypt runs."""
+    hasher = PasswordHasher(pool_size=2, queue_size=0, rounds=10)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        start = time.perf_counter()
+        password_hash = await hasher.hash("s3cret")
+        elapsed = time.perf_counter() - start
+        assert await hasher.verify("s3cret", password_hash) is True
+        assert await hasher.verify("wrong", password_hash) is False
+    finally:
+        task.cancel()
+        hasher.shutdown()
+
+    assert hash_rounds(password_hash) == 10
+    assert ticks >= elapsed / 0.005 / 2  # Most 5 ms ticks fired during the hash
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_sheds_excess_calls(db):
+    """Test calls beyond pool plus queue fail fast and logins report busy."""
+    hasher = PasswordHasher(pool_size=1, queue_size=1, rounds=10)
+    password_hash = hasher.hash_sync("Test123456!")
+    db.add(UserModel(id="u1", username="alice", email="alice@example.com", password_hash=password_hash))
+    await db.commit()
+    service = AuthService(password_hasher=hasher, token_cache=VerifiedTokenCache(ttl_seconds=0))
+    try:
+        results = await asyncio.gather(*(hasher.verify("Test123456!", password_hash) for _ in range(5)),
+                                       return_exceptions=True)
+        assert results.count(True) == 2
+        assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 3
+        assert hasher.get_stats()["rejected"] == 3
+        assert hasher.get_stats()["in_flight"] == 0
+
+        # With the worker and the queue slot taken, a login is shed instead of waiting
+        backlog = asyncio.gather(*(hasher.verify("Test123456!", password_hash) for _ in range(2)))
+        result = await service.login_user(db, UserLogin(username="alice", password="Test123456!"))
+        assert result["status"] == AuthStatus.SERVER_BUSY
+        assert await backlog == [True, True]
+
+        result = await service.login_user(db, UserLogin(username="alice", password="Test123456!"))
+        assert result["status"] == AuthStatus.SUCCESS
+    finally:
+        hasher.shutdown()
+        if service.redis_client:
+            await service.redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_keeps_its_slot_until_the_worker_finishes():
+    """Test a cancelled caller does not free the slot early and failures are counted apart."""
+    hasher = PasswordHasher(pool_size=1, queue_size=0, rounds=4)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    def broken():
+        raise ValueError("bad hash")
+
+    try:
+        task = asyncio.create_task(hasher._run(slow))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The worker is still busy, so the slot is too
+        assert hasher.get_stats()["in_flight"] == 1
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify("s3cret", hasher.hash_sync("s3cret"))
+
+        release.set()
+        while hasher.get_stats()["in_flight"]:
+            await asyncio.sleep(0.001)
+        assert hasher.completed == 1
+
+        with pytest.raises(ValueError):
+            await hasher._run(broken)
+        stats = hasher.get_stats()
+        assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_when_cost_changes(db):
+    """Test a login upgrades a hash made at the old cost and still succeeds."""
+    old = PasswordHasher(rounds=4)
+    db.add(UserModel(id="u1", username="alice", email="alice@example.com", password_hash=old.hash_sync("Test123456!")))
+    await db.commit()
+
+    new = PasswordHasher(rounds=5)
+    service = AuthService(password_hasher=new, token_cache=VerifiedTokenCache(ttl_seconds=0))
+    try:
+        assert (await service.login_user(db, UserLogin(username="alice", password="Test123456!")))["status"] \
+            == AuthStatus.SUCCESS
+        user = await db.get(UserModel, "u1")
+        assert hash_rounds(user.password_hash) == 5
+        assert new.needs_rehash(user.password_hash) is False
+
+        assert (await service.login_user(db, UserLogin(username="alice", password="Test123456!")))["status"] \
+            == AuthStatus.SUCCESS
+        assert (await service.login_user(db, UserLogin(username="alice", password="wrong")))["status"] \
+            == AuthStatus.INVALID_CREDENTIALS
+    finally:
+        new.shutdown()
+        if service.redis_client:
+            await service.redis_client.aclose()
@@ -0,0 +1,141 @@
+"""
+Unit Tests for the Verified Token Cache
+=======================================
+Tests that AuthService.validate_token serves repeat tokens without a user
+lookup, and that logout, password change and deactivation revoke cached
+tokens in this process and, through Redis, in others.
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.services.auth_service import AuthService, AuthStatus, PasswordChange, UserLogin, UserRegistration
+from src.services.token_cache import VerifiedTokenCache
+
+PASSWORD = "Test123456!"
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Provide an in-memory database session."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        yield session
+    await engine.dispose()
+
+
+@asynccontextmanager
+async def _caches():
+    """Two token caches sharing one Redis, as two processes would.
+
+    Created inside each test so the Redis clients belong to the test's event loop.
+    """
+    caches = (VerifiedTokenCache(sync_interval=0), VerifiedTokenCache(sync_interval=0))
+    for cache in caches:
+        if await cache._get_redis() is None:
+            pytest.skip("Redis not available")
+    await caches[0].redis_client.flushdb()
+    try:
+        yield caches
+    finally:
+        await caches[0].redis_client.flushdb()
+        for cache in caches:
+            await cache.close()
+
+
+async def _login(service: AuthService, db, username: str = "alice") -> dict:
+    result = await service.login_user(db, UserLogin(username=username, password=PASSWORD))
+    assert result["status"] == AuthStatus.SUCCESS
+    return result
+
+
+async def _register(service: AuthService, db, username: str = "alice") -> str:
+    result = await service.register_user(db, UserRegistration(
+        username=username, email=f"{username}@example.com", password=PASSWORD, confirm_password=PASSWORD
+    ))
+    assert result["status"] == AuthStatus.SUCCESS
+    return result["user_id"]
+
+
+@pytest.mark.asyncio
+async def test_repeat_validations_skip_the_user_lookup(db):
+    """Test only the first validation of a token loads the user."""
+    async with _caches() as (cache, _):
+        service = AuthService(token_cache=cache)
+        await _register(service, db)
+        token = (await _login(service, db))["token"]
+
+        with patch.object(service, "_get_user_by_id", wraps=service._get_user_by_id) as lookup:
+            results = [await service.validate_token(db, token) for _ in range(50)]
+
+        assert lookup.call_count == 1
+        assert all(r["status"] == AuthStatus.SUCCESS for r in results)
+        assert results[-1]["user"]["username"] == "alice"
+        assert cache.get_stats()["hits"] == 49
+
+        results[-1]["user"]["role"] = "admin"  # Callers get a copy, not the cached snapshot
+        assert (await service.validate_token(db, token))["user"]["role"] == "user"
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token_in_every_process(db):
+    """Test a logout on one instance rejects the cached token on another."""
+    async with _caches() as caches:
+        here, there = AuthService(token_cache=caches[0]), AuthService(token_cache=caches[1])
+        await _register(here, db)
+        token = (await _login(here, db))["token"]
+        other_token = (await _login(here, db))["token"]
+        for service in (here, there):
+            assert (await service.validate_token(db, token))["status"] == AuthStatus.SUCCESS
+
+        assert (await here.logout_user(token=token))["status"] == AuthStatus.SUCCESS
+
+        for service in (here, there):
+            assert (await service.validate_token(db, token))["status"] == AuthStatus.INVALID_TOKEN
+            assert (await service.validate_token(db, other_token))["status"] == AuthStatus.SUCCESS
+
+
+@pytest.mark.asyncio
+async def test_password_change_and_deactivation_revoke_existing_tokens(db):
+    """Test earlier tokens stop validating after a password change or deactivation."""
+    async with _caches() as caches:
+        here, there = AuthService(token_cache=caches[0]), AuthService(token_cache=caches[1])
+        user_id = await _register(here, db)
+        old_token = (await _login(here, db))["token"]
+        assert (await there.validate_token(db, old_token))["status"] == AuthStatus.SUCCESS
+
+        change = PasswordChange(current_password=PASSWORD, new_password="Changed123!", confirm_password="Changed123!")
+        assert (await here.change_password(db, user_id, change))["status"] == AuthStatus.SUCCESS
+        assert (await there.validate_token(db, old_token))["status"] == AuthStatus.INVALID_TOKEN
+
+        new_token = (await here.login_user(db, UserLogin(username="alice", password="Changed123!")))["token"]
+        assert (await there.validate_token(db, new_token))["status"] == AuthStatus.SUCCESS
+
+        assert (await here.deactivate_user(db, user_id))["status"] == AuthStatus.SUCCESS
+        assert (await there.validate_token(db, new_token))["status"] != AuthStatus.SUCCESS
+
+
+@pytest.mark.asyncio
+async def test_revocations_compare_exactly_and_expire():
+    """Test a same-second revocation catches earlier tokens only, and old revocations are forgotten."""
+    async with _caches() as (here, there):
+        await here.revoke("user", "u1")
+        revoked_at = here._revoked["user:u1"]
+        assert here.is_revoked("u1", None, None, issued_at=revoked_at - 0.001)
+        assert here.is_revoked("u1", None, None, issued_at=float(int(revoked_at)))  # Whole-second iat, same second
+        assert not here.is_revoked("u1", None, None, issued_at=revoked_at + 0.001)
+
+        stale = revoked_at - here.retention_seconds - 1
+        await here.redis_client.zadd(here.REVOCATIONS_KEY, {"jti:ancient": stale})
+        there._revoked["jti:forgotten"] = stale
+        await there.sync_revocations(force=True)
+        assert set(there._revoked) == {"user:u1"}
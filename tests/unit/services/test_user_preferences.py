@@ -0,0 +1,111 @@
+"""
+Unit Tests for UserPreferencesService
+=====================================
+Tests the async read-through LRU/TTL cache and cross-instance invalidation
+over Redis pub/sub.
+"""
+
+import asyncio
+
+import pytest
+import redis.asyncio as redis
+
+from src.config import settings
+from src.services.user_preferences import RiskLevel, UserPreferencesService
+
+
+async def _flush():
+    client = redis.from_url(settings.redis_url, decode_responses=True)
+    await client.flushdb()
+    await client.aclose()
+
+
+async def _wait_for(predicate, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.asyncio
+async def test_hot_reads_are_served_from_cache():
+    """Test repeated reads hit the local cache instead of Redis."""
+    await _flush()
+    service = UserPreferencesService(cache_size=10, cache_ttl=60)
+    try:
+        assert await service.update_betting_preferences("u1", {"max_bet_amount": 250.0})
+        client = await service._get_redis()
+
+        calls = []
+        original = client.execute_command
+
+        async def counting(*args, **kwargs):
+            calls.append(args[0])
+            return await original(*args, **kwargs)
+
+        client.execute_command = counting
+        for _ in range(100):
+            assert await service.get_user_max_bet_amount("u1") == 250.0
+            assert await service.get_user_confidence_threshold("u1") == 0.6
+
+        assert calls == []
+        assert service.hits >= 200
+    finally:
+        await service.close()
+        await _flush()
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_and_expires():
+    """Test least recently used entries are evicted and stale ones are reloaded."""
+    await _flush()
+    service = UserPreferencesService(cache_size=2, cache_ttl=0.05)
+    try:
+        for user_id in ("a", "b", "c"):
+            await service.get_user_preferences(user_id)
+        assert list(service._cache) == ["b", "c"]
+
+        await asyncio.sleep(0.06)
+        misses = service.misses
+        await service.get_user_preferences("c")
+        assert service.misses == misses + 1
+    finally:
+        await service.close()
+        await _flush()
+
+
+@pytest.mark.asyncio
+async def test_failed_update_leaves_cache_untouched():
+    """Test updates work on a copy, so the cached entry only changes once saved."""
+    await _flush()
+    service = UserPreferencesService()
+    try:
+        cached = await service.get_user_preferences("u1")
+        service.save_user_preferences = lambda preferences: asyncio.sleep(0, result=False)
+
+        assert not await service.update_betting_preferences("u1", {"risk_level": RiskLevel.AGGRESSIVE})
+        assert cached.betting.risk_level == RiskLevel.MODERATE
+    finally:
+        await service.close()
+        await _flush()
+
+
+@pytest.mark.asyncio
+async def test_write_on_one_instance_invalidates_another():
+    """Test pub/sub evicts a peer's cached copy so it reads the new value."""
+    await _flush()
+    writer, reader = UserPreferencesService(), UserPreferencesService()
+    try:
+        assert await reader.get_user_max_bet_amount("u1") == 100.0
+        await writer._get_redis()
+        await asyncio.sleep(0.05)  # Both listeners subscribed
+
+        assert await writer.update_betting_preferences("u1", {"max_bet_amount": 40.0})
+
+        assert await _wait_for(lambda: "u1" not in reader._cache)
+        assert await reader.get_user_max_bet_amount("u1") == 40.0
+        assert "u1" in writer._cache  # Own writes are not evicted
+    finally:
+        await writer.close()
+        await reader.close()
+        await _flush()
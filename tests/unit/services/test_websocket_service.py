@@ -0,0 +1,366 @@
+"""
+Unit Tests for EnhancedWebSocketManager
+=======================================
+Tests the broadcast engine (single serialization, concurrent per-connection
+writers, back-pressure policies) and topic-indexed subscription routing.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import jwt
+import pytest
+
+from src.config import settings
+from src.services.message_broadcasting import BroadcastMessage, MessageBroadcaster, MessagePriority
+from src.services.websocket_service import (
+    BackpressurePolicy,
+    ConnectionInfo,
+    ConnectionStatus,
+    EnhancedWebSocketManager,
+    MessageType,
+    SubscriptionIndex,
+    TopicKind,
+    WebSocketMessage,
+)
+
+
+class FakeWebSocket:
+    """Records frames; optionally blocks every send until released."""
+
+    def __init__(self, blocked: bool = False):
+        self.frames = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+        if not blocked:
+            self.release.set()
+
+    async def send_text(self, frame: str):
+        await self.release.wait()
+        self.frames.append(frame)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+@asynccontextmanager
+async def running_manager(policy=BackpressurePolicy.DROP_OLDEST, queue_size=4, send_timeout=5.0, live_redis=False):
+    """Manager with a mocked (or live) Redis client; writer tasks are stopped on exit."""
+    manager = EnhancedWebSocketManager()
+    if live_redis:
+        await manager.initialize()
+    else:
+        manager.redis_manager.redis_client = AsyncMock()
+    manager.backpressure_policy = policy
+    manager.send_queue_size = queue_size
+    manager.send_timeout = send_timeout
+    manager.broadcast_shard_size = 2
+    try:
+        yield manager
+    finally:
+        await manager.shutdown()
+
+
+def _attach(manager, websocket, session_id):
+    now = datetime.now()
+    info = ConnectionInfo(
+        websocket=websocket, session_id=session_id, client_id=session_id, instance_id=manager.instance_id,
+        connected_at=now, last_activity=now, status=ConnectionStatus.CONNECTED,
+        subscriptions=set(), user_preferences={}
+    )
+    manager._register_local(info)
+    return info
+
+
+async def _drain():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_serializes_payload_once():
+    """Test every connection is sent the very same pre-encoded frame."""
+    async with running_manager() as manager:
+        sockets = [FakeWebSocket() for _ in range(5)]
+        for i, ws in enumerate(sockets):
+            _attach(manager, ws, f"s{i}")
+
+        message = WebSocketMessage(type=MessageType.SYSTEM_ALERT, data={"text": "hi"}, timestamp=datetime.now())
+        await manager._local_broadcast(message.to_dict())
+        await _drain()
+
+        frames = [ws.frames[0] for ws in sockets]
+        assert all(frame is frames[0] for frame in frames)
+        assert '"system_alert"' in frames[0]
+        assert manager.get_connection_stats()["frames_queued"] == 5
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_encodes_each_message_once():
+    """Test an untargeted broadcast reaches every instance as one shared pre-encoded frame."""
+    async with running_manager(live_redis=True) as publisher, running_manager(live_redis=True) as follower:
+        redis_client = await publisher.redis_manager.get_redis()
+        await redis_client.flushdb()
+        sockets = [FakeWebSocket() for _ in range(4)]
+        for i, ws in enumerate(sockets):
+            _attach(publisher if i < 2 else follower, ws, f"s{i}")
+        broadcaster = MessageBroadcaster(redis_client, publisher)
+        message = BroadcastMessage(id="m1", type="system_alert", data={"text": "hi"},
+                                   priority=MessagePriority.NORMAL, timestamp=datetime.now())
+
+        assert await broadcaster._deliver_single_message(message) is True
+        for _ in range(50):
+            if all(ws.frames for ws in sockets):
+                break
+            await asyncio.sleep(0.01)
+
+        frames = [ws.frames[0] for ws in sockets]
+        assert frames[0] is frames[1] and frames[2] is frames[3]  # Encoded once per instance
+        assert frames[0] == frames[2] and '"system_alert"' in frames[0]
+        await redis_client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_others():
+    """Test a blocked socket leaves the rest of the fan-out unaffected."""
+    async with running_manager() as manager:
+        slow = FakeWebSocket(blocked=True)
+        _attach(manager, slow, "slow")
+        fast = [FakeWebSocket() for _ in range(3)]
+        for i, ws in enumerate(fast):
+            _attach(manager, ws, f"fast{i}")
+
+        await asyncio.wait_for(manager._local_broadcast({"type": "notification", "data": {}}), timeout=1)
+        await _drain()
+
+        assert all(len(ws.frames) == 1 for ws in fast)
+        assert slow.frames == []
+        slow.release.set()
+        await _drain()
+        assert len(slow.frames) == 1
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_latest_frames():
+    """Test a full queue evicts the oldest frame under DROP_OLDEST."""
+    async with running_manager(BackpressurePolicy.DROP_OLDEST, queue_size=2) as manager:
+        slow = FakeWebSocket(blocked=True)
+        _attach(manager, slow, "slow")
+        await manager._local_broadcast({"seq": 0})
+        await _drain()  # Writer is now parked sending frame 0
+
+        for i in range(1, 5):
+            await manager._local_broadcast({"seq": i})
+        slow.release.set()
+        await _drain()
+
+        # Frames 1 and 2 were evicted to make room for 3 and 4
+        assert slow.frames == ['{"seq": 0}', '{"seq": 3}', '{"seq": 4}']
+        assert manager.get_connection_stats()["frames_dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_discards_incoming_frames():
+    """Test a full queue rejects new frames under DROP_NEWEST."""
+    async with running_manager(BackpressurePolicy.DROP_NEWEST, queue_size=2) as manager:
+        slow = FakeWebSocket(blocked=True)
+        _attach(manager, slow, "slow")
+        await manager._local_broadcast({"seq": 0})
+        await _drain()
+
+        for i in range(1, 5):
+            await manager._local_broadcast({"seq": i})
+        slow.release.set()
+        await _drain()
+
+        assert slow.frames == ['{"seq": 0}', '{"seq": 1}', '{"seq": 2}']
+        assert manager.get_connection_stats()["frames_dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    """Test a full queue disconnects the consumer under DISCONNECT."""
+    async with running_manager(BackpressurePolicy.DISCONNECT, queue_size=1) as manager:
+        slow = FakeWebSocket(blocked=True)
+        _attach(manager, slow, "slow")
+        fast = FakeWebSocket()
+        _attach(manager, fast, "fast")
+        await _drain()
+
+        for i in range(3):
+            await manager._local_broadcast({"seq": i})
+            await _drain()
+
+        assert "slow" not in manager.local_connections
+        assert slow.closed_with == 1013
+        assert len(fast.frames) == 3
+        assert manager.broadcast_stats["slow_consumers_disconnected"] == 1
+        manager.redis_manager.redis_client.delete.assert_awaited_with("websocket:session:slow")
+
+
+@pytest.mark.asyncio
+async def test_send_timeout_disconnects_stuck_socket():
+    """Test a write that never completes is abandoned after send_timeout."""
+    async with running_manager(send_timeout=0.01) as manager:
+        stuck = FakeWebSocket(blocked=True)
+        _attach(manager, stuck, "stuck")
+
+        await manager.send_local_message(
+            manager.local_connections["stuck"],
+            WebSocketMessage(type=MessageType.PING, data={}, timestamp=datetime.now())
+        )
+        await asyncio.sleep(0.05)
+
+        assert "stuck" not in manager.local_connections
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_pending_drops():
+    """Test drop tasks are tracked until done and shutdown lets them finish."""
+    class SlowClosingWebSocket(FakeWebSocket):
+        async def close(self, code: int = 1000):
+            await asyncio.sleep(0.02)
+            await super().close(code)
+
+    async with running_manager() as manager:
+        websocket = SlowClosingWebSocket()
+        _attach(manager, websocket, "slow")
+
+        manager._on_send_failure("slow", "test")
+        assert len(manager._drop_tasks) == 1
+
+        await manager.shutdown()
+        assert not manager._drop_tasks
+        assert websocket.closed_with == 1013
+        manager.redis_manager.redis_client.delete.assert_awaited_with("websocket:session:slow")
+
+
+def test_subscription_index_reports_first_and_last_subscriber():
+    """Test the index flags when a topic gains its first or loses its last session."""
+    index = SubscriptionIndex()
+    nba = SubscriptionIndex.topic(TopicKind.SPORT, "NBA")
+
+    assert index.add(nba, "a") is True
+    assert index.add(nba, "b") is False
+    assert index.add(SubscriptionIndex.topic(TopicKind.USER, "u1"), "a") is True
+    assert index.sessions([nba]) == {"a", "b"}
+    assert index.remove(nba, "b") is False
+
+    topics, emptied = index.remove_session("a")
+    assert set(topics) == {nba, (TopicKind.USER, "u1")}
+    assert set(emptied) == set(topics)
+    assert len(index) == 0
+
+
+@pytest.mark.asyncio
+async def test_topic_sends_reach_only_subscribers():
+    """Test sport, channel and user sends touch only the indexed sessions."""
+    async with running_manager(live_redis=True) as manager:
+        redis_client = await manager.redis_manager.get_redis()
+        await redis_client.flushdb()
+        sockets = {name: FakeWebSocket() for name in ("nba", "nhl", "alerts", "user")}
+        conns = {name: _attach(manager, ws, name) for name, ws in sockets.items()}
+        await manager.subscribe_to_sport(conns["nba"], "nba")
+        await manager.subscribe_to_sport(conns["nhl"], "NHL")
+        await manager.subscribe_to_channel(conns["alerts"], "alerts")
+        token = jwt.encode({"sub": "user-42"}, settings.secret_key, algorithm="HS256")
+        assert await manager.authenticate_connection(conns["user"], token)
+
+        assert await manager.broadcast_to_sport("NBA", {"odds": -110}) == 1
+        assert await manager.broadcast_to_channel("alerts", {"alert": 1}) == 1
+        assert await manager.send_to_user("user-42", {"note": 1}) == 1
+        await _drain()
+
+        assert sockets["nba"].frames == ['{"odds": -110}']
+        assert sockets["nhl"].frames == []
+        assert sockets["alerts"].frames == ['{"alert": 1}']
+        assert sockets["user"].frames == ['{"note": 1}']
+        assert await redis_client.smembers("websocket:topic:sport:nhl") == {"nhl"}
+        assert await redis_client.smembers("websocket:topic_instances:user:user-42") == {manager.instance_id}
+
+        await manager.disconnect("nhl")
+        assert manager.subscriptions.sessions([SubscriptionIndex.topic(TopicKind.SPORT, "nhl")]) == set()
+        assert await redis_client.smembers("websocket:topic:sport:nhl") == set()
+        assert await redis_client.smembers("websocket:topic_instances:sport:nhl") == set()
+        await redis_client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_topic_message_relays_only_to_subscribed_instances():
+    """Test a sport update published on one instance reaches subscribers on another."""
+    async with running_manager(live_redis=True) as publisher, running_manager(live_redis=True) as follower:
+        redis_client = await publisher.redis_manager.get_redis()
+        await redis_client.flushdb()
+        remote = FakeWebSocket()
+        await follower.subscribe_to_sport(_attach(follower, remote, "remote"), "mlb")
+
+        assert await publisher.broadcast_to_sport("mlb", {"game": "NYY@BOS"}) == 0
+        for _ in range(50):
+            if remote.frames:
+                break
+            await asyncio.sleep(0.01)
+
+        assert remote.frames == ['{"game": "NYY@BOS"}']
+        await redis_client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_targets_come_from_index():
+    """Test MessageBroadcaster resolves channel, user and sport targets via the index."""
+    async with running_manager() as manager:
+        conns = {name: _attach(manager, FakeWebSocket(), name) for name in ("a", "b", "c")}
+        await manager.subscribe_to_sport(conns["a"], "nfl")
+        await manager.subscribe_to_channel(conns["b"], "predictions")
+        broadcaster = MessageBroadcaster(AsyncMock(), manager)
+        message = BroadcastMessage(id="m1", type="prediction_update", data={}, priority=MessagePriority.NORMAL,
+                                   timestamp=datetime.now(), target_sports=["NFL"], target_channels=["predictions"])
+
+        targets = await broadcaster._get_target_connections(message)
+
+        assert sorted(conn.session_id for conn in targets) == ["a", "b"]
+        assert BroadcastMessage.from_dict(message.to_dict()).target_sports == ["NFL"]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_targets_reach_other_instances():
+    """Test a user-targeted broadcast is relayed to the instance holding the user's socket."""
+    async with running_manager(live_redis=True) as publisher, running_manager(live_redis=True) as follower:
+        redis_client = await publisher.redis_manager.get_redis()
+        await redis_client.flushdb()
+        remote = FakeWebSocket()
+        token = jwt.encode({"sub": "user-7"}, settings.secret_key, algorithm="HS256")
+        assert await follower.authenticate_connection(_attach(follower, remote, "remote"), token)
+        broadcaster = MessageBroadcaster(redis_client, publisher)
+        message = BroadcastMessage(id="m1", type="notification", data={"text": "hi"},
+                                   priority=MessagePriority.NORMAL, timestamp=datetime.now(), target_users=["user-7"])
+
+        assert await broadcaster._deliver_single_message(message) is True
+        for _ in range(50):
+            if remote.frames:
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(remote.frames) == 1 and '"hi"' in remote.frames[0]
+        assert [r.recipient_id for r in broadcaster.delivery_receipts["m1"]] == ["user:user-7"]
+        await redis_client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_topic_memberships_expire_unless_refreshed():
+    """Test topic sets carry a TTL and the owning instance re-creates them on refresh."""
+    async with running_manager(live_redis=True) as manager:
+        redis_client = await manager.redis_manager.get_redis()
+        await redis_client.flushdb()
+        await manager.subscribe_to_sport(_attach(manager, FakeWebSocket(), "s1"), "nba")
+
+        assert 0 < await redis_client.ttl("websocket:topic:sport:nba") <= manager.topic_ttl
+        assert 0 < await redis_client.ttl("websocket:topic_instances:sport:nba") <= manager.topic_ttl
+
+        await redis_client.delete("websocket:topic:sport:nba", "websocket:topic_instances:sport:nba")
+        assert await manager.refresh_topics() == 1
+        assert await redis_client.smembers("websocket:topic:sport:nba") == {"s1"}
+        assert await redis_client.smembers("websocket:topic_instances:sport:nba") == {manager.instance_id}
+        assert await redis_client.ttl("websocket:topic:sport:nba") > 0
+        await redis_client.flushdb()
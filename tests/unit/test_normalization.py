@@ -51,3 +51,48 @@ def test_find_match(service):
     # No match
     match_none = service.find_match("Liverpool", lookup)
     assert match_none is None
+
+def test_name_index_resolves_aliases_and_nicknames(service):
+    index = service.build_index([
+        "Boston Bruins", "Detroit Red Wings", "Los Angeles Kings",
+        "Montreal Canadiens", "New York Rangers", "New York Islanders",
+    ])
+
+    assert index.resolve("boston bruins") == "Boston Bruins"
+    assert index.resolve("Bruins") == "Boston Bruins"
+    assert index.resolve("Boston") == "Boston Bruins"
+    assert index.resolve("Red Wings") == "Detroit Red Wings"
+    assert index.resolve("LA Kings") == "Los Angeles Kings"
+    assert index.resolve("Montréal Canadiens") == "Montreal Canadiens"
+    assert index.resolve("NY Rangers") == "New York Rangers"
+    # Ambiguous city and unrelated same-city team do not resolve
+    assert index.resolve("New York") is None
+    assert index.resolve("Los Angeles Lakers") is None
+    assert index.resolve("Liverpool") is None
+
+def test_name_index_fuzzy_fallback_is_memoized(service):
+    index = service.build_index(["Tampa Bay Lightning", "Montreal Canadiens"])
+
+    assert index.resolve("Montreal Canadians") == "Montreal Canadiens"
+    assert "montreal canadians" in index._memo
+    assert index.resolve("Tampa Bay Lighting") == "Tampa Bay Lightning"
+
+def test_name_index_memo_is_bounded(service):
+    index = service.build_index(["Tampa Bay Lightning", "Montreal Canadiens"])
+    index.MEMO_SIZE = 3
+
+    assert index.resolve("Montreal Canadians") == "Montreal Canadiens"
+    for i in range(10):
+        assert index.resolve(f"Unknown Team {i}") is None
+        index.resolve("Montreal Canadians")  # Recently used entries survive eviction
+
+    assert len(index._memo) == 3
+    assert "montreal canadians" in index._memo and "unknown team 0" not in index._memo
+
+def test_name_index_matches_player_name_formats(service):
+    index = service.build_index(["Djokovic N.", "Alcaraz C.", "Sinner J."], people=True)
+
+    assert index.resolve("Novak Djokovic") == "Djokovic N."
+    assert index.resolve("Carlos Alcaraz") == "Alcaraz C."
+    assert index.resolve("Sinner") == "Sinner J."
+    assert index.resolve("Roger Federer") is None
@@ -1,5 +1,11 @@
 
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+
 import pytest
+from aiohttp import web
 from src.services.real_sports_service import RealSportsService
 
 def test_real_sports_service_initialization():
@@ -16,3 +22,147 @@ async def test_endpoint_mapping():
     service = RealSportsService()
     assert service.ENDPOINTS["nfl"] == "/football/nfl/scoreboard"
     assert service.ENDPOINTS["ncaab"] == "/basketball/mens-college-basketball/scoreboard"
+
+
+@asynccontextmanager
+async def stub_server():
+    """Local ESPN API stand-in with a fixed per-request latency."""
+    state = {"in_flight": 0, "max_in_flight": 0, "requests": 0, "peers": set()}
+
+    async def scoreboard(request):
+        state["requests"] += 1
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.2)
+        state["in_flight"] -= 1
+        day = request.query.get("dates", "today")
+        return web.json_response({"events": [{
+            "id": f"{request.match_info['league']}-{day}",
+            "date": "2026-10-16T23:00Z",
+            "name": "Away at Home",
+            "shortName": "AWY @ HOM",
+            "status": {"type": {"description": "Scheduled"}},
+            "competitions": [{"competitors": [
+                {"homeAway": "home", "team": {"id": "1", "displayName": "Home"}, "score": "0"},
+                {"homeAway": "away", "team": {"id": "2", "displayName": "Away"}, "score": "0"},
+            ]}],
+        }]})
+
+    app = web.Application()
+    app.router.add_get("/espn/{group}/{league}/scoreboard", scoreboard)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", state
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_get_live_games_many_fetches_concurrently(monkeypatch):
+    """Test (sport, date) scoreboards are fetched in parallel over one pooled client."""
+    monkeypatch.setattr("src.services.real_sports_service.settings.the_odds_api_key", None)
+    sports = ["nfl", "nhl", "ncaab", "wnba"]
+    dates = [date(2026, 10, 16), date(2026, 10, 17)]
+
+    async with stub_server() as (base_url, state):
+        service = RealSportsService(base_url=f"{base_url}/espn", max_concurrency=8, host_rate_limit=100)
+        start = time.perf_counter()
+        results = await service.get_live_games_many(sports, dates)
+        elapsed = time.perf_counter() - start
+        await service.aclose()
+
+    assert len(results) == 8
+    assert results[("nhl", date(2026, 10, 17))][0]["id"] == "nhl-20261017"
+    assert state["requests"] == 8
+    assert state["max_in_flight"] == 8
+    assert elapsed < 0.2 * 4  # Sequential would take 1.6s
+    assert len(state["peers"]) <= 8  # Connections come from one shared pool
+
+
+@pytest.mark.asyncio
+async def test_get_live_games_many_respects_concurrency_limit(monkeypatch):
+    """Test in-flight requests never exceed the configured limit."""
+    monkeypatch.setattr("src.services.real_sports_service.settings.the_odds_api_key", None)
+
+    async with stub_server() as (base_url, state):
+        service = RealSportsService(base_url=f"{base_url}/espn", max_concurrency=2, host_rate_limit=100)
+        results = await service.get_live_games_many(["nfl", "nhl", "ncaab", "ncaaw"])
+        await service.aclose()
+
+    assert all(len(games) == 1 for games in results.values())
+    assert state["max_in_flight"] == 2
+
+
+def _odds_handler(state):
+    async def odds(request):
+        state["odds_requests"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            state["not_modified"] += 1
+            return web.Response(status=304)
+        await asyncio.sleep(0.05)
+        return web.json_response([{"home_team": "Home", "bookmakers": []}], headers={"ETag": '"v1"'})
+    return odds
+
+
+@pytest.mark.asyncio
+async def test_scoreboard_cache_serves_repeat_requests(monkeypatch):
+    """Test repeat and concurrent scoreboard requests share one upstream call."""
+    monkeypatch.setattr("src.services.real_sports_service.settings.the_odds_api_key", None)
+
+    async with stub_server() as (base_url, state):
+        service = RealSportsService(base_url=f"{base_url}/espn")
+        concurrent = await asyncio.gather(*(service.get_live_games("nhl") for _ in range(5)))
+        repeat = await service.get_live_games("nhl")
+        other_date = await service.get_live_games("nhl", date=date(2026, 10, 17))
+        await service.aclose()
+
+    assert all(games == repeat for games in concurrent)
+    assert other_date[0]["id"] == "nhl-20261017"
+    assert state["requests"] == 2  # One per (sport, date)
+    assert service.cache.stats["shared"] == 4
+
+
+@pytest.mark.asyncio
+async def test_odds_cache_revalidates_with_etag():
+    """Test stale odds are revalidated with If-None-Match and reused on 304."""
+    state = {"odds_requests": 0, "not_modified": 0}
+    app = web.Application()
+    app.router.add_get("/odds/{sport}/odds", _odds_handler(state))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        service = RealSportsService(odds_api_url=f"http://127.0.0.1:{port}/odds")
+        first = await service._fetch_live_odds("nhl")
+        await service._fetch_live_odds("nhl")  # Fresh hit
+        for entry in service.cache._entries.values():
+            entry.expires_at = 0  # Force staleness
+        revalidated = await service._fetch_live_odds("nhl")
+        await service.aclose()
+    finally:
+        await runner.cleanup()
+
+    assert revalidated == first
+    assert state["odds_requests"] == 2
+    assert state["not_modified"] == 1
+    assert service.cache.stats["revalidated"] == 1
+
+
+def test_final_scoreboard_ttl_only_applies_to_past_dates():
+    """Test the undated scoreboard keeps the live TTL even when every game on it is final."""
+    service = RealSportsService()
+    final = {"events": [{"status": {"type": {"completed": True}}}]}
+    live = {"events": [{"status": {"type": {"completed": False}}}]}
+    yesterday = date.today() - timedelta(days=1)
+
+    assert service._scoreboard_ttl("nfl", yesterday, final) == service.FINAL_SCOREBOARD_TTL
+    assert service._scoreboard_ttl("nfl", None, final) == service.SCOREBOARD_TTLS["nfl"]
+    assert service._scoreboard_ttl("nfl", date.today(), final) == service.SCOREBOARD_TTLS["nfl"]
+    assert service._scoreboard_ttl("nfl", yesterday, live) == service.SCOREBOARD_TTLS["nfl"]